@@ -13,6 +13,7 @@ from .tree import TreeNode, DictNode, ObjectNode, PropertyNode, CallableNode
 from .serialization import ObjectDeserializer
 from .version import VersionNode
 from dal.validation.constants import REDIS_SCHEMA_FOLDER_PATH
+from dal.validation.snapshot import SchemaSnapshot
 
 
 class SchemaNode(DictNode):
@@ -144,7 +145,14 @@ class SchemasTree(CallableNode):
 
         schema_file = path.join(REDIS_SCHEMA_FOLDER_PATH, version, f"{name}.json")
 
-        if not Resource.exists(schema_file):
+        # the snapshot has the parsed schema files, we only go
+        # to the files if the schema is not there
+        snapshot = SchemaSnapshot.from_url(REDIS_SCHEMA_FOLDER_PATH)
+        if f"{version}/{name}.json" in snapshot:
+            schema_data = snapshot.load(f"{version}/{name}.json")
+        elif Resource.exists(schema_file):
+            schema_data = Resource.read_json(schema_file)
+        else:
             raise FileNotFoundError(schema_file)
 
         try:
@@ -153,7 +161,6 @@ class SchemasTree(CallableNode):
             version_tree = SchemaVersionNode(version)
             self.add_child((version, version_tree))
 
-        schema_data = Resource.read_json(schema_file)
         schema_node = SchemaNode(name)
         version_tree.add_child((name, schema_node))
         SchemaDeserializer(version).deserialize(schema_node, schema_data)
@@ -0,0 +1,215 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Compiled parameter expressions, $(<kind> <reference>), used by the ParamParser
+
+   Every distinct expression is split only once into literal parts and
+   references, the results are cached by the expression string.
+   Evaluated parameters are memoized by the parser and checked against
+   the generation of the kinds of references they used, invalidate()
+   moves the generation forward when flows, nodes, configurations or vars
+   change in this process. The writes of other processes are seen through
+   the generation stamps of the scopes in redis, sync() reads them at most
+   once every MOVAI_PARAM_STAMPS_INTERVAL seconds.
+"""
+import ast
+import copy
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple, Union
+
+from movai_core_shared.logger import Log
+
+from dal.utils.generations import stamps
+
+LOGGER = Log.get_logger("ParamParser.mov.ai")
+
+KINDS = ("config", "param", "var", "flow")
+
+# kinds of references that read the objects of each scope, vars have no
+# generation stamps and are only kept for VAR_TTL
+SCOPE_KINDS = {
+    "Configuration": ("config",),
+    "Flow": ("flow", "param"),
+    "Node": ("param",),
+}
+
+# a reference inside an expression
+REFERENCE_REGEX = re.compile(r"\$\((param|config|var|flow)[^$)]+\)")
+
+# the parts of a valid reference, $(<kind> <name>)
+REFERENCE_PARTS_REGEX = re.compile(rf"\$\(({'|'.join(KINDS)})\s+([\w\.-]+)\)")
+
+CACHE_SIZE = int(os.getenv("MOVAI_PARAM_EXPRESSIONS_CACHE_SIZE", "8192"))
+
+# vars can be changed by other processes, their values are only kept for a while
+VAR_TTL = float(os.getenv("MOVAI_PARAM_VAR_TTL", "1.0"))
+
+# how often the generation stamps of the scopes are read from redis
+STAMPS_INTERVAL = float(os.getenv("MOVAI_PARAM_STAMPS_INTERVAL", "1.0"))
+
+_IMMUTABLE = (str, int, float, complex, bool, bytes, type(None))
+_NOT_LITERAL = object()
+
+_GENERATIONS = {kind: 0 for kind in KINDS}
+_GENERATIONS_LOCK = Lock()
+
+# stamps of the scopes in redis when last read, and when they were read
+_STAMPS: Dict[str, Optional[int]] = {}
+_SYNCED = [float("-inf")]
+
+
+@dataclass(frozen=True)
+class Reference:
+    """A reference in an expression, kind and name are None if the reference is not valid"""
+
+    text: str
+    kind: Optional[str]
+    name: Optional[str]
+
+
+@dataclass(frozen=True)
+class Expression:
+    """An expression split in literal parts and references"""
+
+    text: str
+    parts: Tuple[Union[str, Reference], ...]
+
+    @property
+    def kinds(self) -> FrozenSet[str]:
+        """The kinds of the valid references in the expression"""
+        return frozenset(
+            part.kind for part in self.parts if isinstance(part, Reference) and part.kind
+        )
+
+    @property
+    def has_references(self) -> bool:
+        """Whether the expression has any reference"""
+        return any(isinstance(part, Reference) for part in self.parts)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text: str) -> Expression:
+    """
+    Split an expression in literal parts and references
+    """
+    parts = []
+    position = 0
+    for match in REFERENCE_REGEX.finditer(text):
+        if match.start() > position:
+            parts.append(text[position : match.start()])
+
+        result = REFERENCE_PARTS_REGEX.search(match.group())
+        if result is None:
+            parts.append(Reference(match.group(), None, None))
+        else:
+            parts.append(Reference(match.group(), result.group(1), result.group(2)))
+
+        position = match.end()
+
+    if position < len(text):
+        parts.append(text[position:])
+
+    return Expression(text, tuple(parts))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _literal(text: str):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return _NOT_LITERAL
+
+
+def literal(text: str):
+    """
+    Evaluate a string as a python literal ex.: "[1,2,3,4]",
+    returns the string itself if it is not a literal
+    """
+    value = _literal(text)
+    if value is _NOT_LITERAL:
+        return text
+
+    return private_copy(value)
+
+
+def private_copy(value):
+    """Copy of a cached value that the caller can change"""
+    return value if isinstance(value, _IMMUTABLE) else copy.deepcopy(value)
+
+
+def invalidate(*kinds: str) -> None:
+    """
+    Invalidate the memoized parameters that used references of the given kinds,
+    all kinds if none given
+    """
+    with _GENERATIONS_LOCK:
+        for kind in kinds or KINDS:
+            _GENERATIONS[kind] += 1
+
+
+def stamps_connection():
+    """Connection used to read the generation stamps of the scopes"""
+    from dal.movaidb import MovaiDB
+
+    return MovaiDB().db_read
+
+
+def sync(force: bool = False) -> None:
+    """
+    Invalidate the kinds of references that read scopes written by any
+    process since the last read of their generation stamps in redis,
+    the stamps are read at most once every STAMPS_INTERVAL seconds
+    """
+    now = time.monotonic()
+    with _GENERATIONS_LOCK:
+        if not force and now - _SYNCED[0] < STAMPS_INTERVAL:
+            return
+        _SYNCED[0] = now
+
+    try:
+        current = stamps(stamps_connection(), SCOPE_KINDS)
+    except Exception as e:  # pylint: disable=broad-except
+        # the values are kept until a write of this process or the next read
+        LOGGER.debug(f"Could not read the generation stamps: {e}")
+        return
+
+    with _GENERATIONS_LOCK:
+        changed = [scope for scope, stamp in current.items() if _STAMPS.get(scope) != stamp]
+        _STAMPS.update(current)
+        for kind in {kind for scope in changed for kind in SCOPE_KINDS[scope]}:
+            _GENERATIONS[kind] += 1
+
+
+def generation(kinds: Iterable[str]) -> Tuple[int, ...]:
+    """Current generation of the given kinds"""
+    return tuple(_GENERATIONS[kind] for kind in sorted(kinds))
+
+
+@dataclass(frozen=True)
+class MemoEntry:
+    """A memoized parameter value"""
+
+    value: object
+    kinds: FrozenSet[str]
+    generation: Tuple[int, ...]
+    created: float
+
+    @classmethod
+    def create(cls, value, kinds: Iterable[str]) -> "MemoEntry":
+        """Memoize a value computed with references of the given kinds"""
+        kinds = frozenset(kinds)
+        return cls(value, kinds, generation(kinds), time.monotonic())
+
+    def is_valid(self) -> bool:
+        """Whether none of the references used changed"""
+        if generation(self.kinds) != self.generation:
+            return False
+
+        return "var" not in self.kinds or time.monotonic() - self.created < VAR_TTL
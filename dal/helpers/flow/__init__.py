@@ -7,5 +7,7 @@
    - Erez Zomer  (erez@mov.ai) - 2022
 """
 from .gflow import GFlow
+from .compiled import CompiledFlow, FlowCompiler
+from .launch import LaunchPlan, LaunchPlanCompiler
 
-__all__ = ["GFlow"]
+__all__ = ["GFlow", "CompiledFlow", "FlowCompiler", "LaunchPlan", "LaunchPlanCompiler"]
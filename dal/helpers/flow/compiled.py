@@ -0,0 +1,260 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Compiled (flattened) flow graph, all the node instances, links and
+   containers of a flow and all its subflows with the names prefixed
+   the same way Flow.get_dict does
+"""
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from movai_core_shared.logger import Log
+
+if TYPE_CHECKING:
+    from dal.models import Flow
+
+
+START = "START/START/START"
+
+# attributes of a flow that change its compiled graph
+STRUCTURE_ATTRIBUTES = ("NodeInst", "Links", "Container")
+
+
+@dataclass
+class CompiledFlow:
+    """
+    Flattened graph of a flow, references are stored as paths so
+    the graph can be shared between processes:
+        nodes: { <prefixed node instance>: [<flow path>, <node instance>] }
+        links: { <prefixed link id>: {"From": ..., "To": ..., "Dependency": ...} }
+        containers: { <prefixed container>: [<flow path>, <container>, <subflow path>] }
+        templates: { <prefixed node instance>: <node template> }
+    """
+
+    key: str
+    path: str
+    nodes: Dict[str, List[str]] = field(default_factory=dict)
+    links: Dict[str, dict] = field(default_factory=dict)
+    containers: Dict[str, List[str]] = field(default_factory=dict)
+    templates: Dict[str, str] = field(default_factory=dict)
+
+    def extend(self, label: str, other: "CompiledFlow") -> None:
+        """
+        Add the graph of a subflow, placed in the container with the given label
+        """
+        prefix = f"{label}__"
+
+        for name, ref in other.nodes.items():
+            self.nodes[f"{prefix}{name}"] = ref
+            self.templates[f"{prefix}{name}"] = other.templates[name]
+
+        for _id, link in other.links.items():
+            self.links[f"{prefix}{_id}"] = {
+                "From": (
+                    f"{prefix}{link['From']}" if link["From"].upper() != START else link["From"]
+                ),
+                "To": f"{prefix}{link['To']}",
+                "Dependency": link["Dependency"],
+            }
+
+        for name, ref in other.containers.items():
+            self.containers[f"{prefix}{name}"] = ref
+
+    def to_json(self) -> str:
+        """Serialize the graph"""
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data) -> "CompiledFlow":
+        """Load a serialized graph"""
+        return cls(**json.loads(data))
+
+
+class FlowCompiler:
+    """
+    Compile flows into CompiledFlow objects
+
+    The key of a compiled flow is a hash of the structure of the flow and
+    the keys of all its subflows, any change in a subflow changes the key
+    of all the flows using it. Subflows are compiled on their own and
+    cached, when a single subflow changes only the flows in its path up to
+    the main flow are compiled again, shared subflows are compiled once.
+
+    Compiled flows are kept in a process LRU cache, and optionally in redis
+    (MOVAI_FLOW_GRAPH_REDIS=true) to be shared with other processes
+    """
+
+    logger = Log.get_logger("compiled.flow.mov.ai")
+
+    _CACHE = LRUCache(maxsize=int(os.getenv("MOVAI_FLOW_GRAPH_CACHE_SIZE", "256")))
+    _LOCK = Lock()
+
+    REDIS_ENABLED = os.getenv("MOVAI_FLOW_GRAPH_REDIS", "false").lower() in ("1", "true")
+    REDIS_PREFIX = "_compiled_flow:"
+    REDIS_TTL = int(os.getenv("MOVAI_FLOW_GRAPH_REDIS_TTL", str(24 * 3600)))
+
+    def __init__(self, use_redis: Optional[bool] = None):
+        self._use_redis = FlowCompiler.REDIS_ENABLED if use_redis is None else use_redis
+        self._compiled: Dict[str, CompiledFlow] = {}
+        self.built = 0
+
+    @staticmethod
+    def flow_path(flow: "Flow") -> str:
+        """Full path of a flow"""
+        return f"{flow.workspace}/Flow/{flow.ref}/{flow.version}"
+
+    @staticmethod
+    def digest(flow: "Flow") -> str:
+        """Hash of the attributes of a flow that are part of the graph"""
+        data = flow.serialize()
+        structure = {attr: data.get(attr) for attr in STRUCTURE_ATTRIBUTES}
+        content = json.dumps(structure, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    def compile(self, flow: "Flow", prev_flows: Tuple[str, ...] = ()) -> CompiledFlow:
+        """
+        Return the compiled graph of a flow
+        """
+        if flow.ref in prev_flows:
+            raise RecursionError("Flow already in use, this will lead to infinite recursion")
+
+        path = FlowCompiler.flow_path(flow)
+
+        # shared subflows are only compiled once per call
+        try:
+            return self._compiled[path]
+        except KeyError:
+            pass
+
+        children = []
+        for name, container in flow.Container.items():
+            subflow = container.subflow
+            children.append((name, container, self.compile(subflow, prev_flows + (flow.ref,))))
+
+        key = hashlib.sha256(
+            "".join(
+                [path, FlowCompiler.digest(flow)]
+                + [
+                    f"{name}:{container.ContainerLabel}:{child.key}"
+                    for name, container, child in children
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+
+        compiled = self.lookup(key)
+        if compiled is None:
+            compiled = self.build(flow, path, key, children)
+            self.store(compiled)
+
+        self._compiled[path] = compiled
+        return compiled
+
+    def build(self, flow: "Flow", path: str, key: str, children: list) -> CompiledFlow:
+        """
+        Build the graph of a flow given the compiled graphs of its subflows
+        """
+        self.built += 1
+        compiled = CompiledFlow(key=key, path=path)
+
+        for name, node_inst in flow.NodeInst.items():
+            compiled.nodes[name] = [path, name]
+            compiled.templates[name] = node_inst.Template
+
+        for _id, link in flow.Links.items():
+            compiled.links[_id] = {
+                "From": link["From"],
+                "To": link["To"],
+                "Dependency": link.get("Dependency", flow.Links.__DEFAULT_DEPENDENCY__),
+            }
+
+        for name, container, child in children:
+            compiled.containers[container.ContainerLabel] = [path, name, child.path]
+            compiled.extend(container.ContainerLabel, child)
+
+        return compiled
+
+    def lookup(self, key: str) -> Optional[CompiledFlow]:
+        """
+        Get a compiled flow from the caches
+        """
+        with FlowCompiler._LOCK:
+            try:
+                return FlowCompiler._CACHE[key]
+            except KeyError:
+                pass
+
+        if not self._use_redis:
+            return None
+
+        try:
+            data = self.redis().get(f"{FlowCompiler.REDIS_PREFIX}{key}")
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.warning(f"Could not read compiled flow from redis: {e}")
+            return None
+
+        if data is None:
+            return None
+
+        compiled = CompiledFlow.from_json(data)
+        with FlowCompiler._LOCK:
+            FlowCompiler._CACHE[key] = compiled
+        return compiled
+
+    def store(self, compiled: CompiledFlow) -> None:
+        """
+        Store a compiled flow in the caches
+        """
+        with FlowCompiler._LOCK:
+            FlowCompiler._CACHE[compiled.key] = compiled
+
+        if not self._use_redis:
+            return
+
+        try:
+            self.redis().set(
+                f"{FlowCompiler.REDIS_PREFIX}{compiled.key}",
+                compiled.to_json(),
+                ex=FlowCompiler.REDIS_TTL,
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.warning(f"Could not store compiled flow in redis: {e}")
+
+    @staticmethod
+    def redis():
+        """Connection to the local redis"""
+        # pylint: disable=import-outside-toplevel
+        from dal.movaidb import MovaiDB
+
+        return MovaiDB("local").db_write
+
+    @staticmethod
+    def clear() -> None:
+        """Clear the process cache"""
+        with FlowCompiler._LOCK:
+            FlowCompiler._CACHE.clear()
+
+
+def materialize(compiled: CompiledFlow, resolve: Callable[[str], "Flow"]):
+    """
+    Return the node instances and links of a compiled flow,
+    resolve returns the flow object of a path
+    """
+    flows = {}
+    nodes = {}
+    for name, (path, node_inst) in compiled.nodes.items():
+        try:
+            flow = flows[path]
+        except KeyError:
+            flow = flows[path] = resolve(path)
+        nodes[name] = flow.NodeInst[node_inst]
+
+    links = {_id: dict(link) for _id, link in compiled.links.items()}
+    return nodes, links
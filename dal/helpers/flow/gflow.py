@@ -6,7 +6,7 @@
    Developers:
    - Manuel Silva  (manuel.silva@mov.ai) - 2020
 """
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable
 
 from movai_core_shared.logger import Log
 from movai_core_shared.consts import (
@@ -20,6 +20,8 @@ from movai_core_shared.consts import (
 from movai_core_shared.exceptions import RemapValidationError
 from dal.validation.template import Template
 
+from .remaps import RemapEngine
+
 if TYPE_CHECKING:
     from dal.models import Flow
 
@@ -47,6 +49,9 @@ class GFlow:
         self.flow: "Flow" = flow
         self.graph = {}
         self.remaps = {}
+        # links used by the solver, all the links of the flow when None
+        self.links = None
+        self._engine = None
 
     def get_vertex(self, key: str, _type: str = "From") -> dict:
         """Get or create a new vertex"""
@@ -207,7 +212,7 @@ class GFlow:
 
         # list of ports sorted by count (nr. of connections)
         ports = self.sort_graph()
-        links = self.flow.Links.full
+        links = self.flow.Links.full if self.links is None else self.links
 
         # TODO review and refactor
         while ports:
@@ -336,7 +341,58 @@ class GFlow:
         if self.remaps and not force:
             return self.remaps
 
-        return self.calc_remaps()
+        if force:
+            self._engine = None
+
+        return self._engine_remaps()
+
+    @property
+    def engine(self) -> RemapEngine:
+        """Get or create the incremental remap engine"""
+
+        if self._engine is None:
+            self._engine = RemapEngine(self)
+            self._engine.build()
+
+        return self._engine
+
+    def _engine_remaps(self) -> dict:
+        """Update the graph and the remaps from the incremental engine"""
+
+        self.graph = self.engine.graph()
+        self.remaps = self.engine.remaps(self.graph)
+        return self.remaps
+
+    def add_link(self, link_id: str) -> dict:
+        """
+        Update the remaps after a link was added to the flow,
+        only the ports connected to the link are solved again
+        """
+        self.engine.apply(added=[link_id])
+        return self._engine_remaps()
+
+    def delete_link(self, link_id: str) -> dict:
+        """
+        Update the remaps after a link was removed from the flow
+        """
+        self.engine.apply(removed=[link_id])
+        return self._engine_remaps()
+
+    def update_links(self, added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+        """
+        Update the engine after links were added to, changed in or removed from
+        the flow, the remaps are solved again when requested
+        """
+        if self._engine is not None:
+            self._engine.apply(added=added, removed=removed)
+        self.remaps = {}
+
+    def update_node(self, node_inst: str) -> dict:
+        """
+        Update the remaps after a node instance (or its template) changed
+        """
+        self.engine.update_node(node_inst)
+        return self._engine_remaps()
 
     def sort_graph(self) -> list:
         """Sort the graph by the number of elements in links"""
@@ -0,0 +1,363 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Launch plan of a flow, everything a flow launcher asks the flow for
+   (start nodes, dependencies, transitions, remaps, parameters, nodelets
+   and plugins) computed in one go and cached until one of the objects,
+   vars or env vars it was computed from changes
+"""
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from movai_core_shared.logger import Log
+
+from dal.utils.generations import stamps
+
+from .compiled import FlowCompiler
+
+if TYPE_CHECKING:
+    from dal.models import Flow
+
+
+# env vars in an expression, the ones os.path.expandvars replaces
+ENV_REGEX = re.compile(r"\$(\w+|\{[^}]*\})")
+
+
+@dataclass
+class LaunchPlan:
+    """
+    Launch plan of a flow:
+        nodes: [<node instance>], dependencies are placed before the nodes depending on them
+        start_nodes: [<node instance linked to the START node>]
+        dependencies: { <node instance>: [<node instances it depends on>] }
+        transitions: { <node instance>: [<node instances it can transit to>] }
+        remaps: remaps of the flow
+        params: parameters as returned by Flow.resolve_all_params
+        nodelets: { <nodelet manager>: [<nodelets>] }
+        plugins: { <node instance>: [<plugins>] }
+        inputs: { <scope>:<name> of the objects the plan was computed from: <generation stamp> }
+        variables: [<vars referenced by the parameters>]
+        environment: [<env vars referenced by the parameters>]
+    """
+
+    key: str
+    flow: str
+    nodes: List[str] = field(default_factory=list)
+    start_nodes: List[str] = field(default_factory=list)
+    dependencies: Dict[str, List[str]] = field(default_factory=dict)
+    transitions: Dict[str, List[str]] = field(default_factory=dict)
+    remaps: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+    nodelets: Dict[str, List[str]] = field(default_factory=dict)
+    plugins: Dict[str, List[str]] = field(default_factory=dict)
+    inputs: Dict[str, Optional[int]] = field(default_factory=dict)
+    variables: List[str] = field(default_factory=list)
+    environment: List[str] = field(default_factory=list)
+
+    def dumps(self) -> str:
+        """Serialize the plan, tuples in the parameters are loaded as lists"""
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, data) -> "LaunchPlan":
+        """Load a serialized plan"""
+        return cls(**json.loads(data))
+
+
+def dependencies_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """
+    Order the nodes so that dependencies come before the nodes depending on
+    them, nodes in a dependency cycle are placed in the order they are found
+    """
+    output = []
+    visited = set()
+
+    for name in sorted(dependencies):
+        if name in visited:
+            continue
+
+        # depth first, a node is placed after all its dependencies
+        visited.add(name)
+        stack = [(name, iter(sorted(dependencies[name])))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                output.append(node)
+            elif child not in visited and child in dependencies:
+                visited.add(child)
+                stack.append((child, iter(sorted(dependencies[child]))))
+
+    return output
+
+
+class LaunchPlanCompiler:
+    """
+    Compile the launch plan of flows
+
+    A plan records the objects it was computed from (the flow and subflows,
+    the node and ports templates used and the configurations referenced by
+    the parameters), the vars and the env vars referenced by the parameters.
+    Its key is a hash of the generation stamps of those objects, read from
+    redis in one go, and of the current values of the vars and env vars.
+    A plan is reused while its key does not change, checking it does not
+    read any of the objects. Otherwise the objects that changed are dropped
+    from the scopes tree, with the flow, and the plan is computed again.
+
+    Plans are kept by flow in a process LRU cache and in redis
+    (MOVAI_LAUNCH_PLAN_REDIS=false to disable) to be shared by launches
+    """
+
+    logger = Log.get_logger("launch.plan.mov.ai")
+
+    _CACHE = LRUCache(maxsize=int(os.getenv("MOVAI_LAUNCH_PLAN_CACHE_SIZE", "64")))
+    _LOCK = Lock()
+
+    REDIS_ENABLED = os.getenv("MOVAI_LAUNCH_PLAN_REDIS", "true").lower() in ("1", "true")
+    REDIS_PREFIX = "_launch_plan:"
+    REDIS_TTL = int(os.getenv("MOVAI_LAUNCH_PLAN_REDIS_TTL", str(24 * 3600)))
+
+    def __init__(self, use_redis: Optional[bool] = None):
+        self._use_redis = LaunchPlanCompiler.REDIS_ENABLED if use_redis is None else use_redis
+        self.built = 0
+
+    @staticmethod
+    def inputs(flow: "Flow") -> Tuple[List[str], List[str], List[str]]:
+        """
+        Objects (<scope>:<name>), vars and env vars the launch plan of a flow depends on,
+        only read when the plan is computed
+        """
+        # pylint: disable=import-outside-toplevel
+        from dal.models.scopestree import ScopesTree, scopes
+
+        compiled = flow.compiled
+        inputs = set()
+
+        # flows and subflows parameters
+        paths = {compiled.path}
+        for path, *_ in compiled.nodes.values():
+            paths.add(path)
+        for path, _, subflow_path in compiled.containers.values():
+            paths.update((path, subflow_path))
+
+        expressions = []
+        for path in sorted(paths):
+            _flow = flow if path == compiled.path else scopes.from_path(path, scope="Flow")
+            inputs.add(f"Flow:{ScopesTree.extract_reference(path)[2]}")
+            params = _flow.serialize().get("Parameter") or {}
+            expressions.extend(param.get("Value") for param in params.values())
+
+        # node templates and their ports templates
+        node_insts = flow.full.NodeInst
+        for node_inst in node_insts.values():
+            expressions.extend(param.Value for param in node_inst.Parameter.values())
+
+            if f"Node:{node_inst.Template}" in inputs:
+                continue
+            inputs.add(f"Node:{node_inst.Template}")
+            node = node_inst.node_template
+            params = node.serialize().get("Parameter") or {}
+            expressions.extend(param.get("Value") for param in params.values())
+
+            for port_inst in node.PortsInst.values():
+                inputs.add(f"Ports:{port_inst.Template}")
+
+        for name in compiled.containers:
+            container = flow.get_container(name)
+            expressions.extend(param.Value for param in container.Parameter.values())
+
+        # configurations, vars and env vars referenced by the parameters
+        configs, variables = flow.parser.references(expressions)
+        inputs.update(f"Configuration:{name}" for name in configs)
+
+        environment = set()
+        for expression in expressions:
+            for match in ENV_REGEX.finditer(str(expression)):
+                environment.add(match.group(1).strip("{}"))
+
+        return sorted(inputs), sorted(variables), sorted(environment)
+
+    @staticmethod
+    def key(
+        flow: "Flow",
+        inputs: Dict[str, Optional[int]],
+        variables: List[str],
+        environment: List[str],
+    ) -> str:
+        """
+        Hash of the generation stamps of the objects and of the
+        current values of the vars and env vars
+        """
+        content = {
+            "Flow": FlowCompiler.flow_path(flow),
+            "Stamps": inputs,
+            "Env": {name: os.environ.get(name) for name in environment},
+        }
+
+        for reference in variables:
+            try:
+                content[f"Var/{reference}"] = repr(flow.parser.read_var(reference))
+            except Exception:  # pylint: disable=broad-except
+                content[f"Var/{reference}"] = None
+
+        data = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def reload(flow: "Flow", names: List[str]) -> "Flow":
+        """
+        Drop the objects (<scope>:<name>) and the flow from the scopes tree,
+        they may have been written by another process, and read the flow again
+        """
+        # pylint: disable=import-outside-toplevel
+        from dal.models.scopestree import scopes
+
+        # the names of the flow are taken from the tree
+        ref, version = flow.ref, flow.version
+        workspace = scopes(workspace=flow.workspace)
+        for name in [*names, f"Flow:{ref}"]:
+            scope, obj_ref = name.split(":", 1)
+            try:
+                workspace.unload(scope=scope, ref=obj_ref)
+            except ValueError:
+                # not loaded
+                pass
+
+        return workspace.Flow[ref, version]
+
+    def compile(self, flow: "Flow") -> LaunchPlan:
+        """
+        Return the launch plan of a flow
+        """
+        conn = LaunchPlanCompiler.stamps_connection()
+
+        plan = self.lookup(FlowCompiler.flow_path(flow))
+        if plan is not None:
+            current = stamps(conn, plan.inputs)
+            key = LaunchPlanCompiler.key(flow, current, plan.variables, plan.environment)
+            if key == plan.key:
+                return plan
+
+            changed = [name for name, stamp in current.items() if stamp != plan.inputs[name]]
+            flow = LaunchPlanCompiler.reload(flow, changed)
+
+        inputs, variables, environment = LaunchPlanCompiler.inputs(flow)
+        current = stamps(conn, inputs)
+        plan = self.build(flow, LaunchPlanCompiler.key(flow, current, variables, environment))
+        plan.inputs, plan.variables, plan.environment = current, variables, environment
+
+        # an object written while the plan was computed, the next launch computes it again
+        if stamps(conn, inputs) == current:
+            self.store(plan)
+
+        return plan
+
+    def build(self, flow: "Flow", key: str) -> LaunchPlan:
+        """
+        Compute the launch plan of a flow
+        """
+        self.built += 1
+        plan = LaunchPlan(key=key, flow=FlowCompiler.flow_path(flow))
+
+        for name in flow.full.NodeInst:
+            plan.dependencies[name] = sorted(flow.get_node_dependencies(name))
+            plan.transitions[name] = sorted(flow.get_node_transitions(name))
+
+            plugins = flow.get_node_plugins(name)
+            if plugins:
+                plan.plugins[name] = sorted(plugins)
+
+            manager = flow.get_nodelet_manager(name)
+            if manager is not None:
+                plan.nodelets.setdefault(manager, []).append(name)
+
+        plan.nodes = dependencies_order(plan.dependencies)
+        plan.start_nodes = flow.get_start_nodes()
+        plan.remaps = flow.remaps
+        # the memoized values may be older than the change that made the plan stale
+        flow.parser.invalidate()
+        plan.params = flow.resolve_all_params()
+
+        return plan
+
+    def lookup(self, path: str) -> Optional[LaunchPlan]:
+        """
+        Get the last launch plan of a flow from the caches
+        """
+        with LaunchPlanCompiler._LOCK:
+            try:
+                return LaunchPlanCompiler._CACHE[path]
+            except KeyError:
+                pass
+
+        if not self._use_redis:
+            return None
+
+        try:
+            data = self.redis().get(f"{LaunchPlanCompiler.REDIS_PREFIX}{path}")
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.warning(f"Could not read launch plan from redis: {e}")
+            return None
+
+        if data is None:
+            return None
+
+        try:
+            plan = LaunchPlan.loads(data)
+        except (TypeError, ValueError) as e:
+            # stored by another version, the plan is computed again
+            self.logger.warning(f"Could not load launch plan from redis: {e}")
+            return None
+
+        with LaunchPlanCompiler._LOCK:
+            LaunchPlanCompiler._CACHE[path] = plan
+        return plan
+
+    def store(self, plan: LaunchPlan) -> None:
+        """
+        Store a launch plan in the caches, replacing the last one of the flow
+        """
+        with LaunchPlanCompiler._LOCK:
+            LaunchPlanCompiler._CACHE[plan.flow] = plan
+
+        if not self._use_redis:
+            return
+
+        try:
+            self.redis().set(
+                f"{LaunchPlanCompiler.REDIS_PREFIX}{plan.flow}",
+                plan.dumps(),
+                ex=LaunchPlanCompiler.REDIS_TTL,
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.warning(f"Could not store launch plan in redis: {e}")
+
+    @staticmethod
+    def redis():
+        """Connection to the local redis"""
+        return FlowCompiler.redis()
+
+    @staticmethod
+    def stamps_connection():
+        """Connection to the redis with the generation stamps of the objects"""
+        # pylint: disable=import-outside-toplevel
+        from dal.movaidb import MovaiDB
+
+        # the stamps are read right after the writes, always use the master
+        return MovaiDB().db_write
+
+    @staticmethod
+    def clear() -> None:
+        """Clear the process cache"""
+        with LaunchPlanCompiler._LOCK:
+            LaunchPlanCompiler._CACHE.clear()
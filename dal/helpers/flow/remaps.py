@@ -0,0 +1,282 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Incremental remap engine for GFlow
+"""
+from bisect import bisect_left, insort
+from itertools import count
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from movai_core_shared.exceptions import RemapValidationError
+
+if TYPE_CHECKING:
+    from dal.helpers.flow import GFlow
+
+
+class RemapEngine:
+    """
+    Keeps the port graph of a flow split in remap groups, the connected
+    components of the graph. A port can only be remapped by the ports
+    linked to it, so every group is solved on its own using the GFlow
+    solver, adding or removing a link only solves again the groups
+    touched by the link.
+
+    Groups are tracked with a union-find structure, removing a link
+    re-labels only the ports of the group the link belonged to.
+
+    Links and ports are fed to the solver in the same order as a full
+    recompute (main flow links first, then the subflows links), so
+    the results are the same. The order is kept in a sorted list, a
+    link added to the flow goes after the links already in its part
+    of the flow, as it does in the flow links.
+    """
+
+    def __init__(self, gflow: "GFlow"):
+        self._gflow = gflow
+        # link id -> (From, To, forced remap), None if the link is skipped
+        self._edges: Dict[str, Optional[Tuple[str, str, Optional[str]]]] = {}
+        # node instance -> link ids, skipped links included
+        self._node_links: Dict[str, Set[str]] = {}
+        # link id -> node instances of the link
+        self._link_nodes: Dict[str, Tuple[str, str]] = {}
+        # port -> link ids
+        self._port_links: Dict[str, List[str]] = {}
+        # union-find parent of each port
+        self._parent: Dict[str, str] = {}
+        # group root -> solved graph of the group
+        self._solved: Dict[str, dict] = {}
+        # group root -> error found while solving the group
+        self._errors: Dict[str, RemapValidationError] = {}
+        # link id -> position in a full recompute, (subflow link, sequence)
+        self._position: Dict[str, Tuple[int, int]] = {}
+        # (position, link id) of the links not skipped, sorted
+        self._sequence: List[Tuple[Tuple[int, int], str]] = []
+        self._counter = count()
+
+    @property
+    def flow(self):
+        """The flow"""
+        return self._gflow.flow
+
+    def build(self) -> None:
+        """
+        Build all the groups from the links of the flow and subflows
+        """
+        self._edges.clear()
+        self._node_links.clear()
+        self._link_nodes.clear()
+        self._port_links.clear()
+        self._parent.clear()
+        self._solved.clear()
+        self._errors.clear()
+        self._position.clear()
+        self._sequence.clear()
+
+        for link_id in self.flow.Links.ids():
+            self._position[link_id] = (0, next(self._counter))
+
+        touched = set()
+        for link_id in self.flow.Links.full.keys():
+            touched |= self._insert(link_id)
+
+        self._resolve(touched)
+
+    def apply(self, added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+        """
+        Update the groups after links were added to or removed from the flow
+        """
+        touched = set()
+        for link_id in removed:
+            touched |= self._remove(link_id)
+        for link_id in added:
+            touched |= self._insert(link_id)
+
+        self._resolve(touched)
+
+    def update_node(self, node_inst: str) -> None:
+        """
+        Update the groups after a node instance changed, the links of
+        the node are evaluated again
+        """
+        touched = set()
+        links = list(self._node_links.get(node_inst, ()))
+        for link_id in links:
+            touched |= self._remove(link_id, keep_position=True)
+        for link_id in links:
+            touched |= self._insert(link_id)
+
+        self._resolve(touched)
+
+    def _find(self, port: str) -> str:
+        root = port
+        while self._parent[root] != root:
+            root = self._parent[root]
+
+        # path compression
+        while self._parent[port] != root:
+            self._parent[port], port = root, self._parent[port]
+
+        return root
+
+    def _union(self, port_a: str, port_b: str) -> None:
+        root_a, root_b = self._find(port_a), self._find(port_b)
+        if root_a != root_b:
+            self._parent[root_b] = root_a
+
+    def _forget(self, port: str) -> None:
+        """Forget the solution of the group of a port"""
+        if port in self._parent:
+            root = self._find(port)
+            self._solved.pop(root, None)
+            self._errors.pop(root, None)
+
+    def _edge(self, link_id: str):
+        link = self.flow.Links[link_id]
+
+        self._link_nodes[link_id] = (link.From.node_inst, link.To.node_inst)
+        for node_inst in self._link_nodes[link_id]:
+            self._node_links.setdefault(node_inst, set()).add(link_id)
+
+        if self._gflow.should_skip(link):
+            return None
+
+        return link.From.str, link.To.str, self._gflow.forced_remap(link)
+
+    def _insert(self, link_id: str) -> Set[str]:
+        touched = self._remove(link_id, keep_position=True) if link_id in self._edges else set()
+
+        if link_id not in self._position:
+            subflow = int(link_id not in self.flow.Links.ids())
+            self._position[link_id] = (subflow, next(self._counter))
+
+        edge = self._edges[link_id] = self._edge(link_id)
+        if edge is None:
+            return touched
+
+        insort(self._sequence, (self._position[link_id], link_id))
+
+        _from, _to, _ = edge
+        self._forget(_from)
+        self._forget(_to)
+
+        for port in (_from, _to):
+            self._parent.setdefault(port, port)
+            self._port_links.setdefault(port, []).append(link_id)
+
+        self._union(_from, _to)
+        return touched | {_from, _to}
+
+    def _remove(self, link_id: str, keep_position: bool = False) -> Set[str]:
+        edge = self._edges.pop(link_id, None)
+        for node_inst in self._link_nodes.pop(link_id, ()):
+            self._node_links[node_inst].discard(link_id)
+
+        position = self._position[link_id] if keep_position else self._position.pop(link_id, None)
+        if edge is None:
+            return set()
+
+        idx = bisect_left(self._sequence, (position, link_id))
+        del self._sequence[idx]
+
+        _from, _to, _ = edge
+        self._forget(_from)
+
+        remaining = set()
+        for port in (_from, _to):
+            links = self._port_links[port]
+            if link_id in links:
+                links.remove(link_id)
+            if links:
+                remaining.add(port)
+            else:
+                del self._port_links[port]
+                del self._parent[port]
+
+        # the group might be split, label again the ports of the group
+        labeled = set()
+        for port in remaining:
+            if port in labeled:
+                continue
+            group = self._group(port)
+            for member in group:
+                self._parent[member] = port
+            labeled |= group
+
+        return remaining
+
+    def _group(self, port: str) -> Set[str]:
+        """All the ports connected to a port"""
+        group = {port}
+        pending = [port]
+        while pending:
+            for link_id in self._port_links[pending.pop()]:
+                _from, _to, _ = self._edges[link_id]
+                for other in (_from, _to):
+                    if other not in group:
+                        group.add(other)
+                        pending.append(other)
+        return group
+
+    def _ordered_links(self, links: Iterable[str]) -> List[str]:
+        return sorted(links, key=self._position.__getitem__)
+
+    def _resolve(self, ports: Set[str]) -> None:
+        """Solve the groups of the given ports"""
+        roots = {}
+        for port in ports:
+            if port in self._parent:
+                roots.setdefault(self._find(port), port)
+
+        for root, port in roots.items():
+            if root in self._solved:
+                continue
+            group = self._group(port)
+            links = {link_id for member in group for link_id in self._port_links[member]}
+            self._solve(root, self._ordered_links(links))
+
+    def _solve(self, root: str, links: List[str]) -> None:
+        solver = type(self._gflow)(self.flow)
+        solver.links = {}
+
+        # same steps as GFlow.generate_graph
+        for link_id in links:
+            _from, _to, forced = self._edges[link_id]
+            solver.links[link_id] = {"From": _from, "To": _to}
+            solver.add_edge(_from, link_id, "From")
+            solver.add_edge(_to, link_id, "To")
+            if forced:
+                solver.set_remap(_from, forced)
+
+        try:
+            solver.generate_remaps()
+        except RemapValidationError as e:
+            self._errors[root] = e
+
+        self._solved[root] = solver.graph
+
+    def graph(self) -> dict:
+        """The port graph, in the same order as a full recompute"""
+        graph = {}
+        for _, link_id in self._sequence:
+            _from, _to, _ = self._edges[link_id]
+            for port in (_from, _to):
+                if port not in graph:
+                    graph[port] = self._solved[self._find(port)][port]
+        return graph
+
+    def remaps(self, graph: Optional[dict] = None) -> dict:
+        """
+        The remaps of the flow, from the port graph when already built,
+        raises RemapValidationError if any group could not be solved
+        """
+        for error in self._errors.values():
+            raise error
+
+        remaps = {}
+        for port_name, port in (self.graph() if graph is None else graph).items():
+            remaps.setdefault(port["remap"], {"From": [], "To": []})[port["_type"]].append(
+                port_name
+            )
+        return remaps
@@ -7,16 +7,37 @@
    - Manuel Silva  (manuel.silva@mov.ai) - 2020
 """
 
-import ast
 import re
 import os
-from typing import TYPE_CHECKING, Any, Optional, Protocol, Union, cast, List, Tuple
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Optional,
+    Protocol,
+    Union,
+    cast,
+    List,
+    Set,
+    Tuple,
+)
 
 from movai_core_shared.logger import Log
 from movai_core_shared.envvars import RAISE_FLOW_VALIDATION_ERRORS
 from dal.models.scopestree import scopes
-from dal.models.var import Var
+from dal.models.var import Var, get_many as get_many_vars
 from dal.movaidb import MovaiDB
+from dal.helpers.expressions import (
+    REFERENCE_PARTS_REGEX,
+    MemoEntry,
+    Reference,
+    compile_expression,
+    literal,
+    private_copy,
+    sync,
+)
 from dal.exceptions import (
     UndefinedFlowParameterError,
     UndefinedConfigParameterError,
@@ -45,8 +66,6 @@ class ParamParser:
 
     logger = Log.get_logger("ParamParser.mov.ai")
 
-    __REGEX__ = r"\$\((param|config|var|flow)[^$)]+\)"
-
     def __init__(self, flow: "Flow"):
         self.mapping = {
             "config": self.eval_config,
@@ -60,6 +79,15 @@ class ParamParser:
         # context is used to go up from a subflow instance to the main flow
         self.context = None
 
+        # memoized values by (context, instance type, node name, key, expression)
+        self._memo: Dict[tuple, MemoEntry] = {}
+
+        # vars read ahead by prefetch(), by reference
+        self._vars: Dict[str, Any] = {}
+
+        # kinds of references used by each parse in progress (nested parses included)
+        self._active: List[Set[str]] = []
+
     def parse(
         self,
         key: str,
@@ -89,24 +117,108 @@ class ParamParser:
         # assign a different context if needed
         self.context = context or self.flow.ref
 
+        if not self._active:
+            # objects written by other processes, checked once per top level parse
+            sync()
+
+        memo_key = (self.context, type(instance).__name__, node_name, key, expression)
+        entry = self._memo.get(memo_key)
+        if entry is not None and entry.is_valid():
+            self._track(entry.kinds)
+            return private_copy(entry.value)
+
+        kinds = set()
+        self._active.append(kinds)
+        try:
+            output = self._evaluate(key, expression, node_name, instance)
+        finally:
+            self._active.pop()
+
+        self._memo[memo_key] = MemoEntry.create(output, kinds)
+        self._track(kinds)
+        return private_copy(output)
+
+    def _track(self, kinds: Set[str]):
+        """Add the kinds of references used to all the parses in progress"""
+        for active in self._active:
+            active.update(kinds)
+
+    def _evaluate(self, key: str, expression: str, node_name: str, instance: ObjectWithName) -> Any:
+        """Replace the references in the expression until there is nothing left to replace"""
         while 1:
-            temp_param = expression
+            compiled = compile_expression(expression)
+
+            if not compiled.has_references:
+                # try to eval str as python literal ex.: "[1,2,3,4]"
+                return literal(expression)
 
-            expression = re.sub(
-                self.__REGEX__,
-                lambda m: self.eval_reference(key, m.group(), instance, node_name),
-                expression,
+            self._track(compiled.kinds)
+
+            temp_param = expression
+            expression = "".join(
+                part
+                if isinstance(part, str)
+                else self.eval_reference(key, part.text, instance, node_name)
+                for part in compiled.parts
             )
 
             if expression == temp_param:
-                try:
-                    # try to eval str as python literal ex.: "[1,2,3,4]"
-                    return ast.literal_eval(expression)
+                return literal(expression)
+
+    def invalidate(self):
+        """Forget all the memoized values"""
+        self._memo.clear()
+
+    @contextmanager
+    def prefetch(self, expressions: Iterable[Any]):
+        """
+        Read ahead the vars referenced by the expressions, all of them at once,
+        and warm up the caches of the configurations they reference, loaded
+        one at a time. The vars read are used until the end of the block
+        """
+        configs, variables = self.references(expressions)
+        # the values read ahead are used by all the parses of the block
+        sync(force=True)
+
+        for name in configs:
+            self._read_config(name)
+        try:
+            self._vars = self.read_vars(variables)
+        except Exception as e:  # pylint: disable=broad-except
+            # the vars are read one at a time when evaluated
+            self.logger.debug(f"Could not prefetch vars: {e}")
 
-                except (ValueError, SyntaxError):
-                    return expression
+        try:
+            yield self
+        finally:
+            self._vars = {}
 
-        return expression
+    @staticmethod
+    def references(expressions: Iterable[Any]) -> Tuple[Set[str], Set[str]]:
+        """
+        Returns the names of the configurations and the vars referenced by the expressions
+        """
+        configs = set()
+        variables = set()
+        for expression in expressions:
+            for part in compile_expression(os.path.expandvars(str(expression))).parts:
+                if not isinstance(part, Reference):
+                    continue
+                if part.kind == "config" and "." in part.name:
+                    configs.add(part.name.split(".", 1)[0])
+                elif part.kind == "var":
+                    variables.add(part.name)
+
+        return configs, variables
+
+    def _read_config(self, name: str) -> None:
+        """Load a configuration and its values into the caches"""
+        try:
+            obj = cast("Configuration", scopes.from_path(name, scope="Configuration"))
+            obj.get_value()
+        except Exception as e:  # pylint: disable=broad-except
+            # errors are reported when the reference is evaluated
+            self.logger.debug(f"Could not prefetch configuration {name}: {e}")
 
     def eval_reference(
         self, key: str, expression: str, instance: ObjectWithName, node_name: str
@@ -130,8 +242,7 @@ class ParamParser:
         try:
             # $(<context> <parameter reference>)
             # ex.: $(flow var_A)
-            pattern = re.compile(rf"\$\(({'|'.join(self.mapping.keys())})\s+([\w\.-]+)\)")
-            result = pattern.search(expression)
+            result = REFERENCE_PARTS_REGEX.search(expression)
 
             if result is None:
                 raise ValueError(f"Invalid expression, {expression}")
@@ -272,11 +383,11 @@ class ParamParser:
         """
 
         context, param_name, *__ = reference.split(".")
-        robot_name = ""
-        if context == "fleet":
-            robot_name = list(MovaiDB("local").get({"Robot": "*"})["Robot"].keys())[0]
 
-        output = Var(context, robot_name).get(param_name)
+        try:
+            output = self._vars[reference]
+        except KeyError:
+            output = self.read_var(reference)
 
         if not output:
             if RAISE_FLOW_VALIDATION_ERRORS:
@@ -293,6 +404,36 @@ class ParamParser:
 
         return output
 
+    @staticmethod
+    def read_var(reference: str) -> Any:
+        """Read the value of a var, <fleet or robot>.<parameter reference>"""
+        context, param_name, *__ = reference.split(".")
+        robot_name = ""
+        if context == "fleet":
+            robot_name = list(MovaiDB("local").get({"Robot": "*"})["Robot"].keys())[0]
+
+        return Var(context, robot_name).get(param_name)
+
+    @staticmethod
+    def read_vars(references: Iterable[str]) -> Dict[str, Any]:
+        """
+        Read the values of many vars at once, {<reference>: <value>}, the
+        references that are not valid are left out
+        """
+        variables = {}
+        robot_name = None
+        for reference in references:
+            try:
+                context, param_name, *__ = reference.split(".")
+                if context == "fleet" and robot_name is None:
+                    robot_name = list(MovaiDB("local").get({"Robot": "*"})["Robot"].keys())[0]
+                variables[reference] = (Var(context, robot_name or ""), param_name)
+            except Exception:  # pylint: disable=broad-except
+                # errors are reported when the reference is evaluated
+                continue
+
+        return dict(zip(variables, get_many_vars(variables.values())))
+
     @staticmethod
     def _has_unresolved_flow_reference(value: Any) -> bool:
         """Returns whether a parsed value still contains a flow reference."""
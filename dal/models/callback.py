@@ -12,16 +12,21 @@
 import importlib
 import inspect
 import pkgutil
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, List, Tuple
 from movai_core_shared.logger import Log
 
-from .scopestree import scopes
+from dal.movaidb import MovaiDB
+from dal.utils.usage_search.usage_index import UsageIndex
 
 from .model import Model
 
 
 logger = Log.get_logger(__name__)
 
+# Node:<node>,PortsInst:<port instance>,In:<input>,Callback:<callback>
+CALLBACK_KEY_REGEX = re.compile(r"^Node:([^,]+),PortsInst:([^,]+),In:([^,]+),Callback:(.+)$")
+
 
 class Callback(Model):
     """Callback Model"""
@@ -155,23 +160,21 @@ class Callback(Model):
 
     def template_depends(self, force: bool = False) -> Dict:
         """get all the objects that depend on this callback"""
-        # FIXME either implement or wait for api to be able to handle reverse dependency lookup
         # FIXME in the future, with versions, it won't (?) be deletable, or the nodes that depend on this callback
         #   will have a fixed version of this callback
 
-        # anyway, for now
-        db_scopes = scopes()  # use global workspace
-        deps = []
-        nodes = db_scopes.list_scopes(scope="Node")
-        for node in nodes:
-            node_obj = db_scopes.Node[node["ref"]]
-            for port_inst_name, port_inst in node_obj.PortsInst.items():
-                for port_inst_in, port_inst_in_name in port_inst.In.items():
-                    if port_inst_in.Callback.ref == self.ref:  # TODO check versions
-                        deps.append((node["ref"], port_inst_name, port_inst_in_name))
-            # delete cache for this node
-            db_scopes.unload(scope="Node", ref=node["ref"])
-            del node_obj
+        # (node, port instance, input) of the inputs using this callback
+        try:
+            index = UsageIndex()
+            index.refresh()
+            deps = [
+                (node, *entry.split(",", 1))
+                for node, entries in index.used_by("Callback", self.ref).items()
+                for entry in entries
+            ]
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"Usage index not available, scanning the nodes: {e}")
+            deps = self.scan_depends()
 
         deps_dict = dict()
         for dep in deps:
@@ -190,5 +193,18 @@ class Callback(Model):
             "data": {"numberDependencies": len(deps), "dependencies": deps_dict},
         }
 
+    def scan_depends(self) -> List[Tuple[str, str, str]]:
+        """
+        (node, port instance, input) of the inputs using this callback, streamed
+        from the keys of the global workspace, the callback is part of the key
+        """
+        pattern = f"Node:*,PortsInst:*,In:*,Callback:{self.ref}"
+        deps = []
+        for key in MovaiDB().db_read.scan_iter(pattern, count=1000):
+            match = CALLBACK_KEY_REGEX.match(key.decode("utf-8"))
+            if match and match.group(4) == self.ref:
+                deps.append(match.group(1, 2, 3))
+        return sorted(deps)
+
 
 Model.register_model_class("Callback", Callback)
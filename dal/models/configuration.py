@@ -11,6 +11,7 @@ import pickle
 from dal.movaidb import MovaiDB
 from .model import Model
 from dal.helpers.cache import ThreadSafeCache
+from dal.helpers.expressions import invalidate
 from dal.classes.common.singleton import Singleton
 
 
@@ -22,7 +23,8 @@ class ConfigurationCache(metaclass=Singleton):
         import yaml
 
         with self.__class__._lock:  # Lock for thread safety
-            map_key = config_name
+            # a configuration changed by another process gets a new entry
+            map_key = (config_name, yaml_str)
             if map_key in self._map:
                 return self._map[map_key]
             value = yaml.load(yaml_str, Loader=yaml.FullLoader)
@@ -32,6 +34,7 @@ class ConfigurationCache(metaclass=Singleton):
     def clean_config_cache(self):
         with self.__class__._lock:
             self._map = {}
+        invalidate("config")
 
 
 class Configuration(Model):
@@ -44,6 +47,12 @@ class Configuration(Model):
         self.db = MovaiDB().db_read
         self.cache = ThreadSafeCache()
 
+    def write(self, **kwargs):
+        """Write the configuration, parameters using it are evaluated again"""
+        result = super().write(**kwargs)
+        invalidate("config")
+        return result
+
     def _get_db_yaml(self) -> str:
         """will read the Yaml string value from db and returns it
 
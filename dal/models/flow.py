@@ -15,6 +15,9 @@ from typing import Any, Dict, Iterable, Optional, Tuple, TypedDict, Union, cast,
 from movai_core_shared.logger import Log
 from movai_core_shared.consts import ROS1_NODELETSERVER
 from dal.helpers.flow import GFlow
+from dal.helpers.flow.compiled import CompiledFlow, FlowCompiler, materialize
+from dal.helpers.flow.launch import LaunchPlan, LaunchPlanCompiler
+from dal.helpers.expressions import invalidate
 from dal.helpers.parsers import ParamParser
 from .model import Model
 from .scopestree import scopes
@@ -68,6 +71,8 @@ class Flow(Model):
     __END__ = "END/END/END"
     __GRAPH_GEN__ = GFlow
     __PARAM_PARSER__ = ParamParser
+    __FLOW_COMPILER__ = FlowCompiler
+    __LAUNCH_PLAN_COMPILER__ = LaunchPlanCompiler
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -75,13 +80,28 @@ class Flow(Model):
         self._parser = None
         self._graph = None
         self._full = None
+        self._compiled = None
         self._remaps = None
 
+    @property
+    def compiled(self) -> CompiledFlow:
+        """Returns the compiled graph of the main flow and all subflows"""
+
+        self._compiled = self._compiled or self.__FLOW_COMPILER__().compile(self)
+
+        return self._compiled
+
     @property
     def full(self) -> FlowOutput:
         """Returns the data from the main flow and all subflows"""
 
-        self._full = self._full or self.get_dict()
+        if self._full is None:
+            flows = {FlowCompiler.flow_path(self): self}
+            node_insts, links = materialize(
+                self.compiled,
+                lambda path: flows.get(path) or scopes.from_path(path, scope="Flow"),
+            )
+            self._full = FlowOutput(NodeInst=node_insts, Links=links)
 
         return self._full
 
@@ -103,6 +123,61 @@ class Flow(Model):
 
         return self.graph.get_remaps()
 
+    def update_links(self, added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+        """
+        Keep the full flow and the remaps up to date after links of the main
+        flow were added, changed or removed, only the ports connected to the
+        links are solved again
+        """
+        added, removed = list(added), list(removed)
+
+        # compiled again when used, the full flow is updated in place
+        self._compiled = None
+        if self._full is not None:
+            links = self._full.Links
+            for link_id in removed:
+                links.pop(link_id, None)
+            for link_id in added:
+                link = self.Links.value[link_id]
+                links[link_id] = {
+                    "From": link["From"],
+                    "To": link["To"],
+                    "Dependency": link.get("Dependency", self.Links.__DEFAULT_DEPENDENCY__),
+                }
+            # the links of the main flow go before the links of the subflows
+            for link_id in [link_id for link_id in links if link_id not in self.Links.value]:
+                links[link_id] = links.pop(link_id)
+
+        if self._graph is not None:
+            self._graph.update_links(added, removed)
+
+    def remaps_with(self, links: Dict[str, LinkDict]) -> dict:
+        """
+        Returns the remaps of the flow with links added to the main flow, the
+        links are not kept, only the ports connected to them are solved again
+        """
+        previous = {link_id: self.Links.value.get(link_id) for link_id in links}
+        self.Links.value.update(links)
+        self.update_links(added=links)
+        try:
+            return self.remaps
+        finally:
+            for link_id, link in previous.items():
+                if link is None:
+                    del self.Links.value[link_id]
+                else:
+                    self.Links.value[link_id] = link
+            self.update_links(
+                added=[link_id for link_id, link in previous.items() if link is not None],
+                removed=[link_id for link_id, link in previous.items() if link is None],
+            )
+
+    def write(self, **kwargs):
+        """Write the flow, parameters using flow parameters are evaluated again"""
+        result = super().write(**kwargs)
+        invalidate("flow", "param")
+        return result
+
     def _create_parser_instance(self) -> ParamParser:
         """Create and instance of the parser"""
 
@@ -200,6 +275,62 @@ class Flow(Model):
 
         return output
 
+    def resolve_all_params(self) -> dict:
+        """
+        Resolve the parameters of the flow and of all the node instances and
+        containers of the flow and subflows in one pass, the values are the
+        same as the ones returned by get_param, get_node_params and
+        Container.get_params
+        Returns a dictionary with the following format
+        {
+            "Flow": {<parameter>: <value>},
+            "NodeInst": {<node instance name with parents prefix>: {<parameter>: <value>}},
+            "Container": {<container name with parents prefix>: {<parameter>: <value>}},
+        }
+
+        Configurations and vars referenced by the parameters are read ahead,
+        the node instances are resolved one at a time, the parser memo and
+        the scopes tree are not shared with other threads
+        """
+        node_insts = self.full.NodeInst
+        containers = {name: self.get_container(name) for name in self.compiled.containers}
+
+        # templates are read and serialized only once
+        templates = {}
+        for node_inst in node_insts.values():
+            if node_inst.Template not in templates:
+                templates[node_inst.Template] = node_inst.node_template.get_params()
+
+        expressions = [param.Value for param in self.Parameter.values()]
+        for obj in list(node_insts.values()) + list(containers.values()):
+            expressions.extend(param.Value for param in obj.Parameter.values())
+        for params in templates.values():
+            expressions.extend(params.values())
+
+        with self.parser.prefetch(expressions):
+            output = {"Flow": {key: self.get_param(key) for key in self.Parameter.keys()}}
+
+            output["NodeInst"] = {
+                name: node_inst.get_params(
+                    name, self.ref, template_params=templates[node_inst.Template]
+                )
+                for name, node_inst in node_insts.items()
+            }
+
+            output["Container"] = {
+                name: container.get_params(name) for name, container in containers.items()
+            }
+
+        return output
+
+    def compile_launch_plan(self) -> LaunchPlan:
+        """
+        Returns the launch plan of the flow (start nodes, dependencies,
+        transitions, remaps, parameters, nodelets and plugins), reused
+        while the flow and the objects it uses do not change
+        """
+        return self.__LAUNCH_PLAN_COMPILER__().compile(self)
+
     def get_node_params(self, node_name: str, context: Optional[str] = None) -> dict:
         """Returns the parameters of the node instance"""
 
@@ -169,6 +169,7 @@ class FlowLinks(ScopePropertyNode):
         _id = str(uuid.uuid4())
 
         self.value.update({_id: new_link})
+        self.flow.update_links(added=[_id])
 
         return _id, new_link
 
@@ -181,11 +182,13 @@ class FlowLinks(ScopePropertyNode):
 
         try:
             del self.value[link_id]
-            return True
 
         except KeyError:
             return False
 
+        self.flow.update_links(removed=[link_id])
+        return True
+
     def get_node_links(self, node_name: str) -> list:
         """Returns the node instance links in the flow and subflows"""
         if node_name in self.cache:
@@ -250,6 +250,39 @@ class Model(ScopeInstanceVersionNode, ABC):
             pass
         return out
 
+    @staticmethod
+    def get_referrers_relations(**kwargs):
+        """
+        Get all objects referencing the specified scope, the list is answered
+        exclusively by the reverse index of the persistent driver, there is no
+        fallback since that would mean loading every object in the workspace
+        """
+        model = kwargs.get("model", None)
+
+        if issubclass(type(model), Model):
+            workspace = model.workspace
+        else:
+            try:
+                workspace = kwargs["workspace"]
+                _ = kwargs["scope"], kwargs["ref"], kwargs["version"]
+            except KeyError as e:
+                raise ValueError("missing scope,ref,version or model") from e
+
+        relations = scopes(workspace=workspace).plugin.get_referrer_objects(**kwargs)
+
+        if isinstance(relations, set):
+            return relations
+
+        return set()
+
+    def get_referrers(self, depth=0, search_filter=None):
+        """
+        return the objects referencing the current model, up to depth levels
+        of indirection, the answer comes from the reverse index maintained by
+        the persistent layer (see rebuild_indexes)
+        """
+        return Model.get_referrers_relations(model=self, depth=depth, search_filter=search_filter)
+
     def relations(self, depth=0, search_filter=None):
         """
         return the current model relations, the method first try to request the
@@ -9,6 +9,8 @@
 """
 from movai_core_shared.consts import ROS1_NODELET, MOVAI_STATE, ROS1_PLUGIN
 
+from dal.helpers.expressions import invalidate
+
 # from .ports import Ports
 from .scopestree import scopes
 from .model import Model
@@ -46,6 +48,12 @@ class Node(Model):
 
         return prop if param in [None, ""] else param
 
+    def write(self, **kwargs):
+        """Write the node, parameters referencing its parameters are evaluated again"""
+        result = super().write(**kwargs)
+        invalidate("param")
+        return result
+
     @property
     def is_node_to_launch(self) -> bool:
         """Returns True if it should be launched"""
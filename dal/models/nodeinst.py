@@ -138,14 +138,23 @@ class NodeInst(ScopeObjectNode):
         """Returns True if the node is of type plugin"""
         return self.node_template.is_plugin
 
-    def get_params(self, name: str = None, context: Optional[str] = None) -> dict:
+    def get_params(
+        self,
+        name: str = None,
+        context: Optional[str] = None,
+        template_params: Optional[dict] = None,
+    ) -> dict:
         """Returns all the parameters"""
         params = {}
         _name = name or self.name
         _context = context or self.flow.ref
 
-        for key in self.node_template.Parameter.keys():
-            value = self.get_param(key, _name, _context)
+        # the template parameters are only serialized once
+        if template_params is None:
+            template_params = self.node_template.get_params()
+
+        for key in template_params.keys():
+            value = self.get_param(key, _name, _context, template_params=template_params)
             if value is not None:
                 params.update({key: value})
 
@@ -179,10 +188,12 @@ class NodeInst(ScopeObjectNode):
         name: Optional[str] = None,
         context: Optional[str] = None,
         custom_parser: Optional[Any] = None,
+        template_params: Optional[dict] = None,
     ) -> Any:
         """
         Returns a specific parameter of the node instance after
-        parsing it
+        parsing it, template_params are the parameters of the node
+        template when the caller already has them
         """
 
         _name = name or self.name
@@ -192,7 +203,9 @@ class NodeInst(ScopeObjectNode):
         _context = context or self.flow.ref
 
         # get the template value
-        tpl_value = self.node_template.get_params().get(key, None)  # Parameter[key].Value
+        if template_params is None:
+            template_params = self.node_template.get_params()
+        tpl_value = template_params.get(key, None)  # Parameter[key].Value
 
         # get the instance value
         try:
@@ -883,12 +883,12 @@ class ScopeWorkspace(WorkspaceNode):
             # not loaded
             pass
 
-    def rebuild_indexes(self):
+    def rebuild_indexes(self, **kwargs):
         """
         force indexes rebuild inside the workspace
         """
         try:
-            self._plugin.rebuild_indexes()
+            return self._plugin.rebuild_indexes(**kwargs)
         except AttributeError as e:
             raise AttributeError("Plugin not defined") from e
 
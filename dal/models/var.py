@@ -7,11 +7,28 @@
    - Manuel Silva (manuel.silva@mov.ai) - 2020
    - Tiago Paulino (tiago@mov.ai) - 2020
 """
+from typing import Any, Dict, Iterable, List, Tuple
+
 from dal.movaidb import MovaiDB
+from dal.helpers.expressions import invalidate
 
 SCOPES = ["callback", "node", "flow", "robot", "fleet", "global"]
 
 
+def _scope_prefix(scope: str, robot_name="", node_name="", port_name="") -> Tuple[str, str]:
+    """Database (global or local) and prefix of the ids of the vars of a scope"""
+    prefixes = {
+        "callback": node_name + "@" + port_name + "@",
+        "node": node_name + "@",
+        "robot": "@",
+        "flow": "flow@",
+        "fleet": robot_name + "@",
+        "global": "@",
+    }
+    prefix = prefixes.get(scope, "@")
+    return ("global" if scope in ("fleet", "global") else "local"), prefix
+
+
 class Var:
     """Class for user to write and read vars"""
 
@@ -32,6 +49,7 @@ class Var:
         MovaiDB(scope).set(
             {"Var": {self.scope: {"ID": {prefix + name: {"Value": value}}}}}, px=milis
         )
+        invalidate("var")
 
     def __getattr__(self, name):
         scope, prefix = self.__get_scope()
@@ -46,6 +64,7 @@ class Var:
         try:
             scope, prefix = self.__get_scope()
             MovaiDB(scope).delete({"Var": {self.scope: {"ID": {prefix + name: {"Value": ""}}}}})
+            invalidate("var")
             return True
         except:
             return False
@@ -64,21 +83,7 @@ class Var:
 
     def __get_scope(self):
         """Get the Local or Global Scope"""
-        if self.scope in ("fleet", "global"):
-            scope = "global"
-        else:
-            scope = "local"
-
-        prefixes = {
-            "callback": self._node_name + "@" + self._port_name + "@",
-            "node": self._node_name + "@",
-            "robot": "@",
-            "flow": "flow@",
-            "fleet": self._robot_name + "@",
-            "global": "@",
-        }
-        prefix = prefixes.get(self.scope, "@")
-        return scope, prefix
+        return _scope_prefix(self.scope, self._robot_name, self._node_name, self._port_name)
 
     @staticmethod
     def delete_all(scope: str = "Node", _robot_name="", _node_name="", _port_name=""):
@@ -88,24 +93,31 @@ class Var:
             scop = str(SCOPES)[1:-1]
             raise Exception("'" + scope + "' is not a valid scope. Choose between: " + scop)
         scope = scope.lower()
-
-        prefixes = {
-            "callback": _node_name + "@" + _port_name + "@",
-            "node": _node_name + "@",
-            "robot": "@",
-            "flow": "flow@",
-            "fleet": _robot_name + "@",
-            "global": "@",
-        }
-        prefix = prefixes.get(scope, "@")
-
-        if scope in ("fleet", "global"):
-            scope_ = "global"
-        else:
-            scope_ = "local"
+        scope_, prefix = _scope_prefix(scope, _robot_name, _node_name, _port_name)
 
         MovaiDB(scope_).unsafe_delete({"Var": {scope: {"ID": {prefix + "*": {"Value": "*"}}}}})
         if scope == "node":  # also clean SM Vars
             MovaiDB(scope_).unsafe_delete(
                 {"Var": {scope: {"ID": {prefix + "*": {"Parameter": "*"}}}}}
             )
+
+
+def get_many(variables: Iterable[Tuple[Var, str]]) -> List[Any]:
+    """
+    Values of many vars, [(<var>, <name>)], as Var.get returns them, with one
+    read per database instead of one per var
+    """
+    variables = list(variables)
+    keys: Dict[str, Dict[int, str]] = {}
+    for idx, (var, name) in enumerate(variables):
+        # pylint: disable=protected-access
+        scope, prefix = _scope_prefix(var.scope, var._robot_name, var._node_name, var._port_name)
+        _input = {"Var": {var.scope: {"ID": {prefix + name: {"Value": ""}}}}}
+        keys.setdefault(scope, {})[idx] = MovaiDB(scope).dict_to_keys(_input)[0][0]
+
+    values: List[Any] = [None] * len(variables)
+    for scope, scope_keys in keys.items():
+        movaidb = MovaiDB(scope)
+        for idx, value in zip(scope_keys, movaidb.db_read.mget(list(scope_keys.values()))):
+            values[idx] = movaidb.decode_value(value) if value else value
+    return values
@@ -15,7 +15,7 @@ import pickle
 import warnings
 from os import getenv, path
 from re import split
-from typing import Any, Dict, Generator, List, Literal, Optional, Protocol, Tuple, Union
+from typing import Any, Dict, Generator, List, Literal, Mapping, Optional, Protocol, Tuple, Union
 
 import aioredis
 import dal
@@ -28,6 +28,7 @@ from dal.classes import Singleton
 from movai_core_shared.exceptions import InvalidStructure
 from movai_core_shared.logger import Log
 from .db_schema import DBSchema
+from dal.validation.snapshot import LazyMapping
 
 StrOrDictRecursive = Union[str, None, Dict[str, "StrOrDictRecursive"]]
 DB_CONNECT_RETRIES = 3
@@ -317,6 +318,7 @@ class MovaiDB:
     REDIS_LOCAL_PORT = int(getenv("REDIS_LOCAL_PORT", 6379))
     REDIS_SLAVE_HOST = getenv("REDIS_SLAVE_HOST", REDIS_MASTER_HOST)
     DB_SCHEMA = DBSchema()
+    _API_STAR = None
 
     def __init__(
         self,
@@ -344,7 +346,7 @@ class MovaiDB:
         else:
             # we then need to get this from database!!!!
             self.api_struct = self.DB_SCHEMA.get_api()
-        self.api_star = self.template_to_star(self.api_struct)
+        self.api_star = self.get_api_star(self.api_struct)
 
         self.loop = loop
         if not self.loop:
@@ -496,6 +498,42 @@ class MovaiDB:
 
         return self.keys_to_dict(kv)
 
+    def get_many(self, keys: List[str], batch: int = 1000) -> Dict[str, Any]:
+        """
+        Values of many keys of any type, as returned by get. The types and
+        then the values of each batch of keys are read in one pipeline, instead
+        of one request per hash or list.
+        """
+        kv = list()
+        for start in range(0, len(keys), batch):
+            chunk = keys[start : start + batch]
+            pipe = self.db_read.pipeline(transaction=False)
+            for key in chunk:
+                pipe.type(key)
+            types = [
+                type_.decode("utf-8") if isinstance(type_, bytes) else type_
+                for type_ in pipe.execute()
+            ]
+
+            pipe = self.db_read.pipeline(transaction=False)
+            for key, type_ in zip(chunk, types):
+                if type_ == "hash":
+                    pipe.hgetall(key)
+                elif type_ == "list":
+                    pipe.lrange(key, 0, -1)
+                else:
+                    pipe.get(key)
+
+            for key, type_, value in zip(chunk, types, pipe.execute()):
+                if type_ == "hash":
+                    kv.append((key, self.sort_dict(self.decode_hash(value))))
+                elif type_ == "list":
+                    kv.append((key, self.decode_list(value)))
+                elif value:
+                    kv.append((key, self.decode_value(value)))
+
+        return self.keys_to_dict(kv)
+
     def set(
         self,
         _input: dict,
@@ -640,8 +678,9 @@ class MovaiDB:
 
         return False
 
-    def rename(self, old_input: dict, new_input: dict) -> bool:
+    def rename(self, old_input: dict, new_input: dict, pipe=None) -> bool:
         """Receives two dicts with same struct to replace one with the other"""
+        db_rename = pipe if isinstance(pipe, Pipeline) else self.db_write
         keys = list()
         try:
             old_keys = self.dict_to_keys(old_input)
@@ -657,7 +696,7 @@ class MovaiDB:
             raise InvalidStructure("Invalid rename: %s" % e)
 
         for old, new in keys:
-            self.db_write.rename(old, new)
+            db_rename.rename(old, new)
 
         return True  # need also local
 
@@ -759,7 +798,7 @@ class MovaiDB:
 
         return pop_value
 
-    def hset(self, _input: dict):
+    def hset(self, _input: dict, pipe=None):
         """
         Implementation of hset, from redys-py: Set key to value within hash
 
@@ -767,11 +806,12 @@ class MovaiDB:
             1 if HSET created a new field, otherwise 0
             e.g {'Robot':{'lala':{'Parameters': {'Foo':2, 'Bar':3}}}}
         """
+        db_set = pipe if isinstance(pipe, Pipeline) else self.db_write
         kvs = self.dict_to_keys(_input)
         for key, value, _ in kvs:
             try:
                 for hash_field in value:
-                    self.db_write.hset(key, hash_field, pickle.dumps(value[hash_field]))
+                    db_set.hset(key, hash_field, pickle.dumps(value[hash_field]))
             except:
                 print('Something went wrong while saving "%s" in Redis' % (key))
 
@@ -788,15 +828,19 @@ class MovaiDB:
                 value = self.decode_value(value)
             return value
 
-    def hdel(self, _input: dict, hash_field: str, search=True):
+    def hdel(self, _input: dict, hash_field: str, search=True, pipe=None):
         """Deletes a key within the hash name"""
+        db_del = pipe if isinstance(pipe, Pipeline) else self.db_write
         if search:
             keys = self.search(_input)
         else:
             # just convert the dict to a key
             keys = [self.dict_to_keys(_input)[0][0]]
         for key in keys:
-            return self.db_write.hdel(key, hash_field)
+            deleted = db_del.hdel(key, hash_field)
+            # if we're using a Redis pipeline, we won't get
+            # the result until it is executed
+            return deleted if isinstance(deleted, int) else None
 
     def get_list(self, _input: dict, search=True) -> Any:
         """Gets a full list from Redis"""
@@ -872,7 +916,8 @@ class MovaiDB:
         for k, v in d.items():
             key = base_key
             is_ok = False
-            for k_api, _ in api.items():
+            # iterate only the keys, values of the api are loaded on demand
+            for k_api in api:
                 if k_api[0] == "$":
                     key += k + ","
                     temp_api = api[k_api]
@@ -1056,6 +1101,20 @@ class MovaiDB:
         star = {scope: self.api_star[scope]}
         return self.args_to_dict(star, kwargs)
 
+    @classmethod
+    def get_api_star(cls, api: Mapping[str, Any]) -> Mapping[str, Any]:
+        """Star version of the api, computed per scope when used and shared by all instances"""
+        try:
+            star_api, star = cls._API_STAR
+            if star_api is api:
+                return star
+        except TypeError:
+            pass
+
+        star = LazyMapping(api, lambda scope: cls.template_to_star(api[scope]))
+        cls._API_STAR = (api, star)
+        return star
+
     @staticmethod
     def template_to_star(_input: Dict[str, Any]):
         def change_keys(d: Dict[str, Any]):
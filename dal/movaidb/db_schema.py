@@ -1,8 +1,8 @@
 from os import path
 from typing import Dict
 
-from dal.plugins.classes import Resource
 from dal.validation.constants import REDIS_SCHEMA_FOLDER_PATH
+from dal.validation.snapshot import LazyMapping, SchemaSnapshot
 
 
 class DBSchema(dict):
@@ -19,14 +19,12 @@ class DBSchema(dict):
             self.load_schemas_from_files()
 
     def load_schemas_from_files(self):
-        """Load builtins schemas."""
-        type(self).__API__[self.version] = {
-            path.splitext(schema_file)[0]: Resource.read_json(path.join(self.__url, schema_file))[
-                "schema"
-            ]
-            for schema_file in Resource.list_resources(self.__url)
-            if schema_file.endswith(".json")
-        }
+        """Load builtins schemas, each scope is only loaded from the snapshot when used."""
+        snapshot = SchemaSnapshot.from_url(self.__url)
+        type(self).__API__[self.version] = LazyMapping(
+            [path.splitext(name)[0] for name in snapshot if "/" not in name],
+            lambda scope: snapshot[f"{scope}.json"]["schema"],
+        )
 
     @property
     def version(self):
@@ -45,7 +43,7 @@ class DBSchema(dict):
         return type(self).__API__[self.__version][key]
 
     def __iter__(self):
-        return type(self).__API__[self.__version].__iter__
+        return iter(type(self).__API__[self.__version])
 
     def __repr__(self):
         return type(self).__API__[self.__version].__repr__()
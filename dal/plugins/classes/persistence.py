@@ -105,6 +105,13 @@ class PersistencePlugin(Plugin):
         Get a list of all related objects
         """
 
+    def get_referrer_objects(self, **kwargs):
+        """
+        Get a list of all objects referencing this one,
+        plugins without a reverse index return None
+        """
+        return None
+
     @abstractmethod
     def write(self, data: object, **kwargs):
         """
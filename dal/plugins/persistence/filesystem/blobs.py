@@ -0,0 +1,178 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Content addressed storage for the filesystem plugin
+"""
+import os
+import json
+import hashlib
+import tempfile
+from threading import Lock
+
+from cachetools import LRUCache
+
+
+MANIFEST_FILE = "manifest.json"
+DATA_FILE = "data.json"
+# written in the blobs folder once all the versions of the workspace were migrated
+MIGRATED_FILE = "MIGRATED"
+
+
+class BlobStore:
+    """
+    Stores the attributes of the documents of a workspace by content,
+    each top level attribute of a document is serialized and saved
+    in <workspace>/.blobs/<hash[:2]>/<hash>.json, a version of a document
+    becomes a small manifest with the hash of each one of its attributes:
+    {
+        "schema_version": <schema version>,
+        "scope": <scope>,
+        "ref": <ref>,
+        "blobs": { <attribute>: <hash> }
+    }
+    Attributes that did not change between versions are stored only once.
+
+    Blobs never change, so they are cached in-process by hash
+
+    New versions are only written as manifests in workspaces that were
+    migrated by `archive_storage migrate`, readers of older releases
+    only know the data.json layout
+    """
+
+    _CACHE = LRUCache(maxsize=int(os.getenv("MOVAI_FS_BLOB_CACHE_SIZE", "4096")))
+    _LOCK = Lock()
+
+    def __init__(self, workspace_path: str):
+        self._path = os.path.join(workspace_path, ".blobs")
+
+    @staticmethod
+    def serialize(value) -> bytes:
+        """
+        Canonical serialization of a value, equal values always
+        get the same hash
+        """
+        return json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def digest(content: bytes) -> str:
+        """
+        Hash of a serialized value
+        """
+        return hashlib.sha256(content).hexdigest()
+
+    @property
+    def migrated(self) -> bool:
+        """
+        True if the workspace was migrated to the content addressed layout
+        """
+        return os.path.exists(os.path.join(self._path, MIGRATED_FILE))
+
+    def mark_migrated(self) -> None:
+        """
+        Record that all the versions of the workspace were migrated,
+        new versions are then written as manifests
+        """
+        os.makedirs(self._path, exist_ok=True)
+        with open(os.path.join(self._path, MIGRATED_FILE), "w"):
+            pass
+
+    def blob_path(self, digest: str) -> str:
+        """
+        Path of a blob
+        """
+        return os.path.join(self._path, digest[:2], f"{digest}.json")
+
+    def put(self, value) -> str:
+        """
+        Store a value, returns its hash
+        """
+        content = BlobStore.serialize(value)
+        digest = BlobStore.digest(content)
+        filename = self.blob_path(digest)
+
+        # already stored by a previous version
+        if os.path.exists(filename):
+            return digest
+
+        folder = os.path.dirname(filename)
+        os.makedirs(folder, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=folder, prefix=".blob.", delete=False) as fp:
+            fp.write(content)
+        os.replace(fp.name, filename)
+
+        return digest
+
+    def get(self, digest: str):
+        """
+        Load a value by hash, the returned object is shared,
+        callers must not change it
+        """
+        with BlobStore._LOCK:
+            try:
+                return BlobStore._CACHE[digest]
+            except KeyError:
+                pass
+
+        with open(self.blob_path(digest), "rb") as fp:
+            value = json.loads(fp.read())
+
+        with BlobStore._LOCK:
+            BlobStore._CACHE[digest] = value
+
+        return value
+
+    def write_manifest(self, folder: str, schema_version: str, scope: str, ref: str, obj: dict):
+        """
+        Store the attributes of an object and write the version manifest
+        """
+        manifest = {
+            "schema_version": schema_version,
+            "scope": scope,
+            "ref": ref,
+            "blobs": {attr: self.put(value) for attr, value in obj.items()},
+        }
+
+        # a reader never finds a partial manifest
+        with tempfile.NamedTemporaryFile("w", dir=folder, prefix=".manifest.", delete=False) as fp:
+            json.dump(manifest, fp)
+        os.replace(fp.name, os.path.join(folder, MANIFEST_FILE))
+
+        return manifest
+
+    def assemble(self, manifest: dict) -> dict:
+        """
+        Rebuild the document described by a manifest, the document
+        has the same format as a data.json file
+        """
+        obj = {attr: self.get(digest) for attr, digest in manifest["blobs"].items()}
+        return {
+            "schema_version": manifest["schema_version"],
+            manifest["scope"]: {manifest["ref"]: obj},
+        }
+
+    def migrate(self, folder: str) -> bool:
+        """
+        Convert a version folder stored as a data.json into a manifest,
+        returns False if there was nothing to convert
+        """
+        data_file = os.path.join(folder, DATA_FILE)
+        if not os.path.exists(data_file) or os.path.exists(os.path.join(folder, MANIFEST_FILE)):
+            return False
+
+        with open(data_file, "r") as fp:
+            data = json.load(fp)
+
+        schema_version = data.pop("schema_version", "1.0")
+        try:
+            ((scope, refs),) = data.items()
+            ((ref, obj),) = refs.items()
+        except (ValueError, AttributeError):
+            # not a single object document, keep it as it is
+            return False
+
+        # the manifest must be complete before we remove the original data
+        self.write_manifest(folder, schema_version, scope, ref, obj)
+        os.remove(data_file)
+        return True
@@ -8,21 +8,26 @@
 """
 import os
 import json
+import fcntl
 import glob
 import uuid
 import re
 import base64
 import tempfile
+from contextlib import contextmanager
+from threading import Lock
 from urllib.parse import urlparse
 from binascii import Error as BinasciiError
 from datetime import datetime
 
+from cachetools import LRUCache
 from movai_core_shared.logger import Log
 from dal.data import schemas, TreeNode, SchemaPropertyNode
 from dal.plugins.classes import Plugin, PersistencePlugin, Persistence
-from dal.models.scopestree import ScopeInstanceVersionNode, ScopesTree
+from dal.models.scopestree import ScopeInstanceVersionNode, ScopesTree, scopes
 from dal.models.model import Model
 from dal.backup import RestoreManager
+from .blobs import BlobStore, DATA_FILE, MANIFEST_FILE
 from dal.data.archive import RemoteArchive
 
 
@@ -41,6 +46,13 @@ class FilesystemPlugin(PersistencePlugin):
     _FLEET_TOKEN = os.getenv("FLEET_TOKEN", None)
     _ARCHIVE_USER = None
     _ARCHIVE_PASSWORD = None
+    # parsed documents, keyed by file path and modification time
+    _DOCUMENTS_CACHE = LRUCache(maxsize=int(os.getenv("MOVAI_FS_CACHE_SIZE", "256")))
+    _DOCUMENTS_LOCK = Lock()
+    _INDEX_LOCK = Lock()
+    # new versions are stored as manifests pointing to content addressed blobs,
+    # always in workspaces migrated by archive_storage, in all of them when set
+    _CONTENT_ADDRESSED = os.getenv("MOVAI_FS_CONTENT_ADDRESSED", "false").lower() in ("1", "true")
     logger = Log.get_logger("filesystem.mov.ai")
 
     @staticmethod
@@ -140,6 +152,152 @@ class FilesystemPlugin(PersistencePlugin):
             except ValueError as e:
                 raise FileNotFoundError from e
 
+    @staticmethod
+    def dump_json(filename: str, data: object):
+        """
+        Write a json file atomically, the data is written to a temporary file
+        first and then replaces the target, readers will either get the old or
+        the new content, never a partial one
+        """
+        folder, name = os.path.split(filename)
+        with tempfile.NamedTemporaryFile("w", dir=folder, prefix=f".{name}.", delete=False) as fp:
+            json.dump(data, fp)
+        os.replace(fp.name, filename)
+
+    @staticmethod
+    def load_json(filename: str):
+        """
+        Load a json file
+        """
+        with open(filename, "rb") as data_fp:
+            return json.loads(data_fp.read())
+
+    @staticmethod
+    def load_document(filename: str):
+        """
+        Load a json document using the in-process cache, an entry is only
+        valid while the file modification time does not change.
+        The returned object is shared, callers must not change it
+        """
+        stat = os.stat(filename)
+        key = (filename, stat.st_mtime_ns, stat.st_size)
+
+        with FilesystemPlugin._DOCUMENTS_LOCK:
+            try:
+                return FilesystemPlugin._DOCUMENTS_CACHE[key]
+            except KeyError:
+                pass
+
+        document = FilesystemPlugin.load_json(filename)
+
+        with FilesystemPlugin._DOCUMENTS_LOCK:
+            FilesystemPlugin._DOCUMENTS_CACHE[key] = document
+
+        return document
+
+    @staticmethod
+    def copy_document(document):
+        """
+        Copy a json document, much cheaper than a deepcopy
+        """
+        if isinstance(document, dict):
+            return {key: FilesystemPlugin.copy_document(value) for key, value in document.items()}
+        if isinstance(document, list):
+            return [FilesystemPlugin.copy_document(value) for value in document]
+        return document
+
+    @staticmethod
+    def load_version(data_folder: str) -> dict:
+        """
+        Load the document stored in a version folder, either from the
+        manifest and its blobs or from a plain data.json file.
+        The returned object is shared, callers must not change it
+        """
+        try:
+            manifest = FilesystemPlugin.load_document(os.path.join(data_folder, MANIFEST_FILE))
+        except FileNotFoundError:
+            return FilesystemPlugin.load_document(os.path.join(data_folder, DATA_FILE))
+
+        # <ROOT_PATH>/<workspace>/<scope>/<ref>/<version folder>
+        workspace_path = os.path.dirname(os.path.dirname(os.path.dirname(data_folder)))
+        return BlobStore(workspace_path).assemble(manifest)
+
+    @staticmethod
+    def load_version_index(basepath: str) -> dict:
+        """
+        Load the version index of a ref, the index is stored in
+        <ROOT_PATH>/<workspace>/<scope>/<ref>/versions.json and maps
+        each version tag to the folder holding it
+        """
+        try:
+            return FilesystemPlugin.load_document(os.path.join(basepath, "versions.json"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def scan_version_folders(basepath: str) -> dict:
+        """
+        List the version folders of a ref, returns the same mapping
+        of version tags to folders kept in the version index
+        """
+        index = {}
+        for folder in glob.glob(os.path.join(basepath, "*-*")):
+            if os.path.isdir(folder):
+                name = os.path.basename(folder)
+                index[name.split("-")[0]] = name
+        return index
+
+    @staticmethod
+    @contextmanager
+    def index_lock(basepath: str):
+        """
+        Lock the indexes of a ref, against other threads and
+        against other processes sharing the same folder
+        """
+        with FilesystemPlugin._INDEX_LOCK:
+            with open(os.path.join(basepath, ".index.lock"), "w") as lock_fp:
+                fcntl.flock(lock_fp, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fp, fcntl.LOCK_UN)
+
+    @staticmethod
+    def update_version_index(basepath: str, versions: dict):
+        """
+        Add versions to the version index of a ref, a ref stored
+        before the index existed gets all its folders indexed first
+        """
+        filename = os.path.join(basepath, "versions.json")
+        with FilesystemPlugin.index_lock(basepath):
+            if os.path.exists(filename):
+                index = dict(FilesystemPlugin.load_version_index(basepath))
+            else:
+                index = FilesystemPlugin.scan_version_folders(basepath)
+            index.update(versions)
+            FilesystemPlugin.dump_json(filename, index)
+
+    @staticmethod
+    def version_folder(basepath: str, tag: str) -> str:
+        """
+        Get the folder holding a version, the version index is used
+        and we only list the ref folder if the tag is not indexed yet,
+        in that case the index is updated.
+        Raises IndexError if the version does not exist
+        """
+        try:
+            folder = os.path.join(basepath, FilesystemPlugin.load_version_index(basepath)[tag])
+            if os.path.isdir(folder):
+                return folder
+        except KeyError:
+            pass
+
+        # not indexed, the object might have been stored by
+        # an older version or restored from an archive
+        folder = glob.glob(os.path.join(basepath, f"{tag}-*"))[0]
+        FilesystemPlugin.update_version_index(basepath, {tag: os.path.basename(folder)})
+        return folder
+
     def validate_data(self, schema: TreeNode, data: dict, out: dict):
         """
         Validate a dict against a schema
@@ -287,23 +445,23 @@ class FilesystemPlugin(PersistencePlugin):
         # First time we just check if we have any scope with that version in
         # our archive, otherwise we try to fetch it from a remote archive
         try:
-            data_folder = glob.glob(os.path.join(basepath, f"{version}-*"))[0]
+            data_folder = FilesystemPlugin.version_folder(basepath, version)
         except IndexError:
             # try and fetch the scope from a remote archive
             FilesystemPlugin.get_scope_from_upstream(os.path.join(workspace, scope, ref, version))
 
         # if still not there
         try:
-            data_folder = glob.glob(os.path.join(basepath, f"{version}-*"))[0]
+            data_folder = FilesystemPlugin.version_folder(basepath, version)
         except IndexError as e:
             raise FileNotFoundError from e
 
         # Read the data and the stored relations
         try:
-            data_filename = os.path.join(data_folder, "data.json")
+            # archives always hold the full document
+            data_filename = os.path.join(data_folder, DATA_FILE)
             relations_filename = os.path.join(data_folder, "relations.json")
-            with open(data_filename, "r") as data_fp:
-                data = data_fp.read()
+            data = json.dumps(FilesystemPlugin.load_version(data_folder))
             with open(relations_filename, "r") as relations_fp:
                 relations = json.load(relations_fp)
         except FileNotFoundError as e:
@@ -352,6 +510,18 @@ class FilesystemPlugin(PersistencePlugin):
         for archived_file in scope_file_list:
             archive.extract(archived_file, FilesystemPlugin._ROOT_PATH)
 
+        FilesystemPlugin.update_version_index(
+            os.path.dirname(data_folder), {version: os.path.basename(data_folder)}
+        )
+
+        # update the reverse index of the referenced objects
+        try:
+            with open(os.path.join(data_folder, "relations.json"), "r") as data_fp:
+                relations = json.load(data_fp)
+            self.update_referrers(workspace, scope, ref, version, relations)
+        except FileNotFoundError:
+            pass
+
     def list_versions(self, **kwargs):
         """
         list all existing scopes
@@ -363,23 +533,19 @@ class FilesystemPlugin(PersistencePlugin):
         except KeyError as e:
             raise ValueError("missing workspace, scope, or ref") from e
 
-        pattern = os.path.join(FilesystemPlugin._ROOT_PATH, workspace, scope, ref, "*")
-        versions = []
-        for folder in glob.glob(pattern):
-            tokens = os.path.split(folder)
-            try:
-                folder = tokens[0]
-                version = tokens[1]
-            except IndexError:
-                continue
+        basepath = os.path.join(FilesystemPlugin._ROOT_PATH, workspace, scope, ref)
+        indexed = FilesystemPlugin.load_version_index(basepath)
 
-            tokens = version.split("-")
-            try:
-                tag = tokens[0]
-                date = tokens[1]
-            except IndexError:
-                continue
+        # No index yet, we need to list the folder and
+        # build the index for the next time
+        if not indexed:
+            indexed = FilesystemPlugin.scan_version_folders(basepath)
+            if indexed:
+                FilesystemPlugin.update_version_index(basepath, indexed)
 
+        versions = []
+        for tag, version in indexed.items():
+            date = version.split("-")[1]
             versions.append(
                 {
                     "url": f"{workspace}/{scope}/{ref}/{tag}",  # os.path.join(folder.replace(FilesystemPlugin._ROOT_PATH, ""), tag),
@@ -430,7 +596,7 @@ class FilesystemPlugin(PersistencePlugin):
         # not exist more than one
         out = set()
         try:
-            data_folder = glob.glob(os.path.join(basepath, f"{version}-*"))[0]
+            data_folder = FilesystemPlugin.version_folder(basepath, version)
         except IndexError:
             return out
 
@@ -439,9 +605,7 @@ class FilesystemPlugin(PersistencePlugin):
         try:
             # We look for a file called relations.json, it holds a cache
             # to this objects relation
-            filename = os.path.join(data_folder, "relations.json")
-            with open(filename, "r") as data_fp:
-                relations = json.load(data_fp)
+            relations = FilesystemPlugin.load_document(os.path.join(data_folder, "relations.json"))
 
             for value in relations:
                 (
@@ -485,9 +649,7 @@ class FilesystemPlugin(PersistencePlugin):
             # if data is no set it means we need to load it from
             # the file system
             try:
-                filename = os.path.join(data_folder, "data.json")
-                with open(filename, "r") as data_fp:
-                    data = json.load(data_fp)
+                data = FilesystemPlugin.load_version(data_folder)
 
                 schema_version = data.get("schema_version", "1.0")
                 schema = schemas(scope, schema_version)
@@ -504,6 +666,129 @@ class FilesystemPlugin(PersistencePlugin):
             pass
         return out
 
+    def is_local_workspace(self, workspace: str):
+        """
+        Check if a workspace is also stored by this plugin
+        """
+        if workspace == self._args.get("workspace"):
+            return True
+
+        try:
+            return isinstance(scopes(workspace=workspace).plugin, FilesystemPlugin)
+        except (KeyError, ValueError):
+            return False
+
+    @staticmethod
+    def add_referrers(workspace: str, scope: str, ref: str, version: str, referrers: list):
+        """
+        Add referrers to the reverse index of an object, the index is stored
+        in <ROOT_PATH>/<workspace>/<scope>/<ref>/referenced_by.json and maps
+        each version tag to the list of objects referencing it
+        """
+        basepath = os.path.join(FilesystemPlugin._ROOT_PATH, workspace, scope, ref)
+        filename = os.path.join(basepath, "referenced_by.json")
+
+        # we do not create the folder of an object that is not in the
+        # archive yet, the referrers will be added by rebuild_indexes
+        if not os.path.isdir(basepath):
+            return
+
+        with FilesystemPlugin.index_lock(basepath):
+            try:
+                index = dict(FilesystemPlugin.load_document(filename))
+            except (FileNotFoundError, json.JSONDecodeError):
+                index = {}
+
+            index[version] = sorted(set(index.get(version, [])).union(referrers))
+
+            FilesystemPlugin.dump_json(filename, index)
+
+    def update_referrers(self, workspace: str, scope: str, ref: str, tag: str, relations: set):
+        """
+        Register an object version in the reverse index of all its targets
+        that are stored by this plugin
+        """
+        referrer = f"{workspace}/{scope}/{ref}/{tag}"
+        for relation in relations:
+            (
+                target_workspace,
+                target_scope,
+                target_ref,
+                target_version,
+            ) = ScopesTree.extract_reference(relation)
+
+            if not self.is_local_workspace(target_workspace):
+                continue
+
+            FilesystemPlugin.add_referrers(
+                target_workspace, target_scope, target_ref, target_version, [referrer]
+            )
+
+    def get_referrer_objects(self, **kwargs):
+        """
+        Get a list of all objects referencing this one, the answer comes
+        exclusively from the reverse index
+        """
+        model = kwargs.get("model", None)
+        depth = kwargs.get("depth", 0)
+        level = kwargs.get("level", 0)
+        search_filter = kwargs.get("search_filter", None)
+
+        if issubclass(type(model), Model):
+            scope = model.scope
+            ref = model.ref
+            workspace = model.workspace
+            version = model.version
+        else:
+            try:
+                scope = kwargs["scope"]
+                ref = kwargs["ref"]
+                version = kwargs["version"]
+                workspace = kwargs.get("workspace", self._args["workspace"])
+            except KeyError as e:
+                raise KeyError("missing scope, ref or version") from e
+
+        out = set()
+        filename = os.path.join(
+            FilesystemPlugin._ROOT_PATH, workspace, scope, ref, "referenced_by.json"
+        )
+        try:
+            referrers = FilesystemPlugin.load_document(filename).get(version, [])
+        except FileNotFoundError:
+            return out
+
+        for value in referrers:
+            (
+                source_workspace,
+                source_scope,
+                source_ref,
+                source_version,
+            ) = ScopesTree.extract_reference(value)
+
+            # if we passed a search filter we check if scope
+            # is in the list, otherwise the list will be
+            # None and trigger a TypeError
+            try:
+                if source_scope in search_filter:
+                    out.add(f"{source_workspace}/{source_scope}/{source_ref}/{source_version}")
+            except TypeError:
+                out.add(f"{source_workspace}/{source_scope}/{source_ref}/{source_version}")
+
+            if level < depth:
+                out.update(
+                    Model.get_referrers_relations(
+                        workspace=source_workspace,
+                        scope=source_scope,
+                        ref=source_ref,
+                        version=source_version,
+                        level=level + 1,
+                        depth=depth,
+                        search_filter=search_filter,
+                    )
+                )
+
+        return out
+
     def write(self, data: object, **kwargs):
         """
         Stores the object on the persistent layer
@@ -564,7 +849,7 @@ class FilesystemPlugin(PersistencePlugin):
         # we check if we have already any version stored with
         # this tag
         try:
-            _ = glob.glob(os.path.join(basepath, f"{tag}-*"))[0]
+            _ = FilesystemPlugin.version_folder(basepath, tag)
             raise ValueError("Version tag already exists")
         except IndexError:
             pass
@@ -593,15 +878,28 @@ class FilesystemPlugin(PersistencePlugin):
         #     raise ValueError("Data contains invalid references")
 
         # store data
-        obj_file = os.path.join(basepath, "data.json")
-        with open(obj_file, "w") as data_fp:
-            json.dump({"schema_version": schema.version, scope: {ref: obj}}, data_fp)
+        store = BlobStore(os.path.join(FilesystemPlugin._ROOT_PATH, workspace))
+        if FilesystemPlugin._CONTENT_ADDRESSED or store.migrated:
+            store.write_manifest(basepath, schema.version, scope, ref, obj)
+        else:
+            obj_file = os.path.join(basepath, DATA_FILE)
+            with open(obj_file, "w") as data_fp:
+                json.dump({"schema_version": schema.version, scope: {ref: obj}}, data_fp)
 
         # store relations cache
         relation_file = os.path.join(basepath, "relations.json")
         with open(relation_file, "w") as data_fp:
             json.dump(list(relations), data_fp)
 
+        # the version is only visible in the index after all
+        # the files are stored
+        FilesystemPlugin.update_version_index(
+            os.path.dirname(basepath), {tag: os.path.basename(basepath)}
+        )
+
+        # update the reverse index of the referenced objects
+        self.update_referrers(workspace, scope, ref, tag, relations)
+
     def read(self, **kwargs):
         """
         load an object from the persistent layer
@@ -621,7 +919,7 @@ class FilesystemPlugin(PersistencePlugin):
         # First time we just check if we have any scope with that version in
         # our archive, otherwise we try to fetch it from a remote archive
         try:
-            data_folder = glob.glob(os.path.join(basepath, f"{version}-*"))[0]
+            data_folder = FilesystemPlugin.version_folder(basepath, version)
         except IndexError:
             # try and fetch the scope from a remote archive
             FilesystemPlugin.get_scope_from_upstream(os.path.join(workspace, scope, ref, version))
@@ -629,14 +927,13 @@ class FilesystemPlugin(PersistencePlugin):
         # This time we MUST have one or otherwise it means we did not find any in
         # the remote archive
         try:
-            data_folder = glob.glob(os.path.join(basepath, f"{version}-*"))[0]
+            data_folder = FilesystemPlugin.version_folder(basepath, version)
         except IndexError:
             return None
 
+        # the cached document is shared, return a copy
         try:
-            filename = os.path.join(data_folder, "data.json")
-            with open(filename, "r") as data_fp:
-                return json.load(data_fp)
+            return FilesystemPlugin.copy_document(FilesystemPlugin.load_version(data_folder))
         except FileNotFoundError:
             return None
 
@@ -652,13 +949,35 @@ class FilesystemPlugin(PersistencePlugin):
     def rebuild_indexes(self, **kwargs):
         """
         force the database layer to rebuild
-        all indexes, for now we do not implement this
-        on the file system
-        The reason behind it is beacuse data in the archive
-        should always reference to existing data, therefore
-        the relations created during the saving process
-        should be more than enough
+        all indexes, the relations cache of each version
+        is created during the saving process and data in
+        the archive is never changed, therefore we only
+        rebuild the version index and the reverse index
+        from the stored relations
         """
+        try:
+            workspace = kwargs.get("workspace", self._args["workspace"])
+        except KeyError as e:
+            raise ValueError("missing workspace") from e
+
+        for index in ("versions.json", "referenced_by.json"):
+            pattern = os.path.join(FilesystemPlugin._ROOT_PATH, workspace, "*", "*", index)
+            for filename in glob.glob(pattern):
+                os.remove(filename)
+
+        for item in self.list_scopes(workspace=workspace):
+            for version in self.list_versions(
+                workspace=workspace, scope=item["scope"], ref=item["ref"]
+            ):
+                relations = self.get_related_objects(
+                    workspace=workspace,
+                    scope=item["scope"],
+                    ref=item["ref"],
+                    version=version["tag"],
+                )
+                self.update_referrers(
+                    workspace, item["scope"], item["ref"], version["tag"], relations
+                )
 
 
 Persistence.register_plugin("filesystem", FilesystemPlugin)
@@ -0,0 +1,253 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Rebuild engine for the redis plugin indexes, the relations cache
+   (<scope>:<ref>,relations:) and the reverse index
+   (<scope>:<ref>,referenced_by:)
+"""
+import fnmatch
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from redis.client import Redis
+
+from movai_core_shared.logger import Log
+from dal.data import schemas
+from dal.models.model import Model
+from dal.models.scopestree import ScopesTree
+
+
+CHECKPOINT_KEY = "_rebuild_indexes:checkpoint"
+
+# keys that belong to the indexes and not to the object itself
+INDEX_ATTRIBUTES = ("relations", "referenced_by", "_schema_version")
+
+
+class IndexRebuilder:
+    """
+    Rebuild all the indexes of a redis workspace
+
+    The keyspace is streamed only once and the keys are grouped by
+    <scope>:<ref> in memory, relations are then computed from the grouped
+    keys without any further scan. Objects are processed in batches by a
+    pool of workers, every batch reads the values it needs and writes back
+    the indexes using a pipeline.
+
+    After each contiguous run of finished batches the last processed object
+    is stored in a checkpoint, an interrupted rebuild will resume from there
+    """
+
+    logger = Log.get_logger("indexes.redis.mov.ai")
+
+    def __init__(
+        self,
+        plugin,
+        batch_size: int = 500,
+        workers: int = 4,
+        progress: Optional[Callable[[int, int], None]] = None,
+        resume: bool = True,
+    ):
+        self._plugin = plugin
+        self._batch_size = max(1, batch_size)
+        self._workers = max(1, workers)
+        self._progress = progress
+        self._resume = resume
+        self._done = 0
+        self._total = 0
+
+    @staticmethod
+    def group_keys(keys) -> Dict[str, List[str]]:
+        """
+        Group keys by <scope>:<ref>, objects that only have index keys
+        (ex: the reverse index of a deleted object) are discarded
+        """
+        groups = {}
+        for key in keys:
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+
+            tokens = re.split("[:,]", key)
+            if len(tokens) < 3:
+                continue
+
+            groups.setdefault(f"{tokens[0]}:{tokens[1]}", []).append(key)
+
+        return {
+            obj: obj_keys
+            for obj, obj_keys in groups.items()
+            if any(re.split("[:,]", key)[2] not in INDEX_ATTRIBUTES for key in obj_keys)
+        }
+
+    def relation_keys(self, scope: str, ref: str, schema, keys: List[str]) -> list:
+        """
+        Match the object keys against the relations defined for the scope,
+        returns a list of (key, attr_schema, target_scope)
+        """
+        out = []
+        for relation, target in Model.get_relations_definition(scope).items():
+            try:
+                attr_schema = schema.from_path(relation)
+            except (KeyError, AttributeError):
+                continue
+
+            pattern = f"{scope}:{ref}{self._plugin.schema_to_key(attr_schema)}"
+            for key in fnmatch.filter(keys, pattern):
+                out.append((key, attr_schema, target["scope"]))
+
+        return out
+
+    def process_batch(self, batch: List[tuple]) -> int:
+        """
+        Compute and store the indexes of a batch of objects,
+        returns the number of objects processed
+        """
+        conn = Redis(connection_pool=self._plugin._REDIS_MASTER_POOL)
+
+        # First round trip, the schema version and the current relations
+        # of every object in the batch
+        pipe = conn.pipeline(transaction=False)
+        for obj, _ in batch:
+            pipe.get(f"{obj},_schema_version:")
+            pipe.lrange(f"{obj},relations:", 0, -1)
+        replies = pipe.execute()
+
+        pending = []
+        for idx, (obj, keys) in enumerate(batch):
+            scope, ref = obj.split(":", 1)
+            schema_version = replies[idx * 2]
+            old_relations = self._plugin.decode_list(replies[idx * 2 + 1])
+
+            # If we do not a version it probably means
+            # it's version 1.0
+            if schema_version is None:
+                schema_version = "1.0"
+            else:
+                schema_version = schema_version.decode("utf-8")
+
+            try:
+                schema = schemas(scope, schema_version)
+            except FileNotFoundError:
+                self.logger.warning(f"No schema {schema_version} found for {obj}, skipping")
+                continue
+
+            pending.append(
+                (
+                    scope,
+                    ref,
+                    schema_version,
+                    old_relations,
+                    self.relation_keys(scope, ref, schema, keys),
+                )
+            )
+
+        # Second round trip, the values of the relation attributes that
+        # are not stored in the key itself
+        pipe = conn.pipeline(transaction=False)
+        for _, _, _, _, matches in pending:
+            for key, attr_schema, _ in matches:
+                if not attr_schema.attributes.get("value_on_key", False):
+                    pipe.get(key)
+        values = iter(pipe.execute())
+
+        # Last round trip, store the indexes
+        workspace = self._plugin._args.get("workspace", "global")
+        pipe = conn.pipeline(transaction=True)
+        for scope, ref, schema_version, old_relations, matches in pending:
+            relations = set()
+            for key, attr_schema, target_scope in matches:
+                if attr_schema.attributes.get("value_on_key", False):
+                    value = re.split("[:,]", key)[-1]
+                else:
+                    value = next(values)
+                    if value is None:
+                        continue
+                    value = self._plugin.decode_value(value)
+
+                relations.add("/".join(ScopesTree.extract_reference(value, scope=target_scope)))
+
+            referrer = f"{workspace}/{scope}/{ref}/__UNVERSIONED__"
+            pipe.set(f"{scope}:{ref},_schema_version:", schema_version)
+            pipe.delete(f"{scope}:{ref},relations:")
+            if relations:
+                # sorted, as the plugin writes it
+                pipe.rpush(f"{scope}:{ref},relations:", *sorted(relations))
+
+            for relation in set(old_relations) - relations:
+                key = self._plugin.referenced_by_key(relation)
+                if key is not None:
+                    pipe.srem(key, referrer)
+
+            for relation in relations:
+                key = self._plugin.referenced_by_key(relation)
+                if key is not None:
+                    pipe.sadd(key, referrer)
+        pipe.execute()
+
+        return len(batch)
+
+    def run(self) -> int:
+        """
+        Rebuild the indexes, returns the number of objects processed
+        """
+        conn = Redis(connection_pool=self._plugin._REDIS_MASTER_POOL)
+
+        checkpoint = conn.get(CHECKPOINT_KEY) if self._resume else None
+        if checkpoint is None:
+            # fresh start, the reverse index is rebuilt from scratch
+            # using the relations of every object
+            stale = list(conn.scan_iter("*,referenced_by:", count=1000))
+            for idx in range(0, len(stale), self._batch_size):
+                conn.delete(*stale[idx : idx + self._batch_size])
+        else:
+            checkpoint = checkpoint.decode("utf-8")
+            self.logger.info(f"Resuming indexes rebuild after {checkpoint}")
+
+        # stream the whole keyspace once
+        groups = self.group_keys(conn.scan_iter("*", count=1000))
+        objects = sorted(groups)
+        if checkpoint is not None:
+            objects = [obj for obj in objects if obj > checkpoint]
+
+        batches = [
+            [(obj, groups[obj]) for obj in objects[idx : idx + self._batch_size]]
+            for idx in range(0, len(objects), self._batch_size)
+        ]
+
+        self._done = 0
+        self._total = len(objects)
+        self.report()
+
+        # batches might finish out of order, the checkpoint only moves
+        # forward when all the previous batches are also finished
+        finished = set()
+        next_batch = 0
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            futures = {
+                executor.submit(self.process_batch, batch): idx for idx, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                self._done += future.result()
+                finished.add(futures[future])
+
+                while next_batch in finished:
+                    next_batch += 1
+                if next_batch > 0:
+                    conn.set(CHECKPOINT_KEY, batches[next_batch - 1][-1][0])
+
+                self.report()
+
+        conn.delete(CHECKPOINT_KEY)
+        return self._total
+
+    def report(self):
+        """
+        Report the current progress
+        """
+        if self._progress is not None:
+            self._progress(self._done, self._total)
+            return
+
+        self.logger.debug(f"Indexes rebuild: {self._done}/{self._total}")
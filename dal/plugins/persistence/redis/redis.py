@@ -19,6 +19,9 @@ from dal.data import SchemaPropertyNode, SchemaNode, schemas, TreeNode
 from dal.models.scopestree import ScopesTree, ScopeInstanceVersionNode
 from dal.models.model import Model
 from dal.movaidb import MovaiDB
+from dal.utils.generations import bump as bump_generations
+from dal.utils.usage_search.usage_index import DIRTY_KEY as USAGE_DIRTY_KEY, DIRTY_NODES_KEY
+from .indexes import IndexRebuilder
 
 
 __DRIVER_NAME__ = "Mov.ai Redis Plugin"
@@ -419,6 +422,11 @@ class RedisPlugin(PersistencePlugin):
                 if f"{scope}:{ref}" in processed:
                     continue
 
+                # the reverse index may outlive the object it belongs to,
+                # it's not enough to say that the object exists
+                if len(tokens) > 2 and tokens[2] == "referenced_by":
+                    continue
+
                 processed.add(f"{scope}:{ref}")
                 scopes.append({"url": f"{workspace}/{scope}/{ref}", "scope": scope, "ref": ref})
 
@@ -492,8 +500,12 @@ class RedisPlugin(PersistencePlugin):
         except KeyError as e:
             raise ValueError("missing workspace, scope, or ref") from e
 
-        conn.keys
-        if len(list(conn.scan_iter(f"{scope}:{ref}*", count=50))) == 0:
+        keys = [
+            key
+            for key in conn.scan_iter(f"{scope}:{ref},*", count=50)
+            if key.decode("utf-8") != f"{scope}:{ref},referenced_by:"
+        ]
+        if len(keys) == 0:
             return []
 
         return [{"url": f"{workspace}/{scope}/{ref}", "tag": "__UNVERSIONED__", "date": ""}]
@@ -505,7 +517,8 @@ class RedisPlugin(PersistencePlugin):
 
     def get_related_objects(self, **kwargs):
         """
-        Get a list of all related objects
+        Get a list of all related objects, the relations cache is
+        ignored with cached=False
         """
         model = kwargs.get("model", None)
         depth = kwargs.get("depth", 0)
@@ -531,7 +544,7 @@ class RedisPlugin(PersistencePlugin):
 
         # We first check if we have cached relations ( see rebuild_indexes )
         # if that's the case return the cached information
-        if conn.exists(f"{scope}:{ref},relations:"):
+        if kwargs.get("cached", True) and conn.exists(f"{scope}:{ref},relations:"):
             for relation in conn.lrange(f"{scope}:{ref},relations:", 0, -1):
                 value = relation.decode("utf-8")
 
@@ -628,6 +641,121 @@ class RedisPlugin(PersistencePlugin):
 
         return out
 
+    def referenced_by_key(self, relation: str):
+        """
+        Get the key of the reverse index for the target of a relation,
+        returns None if the target is not stored in this workspace
+        """
+        workspace, scope, ref, version = ScopesTree.extract_reference(relation)
+
+        if workspace != self._args.get("workspace", "global") or version != "__UNVERSIONED__":
+            return None
+
+        return f"{scope}:{ref},referenced_by:"
+
+    def read_relations(self, conn: Redis, scope: str, ref: str, redis_keys: list) -> list:
+        """
+        Get the relations cache of an object, redis_keys are the keys of
+        the object, the cache is only read when it is one of them
+        """
+        if f"{scope}:{ref},relations:" not in redis_keys:
+            return []
+        return self.decode_list(conn.lrange(f"{scope}:{ref},relations:", 0, -1))
+
+    def update_relations(self, conn: Redis, scope: str, ref: str, old: list, new: set):
+        """
+        Replace the relations cache of an object and update the reverse
+        index (<scope>:<ref>,referenced_by:) of each one of the targets,
+        both are written in a single transaction so they never disagree
+        """
+        referrer = f"{self._args.get('workspace', 'global')}/{scope}/{ref}/__UNVERSIONED__"
+
+        # sorted, the cache is the same for the same relations
+        new = sorted(new)
+
+        pipe = conn.pipeline(transaction=True)
+        pipe.delete(f"{scope}:{ref},relations:")
+        if new:
+            pipe.rpush(f"{scope}:{ref},relations:", *new)
+
+        for relation in sorted(set(old) - set(new)):
+            key = self.referenced_by_key(relation)
+            if key is not None:
+                pipe.srem(key, referrer)
+
+        for relation in new:
+            key = self.referenced_by_key(relation)
+            if key is not None:
+                pipe.sadd(key, referrer)
+
+        # indexed attributes may have changed
+        if scope == "Flow":
+            pipe.sadd(USAGE_DIRTY_KEY, ref)
+        elif scope == "Node":
+            pipe.sadd(DIRTY_NODES_KEY, ref)
+        # the object was written or deleted
+        bump_generations(pipe, [f"{scope}:{ref}"])
+
+        pipe.execute()
+
+    def get_referrer_objects(self, **kwargs):
+        """
+        Get a list of all objects referencing this one, the answer comes
+        exclusively from the reverse index (see rebuild_indexes)
+        """
+        model = kwargs.get("model", None)
+        depth = kwargs.get("depth", 0)
+        level = kwargs.get("level", 0)
+        search_filter = kwargs.get("search_filter", None)
+
+        if issubclass(type(model), ScopeInstanceVersionNode):
+            scope = model.scope
+            ref = model.ref
+        else:
+            try:
+                scope = kwargs["scope"]
+                ref = kwargs["ref"]
+            except KeyError as e:
+                raise ValueError("missing scope,ref or model") from e
+
+        # We are reading so we connect to the slave instance
+        conn = Redis(connection_pool=self._REDIS_SLAVE_POOL)
+        out = set()
+
+        for referrer in conn.smembers(f"{scope}:{ref},referenced_by:"):
+            value = referrer.decode("utf-8")
+
+            (
+                source_workspace,
+                source_scope,
+                source_ref,
+                source_version,
+            ) = ScopesTree.extract_reference(value)
+
+            # if we passed a search filter we check if scope
+            # is in the list, otherwise the list will be
+            # None and trigger a TypeError
+            try:
+                if source_scope in search_filter:
+                    out.add(f"{source_workspace}/{source_scope}/{source_ref}/{source_version}")
+            except TypeError:
+                out.add(f"{source_workspace}/{source_scope}/{source_ref}/{source_version}")
+
+            if level < depth:
+                out.update(
+                    Model.get_referrers_relations(
+                        workspace=source_workspace,
+                        scope=source_scope,
+                        ref=source_ref,
+                        version=source_version,
+                        level=level + 1,
+                        depth=depth,
+                        search_filter=search_filter,
+                    )
+                )
+
+        return out
+
     def write(self, data: object, **kwargs):
         """
         Stores the object on the persistent layer, for now we only support
@@ -669,21 +797,21 @@ class RedisPlugin(PersistencePlugin):
                     # not there yet
                     pass
 
-                # delete the old relations cache and update it
-                conn.delete(f"{scope}:{ref},relations:")
-                try:
-                    redis_keys.remove(f"{scope}:{ref},relations:")
-                except ValueError:
-                    # not there yet
-                    pass
-                relations = self.get_related_objects(model=data)
-                for relation in relations:
-                    conn.rpush(f"{scope}:{ref},relations:", relation)
-
-                # remove excessive keys
+                # replace the old relations cache
+                old_relations = self.read_relations(conn, scope, ref, redis_keys)
+                for index_key in (f"{scope}:{ref},relations:", f"{scope}:{ref},referenced_by:"):
+                    try:
+                        redis_keys.remove(index_key)
+                    except ValueError:
+                        # not there yet
+                        pass
+                # remove excessive keys, before looking for the relations
                 if len(redis_keys) > 0:
                     conn.delete(*redis_keys)
 
+                relations = self.get_related_objects(model=data, cached=False)
+                self.update_relations(conn, scope, ref, old_relations, relations)
+
                 return None
 
             raise ValueError("Redis plugin do not support versions")
@@ -716,21 +844,23 @@ class RedisPlugin(PersistencePlugin):
             except ValueError:
                 pass
 
-            # delete the old relations cache and update it
-            conn.delete(f"{scope}:{ref},relations:")
-            relations = self.get_related_objects(
-                scope=scope, ref=ref, schema_version=schema_version
-            )
-            for relation in relations:
-                conn.rpush(f"{scope}:{ref},relations:", relation)
-            try:
-                redis_keys.remove(f"{scope}:{ref},relations:")
-            except ValueError:
-                pass
+            # replace the old relations cache
+            old_relations = self.read_relations(conn, scope, ref, redis_keys)
+            for index_key in (f"{scope}:{ref},relations:", f"{scope}:{ref},referenced_by:"):
+                try:
+                    redis_keys.remove(index_key)
+                except ValueError:
+                    pass
 
+            # remove excessive keys, before looking for the relations
             if remove_extra and len(redis_keys) > 0:
                 conn.delete(*redis_keys)
 
+            relations = self.get_related_objects(
+                scope=scope, ref=ref, schema_version=schema_version, cached=False
+            )
+            self.update_relations(conn, scope, ref, old_relations, relations)
+
             return None
 
         raise NotImplementedError(f"Type not serializable: {type(data)}")
@@ -771,6 +901,15 @@ class RedisPlugin(PersistencePlugin):
 
         return data
 
+    def delete_relations(self, conn: Redis, scope: str, ref: str):
+        """
+        Remove the relations cache of an object and remove the object
+        from the reverse index of its targets, the object own reverse
+        index is kept since the referrers still exist
+        """
+        old_relations = self.decode_list(conn.lrange(f"{scope}:{ref},relations:", 0, -1))
+        self.update_relations(conn, scope, ref, old_relations, set())
+
     def delete(self, data: object = None, **kwargs):
         """
         delete an object from the persistent layer,
@@ -801,7 +940,7 @@ class RedisPlugin(PersistencePlugin):
                 )
                 # also delete schema version key
                 conn.delete(f"{scope}:{ref},_schema_version:")
-                conn.delete(f"{scope}:{ref},relations:")
+                self.delete_relations(conn, scope, ref)
 
                 return
 
@@ -831,43 +970,32 @@ class RedisPlugin(PersistencePlugin):
 
             self.delete_keys(schema, f"{scope}:{ref}", self.fetch_keys(conn, scope, ref), conn, obj)
             conn.delete(f"{scope}:{ref},_schema_version:")
-            conn.delete(f"{scope}:{ref},relations:")
+            self.delete_relations(conn, scope, ref)
             return
 
         self.delete_all_keys(schema, f"{scope}:{ref}", self.fetch_keys(conn, scope, ref), conn)
         conn.delete(f"{scope}:{ref},_schema_version:")
-        conn.delete(f"{scope}:{ref},relations:")
+        self.delete_relations(conn, scope, ref)
 
     def rebuild_indexes(self, **kwargs):
         """
         force the database layer to rebuild
-        all indexes, this is a costly operation
-        """
-        conn = Redis(connection_pool=self._REDIS_MASTER_POOL)
-
-        items = self.list_scopes()
-
-        for item in items:
-            scope = item["scope"]
-            ref = item["ref"]
-            # delete the old relations cache and update it
-            conn.delete(f"{scope}:{ref},relations:")
-            schema_version = conn.get(f"{scope}:{ref},_schema_version:")
-
-            # If we do not a version it probably means
-            # it's version 1.0
-            if schema_version is None:
-                schema_version = "1.0"
-                # store the schema version of this data
-                conn.set(f"{scope}:{ref},_schema_version:", schema_version)
-            else:
-                schema_version = schema_version.decode("utf-8")
-
-            relations = self.get_related_objects(
-                scope=scope, ref=ref, schema_version=schema_version
-            )
-            for relation in relations:
-                conn.rpush(f"{scope}:{ref},relations:", relation)
+        all indexes, both the relations cache and the
+        reverse index, this is a costly operation
+
+        The following arguments are optional:
+        - batch_size: number of objects per pipeline (default 500)
+        - workers: number of batches processed concurrently (default 4)
+        - progress: callable receiving (done, total)
+        - resume: continue from the last checkpoint if any (default True)
+        """
+        return IndexRebuilder(
+            self,
+            batch_size=kwargs.get("batch_size", 500),
+            workers=kwargs.get("workers", 4),
+            progress=kwargs.get("progress", None),
+            resume=kwargs.get("resume", True),
+        ).run()
 
 
 Persistence.register_plugin("redis", RedisPlugin)
@@ -31,6 +31,7 @@ from movai_core_shared.consts import (
 from dal.scopes.scope import Scope
 from dal.scopes.ports import Ports
 from dal.scopes.node import Node
+from dal.scopes.structures import tracked_write
 from dal.utils.usage_search.usage_types import (
     UsageData,
     UsageSearchResult,
@@ -38,6 +39,8 @@ from dal.utils.usage_search.usage_types import (
     DirectFlowUsageItem,
     IndirectFlowUsageItem,
 )
+from dal.utils.usage_search.usage_index import UsageIndex
+from dal.utils.scope_keys import scope_keys
 from dal.models.var import Var
 from movai_core_shared.exceptions import DoesNotExist
 from .configuration import Configuration
@@ -155,6 +158,13 @@ class Flow(Scope):
         Calculate remaps
         data: {"port_name": { "remap": None, "links": ["link_name",...], "Type": "From" or "To"}}
         """
+        if new_link is not None:
+            # pylint: disable=import-outside-toplevel
+            from dal.models.scopestree import scopes
+
+            # only the ports connected to the new link are solved again
+            return scopes().Flow[self.name].remaps_with(new_link)
+
         if self.__dict__["cache_calc_remaps"] is not None:
             return self.__dict__["cache_calc_remaps"]
 
@@ -162,9 +172,9 @@ class Flow(Scope):
         if self.__dict__["cache_dict"] is None:
             self.__dict__["cache_dict"] = self.get_dict(recursive=True)
         links = self.cache_dict["Flow"][self.name].get("Links", {})
-        # TODO: validate new_link
-        if new_link is not None:
-            links.update(new_link)
+
+        # every link needs the templates of both ends, read them all at once
+        self.prefetch_templates()
 
         for link, value in links.items():  # {"From": "", "To": ""}
             if (
@@ -739,6 +749,50 @@ class Flow(Scope):
             self.cache_ports_templates.update({port_template: ports})
         return ports
 
+    def prefetch_templates(self) -> None:
+        """
+        Load the node templates and the port templates used by the flow and
+        its subflows, one read per scope, into the templates caches
+        """
+        if self.__dict__["cache_dict"] is None:
+            self.__dict__["cache_dict"] = self.get_dict(recursive=True)
+
+        for node_inst, value in self.cache_dict["Flow"][self.name].get("NodeInst", {}).items():
+            if "Template" in value:
+                self.cache_node_insts.setdefault(node_inst, value["Template"])
+
+        node_templates = set(self.cache_node_insts.values())
+        self._prefetch("Node", node_templates, self.cache_node_templates)
+
+        ports_templates = set()
+        for template_name in node_templates:
+            node_template = self.cache_node_templates.get(template_name, {})
+            for port_inst in node_template.get("PortsInst", {}).values():
+                if "Template" in port_inst:
+                    ports_templates.add(port_inst["Template"])
+        self._prefetch("Ports", ports_templates, self.cache_ports_templates)
+
+    def _prefetch(self, scope: str, names: set, cache: dict) -> None:
+        """Read the documents of a scope missing in the cache, one scan and batched reads"""
+        missing = [name for name in names if not cache.get(name)]
+        if not missing:
+            return
+
+        try:
+            # a get of many objects by name does not match any key, scan the scope once
+            keys = scope_keys(scope, self.movaidb)
+            documents = self.movaidb.get_many(
+                [key for name in missing for key in keys.get(name, [])]
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            # documents not loaded are read one at a time when used
+            LOGGER.warning(f"Could not prefetch {scope} templates: {e}")
+            return
+
+        cache.update(
+            {name: value for name, value in documents.get(scope, {}).items() if name in missing}
+        )
+
     # ported - Node.Path
     # node_inst = flow.get_node_inst(<node_inst name>)["ref"]
     # node_template = nodes_inst.node_template()
@@ -930,21 +984,11 @@ class Flow(Scope):
                     }
                 }
         """
-        # Check if this Flow is used as a Container in other Flows
-        flows = self.movaidb.get({"Flow": {"*": {"Container": "*"}}})
-
-        if not flows or flows.get("Flow") is None or len(flows.get("Flow")) == 0:
-            return UsageSearchResult(scope="Flow", name=self.name, usage={})
+        index = UsageIndex(self.movaidb)
+        index.refresh()
 
         # Find direct usages - map flow_name -> list of container instances
-        direct_usages: Dict[str, list] = {}  # flow_name -> [container_name, ...]
-
-        for flow_name, containers in flows.get("Flow").items():
-            for container_name, params in containers.get("Container", {}).items():
-                if params.get("ContainerFlow") == self.name:
-                    if flow_name not in direct_usages:
-                        direct_usages[flow_name] = []
-                    direct_usages[flow_name].append(container_name)
+        direct_usages: Dict[str, list] = index.used_by("Flow", self.name)
 
         # Build result usage
         usage: UsageData = UsageData(flow={})
@@ -960,16 +1004,13 @@ class Flow(Scope):
             )
 
         # Find all indirect usages through the flow hierarchy
-        self._find_all_indirect_usages(
-            all_flows=flows,
-            usage=usage,
-        )
+        self._find_all_indirect_usages(index=index, usage=usage)
 
         return UsageSearchResult(scope="Flow", name=self.name, usage=usage)
 
     def _find_all_indirect_usages(
         self,
-        all_flows: dict,
+        index: UsageIndex,
         usage: UsageData,
     ):
         """Find all indirect usages by traversing the flow hierarchy.
@@ -978,48 +1019,19 @@ class Flow(Scope):
         find parent flows that contain it as a subflow, and add indirect references.
 
         Args:
-            all_flows: Dict of all flows with Container data
+            index: Usage index, already refreshed
             usage: UsageData to populate with indirect usages
         """
-        # Keep processing until no new flows are added
-        processed_flows = set()
-        flows_to_process = list(usage.flow.keys())
-        while flows_to_process:
-            child_flow_name = flows_to_process.pop(0)
-
-            if child_flow_name in processed_flows:
-                continue
-
-            processed_flows.add(child_flow_name)
-
-            # Get all instances (direct and indirect) in this child flow
-            child_flow_data = usage.flow[child_flow_name]
-            num_direct = len(child_flow_data.direct)
-            num_indirect = len(child_flow_data.indirect)
-            total_instances = num_direct + num_indirect
-
-            if total_instances == 0:
-                continue
-
-            # Find all parent flows that contain this child flow
-            for parent_flow, containers in all_flows.get("Flow", {}).items():
-                for container_name, params in containers.get("Container", {}).items():
-                    if params.get("ContainerFlow") == child_flow_name:
-                        # Add indirect reference for this container
-                        if parent_flow not in usage.flow:
-                            # New parent flow - create entry with empty direct array
-                            usage.flow[parent_flow] = FlowFlowUsage(direct=[], indirect=[])
-                            flows_to_process.append(parent_flow)
-
-                        # Add one indirect reference for this container pointing to the child flow
-                        # Only add if not already present (avoid duplicates)
-                        indirect_ref = IndirectFlowUsageItem(
-                            flow_template_name=child_flow_name,
-                            flow_instance_name=container_name,
-                        )
-
-                        if indirect_ref not in usage.flow[parent_flow].indirect:
-                            usage.flow[parent_flow].indirect.append(indirect_ref)
+        for parent_flow, children in index.indirect(list(usage.flow.keys())).items():
+            if parent_flow not in usage.flow:
+                # New parent flow - create entry with empty direct array
+                usage.flow[parent_flow] = FlowFlowUsage(direct=[], indirect=[])
+
+            # one indirect reference for each container pointing to a child flow
+            usage.flow[parent_flow].indirect.extend(
+                IndirectFlowUsageItem(flow_template_name=child, flow_instance_name=container)
+                for child, container in children
+            )
 
     # NOT PORTED
     def delete(self, key: str, name: str):
@@ -1175,7 +1187,6 @@ class Flow(Scope):
         port_name: str,
         join_char: str = None,
         prefix: str = None,
-        flows: dict = None,
     ) -> bool:
         """
         Find all links in all Flows with containers and delete links to the exposed port
@@ -1186,76 +1197,68 @@ class Flow(Scope):
             port_name (str): The unexposed port name.
             join_char (str): '/' when starting from a node instance or '__' when starting from a subflow
             prefix (str): Node instance name when going to upper flows.
-            flows (dict): List of flows with subflows.
 
         Returns:
             bool: True for success, False otherwise.
 
         """
 
-        # get info about flows with containers
-        # Container: {"ContainerFlow": <Flow name>, "ContainerLabel": <container name>}
-        flows_with_containers = flows or self.movaidb.get({"Flow": {"*": {"Container": "*"}}})
-
-        # Loop flows that have subflows
-        for flow_name, flow_containers in flows_with_containers.get("Flow", {}).items():
-            # Loop throught subflows
-            for flow_container in next(iter(flow_containers.values())).values():
-                # check if the subflow is referencing me
-                if flow_container.get("ContainerFlow", "") == self.name:
-                    try:
-                        container_label = flow_container.get("ContainerLabel", "")
-                        _port_prefix = f"{container_label}__{prefix}" if prefix else container_label
+        # the flows using me as a subflow and the containers referencing me
+        index = UsageIndex(self.movaidb)
+        index.refresh()
 
-                        _join_char = join_char or (
-                            "__" if (self.Container.get(node_inst_name, None) or prefix) else "/"
-                        )
+        for flow_name, container_names in index.used_by("Flow", self.name).items():
+            # the flow where the ContainerFlow is
+            flow = Flow(flow_name)
 
-                        # we do not care about the in/out of the port bc port names are unique in the Node
-                        regex = rf"{_port_prefix}__{node_inst_name}{_join_char}{port_name}/.+"
+            for container_name in container_names:
+                try:
+                    container_label = flow.Container[container_name].ContainerLabel or ""
+                    _port_prefix = f"{container_label}__{prefix}" if prefix else container_label
 
-                        # the flow where the ContainerFlow is
-                        flow = Flow(flow_name)
-                        flow_links = {**flow.Links}
+                    _join_char = join_char or (
+                        "__" if (self.Container.get(node_inst_name, None) or prefix) else "/"
+                    )
 
-                        # delete the link associated with the port
-                        for link_id, link in flow_links.items():
-                            _to = link.get("To")
-                            _from = link.get("From")
-                            if re.match(regex, _to) or re.match(regex, _from):
-                                flow.Links.delete(link_id)
+                    # we do not care about the in/out of the port bc port names are unique in the Node
+                    regex = rf"{_port_prefix}__{node_inst_name}{_join_char}{port_name}/.+"
 
-                        # delete the exposed port
-                        flow_exposed_ports = {**flow.ExposedPorts}
+                    flow_links = {**flow.Links}
 
-                        # __<Flow name> is how we identify flows in the exposed ports
-                        if f"__{self.name}" in flow_exposed_ports.keys():
+                    # delete the link associated with the port
+                    for link_id, link in flow_links.items():
+                        _to = link.get("To")
+                        _from = link.get("From")
+                        if re.match(regex, _to) or re.match(regex, _from):
+                            flow.Links.delete(link_id)
 
-                            def format_port(pfx, nnm, pnm):
-                                return f"{pfx}__{nnm}/{pnm}" if pfx else f"{nnm}/{pnm}"
+                    # delete the exposed port
+                    flow_exposed_ports = {**flow.ExposedPorts}
 
-                            # _port_name = port_name
-                            # if _port_name is not "*":
-                            #     _port_name = f"{prefix}__{node_inst_name}/{port_name}" if prefix else f'{node_inst_name}/{port_name}'
-                            _port_name = (
-                                format_port(prefix, node_inst_name, port_name)
-                                if port_name != "*"
-                                else port_name
-                            )
+                    # __<Flow name> is how we identify flows in the exposed ports
+                    if f"__{self.name}" in flow_exposed_ports.keys():
 
-                            flow.delete_exposed_port(f"__{self.name}", _port_name, container_label)
+                        def format_port(pfx, nnm, pnm):
+                            return f"{pfx}__{nnm}/{pnm}" if pfx else f"{nnm}/{pnm}"
 
-                        # check Flows using 'flow' as a subflow
-                        flow.delete_exposed_port_links(
-                            node_inst_name,
-                            port_name,
-                            _join_char,
-                            _port_prefix,
-                            flows_with_containers,
+                        _port_name = (
+                            format_port(prefix, node_inst_name, port_name)
+                            if port_name != "*"
+                            else port_name
                         )
 
-                    except Exception as e:
-                        LOGGER.error(str(e))
+                        flow.delete_exposed_port(f"__{self.name}", _port_name, container_label)
+
+                    # check Flows using 'flow' as a subflow
+                    flow.delete_exposed_port_links(
+                        node_inst_name,
+                        port_name,
+                        _join_char,
+                        _port_prefix,
+                    )
+
+                except Exception as e:
+                    LOGGER.error(str(e))
 
         return True
 
@@ -1328,8 +1331,10 @@ class Flow(Scope):
             if options:
                 new_node.update(options)
 
-            self.movaidb.set(
-                {self.__class__.__name__: {self.name: {org_type: {copy_name: new_node}}}}
+            tracked_write(
+                self.movaidb,
+                "set",
+                {self.__class__.__name__: {self.name: {org_type: {copy_name: new_node}}}},
             )
 
         except Exception as error:
@@ -1346,8 +1351,10 @@ class Flow(Scope):
         - Delete all nodes of type Container with ContainerFlow = flow_id
         """
 
-        for flow_name in Flow.get_all():
+        index = UsageIndex()
+        index.refresh()
+
+        for flow_name, container_names in index.used_by("Flow", flow_id).items():
             flow = Flow(flow_name)
-            for c_name, c_value in flow.Container.items():
-                if c_value.ContainerFlow == flow_id:
-                    flow.delete("Container", c_name)
+            for c_name in container_names:
+                flow.delete("Container", c_name)
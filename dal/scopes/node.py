@@ -10,7 +10,6 @@
     Module that implements a Node scope class
 """
 
-import re
 from movai_core_shared.consts import (
     ROS1_NODELET,
     ROS1_PLUGIN,
@@ -66,7 +65,7 @@ from dal.utils.usage_search.usage_types import (
     DirectNodeUsageItem,
     IndirectNodeUsageItem,
 )
-from dal.helpers.helpers import Helpers
+from dal.utils.usage_search.usage_index import UsageIndex
 from movai_core_shared.logger import Log
 from typing import Dict, Set
 
@@ -442,40 +441,15 @@ class Node(Scope):
         return to_return
 
     def get_port_node_instance_links(self, port_name: str) -> list:
-        full_node_list = self.movaidb.search(
-            {"Flow": {"*": {"NodeInst": {"*": {"Template": self.name}}}}}
-        )
+        """Links of all the Flows to the port of the instances of this Node"""
+        index = UsageIndex(self.movaidb)
+        index.refresh()
 
         node_ref_keys = []
-        for node_key in full_node_list:
-            try:
-                # Get flow_name and node_inst_name
-                node = self.movaidb.keys_to_dict([(node_key, "")])
-                flow_name = next(iter(node.get("Flow").keys()))
-
-                # get Links from Flow(flow_name)
-                flow_links = self.movaidb.get({"Flow": {flow_name: {"Links": "*"}}})
-                node_inst_name = next(iter(node.get("Flow").get(flow_name).get("NodeInst")))
-
-                for key, value in (
-                    flow_links.get("Flow", {}).get(flow_name, {}).get("Links", {}).items()
-                ):
-                    if re.search(
-                        r"^{0}/{1}/.+$".format(node_inst_name, port_name),
-                        value.get("From"),
-                    ):
-                        dict_key = {"Flow": {flow_name: {"Links": {key: value}}}}
-                        node_ref_keys.append(dict_key)
-
-                    if re.search(
-                        r"^{0}/{1}/.+$".format(node_inst_name, port_name),
-                        value.get("To"),
-                    ):
-                        dict_key = {"Flow": {flow_name: {"Links": {key: value}}}}
-                        node_ref_keys.append(dict_key)
-
-            except AttributeError as e:
-                LOGGER.error(str(e))
+        for flow_name, node_inst_names in index.used_by("Node", self.name).items():
+            for node_inst_name in node_inst_names:
+                for key, value in index.links(flow_name, node_inst_name, port_name).items():
+                    node_ref_keys.append({"Flow": {flow_name: {"Links": {key: value}}}})
 
         return node_ref_keys
 
@@ -510,21 +484,11 @@ class Node(Scope):
                     }
                 }
         """
-        # Check if Node has instances on existing Flows
-        flows = self.movaidb.get({"Flow": {"*": {"NodeInst": "*"}}})
-
-        if not flows or flows.get("Flow") is None or len(flows.get("Flow")) == 0:
-            return UsageSearchResult(scope="Node", name=self.name, usage={})
+        index = UsageIndex(self.movaidb)
+        index.refresh()
 
         # Find direct usages - map flow_name -> list of node instances
-        direct_usages: Dict[str, list] = {}  # flow_name -> [node_inst_name, ...]
-
-        for flow_name, node_insts in flows.get("Flow").items():
-            for node_inst_name, params in node_insts.get("NodeInst").items():
-                if params.get("Template") == self.name:
-                    if flow_name not in direct_usages:
-                        direct_usages[flow_name] = []
-                    direct_usages[flow_name].append(node_inst_name)
+        direct_usages: Dict[str, list] = index.used_by("Node", self.name)
 
         # Build result dictionary
         usage: UsageData = UsageData(flow={})
@@ -542,106 +506,50 @@ class Node(Scope):
             return UsageSearchResult(scope="Node", name=self.name, usage=usage)
 
         # Find indirect usages by checking which flows use our direct flows as subflows
-        all_flows = self.movaidb.get({"Flow": {"*": {"Container": "*"}}})
-        if all_flows and all_flows.get("Flow"):
-            # Process each flow that has containers and build indirect references
-            self._find_all_indirect_usages(
-                all_flows=all_flows,
-                usage=usage,
-            )
+        self._find_all_indirect_usages(index=index, usage=usage)
 
         return UsageSearchResult(scope="Node", name=self.name, usage=usage)
 
     def _find_all_indirect_usages(
         self,
-        all_flows: dict,
+        index: UsageIndex,
         usage: UsageData,
     ):
         """Find all indirect usages by traversing the flow hierarchy.
 
-        For each flow in usage_dict (flows that contain the node either directly or indirectly),
+        For each flow in usage (flows that contain the node either directly or indirectly),
         find parent flows that contain it as a subflow, and add indirect references for each
-        instance (direct or indirect) in the child flow.
+        container using the child flow.
 
         Args:
-            all_flows: Dict of all flows with Container data
-            usage_dict: Dictionary to populate with indirect usages
+            index: Usage index, already refreshed
+            usage: UsageData to populate with indirect usages
         """
-        # Keep processing until no new flows are added
-        processed_flows = set()
-        flows_to_process = list(usage.flow.keys())
-
-        while flows_to_process:
-            child_flow_name = flows_to_process.pop(0)
-
-            if child_flow_name in processed_flows:
-                continue
-
-            processed_flows.add(child_flow_name)
-
-            # Get all instances (direct and indirect) in this child flow
-            child_flow_data = usage.flow[child_flow_name]
-            num_direct = len(child_flow_data.direct)
-            num_indirect = len(child_flow_data.indirect)
-            total_instances = num_direct + num_indirect
-
-            if total_instances == 0:
-                continue
-
-            # Find all parent flows that contain this child flow
-            for parent_flow, containers in all_flows.get("Flow", {}).items():
-                for container_name, params in containers.get("Container", {}).items():
-                    if params.get("ContainerFlow") == child_flow_name:
-                        # Add indirect reference for this container
-                        if parent_flow not in usage.flow:
-                            # New parent flow - create entry with empty direct array
-                            usage.flow[parent_flow] = NodeFlowUsage(direct=[], indirect=[])
-                            flows_to_process.append(parent_flow)
-
-                        # Add one indirect reference for this container pointing to the child flow
-                        # Only add if not already present (avoid duplicates)
-                        indirect_ref = IndirectNodeUsageItem(
-                            flow_template_name=child_flow_name,
-                            flow_instance_name=container_name,
-                        )
-
-                        if indirect_ref not in usage.flow[parent_flow].indirect:
-                            usage.flow[parent_flow].indirect.append(indirect_ref)
+        for parent_flow, children in index.indirect(list(usage.flow.keys())).items():
+            if parent_flow not in usage.flow:
+                # New parent flow - create entry with empty direct array
+                usage.flow[parent_flow] = NodeFlowUsage(direct=[], indirect=[])
+
+            # one indirect reference for each container pointing to a child flow
+            usage.flow[parent_flow].indirect.extend(
+                IndirectNodeUsageItem(flow_template_name=child, flow_instance_name=container)
+                for child, container in children
+            )
 
     def port_inst_depends(self, port_name: str) -> list:
         """Loop through NodeInst's Links and return list with matching links dict_keys"""
+        index = UsageIndex(self.movaidb)
+        index.refresh()
 
-        # Loop through Flows with ExposedPorts to check if the port is exposed
-        flow_exposed_ports = self.movaidb.get({"Flow": {"*": {"ExposedPorts": "*"}}})
+        # Flows exposing the port and the Links to it in the Flows using them as subflows
         exposed_ports_ref_keys = []
-        if (
-            not flow_exposed_ports
-            or flow_exposed_ports.get("Flow") is None
-            or len(flow_exposed_ports.get("Flow")) == 0
-        ):
-            return exposed_ports_ref_keys
-        for key, value in flow_exposed_ports.get("Flow").items():
-            exposed_ports = value.get("ExposedPorts").get(self.name, [])
-            if not exposed_ports:
-                continue
-
-            ports = next(iter(exposed_ports.values()))
-
-            for port in ports:
-                re_port = re.search(r"^.+/", port)[0][:-1]
-                if re_port == port_name:
-                    node_inst_name = next(iter(exposed_ports))
-                    dict_key = {"Flow": {key: {"ExposedPorts": {node_inst_name: [port]}}}}
-                    exposed_ports_ref_keys.append(dict_key)
-                    break
-
-        # Loop through Flows with Containers instances and get Links to the port that is exposed
         flow_container_link_keys = []
-        for exposed_port in exposed_ports_ref_keys:
-            for port_hash in Helpers.find_by_key(exposed_port, "ExposedPorts"):
-                node_inst_name = next(iter(port_hash.get("ExposedPorts")))
-                link_keys = self.get_exposed_port_node_instance_links(port_name, node_inst_name)
-                flow_container_link_keys.extend(link_keys)
+        for flow_name, node_inst_name, port in index.exposed(self.name, port_name):
+            dict_key = {"Flow": {flow_name: {"ExposedPorts": {node_inst_name: [port]}}}}
+            exposed_ports_ref_keys.append(dict_key)
+            flow_container_link_keys.extend(
+                self.get_exposed_port_node_instance_links(port_name, node_inst_name, flow_name)
+            )
 
         # Get Links
         node_ref_keys = self.get_port_node_instance_links(port_name)
@@ -655,46 +563,32 @@ class Node(Scope):
 
         return reference_keys
 
-    def get_exposed_port_node_instance_links(self, port_name, exposed_port_node_inst_name):
-        # Loop through Flows with Containers instances and get Links to the port that is exposed
-        flow_container_link_keys = []
-        flows_with_containers = self.movaidb.get({"Flow": {"*": {"Container": "*"}}})
-
-        for flow_name, flows_containers in flows_with_containers.get("Flow").items():
-            for container_node_inst_name in flows_containers.get("Container").keys():
-                # Confirm that the port is from the correct Node
-                container_flow_name = (
-                    flows_containers.get("Container", {})
-                    .get(container_node_inst_name, {})
-                    .get("ContainerFlow", None)
-                )
+    def get_exposed_port_node_instance_links(
+        self, port_name: str, exposed_port_node_inst_name: str, flow_name: str = None
+    ) -> list:
+        """
+        Links to a port exposed by a node instance in the Flows using the Flow of the
+        node instance as a subflow, all the Flows exposing the port when flow_name is None
+        """
+        index = UsageIndex(self.movaidb)
+        index.refresh()
+
+        if flow_name is None:
+            exposed_in = {
+                flow
+                for flow, node_inst_name, _ in index.exposed(self.name, port_name)
+                if node_inst_name == exposed_port_node_inst_name
+            }
+        else:
+            exposed_in = {flow_name}
 
-                exposed_ports = self.movaidb.get_hash(
-                    {"Flow": {container_flow_name: {"ExposedPorts": "*"}}}, search=False
-                )
-                if self.name not in exposed_ports:
-                    continue
-
-                prefix = container_node_inst_name
-                node_inst_name = "{}__{}".format(prefix, exposed_port_node_inst_name)
-
-                flow_links = self.movaidb.get({"Flow": {flow_name: {"Links": "*"}}})
-                for key, value in (
-                    flow_links.get("Flow", {}).get(flow_name, {}).get("Links", {}).items()
-                ):
-                    if re.search(
-                        r"^{0}/{1}/.+$".format(node_inst_name, port_name),
-                        value.get("From"),
-                    ):
-                        dict_key = {"Flow": {flow_name: {"Links": {key: value}}}}
-                        flow_container_link_keys.append(dict_key)
-
-                    if re.search(
-                        r"^{0}/{1}/.+$".format(node_inst_name, port_name),
-                        value.get("To"),
-                    ):
-                        dict_key = {"Flow": {flow_name: {"Links": {key: value}}}}
-                        flow_container_link_keys.append(dict_key)
+        flow_container_link_keys = []
+        for subflow in sorted(exposed_in):
+            for parent, containers in index.used_by("Flow", subflow).items():
+                for container in containers:
+                    node_inst_name = f"{container}__{exposed_port_node_inst_name}"
+                    for key, value in index.links(parent, node_inst_name, port_name).items():
+                        flow_container_link_keys.append({"Flow": {parent: {"Links": {key: value}}}})
 
         return flow_container_link_keys
 
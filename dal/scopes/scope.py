@@ -11,10 +11,10 @@ Attributes:
     SCOPES_TO_VALIDATE: List of scopes that will be validated before writing into redis.
 
 """
-from typing import List
+from typing import Dict, List, Mapping
 from functools import cached_property
 from movai_core_shared.exceptions import DoesNotExist, AlreadyExist
-from .structures import Struct
+from .structures import Struct, tracked_write
 from dal.movaidb import MovaiDB
 from dal.movaidb.db_schema import DBSchema
 
@@ -109,12 +109,12 @@ class Scope(Struct):
 
     def remove(self, force=True):
         """Removes Scope"""
-        result = self.movaidb.unsafe_delete({self.scope: {self.name: "**"}})
+        result = tracked_write(self.movaidb, "unsafe_delete", {self.scope: {self.name: "**"}})
         return result
 
     def remove_partial(self, dict_key):
         """Remove Scope key"""
-        result = self.movaidb.unsafe_delete({self.scope: {self.name: dict_key}})
+        result = tracked_write(self.movaidb, "unsafe_delete", {self.scope: {self.name: dict_key}})
         return result
 
     def get_dict(self):
@@ -180,3 +180,27 @@ class Scope(Struct):
         if scope in SCOPES_TO_VALIDATE:
             cls.get_validator().validate(scope, data)
             cls._validate_content(data)
+
+    @classmethod
+    def validate_format_many(cls, scope, documents: Mapping[str, dict]) -> Dict[str, str]:
+        """Check many documents of this scope at once.
+
+        Returns:
+            The error of each document that is not in a valid format, by name.
+
+        Raises:
+            SchemaTypeNotKnown: If the scope is not known to the validator.
+
+        """
+        if scope not in SCOPES_TO_VALIDATE:
+            return {}
+
+        errors = cls.get_validator().validate_many(scope, documents)
+        for name, data in documents.items():
+            if name in errors:
+                continue
+            try:
+                cls._validate_content(data)
+            except ValueError as e:
+                errors[name] = str(e)
+        return errors
@@ -14,6 +14,47 @@ from movai_core_shared.exceptions import AlreadyExist
 
 from dal.movaidb import MovaiDB
 from dal.helpers.helpers import Helpers
+from dal.utils.generations import SCOPES as STAMPED_SCOPES, bump as bump_generations
+from dal.utils.usage_search.usage_index import mark_written
+
+
+def mark_changed(conn, _input: dict) -> None:
+    """
+    Queue in conn, usually the pipeline of the write, the commands for the
+    objects of the stamped scopes written in _input: the usage index must
+    read them again and they get a new generation stamp
+    """
+    names = []
+    for scope, objects in _input.items():
+        if scope not in STAMPED_SCOPES or not isinstance(objects, dict):
+            continue
+        for name, attributes in objects.items():
+            if not isinstance(attributes, dict) or any("*" in attr for attr in attributes):
+                # the whole object, or attributes matched by a pattern
+                attributes = None
+            mark_written(conn, scope, name, attributes)
+            names.append(f"{scope}:{name}")
+    bump_generations(conn, names)
+
+
+def tracked_write(movaidb: MovaiDB, write: str, _input: dict, *args, **kwargs):
+    """
+    Runs the MovaiDB write method (set, unsafe_delete, rename, hset or hdel)
+    on _input, writes of the stamped scopes are sent in one transaction with
+    the commands of mark_changed
+    """
+    if not any(scope in STAMPED_SCOPES for scope in _input):
+        return getattr(movaidb, write)(_input, *args, **kwargs)
+
+    pipe = movaidb.create_pipe()
+    result = getattr(movaidb, write)(_input, *args, pipe=pipe, **kwargs)
+    if not pipe.command_stack:
+        # nothing to write
+        return result
+    mark_changed(pipe, _input)
+    replies = pipe.execute()
+    # deletes answer the number of deleted entries
+    return replies[0] if write in ("unsafe_delete", "hdel") else result
 
 
 class List(list):
@@ -78,7 +119,9 @@ class Hash(dict):
         super(Hash, self).update(value)
         # struct = copy.deepcopy(self.prev_struct)
         # Helpers already do a deepcopy
-        self.movaidb.hset(Helpers.update_dict(self.prev_struct, {self.name: value}))
+        tracked_write(
+            self.movaidb, "hset", Helpers.update_dict(self.prev_struct, {self.name: value})
+        )
 
     def get(self, var: str, default=None):
         """Gets a hash field and returns it"""
@@ -98,7 +141,9 @@ class Hash(dict):
             raise Exception('Hash has no field with name "%s"' % var)
         # struct = copy.deepcopy(self.prev_struct)
         # Helpers already do a deepcopy
-        self.movaidb.hdel(Helpers.update_dict(self.prev_struct, {self.name: ""}), var)
+        tracked_write(
+            self.movaidb, "hdel", Helpers.update_dict(self.prev_struct, {self.name: ""}), var
+        )
         return result
 
     def delete(self, var: str):
@@ -208,7 +253,9 @@ class Struct:
         if getattr(self, name) is None:
             print("Attribute is not defined")
             return False
-        result = self.movaidb.unsafe_delete(Helpers.join_first({name: "*"}, self.prev_struct))
+        result = tracked_write(
+            self.movaidb, "unsafe_delete", Helpers.join_first({name: "*"}, self.prev_struct)
+        )
         if name in self.lists:  # do some cleaver delete
             self.__dict__[name] = List(name, [], self.db, self.prev_struct)
         elif name in self.hashs:
@@ -225,7 +272,9 @@ class Struct:
                 if name == "Value" and "TTL" in self.attrs
                 else None
             )
-            self.movaidb.set(Helpers.join_first({name: value}, self.prev_struct), ex=TTL)
+            tracked_write(
+                self.movaidb, "set", Helpers.join_first({name: value}, self.prev_struct), ex=TTL
+            )
         elif name in self.lists:
             raise AttributeError(f"'{name}' is a list not an attribute")
         elif name in self.hashs:
@@ -238,7 +287,8 @@ class Struct:
         args[key] = name
         result = 0
         for scope_name in self.prev_struct:
-            result = self.movaidb.delete_by_args(scope_name, **args)
+            search_dict = self.movaidb.get_search_dict(scope_name, **args)
+            result = tracked_write(self.movaidb, "unsafe_delete", search_dict)
 
         if key in self.__dict__ and name in self.__dict__[key]:
             del self.__dict__[key][name]
@@ -280,7 +330,7 @@ class Struct:
         old_struct = Helpers.join_first(part2, part1_old)
         new_struct = Helpers.join_first(part2, part1_new)
 
-        MovaiDB().rename(old_struct, new_struct)
+        tracked_write(MovaiDB(), "rename", old_struct, new_struct)
         return True
 
     def get_dict(self):
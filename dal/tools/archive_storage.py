@@ -0,0 +1,146 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Tool to manage the storage of the filesystem (archive) workspaces
+   - migrate: convert versions stored as data.json into content addressed manifests
+   - benchmark: compare disk usage and write time of both layouts
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from dal.plugins.persistence.filesystem.blobs import BlobStore, DATA_FILE
+
+
+def folder_size(path: str) -> int:
+    """Disk usage of a folder, in bytes"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def migrate(root: str, workspace: str, verbose: bool = False) -> dict:
+    """
+    Convert all versions of a workspace to the content addressed layout
+    """
+    workspace_path = os.path.join(root, workspace)
+    if not os.path.isdir(workspace_path):
+        raise FileNotFoundError(workspace_path)
+
+    size_before = folder_size(workspace_path)
+    store = BlobStore(workspace_path)
+    migrated = skipped = 0
+
+    # <ROOT_PATH>/<workspace>/<scope>/<ref>/<version folder>
+    for folder in glob.glob(os.path.join(workspace_path, "*", "*", "*")):
+        if not os.path.isdir(folder):
+            continue
+
+        if store.migrate(folder):
+            migrated += 1
+            if verbose:
+                print(f"migrated {os.path.relpath(folder, workspace_path)}")
+        else:
+            skipped += 1
+
+    # new versions of the workspace are now written as manifests
+    store.mark_migrated()
+
+    return {
+        "workspace": workspace,
+        "migrated": migrated,
+        "skipped": skipped,
+        "size_before": size_before,
+        "size_after": folder_size(workspace_path),
+    }
+
+
+def synthetic_versions(versions: int, attributes: int, attribute_size: int):
+    """
+    Generate the versions of a document, each version changes a single attribute
+    """
+    obj = {
+        f"Attribute{idx}": {"Value": "x" * attribute_size, "Index": idx}
+        for idx in range(attributes)
+    }
+    for version in range(versions):
+        obj = dict(obj)
+        changed = f"Attribute{version % attributes}"
+        obj[changed] = {"Value": uuid.uuid4().hex * (attribute_size // 32 + 1), "Index": version}
+        yield f"v{version}", obj
+
+
+def benchmark(versions: int, attributes: int, attribute_size: int) -> dict:
+    """
+    Write the same versions using both layouts and compare them
+    """
+    report = {"versions": versions, "attributes": attributes, "attribute_size": attribute_size}
+
+    for layout in ("data", "content_addressed"):
+        workspace_path = tempfile.mkdtemp(prefix=f"archive-{layout}-")
+        store = BlobStore(workspace_path)
+        basepath = os.path.join(workspace_path, "Flow", "benchmark")
+
+        start = time.perf_counter()
+        for tag, obj in synthetic_versions(versions, attributes, attribute_size):
+            folder = os.path.join(basepath, f"{tag}-{time.time()}-{uuid.uuid4()}")
+            os.makedirs(folder)
+            if layout == "data":
+                with open(os.path.join(folder, DATA_FILE), "w") as fp:
+                    json.dump({"schema_version": "1.0", "Flow": {"benchmark": obj}}, fp)
+            else:
+                store.write_manifest(folder, "1.0", "Flow", "benchmark", obj)
+        elapsed = time.perf_counter() - start
+
+        report[layout] = {"write_seconds": elapsed, "disk_bytes": folder_size(workspace_path)}
+        shutil.rmtree(workspace_path)
+
+    report["disk_ratio"] = report["content_addressed"]["disk_bytes"] / max(
+        1, report["data"]["disk_bytes"]
+    )
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage the storage of Mov.AI archive workspaces")
+    action_subparser = parser.add_subparsers(dest="action")
+
+    sub_parser = action_subparser.add_parser("migrate", help="Convert a workspace to manifests")
+    sub_parser.add_argument("workspace", help="Workspace to migrate")
+    sub_parser.add_argument(
+        "-r",
+        "--root",
+        help="Archive root folder",
+        default=os.path.join(os.getenv("MOVAI_USERSPACE", ""), "database"),
+    )
+    sub_parser.add_argument("-v", "--verbose", action="store_true", help="Print each version")
+
+    sub_parser = action_subparser.add_parser("benchmark", help="Compare both storage layouts")
+    sub_parser.add_argument("--versions", type=int, default=200)
+    sub_parser.add_argument("--attributes", type=int, default=20)
+    sub_parser.add_argument("--attribute-size", type=int, default=2048)
+
+    args = parser.parse_args()
+
+    if args.action == "migrate":
+        print(json.dumps(migrate(args.root, args.workspace, args.verbose), indent=4))
+    elif args.action == "benchmark":
+        print(json.dumps(benchmark(args.versions, args.attributes, args.attribute_size), indent=4))
+    else:
+        parser.print_help()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,20 +11,33 @@
 import argparse
 import datetime
 import hashlib
+import io
 import json
 import os
 import pickle
 import re
 import sys
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from importlib import import_module
 import warnings
 from abc import ABC, abstractmethod
-from typing import Iterator, List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Union
 import xml.etree.ElementTree as ET
 
 from dal.movaidb import MovaiDB
 from dal.scopes.package import Package
+from dal.scopes.structures import mark_changed
+from dal.tools.import_hashes import NEW, CHANGED, UNCHANGED, ImportHashes
+from dal.utils.generations import bump as bump_generations
+from dal.utils.scope_keys import scope_keys, scopes_keys
+from dal.utils.usage_search.usage_index import mark_dirty
+from dal.validation.project_snapshot import read_documents
 
 from movai_core_shared.logger import Log
 
@@ -64,6 +77,125 @@ _re_config = re.compile(r"^\$\(\s*config\s+([${}a-zA-Z0-9_]+)\.?.*\)$")
 _re_envvar = re.compile(r"\$\{?(.+?)\}?$")
 _re_place_holder = re.compile(r"(/)?place_holder(?(1)(/|$)|)")
 
+# threads reading and validating the objects to import, 1 imports one object at a time
+IMPORT_WORKERS = int(os.getenv("MOVAI_IMPORT_WORKERS", "4"))
+# threads serializing the objects to export, 1 exports one object at a time
+EXPORT_WORKERS = int(os.getenv("MOVAI_EXPORT_WORKERS", "4"))
+# keys unlinked by each command of the remover
+REMOVE_BATCH_SIZE = int(os.getenv("MOVAI_REMOVE_BATCH_SIZE", "1000"))
+
+
+def _config_name(value) -> Optional[str]:
+    """Name of the configuration referenced by a parameter value, if any"""
+    if not isinstance(value, str):
+        return None
+    m = _re_config.match(value)
+    if m is None:
+        return None
+    conf = m.group(1)
+    m = _re_envvar.match(conf)
+    if m:
+        # TODO getting from envvars will probably be replaced
+        # by looking in the robot config
+        conf_name = os.getenv(m.group(1), None)
+        if conf_name is None:
+            # error, print always
+            print(f"Could not find value for {m.group(1)}")
+        return conf_name
+    return conf
+
+
+def _callbacks(names) -> List[Tuple[str, str]]:
+    return [("Callback", name) for name in names if name and _re_place_holder.search(name) is None]
+
+
+def _dependencies(scope: str, content: dict) -> List[Tuple[str, str]]:
+    """(scope, name) of the objects imported with an object, as the import_<scope> functions do"""
+    dependencies = []
+    if scope == "Flow":
+        for node_inst in content.get("NodeInst", {}).values():
+            if node_inst.get("Template"):
+                dependencies.append(("Node", node_inst["Template"]))
+        for container in content.get("Container", {}).values():
+            if container.get("ContainerFlow"):
+                dependencies.append(("Flow", container["ContainerFlow"]))
+    elif scope == "Node":
+        for ports_inst in content.get("PortsInst", {}).values():
+            _in = ports_inst.get("In", {})
+            for iport in _in:
+                dependencies.extend(_callbacks([_in[iport].get("Callback")]))
+                if ports_inst.get("Template") == "MovAI/StateMachine":
+                    state_machine = _in[iport].get("Parameter", {}).get("StateMachine")
+                    if state_machine:
+                        dependencies.append(("StateMachine", state_machine))
+        for param in content.get("Parameter", {}).values():
+            conf_name = _config_name(param.get("Value", None))
+            if conf_name is not None:
+                dependencies.append(("Configuration", conf_name))
+    elif scope == "TaskTemplate":
+        dependencies.extend(("SharedDataTemplate", name) for name in content.get("SharedData", {}))
+        dependencies.extend(
+            _callbacks(
+                [
+                    content.get("ScoringFunction"),
+                    content.get("GenericScoringFunction"),
+                    content.get("TaskFilter"),
+                ]
+            )
+        )
+    elif scope == "SharedDataEntry":
+        if content.get("TemplateID"):
+            dependencies.append(("SharedDataTemplate", content["TemplateID"]))
+    elif scope == "StateMachine":
+        dependencies.extend(
+            _callbacks(state.get("Callback") for state in content.get("State", {}).values())
+        )
+    elif scope == "Ports":
+        if "Package" in content.get("Data", {}):
+            dependencies.append(("Message", content["Data"]["Package"]))
+    elif scope == "GraphicScene":
+        for assets in content.get("AssetType", {}).values():
+            for asset in assets.values():
+                dependencies.extend(("Annotation", name) for name in asset.get("Annotation", {}))
+    return dependencies
+
+
+# scopes of the objects that depend on others
+DEPENDENT_SCOPES = (
+    "Flow",
+    "Node",
+    "TaskTemplate",
+    "SharedDataEntry",
+    "StateMachine",
+    "Ports",
+    "GraphicScene",
+)
+
+
+def _export_dependencies(scope: str, content: dict) -> List[Tuple[str, str]]:
+    """(scope, name) of the objects exported with an object, as the export_<scope> functions do"""
+    if scope != "GraphicScene":
+        return _dependencies(scope, content)
+
+    dependencies = [("Package", name) for name in ("maps", "meshes", "point_clouds")]
+    for asset_type in content.get("AssetType", {}).values():
+        for asset in asset_type.get("AssetName", {}).values():
+            dependencies.extend(("Annotation", name) for name in asset.get("Annotation", {}))
+    return dependencies
+
+
+@dataclass
+class ImportItem:
+    """An object to import, read from the project"""
+
+    scope: str
+    name: str
+    data: dict
+    path: str
+    tracked_names: Optional[List[str]] = None
+    dependencies: List[Tuple[str, str]] = field(default_factory=list)
+    level: int = 0
+
 
 class BackupException(Exception):
     pass
@@ -160,6 +292,15 @@ class ProjectSource(ABC):
     def display_path(self, relative_path: str) -> str:
         """Return a human-readable path for logs and imported InstallPath."""
 
+    def close(self) -> None:
+        """Release the resources of the source."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class FilesystemProjectSource(ProjectSource):
     """Filesystem-backed project source."""
@@ -288,6 +429,282 @@ class InMemoryProjectSource(ProjectSource):
         return self.normalize_path(relative_path)
 
 
+class ArchiveProjectSource(ProjectSource):
+    """Zip or tar archive project source, read without extracting it.
+
+    The members are indexed once, from the zip central directory or the tar
+    headers, and each member is only decompressed when read. Members are
+    read concurrently from zips and plain tars, compressed tars are read one
+    member at a time.
+
+    Args:
+        path (str): Path of the archive.
+        root (str): Folder of the archive with the project, by default the
+            archive root or the folder with the scopes when the archive wraps
+            them in a single folder or a metadata folder.
+
+    """
+
+    def __init__(self, path: str, root: Optional[str] = None):
+        self.path = os.path.abspath(path)
+        self._zip = None
+        self._tar = None
+        # plain tars are read at the member offsets, with a file per thread
+        self._plain = False
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+        if zipfile.is_zipfile(self.path):
+            self._zip = zipfile.ZipFile(self.path)
+            members = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        elif tarfile.is_tarfile(self.path):
+            try:
+                self._tar = tarfile.open(self.path, "r:")
+                self._plain = True
+            except tarfile.ReadError:
+                self._tar = tarfile.open(self.path, "r:*")
+            members = {info.name: info for info in self._tar.getmembers() if info.isfile()}
+        else:
+            raise ValueError(f"not a zip or tar archive: {path}")
+
+        members = {self.normalize_path(name): info for name, info in members.items()}
+        self.root = self._find_root(members) if root is None else self.normalize_path(root)
+        prefix = f"{self.root}/" if self.root else ""
+
+        # paths relative to the root
+        self._members = {
+            name[len(prefix) :]: info for name, info in members.items() if name.startswith(prefix)
+        }
+        self._children: Dict[str, set] = {"": set()}
+        for name in self._members:
+            parent, _, child = name.rpartition("/")
+            while True:
+                self._children.setdefault(parent, set()).add(child)
+                if not parent:
+                    break
+                parent, _, child = parent.rpartition("/")
+
+    @staticmethod
+    def _find_root(members: dict) -> str:
+        """Folder with the scopes, descending single folders and metadata folders."""
+        root = ""
+        while True:
+            prefix = f"{root}/" if root else ""
+            children = {
+                name[len(prefix) :].split("/", 1)[0]
+                for name in members
+                if name.startswith(prefix) and "/" in name[len(prefix) :]
+            }
+            if children.intersection(Backup.SCOPES):
+                return root
+            if "metadata" in children:
+                child = "metadata"
+            elif len(children) == 1 and not any(
+                "/" not in name[len(prefix) :] for name in members if name.startswith(prefix)
+            ):
+                child = next(iter(children))
+            else:
+                return root
+            root = ProjectSource.join(root, child)
+
+    def _member(self, relative_path: str):
+        normalized = self.normalize_path(relative_path)
+        if normalized not in self._members:
+            raise FileNotFoundError(f"File not found: {relative_path}")
+        return self._members[normalized]
+
+    def list_dir(self, relative_dir: str) -> List[str]:
+        normalized = self.normalize_path(relative_dir)
+        if normalized not in self._children:
+            raise FileNotFoundError(f"Directory not found: {relative_dir}")
+        return sorted(self._children[normalized])
+
+    def is_file(self, relative_path: str) -> bool:
+        return self.normalize_path(relative_path) in self._members
+
+    def is_dir(self, relative_path: str) -> bool:
+        return self.normalize_path(relative_path) in self._children
+
+    def read_text(self, relative_path: str) -> str:
+        return self.read_bytes(relative_path).decode("utf-8")
+
+    def read_bytes(self, relative_path: str) -> bytes:
+        info = self._member(relative_path)
+
+        if self._zip is not None:
+            # zipfile serializes the reads of the shared file, not the decompression
+            with self._zip.open(info) as file:
+                return file.read()
+
+        if self._plain:
+            handle = getattr(self._local, "handle", None)
+            if handle is None:
+                handle = self._local.handle = open(self.path, "rb")
+                with self._lock:
+                    self._handles.append(handle)
+            handle.seek(info.offset_data)
+            return handle.read(info.size)
+
+        with self._lock:
+            return self._tar.extractfile(info).read()
+
+    def walk(self, relative_dir: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        stack = [self.normalize_path(relative_dir)]
+        while stack:
+            current = stack.pop(0)
+            if current not in self._children:
+                continue
+            dirs = []
+            files = []
+            for child in sorted(self._children[current]):
+                path = ProjectSource.join(current, child)
+                (dirs if path in self._children else files).append(child)
+            yield current, dirs, files
+            stack.extend(ProjectSource.join(current, child) for child in dirs)
+
+    def display_path(self, relative_path: str) -> str:
+        return "/".join(
+            part for part in (self.path, self.root, self.normalize_path(relative_path)) if part
+        )
+
+    def close(self):
+        """Close the archive and the files opened by the reading threads."""
+        with self._lock:
+            for handle in self._handles:
+                handle.close()
+            self._handles = []
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+
+
+class ProjectTarget(ABC):
+    """Destination of an export, written by project-relative POSIX paths.
+
+    The files have the same layout in every target, an archive has the
+    files of the project folder at its root.
+    """
+
+    @abstractmethod
+    def write(self, relative_path: str, data: Union[str, bytes]) -> None:
+        """Write a file, text is encoded as UTF-8."""
+
+    def read_text(self, relative_path: str) -> Optional[str]:
+        """Text of a file that existed before the export, None if there is none."""
+        return None
+
+    def close(self) -> None:
+        """Finish writing the target."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FilesystemProjectTarget(ProjectTarget):
+    """Project folder on disk, existing files are replaced if override allows it."""
+
+    def __init__(self, root: str, override: Optional[Callable[[str], bool]] = None):
+        self.root = os.path.abspath(root)
+        self.override = override
+
+    def write(self, relative_path: str, data: Union[str, bytes]) -> None:
+        path = os.path.join(self.root, ProjectSource.normalize_path(relative_path))
+        if self.override is not None and not self.override(path):
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, bytes):
+            with open(path, "wb+") as file:
+                file.write(data)
+        else:
+            with open(path, "w+") as file:
+                file.write(data)
+
+    def read_text(self, relative_path: str) -> Optional[str]:
+        path = os.path.join(self.root, ProjectSource.normalize_path(relative_path))
+        if not os.path.isfile(path):
+            return None
+        with open(path) as file:
+            return file.read()
+
+
+class ZipProjectTarget(ProjectTarget):
+    """Zip archive, written to a path or a file object."""
+
+    def __init__(self, file):
+        self._zip = zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, relative_path: str, data: Union[str, bytes]) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._zip.writestr(ProjectSource.normalize_path(relative_path), data)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class TarProjectTarget(ProjectTarget):
+    """Tar archive, written to a path or streamed to a file object."""
+
+    def __init__(self, file, mode: str = "w"):
+        if isinstance(file, (str, os.PathLike)):
+            self._tar = tarfile.open(file, mode)
+        else:
+            self._tar = tarfile.open(fileobj=file, mode=mode)
+        self._mtime = time.time()
+
+    def write(self, relative_path: str, data: Union[str, bytes]) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        info = tarfile.TarInfo(ProjectSource.normalize_path(relative_path))
+        info.size = len(data)
+        info.mtime = self._mtime
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+# project path that streams a tar archive to stdout
+STDOUT_PROJECT = "-"
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+def is_archive(path: str) -> bool:
+    """Whether a project path is an archive instead of a folder."""
+    return str(path).lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def open_project_source(path: str) -> ProjectSource:
+    """Source of an import from a folder or a zip or tar archive."""
+    if is_archive(path) and os.path.isfile(path):
+        return ArchiveProjectSource(path)
+    return FilesystemProjectSource(path)
+
+
+def open_project_target(
+    path: str, override: Optional[Callable[[str], bool]] = None
+) -> ProjectTarget:
+    """Target of an export to a folder, a zip or tar archive, or to stdout with '-'."""
+    lower = str(path).lower()
+    if path == STDOUT_PROJECT:
+        return TarProjectTarget(sys.stdout.buffer, "w|")
+    if lower.endswith(".zip"):
+        return ZipProjectTarget(path)
+    if lower.endswith((".tar.gz", ".tgz")):
+        return TarProjectTarget(path, "w:gz")
+    if lower.endswith(".tar"):
+        return TarProjectTarget(path, "w")
+    return FilesystemProjectTarget(path, override)
+
+
 class Backup:
     """Base class for Importer and Exporter."""
 
@@ -410,13 +827,18 @@ class Importer(Backup):
         force: bool = False,
         dry: bool = False,
         clean_old_data: bool = False,
+        workers: int = IMPORT_WORKERS,
+        incremental: bool = True,
+        verify: bool = False,
         **kwargs,
     ):
         super().__init__(project, **kwargs)
 
         self.project = project
         self.project_path = os.path.abspath(project) if project else ""
-        self.source = source or FilesystemProjectSource(self.project_path)
+        # the importer closes the sources it opens
+        self._owned_source = source is None
+        self.source = source or open_project_source(self.project_path)
         self.import_container = workspace or self._extract_import_container()
         self.import_package_version = package_version or "N/A"
 
@@ -424,11 +846,20 @@ class Importer(Backup):
         self.dry_run = dry
         self.validate = not force
         self._delete = clean_old_data
+        self.workers = workers
+        # skip the objects that did not change since they were imported
+        self.incremental = incremental
+        # compare the unchanged objects with the database too
+        self.verify = verify
 
         if not self.source.is_dir(""):
             raise ImportException("Project path does not exist")
 
         self._imported = {}
+        # names written or skipped, per state
+        self._changes = {NEW: [], CHANGED: [], UNCHANGED: []}
+        # objects read while planning a parallel import, per thread
+        self._recording = threading.local()
 
         if self.dry_run:
             # override import_data to not import data
@@ -436,8 +867,20 @@ class Importer(Backup):
             self.dry_print = lambda *paths: [print(path) for path in paths]
         else:
             self._db = MovaiDB()
+            self._hashes = ImportHashes(self._db)
             self.dry_print = lambda *paths: None
 
+    def close(self):
+        """Close the project source, when it was opened by the importer."""
+        if self._owned_source:
+            self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     @staticmethod
     def _extract_import_container() -> str:
         """
@@ -467,7 +910,13 @@ class Importer(Backup):
         return [None]
 
     def run(self, objects: dict = {}):
-        """Imports the objects defined in the manifest."""
+        """Imports the objects defined in the manifest.
+
+        With more than one worker the objects are read and validated by a
+        pool of threads before anything is written, then written level by
+        level, each object after the objects it depends on.
+
+        """
 
         def should_import(scope):
             if len(objects) == 0:
@@ -479,36 +928,250 @@ class Importer(Backup):
                 return None
             return None if None in objects[scope] else objects[scope]
 
-        for scope_name in Backup.SCOPES:
-            if not should_import(scope_name):
-                continue
+        requests = [
+            (scope_name, get_objects(scope_name))
+            for scope_name in Backup.SCOPES
+            if should_import(scope_name)
+        ]
 
-            try:
-                importer = self.__getattribute__(f"import_{scope_name.lower()}")
+        if self.dry_run or self.workers <= 1:
+            for scope_name, object_names in requests:
+                self._import_scope(scope_name, object_names)
+            return
 
-                def args(scope, names):
-                    return (names,)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            items = self._plan(requests, executor)
+            levels = self._levels(items)
+            valid = self._validate_items([item for level in levels for item in level], executor)
+            for level in levels:
+                items = [item for item in level if id(item) in valid]
+                if items:
+                    self._commit(items)
+
+    def _import_scope(self, scope, names):
+        """Imports the given names of a scope, all of them if names is None."""
+        try:
+            importer = self.__getattribute__(f"import_{scope.lower()}")
 
-            except AttributeError:
-                importer = self.import_default
+            def args(scope, names):
+                return (names,)
+
+        except AttributeError:
+            importer = self.import_default
+
+            def args(scope, names):
+                return (scope, names)
+
+        importer(*args(scope, names))
+
+    def _record_data(self, scope, name, data, path, tracked_names=None):
+        """Keeps the data read by an import function, instead of importing it."""
+        LOGGER.debug(f"Reading {scope}:{name} from {self.source.display_path(path)}")
+        data[scope][name]["InstallPath"] = self.source.display_path(path)
+        self._recording.items.append(ImportItem(scope, name, data, path, tracked_names))
 
-                def args(scope, names):
-                    return (scope, names)
+    def _read_objects(self, request) -> List[ImportItem]:
+        """Reads the objects of a (scope, names) request."""
+        self._recording.items = []
+        try:
+            self._import_scope(*request)
+            return self._recording.items
+        finally:
+            del self._recording.items
+
+    def _plan(self, requests, executor) -> Dict[Tuple[str, str], ImportItem]:
+        """Reads the objects requested and the objects they depend on.
+
+        Objects are read by the import functions, a level of dependencies
+        at a time, the dependencies are followed here instead of by them.
+
+        """
+        recursive = self.recursive
+        pending = []
+        for scope, names in requests:
+            if names is None and scope not in ("Package", "Ports"):
+                names = [name for name, _ in self.get_files(scope, None)]
+            if names is None:
+                pending.append((scope, None))
+            else:
+                pending.extend((scope, [name]) for name in names)
+
+        items = {}
+        requested = set()
+        self.recursive = False
+        self._import_data = self._record_data
+        try:
+            while pending:
+                batch, pending = pending, []
+                for loaded in executor.map(self._read_objects, batch):
+                    for item in loaded:
+                        key = (item.scope, item.name)
+                        if key in items:
+                            continue
+                        items[key] = item
+                        # ports always import their messages
+                        if recursive or item.scope == "Ports":
+                            item.dependencies = _dependencies(
+                                item.scope, item.data[item.scope][item.name]
+                            )
+                        for dependency in item.dependencies:
+                            if dependency not in items and dependency not in requested:
+                                requested.add(dependency)
+                                pending.append((dependency[0], [dependency[1]]))
+        finally:
+            self.recursive = recursive
+            del self._import_data
+
+        return items
+
+    @staticmethod
+    def _levels(items: Dict[Tuple[str, str], ImportItem]) -> List[List[ImportItem]]:
+        """Groups the items in levels, each item after the items it depends on."""
+
+        def level(key, visiting):
+            item = items[key]
+            if key in done or key in visiting:
+                # cycles are broken where they are found
+                return item.level
+            visiting.add(key)
+            for dependency in item.dependencies:
+                if dependency in items:
+                    item.level = max(item.level, level(dependency, visiting) + 1)
+            visiting.discard(key)
+            done.add(key)
+            return item.level
+
+        done = set()
+        levels = {}
+        for key, item in items.items():
+            levels.setdefault(level(key, set()), []).append(item)
+        return [levels[index] for index in sorted(levels)]
+
+    def _validate_items(self, items: List[ImportItem], executor) -> set:
+        """Validates the items, returns the ids of the valid ones.
+
+        Errors are reported in the order the items are imported, when
+        validating the import stops at the first one.
+
+        """
+        documents = {}
+        for item in items:
+            documents.setdefault(item.scope, {})[item.name] = item.data[item.scope][item.name]
+
+        def validate(scope):
+            return Factory.get_class(scope).validate_format_many(scope, documents[scope])
+
+        errors = dict(zip(documents, executor.map(validate, documents)))
+
+        invalid = [item for item in items if item.name in errors[item.scope]]
+        for item in invalid:
+            _msg = f"Failed to import {item.scope}:{item.name} - {errors[item.scope][item.name]}"
+            if self.validate:
+                self.log(_msg)
+            else:
+                # force print
+                print(_msg)
+        if invalid and self.validate:
+            raise ImportException(errors[invalid[0].scope][invalid[0].name])
+
+        return {id(item) for item in items} - {id(item) for item in invalid}
 
-            object_names = get_objects(scope_name)
-            importer(*args(scope_name, object_names))
+    def _commit(self, items: List[ImportItem]):
+        """Writes the items, and deletes their old keys, in one transaction."""
+        for item in items:
+            if self._delete and item.scope not in self.SKIP_SCOPE_DELETE:
+                self._remove_unwanted_keys(item.scope, item.name, item.data)
+
+        changes = self._hashes.changes(
+            [(item.scope, item.name, item.data) for item in items], verify=self.verify
+        )
+        skipped = []
+        written = []
+        for item, (state, digest) in zip(items, changes):
+            if state == UNCHANGED and self.incremental:
+                skipped.append(item)
+            else:
+                written.append((item, state, digest))
+
+        # the old keys of an object are deleted in the same transaction that
+        # writes it, an object that cannot be written is not deleted
+        pipe = self._db.create_pipe()
+        commands = []
+        for item, state, digest in written:
+            start = len(pipe.command_stack)
+            # attributes left out of the data are deleted as well
+            changed = item.data
+            if self._delete and item.scope not in self.SKIP_SCOPE_DELETE:
+                try:
+                    search_dict = self._db.get_search_dict(item.scope, Name=item.name)
+                    self._db.unsafe_delete(search_dict, pipe=pipe)
+                    changed = {item.scope: {item.name: "*"}}
+                except Exception:
+                    del pipe.command_stack[start:]
+            try:
+                self._db.set(item.data, pipe=pipe)
+                self._hashes.set(item.scope, item.name, digest, pipe=pipe)
+                mark_changed(pipe, changed)
+                failed = False
+            except Exception:
+                del pipe.command_stack[start:]
+                failed = True
+            commands.append((item, state, start, len(pipe.command_stack), failed))
+        results = pipe.execute(raise_on_error=False) if commands else []
+
+        done = [(item, UNCHANGED) for item in skipped]
+        failures = []
+        for item, state, start, end, failed in commands:
+            if failed or any(isinstance(result, Exception) for result in results[start:end]):
+                failures.append(item)
+                continue
+            done.append((item, state))
+
+        tracked = {}
+        for item, state in done:
+            self.set_imported(item.scope, item.name, state)
+            names = item.tracked_names if isinstance(item.tracked_names, list) else [item.name]
+            tracked.setdefault(item.scope, []).extend(names)
+
+        # Update package data structure for duplicate detection
+        for scope, names in tracked.items():
+            self._update_package_tracking(scope, names[0], tracked_names=names)
+
+        for item in failures:
+            # the hash may have been stored without the object
+            self._hashes.remove(item.scope, item.name)
+            _msg = f"Failed to import '{item.scope}:{item.name}'"
+            if self.validate:
+                self.log(_msg)
+                raise ImportException(_msg)
+            # force print
+            print(_msg)
 
     def imported(self, scope, name) -> bool:
         """Wrapper to check if a scope:name pair is already imported."""
         return scope in self._imported and name in self._imported[scope]
 
-    def set_imported(self, scope, name):
-        """Wrapper to set a scope:name pair as imported."""
+    def set_imported(self, scope, name, state: Optional[str] = None):
+        """Wrapper to set a scope:name pair as imported.
+
+        Args:
+            state (str): new, changed or unchanged, when the object was compared.
+
+        """
         if scope not in self._imported:
             self._imported[scope] = []
         if name not in self._imported[scope]:
-            self.log(f"Imported {scope}:{name}")
+            if state == UNCHANGED:
+                self.log(f"Skipped {scope}:{name}, unchanged")
+            else:
+                self.log(f"Imported {scope}:{name}")
             self._imported[scope].append(name)
+            if state is not None:
+                self._changes[state].append(f"{scope}:{name}")
+
+    def summary(self) -> Dict[str, int]:
+        """Number of new, changed and unchanged objects imported."""
+        return {state: len(names) for state, names in self._changes.items()}
 
     def _extract_package_version(self, package_path: Path) -> str:
         """
@@ -558,8 +1221,11 @@ class Importer(Backup):
             # Typical MOV.AI structure: project/pkg_name/metadata/Scope/object.json
             path = Path(self.project_path)
 
+            if isinstance(self.source, ArchiveProjectSource):
+                # the archive is the package
+                package_name = re.sub(r"\.(zip|tar|tar\.gz|tgz)$", "", path.name, flags=re.I)
             # If package version was not provided by caller, infer it from package.xml.
-            if package_version in ("", "N/A"):
+            elif package_version in ("", "N/A"):
                 # Check if the current path ends with "metadata"
                 if path.name == "metadata":
                     # Parent directory is the package
@@ -700,15 +1366,15 @@ class Importer(Backup):
 
         # remove unwanted keys
         if self._delete and scope not in self.SKIP_SCOPE_DELETE:
-            try:
-                del data[scope][name]["_schema_version"]
-            except KeyError:
-                pass
-            try:
-                del data[scope][name]["relations"]
-            except KeyError:
-                pass
-            # delete
+            self._remove_unwanted_keys(scope, name, data)
+
+        [(state, digest)] = self._hashes.changes([(scope, name, data)], verify=self.verify)
+        if state == UNCHANGED and self.incremental:
+            self.set_imported(scope, name, state)
+            self._update_package_tracking(scope, name, tracked_names=tracked_names)
+            return
+
+        if self._delete and scope not in self.SKIP_SCOPE_DELETE:
             try:
                 obj = Factory.get_class(scope)(name)
                 self._db.delete_by_args(scope, Name=obj.name)
@@ -716,11 +1382,16 @@ class Importer(Backup):
                 pass
 
         try:
-            self._db.set(data)
-            self.set_imported(scope, name)
+            pipe = self._db.create_pipe()
+            self._db.set(data, pipe=pipe)
+            mark_changed(pipe, {scope: {name: "*"}})
+            pipe.execute()
+            self._hashes.set(scope, name, digest)
+            self.set_imported(scope, name, state)
             # Update package data structure for duplicate detection
             self._update_package_tracking(scope, name, tracked_names=tracked_names)
         except Exception:
+            self._hashes.remove(scope, name)
             _msg = f"Failed to import '{scope}:{name}'"
             if self.validate:
                 self.log(_msg)
@@ -729,6 +1400,18 @@ class Importer(Backup):
                 # force print
                 print(_msg)
 
+    @staticmethod
+    def _remove_unwanted_keys(scope, name, data):
+        """Removes the keys that are not imported when cleaning old data."""
+        try:
+            del data[scope][name]["_schema_version"]
+        except KeyError:
+            pass
+        try:
+            del data[scope][name]["relations"]
+        except KeyError:
+            pass
+
     def import_default(self, scope, names=None):
         """Default import function.
 
@@ -1203,35 +1886,30 @@ class Importer(Backup):
 
         # configs
         for param in node.get("Parameter", {}).values():
-            value = param.get("Value", None)
-            if not isinstance(value, str):
-                continue
-            m = _re_config.match(value)
-            if m is None:
-                continue
-            conf = m.group(1)
-            m = _re_envvar.match(conf)
-            if m:
-                conf_name = os.getenv(m.group(1), None)
-                if conf_name is None:
-                    print(f"Could not find value for {m.group(1)}")
-                    continue
-            else:
-                conf_name = conf
-
-            cf_importer(*cf_args([conf_name]))
+            conf_name = _config_name(param.get("Value", None))
+            if conf_name is not None:
+                cf_importer(*cf_args([conf_name]))
 
 
 class Exporter(Backup):
     """Exports projects data from the database."""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, project, *args, workers: int = EXPORT_WORKERS, **kwargs):
+        super().__init__(project, *args, **kwargs)
+
+        self.project = project
+        self.workers = workers
+        # zip or tar archive, or a tar streamed to stdout
+        self.archive = project == STDOUT_PROJECT or is_archive(project)
 
         # create base directory
-        if not os.path.exists(self.project_path):
+        if not self.archive and not os.path.exists(self.project_path):
             os.makedirs(self.project_path)
 
+        if project == STDOUT_PROJECT and self.log is print:
+            # stdout is taken by the archive
+            self.log = lambda *args, **kwargs: print(*args, file=sys.stderr, **kwargs)
+
         # avoid multiple exports
         self._exported = {
             # don't export place_holder
@@ -1288,10 +1966,22 @@ class Exporter(Backup):
             self._exported[scope].append(name)
 
     def run(self, objects: dict = {}):
-        """Exports the objects defined in the manifest."""
+        """Exports the objects defined in the manifest.
+
+        With more than one worker, or to an archive, the objects and their
+        dependencies are read in batches a level at a time, serialized by a
+        pool of threads and written to the target as they are ready.
+
+        """
         if len(objects) == 0:
             raise ExportException("No objects to export")
 
+        if self.archive or self.workers > 1:
+            path = self.project if self.archive else self.project_path
+            with open_project_target(path, self.override) as target:
+                self._export_to(target, objects)
+            return
+
         for scope_name in Backup.SCOPES:
             if scope_name not in objects:
                 # not to export
@@ -1313,6 +2003,124 @@ class Exporter(Backup):
                 self.log(f"Exporting {scope_name}:{obj_id}")
                 exporter(*args(scope_name, obj_id))
 
+    def _export_to(self, target: ProjectTarget, objects: dict):
+        """Exports the objects and the objects they depend on to a target."""
+        pending = list(
+            dict.fromkeys(
+                (scope, _from_path(name))
+                for scope in Backup.SCOPES
+                if scope in objects
+                for name in objects[scope]
+            )
+        )
+        requested = set(pending)
+        movaidb = MovaiDB()
+        keys = {}
+        ports = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            while pending:
+                batch = [key for key in pending if not self.exported(*key)]
+                pending = []
+                documents = self._read_documents(batch, keys, movaidb)
+
+                for scope, name in batch:
+                    if (scope, name) not in documents:
+                        raise ExportException(f"Can't find {scope}:{name}")
+                    if not self.recursive:
+                        continue
+                    content = documents[(scope, name)][scope][name]
+                    for dep_scope, dep_name in _export_dependencies(scope, content):
+                        dependency = (dep_scope, _from_path(dep_name))
+                        if dependency not in requested:
+                            requested.add(dependency)
+                            pending.append(dependency)
+
+                # the ports of a package share one file, written at the end
+                items = []
+                for scope, name in batch:
+                    if scope == "Ports":
+                        ports[name] = documents[(scope, name)]
+                    else:
+                        items.append((scope, name, documents[(scope, name)]))
+
+                for (scope, name, _), files in zip(
+                    items, executor.map(lambda item: self._files(*item), items)
+                ):
+                    self.log(f"Exporting {scope}:{name}")
+                    for path, data in files:
+                        target.write(path, data)
+                    self.set_exported(scope, name)
+
+        for path, data in self._ports_files(ports, target):
+            target.write(path, data)
+        for name in ports:
+            self.set_exported("Ports", name)
+
+    @staticmethod
+    def _read_documents(batch, keys, movaidb) -> Dict[Tuple[str, str], dict]:
+        """Documents of a batch of objects, the keys of each scope are listed once."""
+        names = {}
+        for scope, name in batch:
+            names.setdefault(scope, []).append(name)
+
+        documents = {}
+        for scope, scope_names in names.items():
+            if scope not in keys:
+                keys[scope] = scope_keys(scope, movaidb)
+            found = {name: keys[scope][name] for name in scope_names if name in keys[scope]}
+            for name, document in read_documents(scope, found, movaidb).items():
+                documents[(scope, name)] = document
+        return documents
+
+    @classmethod
+    def _files(cls, scope, name, document) -> List[Tuple[str, Union[str, bytes]]]:
+        """(relative path, data) of the files of an object, as written by export_<scope>."""
+        content = document[scope][name]
+
+        if scope == "Message":
+            kinds = {kind: list(content.get(kind, {})) for kind in ("Msg", "Srv", "Action")}
+            files = [(f"Message/{name}.json", json.dumps(kinds, sort_keys=True, indent=4))]
+            for kind in kinds:
+                for key, message in content.get(kind, {}).items():
+                    files.append((f"Message/{name}/{key}.source", message.get("Source", "")))
+                    files.append((f"Message/{name}/{key}.compiled", message.get("Compiled", "")))
+            return files
+
+        if scope == "Package":
+            return [
+                (f"Package/{name}/{key}", value.get("Value", ""))
+                for key, value in content.get("File", {}).items()
+            ]
+
+        # taken before they are removed from the json
+        files = []
+        if scope == "Callback":
+            files.append((f"Callback/{name}.py", content.get("Code", "")))
+        elif scope == "Configuration":
+            files.append((f"Configuration/{name}.yaml", content.get("Yaml", "")))
+        elif scope == "Translation":
+            for lang, value in content.get("Translations", {}).items():
+                files.append((f"Translation/{name}.{lang}.po", value.get("po", "")))
+
+        return [(f"{scope}/{name}.json", cls._serialize(document))] + files
+
+    @classmethod
+    def _ports_files(cls, ports: Dict[str, dict], target: ProjectTarget):
+        """(relative path, text) of the files of the ports, merged with the files in the target."""
+        files = {}
+        for name, document in ports.items():
+            files.setdefault(name.split("/", 1)[0], {})[name] = document["Ports"][name]
+
+        for first_part, contents in files.items():
+            path = f"Ports/{first_part}.json"
+            current = target.read_text(path)
+            data = json.loads(current) if current else {"Ports": {}}
+            for name, content in contents.items():
+                cls._clean(content)
+                data["Ports"][name] = content
+            yield path, json.dumps(data, sort_keys=True, indent=4)
+
     def export_default(self, scope, name):
         name = _from_path(name)
         if self.exported(scope, name):
@@ -1408,7 +2216,8 @@ class Exporter(Backup):
             "Srv": list(obj.Srv.keys()),
             "Action": list(obj.Action.keys()),
         }
-        self.dict2file(json_dict, message_path + ".json")
+        # lists, not an object, written as is
+        self.dump2file(json.dumps(json_dict, sort_keys=True, indent=4), message_path + ".json")
 
         for pack in files:
             msg_type_dict = obj.__getattribute__(pack[0])
@@ -1564,6 +2373,8 @@ class Exporter(Backup):
             json_dict = {"Ports": {}}
 
         data = ports.get_dict()
+        # every port of the file is cleaned, not only the first one
+        self._clean(data["Ports"][name])
         json_dict["Ports"][name] = data["Ports"][name]
 
         self.dict2file(json_dict, ports_path)
@@ -1640,60 +2451,51 @@ class Exporter(Backup):
         path = os.path.join(self.project_path, "Configuration", f"{name}.yaml")
         self.code2file(config.Yaml, path)
 
-    def dict2file(self, data, path):
-        real_path = os.path.join(self.project_path, path)
-        if not self.override(real_path):
-            return
+    @staticmethod
+    def _clean(content: dict):
+        """Removes the keys that are not exported from the content of an object."""
+        for key in (
+            "_schema_version",
+            "relations",
+            # remove the path from json, path is only for internal use
+            "InstallPath",
+            # remove the code from json, code should only exists in .py
+            "Code",
+            # remove the yaml from configuration, yaml should only exists in .yaml
+            "Yaml",
+            # remove the translations from json, translations should only exists in .po
+            "Translations",
+        ):
+            content.pop(key, None)
 
-        b = data
-        for i in range(2):
-            b = b[next(iter(b.keys()))]
-        try:
-            del b["_schema_version"]
-        except KeyError:
-            pass
-        try:
-            del b["relations"]
-        except KeyError:
-            pass
-        # remove the path from json, path is only for internal use
-        try:
-            del b["InstallPath"]
-        except KeyError:
-            pass
-        # remove the code from json, code should only exists in .py
-        try:
-            del b["Code"]
-        except KeyError:
-            pass
-        # remove the yaml from configuration, yaml should only exists in .yaml
-        try:
-            del b["Yaml"]
-        except KeyError:
-            pass
-        # remove the translations from json, translations should only exists in .po
-        try:
-            del b["Translations"]
-        except KeyError:
-            pass
         # the Dummy field is deprecated, to keep compatibility
         # if Dummy is true, it must be replaced with
         # Remappable = false and Launch = false
-        try:
-            if b["Dummy"] is True:
-                b["Remappable"] = False
-                b["Launch"] = False
-
-            del b["Dummy"]
-        except KeyError:
-            pass
+        if "Dummy" in content:
+            if content.pop("Dummy") is True:
+                content["Remappable"] = False
+                content["Launch"] = False
+
+    @classmethod
+    def _serialize(cls, data: dict) -> Union[str, bytes]:
+        """Text of the file of an object, {<scope>: {<name>: <content>}}."""
+        b = data
+        for i in range(2):
+            b = b[next(iter(b.keys()))]
+        cls._clean(b)
 
         try:
-            _data = json.dumps(data, sort_keys=True, indent=4)
-            mode = "w+"
+            return json.dumps(data, sort_keys=True, indent=4)
         except:
-            _data = pickle.dumps(data)
-            mode = "wb+"
+            return pickle.dumps(data)
+
+    def dict2file(self, data, path):
+        real_path = os.path.join(self.project_path, path)
+        if not self.override(real_path):
+            return
+
+        _data = self._serialize(data)
+        mode = "wb+" if isinstance(_data, bytes) else "w+"
 
         os.makedirs(os.path.dirname(real_path), exist_ok=True)
         with open(real_path, mode) as file:
@@ -1811,32 +2613,54 @@ class Exporter(Backup):
 
         # configs
         for param in node.Parameter.values():
-            if not isinstance(param.Value, str):
-                # not a string
-                continue
-            m = _re_config.match(param.Value)
-            if m is None:
-                continue
-            conf = m.group(1)
-            m = _re_envvar.match(conf)
-            if m:
-                # TODO getting from envvars will probably be replaced
-                # by looking in the robot config
-                conf_name = os.getenv(m.group(1), None)
-                if conf_name is None:
-                    # error, print always
-                    print(f"Could not find value for {m.group(1)}")
-                    continue
-            else:
-                conf_name = conf
-
-            cf_exporter(*cf_args(conf_name))
+            conf_name = _config_name(param.Value)
+            if conf_name is not None:
+                cf_exporter(*cf_args(conf_name))
+
+
+@dataclass
+class RemovalPlan:
+    """Objects to remove and their keys, in the order they are removed."""
+
+    keys: Dict[Tuple[str, str], List[str]] = field(default_factory=dict)
+    # removed because the requested objects depend on them
+    dependencies: List[Tuple[str, str]] = field(default_factory=list)
+    # dependencies kept because an object not removed uses them, with that object
+    kept: Dict[Tuple[str, str], Tuple[str, str]] = field(default_factory=dict)
+    # requested but not in the database
+    missing: List[Tuple[str, str]] = field(default_factory=list)
+
+    def count(self) -> int:
+        """Number of keys to remove."""
+        return sum(len(keys) for keys in self.keys.values())
+
+    def report(self) -> List[str]:
+        """Lines describing the removal, as printed on dry runs."""
+        dependencies = set(self.dependencies)
+        lines = [
+            f"Would remove {scope}:{name} ({len(keys)} keys)"
+            + (", dependency" if (scope, name) in dependencies else "")
+            for (scope, name), keys in self.keys.items()
+        ]
+        lines.extend(
+            f"Would keep {scope}:{name}, used by {user[0]}:{user[1]}"
+            for (scope, name), user in self.kept.items()
+        )
+        lines.extend(f"Not present in database {scope}:{name}" for scope, name in self.missing)
+        lines.append(f"{len(self.keys)} objects, {self.count()} keys")
+        return lines
 
 
 class Remover(Backup):
     """Handles the deletion of metadata from the database.
 
-    This class does not support force, nor recursive.
+    The objects to remove, and with dependencies the objects they depend on
+    that no other object uses, are found in a single listing of the keys of
+    the database, then their keys are unlinked in pipelined batches of
+    batch_size keys.
+
+    This class does not support force, nor recursive removal without
+    dependencies.
 
     Attributes:
         force (bool): Force flag to be validated, must be false, still an
@@ -1848,12 +2672,21 @@ class Remover(Backup):
 
     """
 
-    def __init__(self, force: bool = False, dry: bool = False, **kwargs):
+    def __init__(
+        self,
+        force: bool = False,
+        dry: bool = False,
+        dependencies: bool = False,
+        batch_size: int = REMOVE_BATCH_SIZE,
+        **kwargs,
+    ):
         """Sets up object for removal.
 
         Args:
             force (bool): Force flag to be validated.
             dry (bool): Dry run is executed.
+            dependencies (bool): Also remove the dependencies no other object uses.
+            batch_size (int): Keys unlinked by each command.
 
         """
         super().__init__("", **kwargs)
@@ -1861,16 +2694,16 @@ class Remover(Backup):
         self.force = force
         # dry run, print info but does not change db
         self.dry_run = dry
+        self.dependencies = dependencies
+        self.batch_size = max(1, batch_size)
         # list of removed data
         self._removed = {}
+        # the keys are listed on dry runs too
+        self._db = MovaiDB()
 
         if self.dry_run:
-            # override remove_data to not remove data
-            self._remove_data = lambda scope, name: self.set_removed(scope, name)
-            # remove project root dir from it, plus an extra '/' (+1)
             self.dry_print = lambda *paths: [print(path) for path in paths]
         else:
-            self._db = MovaiDB()
             self.dry_print = lambda *paths: None
 
     def get_objs(self, scope):
@@ -1891,22 +2724,152 @@ class Remover(Backup):
         """Remover main function, removes the defined objects.
 
         Args:
-            objects: Dict with scope names as keys and list of items to be removed as value
+            objects: Dict with scope names as keys and list of items to be removed as value,
+                None removes all the objects of the scope
 
         """
-        if self.recursive:
-            raise RemoveException("Remove only supports individual removal")
+        if self.recursive and not self.dependencies:
+            raise RemoveException(
+                "Remove only supports individual removal, or removal with dependencies"
+            )
 
         if self.force:
             raise RemoveException("Remove does not support force")
 
-        # iterate over Nodes, Flows, ...
-        for scope_name in Backup.SCOPES:
-            if scope_name not in objects:
+        plan = self.plan(objects)
+
+        if self.dry_run:
+            self.dry_print(*plan.report())
+        if plan.missing:
+            scope, name = plan.missing[0]
+            raise RemoveException(f"Item {scope}:{name} not present in database")
+        if not self.dry_run:
+            self._unlink(plan)
+
+        for scope, name in plan.keys:
+            self.set_removed(scope, name)
+
+    def plan(self, objects: dict) -> RemovalPlan:
+        """Objects to remove and their keys, found with a single listing of the database.
+
+        Args:
+            objects: Dict with scope names as keys and list of items to be removed as value
+
+        """
+        keys = scopes_keys(Backup.SCOPES, self._db)
+
+        plan = RemovalPlan()
+        pending = []
+        for scope in Backup.SCOPES:
+            if scope not in objects:
+                continue
+            if None in objects[scope]:
+                pending.extend((scope, name) for name in sorted(keys[scope]))
+            else:
+                pending.extend((scope, _from_path(name)) for name in objects[scope])
+
+        pending = list(dict.fromkeys(pending))
+        requested = set(pending)
+        seen = set(pending)
+        # dependencies of the objects to remove
+        edges = {}
+        while pending:
+            batch, pending = pending, []
+            found = {}
+            for scope, name in batch:
+                if name not in keys.get(scope, {}):
+                    # dependencies already gone are not an error
+                    if (scope, name) in requested:
+                        plan.missing.append((scope, name))
+                    continue
+                plan.keys[(scope, name)] = keys[scope][name]
+                if (scope, name) not in requested:
+                    plan.dependencies.append((scope, name))
+                found.setdefault(scope, {})[name] = keys[scope][name]
+
+            if not self.dependencies:
+                continue
+
+            edges.update(self._edges(found))
+            for scope, names in found.items():
+                for name in names:
+                    for dependency in edges[(scope, name)]:
+                        if dependency not in seen:
+                            seen.add(dependency)
+                            pending.append(dependency)
+
+        if plan.dependencies:
+            self._keep_used(plan, keys, edges)
+        return plan
+
+    def _edges(self, objects: Dict[str, Dict[str, List[str]]]) -> Dict[tuple, List[tuple]]:
+        """The dependencies of the objects, {scope: {name: keys}}, read in batches."""
+        edges = {}
+        for scope, names in objects.items():
+            for name, document in read_documents(scope, names, self._db).items():
+                edges[(scope, name)] = [
+                    (dependency[0], _from_path(dependency[1]))
+                    for dependency in _dependencies(scope, document[scope][name])
+                ]
+        return edges
+
+    def _keep_used(self, plan: RemovalPlan, keys: Dict[str, dict], edges: Dict[tuple, list]):
+        """Takes out of the plan the dependencies still used by objects not removed.
+
+        The usage index only knows node templates, subflows and callbacks, so
+        the references are read from the documents of the other objects.
+        """
+        candidates = set(plan.dependencies)
+        others = {}
+        for scope in DEPENDENT_SCOPES:
+            for name, object_keys in keys.get(scope, {}).items():
+                if (scope, name) not in plan.keys:
+                    others.setdefault(scope, {})[name] = object_keys
+
+        # a kept dependency keeps its own dependencies too
+        pending = [
+            (dependency, user)
+            for user, dependencies in self._edges(others).items()
+            for dependency in dependencies
+            if dependency in candidates
+        ]
+        while pending:
+            dependency, user = pending.pop(0)
+            if dependency in plan.kept:
                 continue
+            plan.kept[dependency] = user
+            pending.extend(
+                (child, dependency) for child in edges[dependency] if child in candidates
+            )
 
-            object_names = None if None in objects[scope_name] else objects[scope_name]
-            self.remove_default(scope_name, object_names)
+        for dependency in plan.kept:
+            del plan.keys[dependency]
+        plan.dependencies = [item for item in plan.dependencies if item not in plan.kept]
+
+    def _unlink(self, plan: RemovalPlan):
+        """Unlinks the keys of the plan in batches, reporting the progress."""
+        keys = [key for object_keys in plan.keys.values() for key in object_keys]
+        total = len(keys)
+        for start in range(0, total, self.batch_size):
+            batch = keys[start : start + self.batch_size]
+            pipe = self._db.db_write.pipeline(transaction=False)
+            pipe.unlink(*batch)
+            # indexed attributes removed, the usage index must read the objects again,
+            # and the objects get a new generation stamp
+            mark_dirty(pipe, batch)
+            bump_generations(pipe, batch)
+            pipe.execute()
+            self.log(f"Removed {start + len(batch)}/{total} keys")
+
+        # imported again even if the files did not change
+        hashes = ImportHashes(self._db)
+        pipe = self._db.db_write.pipeline(transaction=False)
+        for scope, name in plan.keys:
+            hashes.remove(scope, name, pipe=pipe)
+        pipe.execute()
+
+        for scope, name in plan.keys:
+            self.log(f"Removed {scope}:{name}")
 
     def removed(self, scope, name):
         """Wrapper to check if a scope:name pair was already removed.
@@ -1934,40 +2897,6 @@ class Remover(Backup):
         if name not in self._removed[scope]:
             self._removed[scope].append(name)
 
-    def _remove_data(self, scope, name):  # pylint: disable=method-hidden
-        """Deletes a scope:name pair if existent in the database.
-
-        Args:
-            scope: Metadata scope.
-            name: Item name.
-
-        """
-        try:
-            obj = Factory.get_class(scope)(name)
-            # exists
-            self._db.delete_by_args(scope, Name=obj.name)
-            self.log(f"Removed {scope}:{name}")
-        except Exception as e:
-            error_msg = f"Item {scope}:{name} not present in database ({e})"
-            raise RemoveException(error_msg) from e
-
-    def remove_default(self, scope, names):
-        """Deletes a series of scope:name pairs from the database.
-
-        Args:
-            scope: Metadata scope.
-            name: Item name.
-
-        """
-        for name in names:
-            if self.removed(scope, name):
-                continue
-
-            self.dry_print(f"Would remove {scope}:{name}")
-
-            self._remove_data(scope, name)
-            self.set_removed(scope, name)
-
 
 def backup(args) -> int:
     """Main function to handle the backup actions based on provided arguments."""
@@ -1985,6 +2914,8 @@ def backup(args) -> int:
                 debug=args.debug,
                 recursive=recursive,
                 clean_old_data=args.clean_old_data,
+                incremental=not getattr(args, "full", False),
+                verify=getattr(args, "verify", False),
             )
         else:
             print("Skipping importer...")
@@ -1998,6 +2929,7 @@ def backup(args) -> int:
                 dry=args.dry,
                 debug=args.debug,
                 recursive=recursive,
+                dependencies=getattr(args, "dependencies", False),
             )
             # so the action print is not 'Removeed'
         else:
@@ -2020,7 +2952,12 @@ def backup(args) -> int:
 
     try:
         tool.run(objects)
-        print(args.action.capitalize() + "ed")
+        # stdout may be the exported archive
+        print(
+            args.action.capitalize() + "ed", file=sys.stderr if project == STDOUT_PROJECT else None
+        )
+        if isinstance(tool, Importer) and not tool.dry_run:
+            print(", ".join(f"{count} {state}" for state, count in tool.summary().items()))
         return 0
     except ImportException as exc:
         import traceback
@@ -2036,6 +2973,9 @@ def backup(args) -> int:
 
         print(traceback.format_exc(), end="", file=sys.stderr)
         print("unknown error:", type(e).__qualname__, "-", str(e), file=sys.stderr)
+    finally:
+        if isinstance(tool, Importer):
+            tool.close()
 
     # not exited before, means exception
     return 1
@@ -2068,7 +3008,10 @@ def main() -> int:
     parser.add_argument(
         "-p",
         "--project",
-        help="Folder to export to or import from.",
+        help=(
+            "Folder, or .zip, .tar or .tar.gz archive, to export to or import from, "
+            "'-' exports to stdout."
+        ),
         type=str,
         required=True,
         metavar="",
@@ -2125,8 +3068,28 @@ def main() -> int:
         action="store_true",
         help="Clean old data, after import",
     )
+    parser.add_argument(
+        "--full",
+        dest="full",
+        action="store_true",
+        help="Import every object, also the ones unchanged since the last import",
+    )
+    parser.add_argument(
+        "--verify",
+        dest="verify",
+        action="store_true",
+        help="Compare the objects unchanged since the last import with the database",
+    )
+    parser.add_argument(
+        "--dependencies",
+        dest="dependencies",
+        action="store_true",
+        help="Also remove the dependencies of the elements that no other object uses",
+    )
 
-    parser.set_defaults(force=False, debug=False, dry=False)
+    parser.set_defaults(
+        force=False, debug=False, dry=False, full=False, verify=False, dependencies=False
+    )
 
     args, _ = parser.parse_known_args()
 
@@ -0,0 +1,294 @@
+"""
+Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Benchmarks of the tools on synthetic projects.
+
+    dal_benchmark generate --scale 10 --output ./project [--redis]
+    dal_benchmark run --scale 10 100 1000 --repeat 3 --output report.json
+
+Every benchmark is timed on a generated project of each scale, the report
+is a JSON document with the time of every run so it can be compared between
+versions. Benchmarks that need the database are skipped when redis is not
+reachable, the objects written by them are removed at the end of each scale.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from movai_core_shared.logger import Log
+
+from dal.tools.synthetic_project import ProjectSpec, SyntheticProject, generate_project
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+
+LOGGER = Log.get_logger("Benchmark")
+
+REPORT_VERSION = 1
+
+
+@dataclass
+class BenchmarkContext:
+    """Project a benchmark runs on"""
+
+    project: SyntheticProject
+    # project directory
+    path: str
+    # scratch directory, removed after the scale
+    workdir: str
+    movaidb: Optional["MovaiDB"] = None
+
+
+def bench_schema_validation(context: BenchmarkContext):
+    """Format validation of all the nodes, as done on import and save"""
+    # pylint: disable=import-outside-toplevel
+    from dal.scopes.node import Node
+
+    Node.validate_format_many("Node", context.project.documents["Node"])
+
+
+def bench_import(context: BenchmarkContext):
+    """Import of the project directory, every object is written"""
+    # pylint: disable=import-outside-toplevel
+    from dal.tools.backup import Importer
+
+    with Importer(context.path, incremental=False) as importer:
+        importer.run()
+
+
+def bench_import_unchanged(context: BenchmarkContext):
+    """Import of the project directory again, the unchanged objects are skipped"""
+    # pylint: disable=import-outside-toplevel
+    from dal.tools.backup import Importer
+
+    with Importer(context.path) as importer:
+        importer.run()
+
+
+def bench_export(context: BenchmarkContext):
+    """Export of the top flows and everything they use"""
+    # pylint: disable=import-outside-toplevel
+    from dal.tools.backup import Exporter
+
+    exporter = Exporter(tempfile.mkdtemp(dir=context.workdir))
+    # never ask to replace files
+    exporter._override = 1  # pylint: disable=protected-access
+    exporter.run({"Flow": context.project.top_flows()})
+
+
+def bench_validation(context: BenchmarkContext):
+    """Full validation of the project, without the cached results"""
+    # pylint: disable=import-outside-toplevel
+    from dal.validation.project_validator import ProjectValidator
+
+    ProjectValidator().validate(force=True)
+
+
+def bench_usage_search(context: BenchmarkContext):
+    """Usage of every node and flow"""
+    # pylint: disable=import-outside-toplevel
+    from dal.tools.usage_search import Searcher
+
+    for _ in Searcher().usage_matrix(context.movaidb):
+        pass
+
+
+def bench_parameter_resolution(context: BenchmarkContext):
+    """Parameters of the top flows, subflows and node instances"""
+    # pylint: disable=import-outside-toplevel
+    from dal.models.flow import Flow
+
+    for name in context.project.top_flows():
+        Flow(name).resolve_all_params()
+
+
+def bench_launch_plan(context: BenchmarkContext):
+    """Launch plans of the top flows"""
+    # pylint: disable=import-outside-toplevel
+    from dal.models.flow import Flow
+
+    for name in context.project.top_flows():
+        Flow(name).compile_launch_plan()
+
+
+# in the order they run, import writes the project for the ones after it
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], None]] = {
+    "schema_validation": bench_schema_validation,
+    "import": bench_import,
+    "import_unchanged": bench_import_unchanged,
+    "export": bench_export,
+    "validation": bench_validation,
+    "usage_search": bench_usage_search,
+    "parameter_resolution": bench_parameter_resolution,
+    "launch_plan": bench_launch_plan,
+}
+
+# benchmarks that need the database
+DB_BENCHMARKS = frozenset(BENCHMARKS) - {"schema_validation"}
+
+
+def measure(benchmark: Callable[[BenchmarkContext], None], context: BenchmarkContext, repeat: int):
+    """Time the runs of a benchmark, in seconds"""
+    runs = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        benchmark(context)
+        runs.append(time.perf_counter() - start)
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs)}
+
+
+def _connect() -> Optional["MovaiDB"]:
+    try:
+        # pylint: disable=import-outside-toplevel
+        from dal.movaidb import MovaiDB
+
+        movaidb = MovaiDB()
+        movaidb.db_write.ping()
+        return movaidb
+    except Exception as e:  # pylint: disable=broad-except
+        LOGGER.warning(f"Skipping the benchmarks that need redis: {e}")
+        return None
+
+
+def _environment() -> dict:
+    try:
+        # pylint: disable=import-outside-toplevel
+        from importlib.metadata import version
+
+        dal_version = version("data-access-layer")
+    except Exception:  # pylint: disable=broad-except
+        dal_version = "unknown"
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "data-access-layer": dal_version,
+    }
+
+
+def run_scale(scale: int, names: List[str], repeat: int = 3, **spec) -> dict:
+    """Run the benchmarks on a project of a scale"""
+    project = generate_project(ProjectSpec.scaled(scale, **spec))
+    output = {
+        "scale": scale,
+        "spec": asdict(project.spec),
+        "objects": project.count(),
+        "results": {},
+    }
+
+    movaidb = _connect() if DB_BENCHMARKS.intersection(names) else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        context = BenchmarkContext(
+            project, project.write(os.path.join(workdir, "project")), workdir, movaidb
+        )
+        try:
+            if movaidb is not None and "import" not in names:
+                if "import_unchanged" in names:
+                    # imported once, the timed imports find every object unchanged
+                    bench_import(context)
+                else:
+                    project.load(movaidb)
+
+            for name in names:
+                if name in DB_BENCHMARKS and movaidb is None:
+                    output["results"][name] = {"skipped": "redis is not reachable"}
+                    continue
+
+                LOGGER.info(f"Running {name} at {scale}x")
+                try:
+                    output["results"][name] = measure(BENCHMARKS[name], context, repeat)
+                except Exception as e:  # pylint: disable=broad-except
+                    LOGGER.error(f"Benchmark {name} failed at {scale}x: {e}")
+                    output["results"][name] = {"error": str(e)}
+        finally:
+            if movaidb is not None:
+                project.unload(movaidb)
+
+    return output
+
+
+def run_benchmarks(
+    scales: List[int], names: Optional[List[str]] = None, repeat: int = 3, **spec
+) -> dict:
+    """Run the benchmarks on projects of each scale, returns the report"""
+    names = [name for name in BENCHMARKS if names is None or name in names]
+    return {
+        "version": REPORT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(),
+        "repeat": repeat,
+        "scales": [run_scale(scale, names, repeat, **spec) for scale in scales],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Mov.AI data tools")
+    action_subparser = parser.add_subparsers(dest="action")
+
+    sub_parser = action_subparser.add_parser("generate", help="Generate a synthetic project")
+    sub_parser.add_argument("-s", "--scale", type=int, default=1, help="Size of the project")
+    sub_parser.add_argument("-o", "--output", type=str, help="Folder to write the project to")
+    sub_parser.add_argument(
+        "--redis", action="store_true", help="Write the project into the database"
+    )
+    sub_parser.add_argument("--seed", type=int, default=0, help="Seed of the generator")
+
+    sub_parser = action_subparser.add_parser("run", help="Run the benchmarks")
+    sub_parser.add_argument(
+        "-s", "--scale", type=int, nargs="+", default=[10], help="Sizes of the projects"
+    )
+    sub_parser.add_argument(
+        "-b",
+        "--benchmarks",
+        nargs="+",
+        choices=list(BENCHMARKS),
+        default=None,
+        help="Benchmarks to run, all by default",
+    )
+    sub_parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs of each benchmark")
+    sub_parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="File to write the report to, stdout by default",
+    )
+    sub_parser.add_argument("--seed", type=int, default=0, help="Seed of the generator")
+
+    args = parser.parse_args()
+
+    if args.action == "generate":
+        if not args.output and not args.redis:
+            parser.error("generate requires --output or --redis")
+        project = generate_project(ProjectSpec.scaled(args.scale, seed=args.seed))
+        if args.output:
+            project.write(args.output)
+        if args.redis:
+            project.load()
+        print(json.dumps(project.count()))
+    elif args.action == "run":
+        report = run_benchmarks(args.scale, args.benchmarks, args.repeat, seed=args.seed)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=4)
+        else:
+            json.dump(report, sys.stdout, indent=4)
+    else:
+        parser.print_help()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
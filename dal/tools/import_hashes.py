@@ -0,0 +1,154 @@
+"""
+Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Hashes of the objects written by the importer.
+
+The importer stores the hash of every object it writes in one redis hash,
+{<scope>/<name>: <hash>}. Importing the same package again compares the
+hash of each file with the stored one and skips the objects that did not
+change, as long as their keys are still in the database. When verifying,
+the values in the database are compared as well, so objects changed by
+other means are written again.
+"""
+import hashlib
+import json
+import pickle
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Tuple
+
+from movai_core_shared.logger import Log
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+
+LOGGER = Log.get_logger(__name__)
+
+# no ':' so it never matches the search patterns of the scopes
+HASHES_KEY = "_import_hashes"
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+def _encode(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.hex()
+    return repr(value)
+
+
+def content_hash(content: dict) -> str:
+    """Hash of the content of an object, the same for equal contents"""
+    text = json.dumps(content, sort_keys=True, default=_encode)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _written(kvs: List[Tuple[str, Any, Any]]) -> List[Tuple[str, Any, Any]]:
+    """Keys written by MovaiDB.set, empty hashes and lists are not"""
+    return [
+        (key, value, source)
+        for key, value, source in kvs
+        if source not in ("hash", "list") or value
+    ]
+
+
+def _loads(value: Optional[bytes]) -> Any:
+    try:
+        return pickle.loads(value)
+    except Exception:  # pylint: disable=broad-except
+        return value
+
+
+class ImportHashes:
+    """Hashes of the imported objects, stored in the database"""
+
+    def __init__(self, movaidb: "MovaiDB"):
+        self._db = movaidb
+
+    @staticmethod
+    def field(scope: str, name: str) -> str:
+        return f"{scope}/{name}"
+
+    def set(self, scope: str, name: str, digest: str, pipe=None) -> None:
+        """Store the hash of an object, in the pipeline if given"""
+        (pipe or self._db.db_write).hset(HASHES_KEY, self.field(scope, name), digest)
+
+    def remove(self, scope: str, name: str, pipe=None) -> None:
+        (pipe or self._db.db_write).hdel(HASHES_KEY, self.field(scope, name))
+
+    def changes(
+        self, objects: Sequence[Tuple[str, str, dict]], verify: bool = False
+    ) -> List[Tuple[str, str]]:
+        """
+        (state, hash) of each (scope, name, data) to import, the state is
+        new, changed or unchanged.
+        """
+        if not objects:
+            return []
+
+        digests = [content_hash(data[scope][name]) for scope, name, data in objects]
+        stored = self._db.db_write.hmget(
+            HASHES_KEY, [self.field(scope, name) for scope, name, _ in objects]
+        )
+        states = [
+            NEW if previous is None else CHANGED if previous.decode() != digest else UNCHANGED
+            for previous, digest in zip(stored, digests)
+        ]
+
+        # the keys of an unchanged object may have been removed since
+        written = {
+            index: _written(self._db.dict_to_keys(objects[index][2]))
+            for index, state in enumerate(states)
+            if state == UNCHANGED
+        }
+        candidates = [index for index, keys in written.items() if keys]
+        for index in written.keys() - set(candidates):
+            states[index] = CHANGED
+        pipe = self._db.create_pipe()
+        for index in candidates:
+            pipe.exists(*[key for key, _, _ in written[index]])
+        for index, count in zip(candidates, pipe.execute() if candidates else []):
+            if count != len(written[index]):
+                states[index] = CHANGED
+            elif verify and not self._matches(*objects[index][:2], written[index]):
+                states[index] = CHANGED
+
+        return list(zip(states, digests))
+
+    def _matches(self, scope: str, name: str, written: List[Tuple[str, Any, Any]]) -> bool:
+        """Whether the object in the database has exactly the keys and values to write"""
+        live = self._db.search(self._db.get_search_dict(scope, Name=name))
+        if set(live) != {key for key, _, _ in written}:
+            LOGGER.debug(f"{scope}:{name} has other keys in the database")
+            return False
+
+        pipe = self._db.create_pipe()
+        for key, _, source in written:
+            if source == "hash":
+                pipe.hgetall(key)
+            elif source == "list":
+                pipe.lrange(key, 0, -1)
+            elif source[0] == "&":
+                # the value is in the key
+                pipe.exists(key)
+            else:
+                pipe.get(key)
+
+        for (key, value, source), current in zip(written, pipe.execute()):
+            if source == "hash":
+                current = {
+                    hkey.decode() if isinstance(hkey, bytes) else hkey: _loads(hval)
+                    for hkey, hval in current.items()
+                }
+            elif source == "list":
+                current = [_loads(lval) for lval in current]
+            elif source[0] == "&":
+                current = value if current else None
+            else:
+                current = _loads(current)
+            if current != value:
+                LOGGER.debug(f"{scope}:{name} differs in the database at {key}")
+                return False
+
+        return True
@@ -25,7 +25,10 @@ def main() -> int:
         sub_parser.add_argument(
             "-p",
             "--project",
-            help="Folder to export to or import from (not required for usage-search).",
+            help=(
+                "Folder, or .zip, .tar or .tar.gz archive, to export to or import from, "
+                "'-' exports to stdout (not required for usage-search)."
+            ),
             type=str,
             required=True,
             metavar="",
@@ -82,8 +85,28 @@ def main() -> int:
             action="store_true",
             help="Clean old data, after import",
         )
+        sub_parser.add_argument(
+            "--full",
+            dest="full",
+            action="store_true",
+            help="Import every object, also the ones unchanged since the last import",
+        )
+        sub_parser.add_argument(
+            "--verify",
+            dest="verify",
+            action="store_true",
+            help="Compare the objects unchanged since the last import with the database",
+        )
+        sub_parser.add_argument(
+            "--dependencies",
+            dest="dependencies",
+            action="store_true",
+            help="Also remove the dependencies of the elements that no other object uses",
+        )
 
-        sub_parser.set_defaults(force=False, debug=False, dry=False)
+        sub_parser.set_defaults(
+            force=False, debug=False, dry=False, full=False, verify=False, dependencies=False
+        )
 
     # arguments for usage-search
     sub_parser = action_subparser.add_parser(
@@ -91,10 +114,26 @@ def main() -> int:
     )
     sub_parser.add_argument(
         "search_type",
+        nargs="?",
         choices=list(get_usage_search_scope_map().keys()),
         help="Scope to search for",
     )
-    sub_parser.add_argument("name", help="Name of the node to search for")
+    sub_parser.add_argument("name", nargs="?", help="Name of the node to search for")
+    sub_parser.add_argument(
+        "-a",
+        "--all",
+        dest="search_all",
+        action="store_true",
+        help="Usage of every node and flow as JSON, including the ones not used anywhere",
+    )
+    sub_parser.add_argument(
+        "-o",
+        "--output",
+        help="File to write the JSON to when using --all, stdout by default",
+        type=str,
+        metavar="",
+        default=None,
+    )
     sub_parser.add_argument(
         "-v",
         "--verbose",
@@ -106,7 +145,16 @@ def main() -> int:
 
     if args.action == "usage-search":
         searcher = Searcher(debug=args.verbose)
-        ret_code = searcher.search_usage(args.search_type, args.name)
+        if args.search_all:
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as output:
+                    ret_code = searcher.search_all(output)
+            else:
+                ret_code = searcher.search_all()
+        elif not args.search_type or not args.name:
+            parser.error("usage-search requires search_type and name, or --all")
+        else:
+            ret_code = searcher.search_usage(args.search_type, args.name)
     elif args.action in ["import", "export", "remove"]:
         # Non usage-search actions require project
         if not args.project:
@@ -0,0 +1,341 @@
+"""
+Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Synthetic projects to measure the tools at scale.
+
+A project has flows nested in levels of subflows, node templates with
+publishers and subscribers, callbacks and configurations. Parameters of the
+flows and node instances reference the configurations, node instances are
+linked to each other and to the exposed ports of the subflows. The same
+spec and seed always generate the same project.
+"""
+import json
+import os
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+
+# prefix of the names of all the generated objects
+PREFIX = "bench"
+
+LAST_UPDATE = {"date": "01/01/2024 at 00:00:00", "user": "movai@internal"}
+
+MESSAGE = {"Message": "Float32", "Package": "std_msgs"}
+
+# fields stored in their own files in a project directory
+CODE_FIELDS = {"Callback": ("Code", "py"), "Configuration": ("Yaml", "yaml")}
+
+
+@dataclass
+class ProjectSpec:
+    """Size of a synthetic project, counts of the 1x project are multiplied by the scale"""
+
+    flows: int = 4
+    nodes: int = 5
+    callbacks: int = 3
+    configurations: int = 2
+    # levels of subflows, 1 for no subflows
+    depth: int = 2
+    # per flow
+    subflows: int = 2
+    node_instances: int = 4
+    links: int = 4
+    # per node, publishers and subscribers
+    ports: int = 2
+    seed: int = 0
+
+    @classmethod
+    def scaled(cls, scale: int, **kwargs) -> "ProjectSpec":
+        """A project scale times larger than the 1x project, flows keep their size"""
+        base = cls(**kwargs)
+        base.flows *= scale
+        base.nodes *= scale
+        base.callbacks *= scale
+        base.configurations *= scale
+        return base
+
+
+def _name(kind: str, index: int) -> str:
+    return f"{PREFIX}_{kind}_{index:05d}"
+
+
+@dataclass
+class SyntheticProject:
+    """Documents of a generated project, {<scope>: {<name>: <content>}}"""
+
+    spec: ProjectSpec
+    documents: Dict[str, Dict[str, dict]] = field(default_factory=dict)
+
+    def count(self) -> Dict[str, int]:
+        """Number of objects of each scope"""
+        return {scope: len(objects) for scope, objects in self.documents.items()}
+
+    def manifest(self) -> str:
+        """Manifest with every object of the project"""
+        return "".join(
+            f"{scope}:{name}\n" for scope, objects in self.documents.items() for name in objects
+        )
+
+    def top_flows(self) -> List[str]:
+        """Flows that are not used as subflows"""
+        used = {
+            container["ContainerFlow"]
+            for content in self.documents.get("Flow", {}).values()
+            for container in content.get("Container", {}).values()
+        }
+        return [name for name in self.documents.get("Flow", {}) if name not in used]
+
+    def files(self) -> Iterator[Tuple[str, str]]:
+        """(relative path, text) of the files of the project as exported"""
+        for scope, objects in self.documents.items():
+            for name, content in objects.items():
+                content = dict(content)
+                if scope in CODE_FIELDS:
+                    key, extension = CODE_FIELDS[scope]
+                    yield os.path.join(scope, f"{name}.{extension}"), content.pop(key)
+                data = {scope: {name: content}}
+                yield os.path.join(scope, f"{name}.json"), json.dumps(
+                    data, sort_keys=True, indent=4
+                )
+
+    def write(self, path: str) -> str:
+        """Write the project directory, returns its path"""
+        for relative_path, text in self.files():
+            file_path = os.path.join(path, relative_path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(text)
+
+        with open(os.path.join(path, "manifest.txt"), "w", encoding="utf-8") as file:
+            file.write(self.manifest())
+
+        return path
+
+    def load(self, movaidb: Optional["MovaiDB"] = None) -> None:
+        """Write all the objects into the database"""
+        # pylint: disable=import-outside-toplevel
+        from dal.scopes.structures import mark_changed
+
+        movaidb = _movaidb(movaidb)
+        for scope, objects in self.documents.items():
+            for name, content in objects.items():
+                pipe = movaidb.create_pipe()
+                movaidb.set({scope: {name: content}}, pipe=pipe)
+                mark_changed(pipe, {scope: {name: content}})
+                pipe.execute()
+
+    def unload(self, movaidb: Optional["MovaiDB"] = None) -> None:
+        """Remove all the objects from the database"""
+        # pylint: disable=import-outside-toplevel
+        from dal.scopes.structures import mark_changed
+
+        movaidb = _movaidb(movaidb)
+        for scope, objects in self.documents.items():
+            for name in objects:
+                pipe = movaidb.create_pipe()
+                movaidb.unsafe_delete({scope: {name: "**"}}, pipe=pipe)
+                mark_changed(pipe, {scope: {name: "**"}})
+                pipe.execute()
+
+
+def _movaidb(movaidb: Optional["MovaiDB"]) -> "MovaiDB":
+    if movaidb is None:
+        # pylint: disable=import-outside-toplevel
+        from dal.movaidb import MovaiDB
+
+        movaidb = MovaiDB()
+    return movaidb
+
+
+def _callback(name: str) -> dict:
+    return {
+        "Code": f'"""{name}"""\nlogger.info(msg.data)\n',
+        "Info": "",
+        "Label": name,
+        "LastUpdate": LAST_UPDATE,
+        "Message": "std_msgs/Float32",
+        "Py3Lib": {},
+        "User": "",
+        "Version": "",
+    }
+
+
+def _configuration(name: str, index: int) -> dict:
+    return {
+        "Label": name,
+        "LastUpdate": LAST_UPDATE,
+        "Type": "yaml",
+        "User": "",
+        "Yaml": f"rate: {10 + index % 90}\nframe: map_{index}\n",
+    }
+
+
+def _node(name: str, spec: ProjectSpec, rng: random.Random, configurations: List[str]) -> dict:
+    ports = {}
+    for port in range(spec.ports):
+        if port % 2 == 0:
+            ports[f"pub{port}"] = {
+                **MESSAGE,
+                "Out": {"out": {"Message": "std_msgs/Float32"}},
+                "Template": "ROS1/Publisher",
+            }
+        else:
+            ports[f"sub{port}"] = {
+                **MESSAGE,
+                "In": {
+                    "in": {
+                        "Callback": _name("callback", rng.randrange(spec.callbacks)),
+                        "Message": "std_msgs/Float32",
+                    }
+                },
+                "Template": "ROS1/Subscriber",
+            }
+
+    parameters = {"topic": {"Value": f"/{name}"}}
+    if configurations:
+        parameters["rate"] = {"Value": f"$(config {rng.choice(configurations)}.rate)"}
+
+    return {
+        "Info": "",
+        "Label": name,
+        "LastUpdate": LAST_UPDATE,
+        "Parameter": parameters,
+        "PortsInst": ports,
+        "Remappable": True,
+        "Type": "ROS1/Node",
+    }
+
+
+def _ports(node: dict, direction: str) -> List[str]:
+    return [
+        f"{port}/{direction}"
+        for port, value in node["PortsInst"].items()
+        if direction.capitalize() in value
+    ]
+
+
+def _visualization(rng: random.Random) -> dict:
+    return {"x": {"Value": round(rng.random(), 3)}, "y": {"Value": round(rng.random(), 3)}}
+
+
+def _flow(
+    name: str,
+    spec: ProjectSpec,
+    rng: random.Random,
+    nodes: Dict[str, dict],
+    subflows: List[Tuple[str, dict]],
+    configurations: List[str],
+) -> dict:
+    node_insts = {}
+    for index in range(spec.node_instances):
+        template = rng.choice(list(nodes))
+        node_insts[f"inst{index}"] = {
+            "NodeLabel": f"inst{index}",
+            "Parameter": {"rate": {"Value": "$(flow rate)"}},
+            "Template": template,
+            "Visualization": _visualization(rng),
+        }
+
+    # ports of the node instances and of the exposed ports of the subflows
+    outputs = [
+        f"{inst}/{port}"
+        for inst, value in node_insts.items()
+        for port in _ports(nodes[value["Template"]], "out")
+    ]
+    inputs = [
+        f"{inst}/{port}"
+        for inst, value in node_insts.items()
+        for port in _ports(nodes[value["Template"]], "in")
+    ]
+    containers = {}
+    for index, (subflow, content) in enumerate(subflows):
+        container = f"sub{index}"
+        containers[container] = {
+            "ContainerFlow": subflow,
+            "ContainerLabel": container,
+            "Visualization": _visualization(rng),
+        }
+        for exposed in content["ExposedPorts"].values():
+            for inst, ports in exposed.items():
+                for port in ports:
+                    paths = outputs if port.endswith("/out") else inputs
+                    paths.append(f"{container}__{inst}/{port}")
+
+    links = {}
+    if outputs and inputs:
+        for _ in range(spec.links):
+            link_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            links[link_id] = {"From": rng.choice(outputs), "To": rng.choice(inputs)}
+
+    # expose the ports of the first node instance
+    first = node_insts["inst0"]["Template"] if node_insts else None
+    exposed = (
+        {first: {"inst0": _ports(nodes[first], "in") + _ports(nodes[first], "out")}}
+        if first
+        else {}
+    )
+
+    rate = f"$(config {rng.choice(configurations)}.rate)" if configurations else "10"
+    content = {
+        "Description": "synthetic flow",
+        "ExposedPorts": exposed,
+        "Label": name,
+        "LastUpdate": LAST_UPDATE,
+        "Links": links,
+        "NodeInst": node_insts,
+        "Parameter": {"rate": {"Value": rate}},
+    }
+    if containers:
+        content["Container"] = containers
+    return content
+
+
+def generate_project(spec: ProjectSpec) -> SyntheticProject:
+    """Generate a project of the given size"""
+    rng = random.Random(spec.seed)
+    project = SyntheticProject(spec)
+
+    callbacks = {
+        _name("callback", index): _callback(_name("callback", index))
+        for index in range(spec.callbacks)
+    }
+    configurations = {
+        _name("config", index): _configuration(_name("config", index), index)
+        for index in range(spec.configurations)
+    }
+    config_names = list(configurations)
+    nodes = {
+        _name("node", index): _node(_name("node", index), spec, rng, config_names)
+        for index in range(spec.nodes)
+    }
+
+    # flows of a level use flows of the level below as subflows
+    depth = max(1, spec.depth)
+    flows: Dict[str, dict] = {}
+    below: List[str] = []
+    for level in range(depth):
+        count = spec.flows // depth + (1 if level < spec.flows % depth else 0)
+        current = []
+        for _ in range(count):
+            name = _name("flow", len(flows))
+            subflows = [
+                (subflow, flows[subflow])
+                for subflow in (rng.sample(below, min(spec.subflows, len(below))) if below else [])
+            ]
+            flows[name] = _flow(name, spec, rng, nodes, subflows, config_names)
+            current.append(name)
+        below = current or below
+
+    project.documents = {
+        "Flow": flows,
+        "Node": nodes,
+        "Callback": callbacks,
+        "Configuration": configurations,
+    }
+    return project
@@ -1,8 +1,21 @@
 import json
+import sys
+from typing import Dict, Iterator, List, Optional, Set, TextIO
 
 from movai_core_shared.exceptions import DoesNotExist
-from dal.utils.usage_search.usage_types import UsageSearchResult, UsageData
+from dal.movaidb import MovaiDB
+from dal.utils.usage_search.usage_types import (
+    UsageSearchResult,
+    UsageData,
+    NodeFlowUsage,
+    FlowFlowUsage,
+    DirectNodeUsageItem,
+    DirectFlowUsageItem,
+    IndirectNodeUsageItem,
+    IndirectFlowUsageItem,
+)
 from dal.utils.usage_search.scope_map import get_usage_search_scope_map
+from dal.utils.usage_search.usage_index import UsageIndex
 
 
 class Searcher:
@@ -103,3 +116,112 @@ class Searcher:
         self.print_results(result)
 
         return 0
+
+    def usage_matrix(self, movaidb: Optional[MovaiDB] = None) -> Iterator[UsageSearchResult]:
+        """Usage of every node and flow, the same usages search_usage reports for each one.
+
+        All the flows are read once, the containment graph is built in memory
+        and the flows containing each flow, at any depth, are computed once.
+
+        Args:
+            movaidb (MovaiDB): Database to read from, the global one by default
+
+        Yields:
+            UsageSearchResult: Usage of each node, then of each flow
+        """
+        movaidb = movaidb or MovaiDB()
+
+        # {"Node" or "Flow": {<name>: {<flow>: [<node instances or containers>]}}}
+        direct: Dict[str, Dict[str, Dict[str, List[str]]]] = {"Node": {}, "Flow": {}}
+        flows = UsageIndex(movaidb).read_flows()
+        for flow_name in sorted(flows, key=str.lower):
+            for field, value in sorted(UsageIndex.entries(flows[flow_name]).items()):
+                kind, instance = field.split(",", 1)
+                scope = "Node" if kind == "NodeInst" else "Flow"
+                direct[scope].setdefault(value, {}).setdefault(flow_name, []).append(instance)
+
+        parents = direct["Flow"]
+        ancestors: Dict[str, Set[str]] = {}
+
+        def reach(flow_name: str, path: frozenset = frozenset()) -> Set[str]:
+            """The flow and all the flows containing it, at any depth"""
+            try:
+                return ancestors[flow_name]
+            except KeyError:
+                pass
+            output = {flow_name}
+            for parent in parents.get(flow_name, {}):
+                if parent not in path:
+                    output |= reach(parent, path | {flow_name})
+            ancestors[flow_name] = output
+            return output
+
+        types = {
+            "Node": (
+                NodeFlowUsage,
+                DirectNodeUsageItem,
+                IndirectNodeUsageItem,
+                "node_instance_name",
+            ),
+            "Flow": (
+                FlowFlowUsage,
+                DirectFlowUsageItem,
+                IndirectFlowUsageItem,
+                "flow_instance_name",
+            ),
+        }
+
+        for scope_class in get_usage_search_scope_map().values():
+            scope = scope_class.scope
+            usage_class, direct_class, indirect_class, direct_field = types[scope]
+
+            names = set(movaidb.search_by_args(scope, Name="*")[0].get(scope, {}))
+            names.update(direct[scope])
+
+            for name in sorted(names, key=str.lower):
+                usage = UsageData(flow={})
+                for flow_name, instances in direct[scope].get(name, {}).items():
+                    usage.flow[flow_name] = usage_class(
+                        direct=[direct_class(**{direct_field: inst}) for inst in instances]
+                    )
+
+                # every flow reachable from the direct ones adds its containers
+                reachable = set()
+                for flow_name in direct[scope].get(name, {}):
+                    reachable |= reach(flow_name)
+                for child in sorted(reachable, key=str.lower):
+                    for parent, containers in parents.get(child, {}).items():
+                        entry = usage.flow.setdefault(parent, usage_class())
+                        entry.indirect.extend(
+                            indirect_class(flow_template_name=child, flow_instance_name=container)
+                            for container in containers
+                        )
+
+                yield UsageSearchResult(scope=scope, name=name, usage=usage)
+
+    def search_all(self, output: TextIO = sys.stdout) -> int:
+        """Write the usage of every node and flow as JSON, and the ones not used anywhere.
+
+        The document is written while the results are computed:
+            {"usage": [<UsageSearchResult>, ...], "unused": {"Node": [...], "Flow": [...]}}
+
+        Args:
+            output (TextIO): Where to write, stdout by default
+
+        Returns:
+            int: Exit code (0 for success)
+        """
+        unused: Dict[str, List[str]] = {"Node": [], "Flow": []}
+
+        output.write('{"usage": [')
+        for idx, result in enumerate(self.usage_matrix()):
+            if not result.usage.flow:
+                unused[result.scope].append(result.name)
+            output.write(",\n" if idx else "\n")
+            output.write(json.dumps(result.model_dump()))
+            if self.debug:
+                print(f"{result.scope} '{result.name}' done", file=sys.stderr)
+        output.write(f'\n], "unused": {json.dumps(unused)}}}\n')
+        output.flush()
+
+        return 0
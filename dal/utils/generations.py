@@ -0,0 +1,61 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Generation stamps of the objects stored in redis
+
+   Every write of an object of the scopes launch plans are computed from
+   moves its generation and the generation of its scope forward, the stamps
+   are kept in a single hash so any process can check a set of objects, or
+   whole scopes, for changes in one read instead of reading the objects:
+       _generations: hash {"<scope>:<name>": <number of writes>,
+                           "<scope>": <number of writes of its objects>}
+
+   An object that was never written since the stamps exist has no stamp,
+   writes of an object with no stamp still give it a new one. The key has
+   no ':' so it is never taken as an object of a scope.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+GENERATIONS_KEY = "_generations"
+
+# scopes with generation stamps, writes of other objects are not stamped
+SCOPES = ("Flow", "Node", "Ports", "Configuration")
+
+# <scope>:<name> of the keys of an object
+OBJECT_KEY_REGEX = re.compile(r"^([A-Z]\w*):([^,:*?[]+)")
+
+
+def object_names(keys: Iterable[str]) -> Set[str]:
+    """<scope>:<name> of the objects with keys in the keys"""
+    names = set()
+    for key in keys:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        match = OBJECT_KEY_REGEX.match(key)
+        if match:
+            names.add(f"{match.group(1)}:{match.group(2)}")
+    return names
+
+
+def bump(conn, keys: Iterable[str]) -> None:
+    """
+    Move forward the generation of the objects written in the keys and of
+    their scopes, conn may be a pipeline
+    """
+    names = {name for name in object_names(keys) if name.split(":", 1)[0] in SCOPES}
+    for name in sorted(names):
+        conn.hincrby(GENERATIONS_KEY, name, 1)
+    for scope in sorted({name.split(":", 1)[0] for name in names}):
+        conn.hincrby(GENERATIONS_KEY, scope, 1)
+
+
+def stamps(conn, names: Iterable[str]) -> Dict[str, Optional[int]]:
+    """Generation of each one of the objects, <scope>:<name>, or scopes, read at once"""
+    names: List[str] = list(names)
+    if not names:
+        return {}
+    values = conn.hmget(GENERATIONS_KEY, names)
+    return {name: None if value is None else int(value) for name, value in zip(names, values)}
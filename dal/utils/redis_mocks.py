@@ -2,6 +2,7 @@ import asyncio
 import logging
 import os
 import pickle
+import threading
 from fnmatch import fnmatch
 from typing import Any, Callable, Dict, List, Optional, Type
 from unittest.mock import _patch, _get_target
@@ -14,6 +15,9 @@ import aioredis
 # Set to False to mock Redis using pre-saved interactions
 RECORD = False
 
+MULTI = "(('MULTI',), {})"
+EXEC = "(('EXEC',), {})"
+
 
 logger = logging.getLogger("RedisProxies")
 
@@ -34,6 +38,10 @@ class _fake_redis(_patch):
 
             __responses = {}
             __last_out: List[Optional[str]] = [None]
+            # commands of a pipeline whose responses are still to be read
+            __queued: List[str] = []
+            # commands of the transaction of the pipeline, answered by EXEC
+            __transaction: List[str] = []
 
             def __init__(self, host, port, db=0, **kwargs):
                 if not RECORD:
@@ -80,7 +88,26 @@ class _fake_redis(_patch):
                                 msg,
                             )
 
-            def read_response(self, *a, **kw):
+            def pack_commands(self, commands):
+                # pipelines send all the commands at once, the responses are
+                # recorded and replayed for each one of the commands
+                outs = [f"({args}, {{}})" for args in commands]
+                FakeConnection.__queued[:] = outs
+                transaction = outs and outs[0] == MULTI
+                FakeConnection.__transaction[:] = outs[1:-1] if transaction else []
+                return super().pack_commands(commands) if RECORD else []
+
+            def send_packed_command(self, command):
+                if RECORD:
+                    super().send_packed_command(command)
+
+            @staticmethod
+            def record(out, value):
+                FakeConnection.__responses[out] = value
+                with open(recording_path, "wb") as f:
+                    pickle.dump(FakeConnection.__responses, f)
+
+            def read_command_response(self, out, *a, **kw):
                 if RECORD:
                     try:
                         value = super().read_response(*a, **kw)
@@ -88,12 +115,34 @@ class _fake_redis(_patch):
                         logger.warning("GOT EXC: %s", e)
                         value = e
 
-                    FakeConnection.__responses[FakeConnection.__last_out[0]] = value
-                    with open(recording_path, "wb") as f:
-                        pickle.dump(FakeConnection.__responses, f)
+                    FakeConnection.record(out, value)
                     logger.debug("returning %s", value)
                 else:
-                    value = FakeConnection.__responses[FakeConnection.__last_out[0]]
+                    value = FakeConnection.__responses[out]
+                return value
+
+            def read_queued_response(self, *a, **kw):
+                out = FakeConnection.__queued.pop(0)
+                transaction = FakeConnection.__transaction
+                if out == MULTI:
+                    return super().read_response(*a, **kw) if RECORD else b"OK"
+                if out == EXEC:
+                    # the responses of the commands of the transaction
+                    if not RECORD:
+                        return [FakeConnection.__responses[command] for command in transaction]
+                    value = super().read_response(*a, **kw)
+                    for command, response in zip(transaction, value or []):
+                        FakeConnection.record(command, response)
+                    return value
+                if transaction:
+                    return super().read_response(*a, **kw) if RECORD else b"QUEUED"
+                return self.read_command_response(out, *a, **kw)
+
+            def read_response(self, *a, **kw):
+                if FakeConnection.__queued:
+                    value = self.read_queued_response(*a, **kw)
+                else:
+                    value = self.read_command_response(FakeConnection.__last_out[0], *a, **kw)
 
                 if isinstance(value, Exception):
                     raise value
@@ -198,3 +247,217 @@ class FakeAsyncPool(aioredis.ConnectionsPool):
             fut = asyncio.get_running_loop().create_future()
             fut.set_result(FakeAsyncConnection(None, None, address=address))
             return fut
+
+
+def _encode(value) -> bytes:
+    """Encode a value the way redis-py sends it"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, bool):
+        raise redis.DataError("Invalid input of type: 'bool'")
+    return str(value).encode("utf-8")
+
+
+class FakeRedis:
+    """In memory redis with the subset of commands used by the persistence
+    layer, answers as redis-py does (bytes keys and values). Calling the
+    instance returns itself so it can replace the Redis class"""
+
+    def __init__(self):
+        self.data: Dict[bytes, Any] = {}
+        self.lock = threading.RLock()
+        # every command executed, (name, args)
+        self.commands: List[tuple] = []
+
+    def __call__(self, *args, **kwargs) -> "FakeRedis":
+        return self
+
+    def _run(self, name: str, *args, **kwargs):
+        with self.lock:
+            self.commands.append((name, args))
+            return getattr(self, f"_{name}")(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not hasattr(type(self), f"_{name}"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._run(name, *args, **kwargs)
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self, transaction)
+
+    def _get_typed(self, key, kind):
+        value = self.data.get(_encode(key))
+        if value is not None and not isinstance(value, kind):
+            raise redis.ResponseError(
+                "WRONGTYPE Operation against a key holding the wrong kind of value"
+            )
+        return value
+
+    # server
+
+    def _info(self, section=None):
+        # no memory limit
+        return {"maxmemory": 2**63, "used_memory": 0}
+
+    # keys
+
+    def _keys(self, pattern="*"):
+        pattern = _encode(pattern).decode("utf-8")
+        return [key for key in list(self.data) if fnmatch(key.decode("utf-8"), pattern)]
+
+    def _scan_iter(self, match=None, count=None):
+        return iter(self._keys(match or "*"))
+
+    def _exists(self, *keys):
+        return sum(1 for key in keys if _encode(key) in self.data)
+
+    def _delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(_encode(key), None) is not None)
+
+    _unlink = _delete
+
+    def _rename(self, src, dst):
+        if _encode(src) not in self.data:
+            raise redis.ResponseError("no such key")
+        self.data[_encode(dst)] = self.data.pop(_encode(src))
+        return True
+
+    def _type(self, key):
+        value = self.data.get(_encode(key))
+        for kind, name in ((bytes, b"string"), (dict, b"hash"), (list, b"list"), (set, b"set")):
+            if isinstance(value, kind):
+                return name
+        return b"none"
+
+    # strings
+
+    def _get(self, key):
+        return self._get_typed(key, bytes)
+
+    def _mget(self, keys, *args):
+        # keys of other types are nil, as in redis
+        values = [self.data.get(_encode(key)) for key in [*keys, *args]]
+        return [value if isinstance(value, bytes) else None for value in values]
+
+    def _set(self, key, value, **kwargs):
+        self.data[_encode(key)] = _encode(value)
+        return True
+
+    # hashes
+
+    def _hset(self, key, field, value):
+        values = self._get_typed(key, dict)
+        if values is None:
+            values = self.data[_encode(key)] = {}
+        new = _encode(field) not in values
+        values[_encode(field)] = _encode(value)
+        return int(new)
+
+    def _hmset(self, key, mapping):
+        for field, value in mapping.items():
+            self._hset(key, field, value)
+        return True
+
+    def _hget(self, key, field):
+        return (self._get_typed(key, dict) or {}).get(_encode(field))
+
+    def _hmget(self, key, fields, *args):
+        values = self._get_typed(key, dict) or {}
+        return [values.get(_encode(field)) for field in [*fields, *args]]
+
+    def _hgetall(self, key):
+        return dict(self._get_typed(key, dict) or {})
+
+    def _hincrby(self, key, field, amount=1):
+        value = int(self._hget(key, field) or 0) + amount
+        self._hset(key, field, value)
+        return value
+
+    def _hdel(self, key, *fields):
+        values = self._get_typed(key, dict) or {}
+        removed = sum(1 for field in fields if values.pop(_encode(field), None) is not None)
+        if not values:
+            self.data.pop(_encode(key), None)
+        return removed
+
+    # lists
+
+    def _rpush(self, key, *values):
+        items = self._get_typed(key, list)
+        if items is None:
+            items = self.data[_encode(key)] = []
+        items.extend(_encode(value) for value in values)
+        return len(items)
+
+    def _lrange(self, key, start, end):
+        items = self._get_typed(key, list) or []
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    # sets
+
+    def _sadd(self, key, *values):
+        members = self._get_typed(key, set)
+        if members is None:
+            members = self.data[_encode(key)] = set()
+        new = {_encode(value) for value in values} - members
+        members.update(new)
+        return len(new)
+
+    def _srem(self, key, *values):
+        members = self._get_typed(key, set) or set()
+        removed = members & {_encode(value) for value in values}
+        members.difference_update(removed)
+        if not members:
+            self.data.pop(_encode(key), None)
+        return len(removed)
+
+    def _smembers(self, key):
+        return set(self._get_typed(key, set) or set())
+
+    def _spop(self, key, count=None):
+        members = self._get_typed(key, set) or set()
+        popped = [members.pop() for _ in range(min(len(members), count or 1))]
+        if not members:
+            self.data.pop(_encode(key), None)
+        if count is None:
+            return popped[0] if popped else None
+        return popped
+
+
+class FakePipeline:
+    """Pipeline of a FakeRedis, the commands run when executed, a
+    transaction runs them holding the lock of the database"""
+
+    def __init__(self, db: FakeRedis, transaction: bool = True):
+        self.db = db
+        self.transaction = transaction
+        self.command_stack: List[tuple] = []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not hasattr(FakeRedis, f"_{name}"):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.command_stack.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def __enter__(self) -> "FakePipeline":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.command_stack = []
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        commands, self.command_stack = self.command_stack, []
+        with self.db.lock:
+            results = []
+            for name, args, kwargs in commands:
+                try:
+                    results.append(self.db._run(name, *args, **kwargs))
+                except redis.ResponseError as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+            return results
@@ -0,0 +1,51 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Keys of the objects of a scope, listed with a single scan
+
+   A get of many objects by name makes a single pattern matching none of
+   their keys, callers list the keys of a scope once and read the ones of
+   the objects they need with MovaiDB.get_many.
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+
+
+def _movaidb(movaidb: Optional["MovaiDB"]) -> "MovaiDB":
+    if movaidb is None:
+        # pylint: disable=import-outside-toplevel
+        from dal.movaidb import MovaiDB
+
+        movaidb = MovaiDB()
+    return movaidb
+
+
+def scope_keys(scope: str, movaidb: Optional["MovaiDB"] = None) -> Dict[str, List[str]]:
+    """Keys of every object of a scope by name, with a single scan"""
+    movaidb = _movaidb(movaidb)
+    keys: Dict[str, List[str]] = {}
+    for key in movaidb.search(movaidb.get_search_dict(scope, Name="*")):
+        # <scope>:<name>,<attribute>:...
+        name = key.split(",", 1)[0].split(":", 1)[-1]
+        keys.setdefault(name, []).append(key)
+    return keys
+
+
+def scopes_keys(
+    scopes: Iterable[str], movaidb: Optional["MovaiDB"] = None
+) -> Dict[str, Dict[str, List[str]]]:
+    """Keys of every object of many scopes by scope and name, with a single scan"""
+    movaidb = _movaidb(movaidb)
+    wanted = set(scopes)
+    keys: Dict[str, Dict[str, List[str]]] = {scope: {} for scope in wanted}
+    for key in movaidb.db_read.scan_iter(count=1000):
+        key = key.decode("utf-8") if isinstance(key, bytes) else key
+        scope, separator, rest = key.partition(":")
+        if not separator or scope not in wanted:
+            continue
+        keys[scope].setdefault(rest.split(",", 1)[0], []).append(key)
+    return keys
@@ -0,0 +1,390 @@
+"""
+   Copyright (C) Mov.ai  - All Rights Reserved
+   Unauthorized copying of this file, via any medium is strictly prohibited
+   Proprietary and confidential
+
+   Inverted usage index of node templates, flows and callbacks
+
+   For every flow the index keeps its node instances, containers,
+   exposed ports and links, for every node template and flow the set
+   of (flow, instance) using it, for every port of a node template the
+   flows exposing it and for every port of an instance the links to it:
+       _usage_index/Flow/<flow>: hash {"NodeInst,<inst>": <node>, "Container,<name>": <subflow>,
+                                       "ExposedPorts,<node>,<inst>,<exposed port>": <port>,
+                                       "Links,<id>": <json link>}
+       _usage_index/used_by/Node/<node>: set {"<flow>,<node instance>"}
+       _usage_index/used_by/Flow/<subflow>: set {"<flow>,<container>"}
+       _usage_index/exposed/<node>/<port>: set {"<flow>,<node instance>,<exposed port>"}
+       _usage_index/linked/<flow>/<node instance>/<port>: set {<link id>}
+
+   For every node the index keeps the callbacks of its inputs, and for
+   every callback the inputs using it:
+       _usage_index/Node/<node>: hash {"In,<port instance>,<input>": <callback>}
+       _usage_index/used_by/Callback/<callback>: set {"<node>,<port instance>,<input>"}
+
+   Writes of flows and nodes only add them to a dirty set, dirty objects
+   are indexed again before answering a query. The keys have no ':' so
+   they are never taken as objects of a scope.
+"""
+import json
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from movai_core_shared.logger import Log
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+
+PREFIX = "_usage_index/"
+DIRTY_KEY = f"{PREFIX}dirty"
+DIRTY_NODES_KEY = f"{PREFIX}dirty_nodes"
+READY_KEY = f"{PREFIX}ready"
+
+# flow attributes read by usage queries and the ones the index is built from
+USAGE_FIELDS = ("NodeInst", "Container")
+INDEX_FIELDS = (*USAGE_FIELDS, "ExposedPorts", "Links")
+
+# keys of the flow attributes the index is built from
+USAGE_KEY_REGEX = re.compile(r"^Flow:([^,:*?[]+),(?:%s):" % "|".join(INDEX_FIELDS))
+
+# keys of the node attributes the index is built from
+NODE_KEY_REGEX = re.compile(r"^Node:([^,:*?[]+),PortsInst:")
+
+# <port>/<direction> in exposed ports
+EXPOSED_PORT_REGEX = re.compile(r"^(.+)/")
+
+# <node instance>/<port>/<direction> in link endpoints
+LINK_END_REGEX = re.compile(r"^([^/]+)/([^/]+)/.+$")
+
+LOGGER = Log.get_logger("usage_index.mov.ai")
+
+
+def dirty_flows(keys: Iterable[str]) -> Set[str]:
+    """Names of the flows with indexed attributes in the keys"""
+    flows = set()
+    for key in keys:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        match = USAGE_KEY_REGEX.match(key)
+        if match:
+            flows.add(match.group(1))
+    return flows
+
+
+def dirty_nodes(keys: Iterable[str]) -> Set[str]:
+    """Names of the nodes with port instances in the keys"""
+    nodes = set()
+    for key in keys:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        match = NODE_KEY_REGEX.match(key)
+        if match:
+            nodes.add(match.group(1))
+    return nodes
+
+
+def mark_dirty(conn, keys: Iterable[str]) -> None:
+    """Add the flows and nodes written in the keys to the dirty sets, conn may be a pipeline"""
+    keys = list(keys)
+    flows = dirty_flows(keys)
+    if flows:
+        conn.sadd(DIRTY_KEY, *flows)
+    nodes = dirty_nodes(keys)
+    if nodes:
+        conn.sadd(DIRTY_NODES_KEY, *nodes)
+
+
+def mark_written(conn, scope: str, name: str, attributes: Optional[Iterable[str]] = None) -> None:
+    """
+    Add a flow or a node to its dirty set when its indexed attributes, any
+    attribute if attributes is None, were written, conn may be a pipeline
+    """
+    if scope == "Flow":
+        indexed, dirty_key = INDEX_FIELDS, DIRTY_KEY
+    elif scope == "Node":
+        indexed, dirty_key = ("PortsInst",), DIRTY_NODES_KEY
+    else:
+        return
+    if attributes is None or not set(indexed).isdisjoint(attributes):
+        conn.sadd(dirty_key, name)
+
+
+def _sort(items: Iterable[str]) -> List[str]:
+    return sorted(items, key=lambda item: (item.lower(), item))
+
+
+class UsageIndex:
+    """
+    Answers direct and indirect usage queries of node templates, flows and callbacks
+    """
+
+    def __init__(self, movaidb: Optional["MovaiDB"] = None):
+        if movaidb is None:
+            # pylint: disable=import-outside-toplevel
+            from dal.movaidb import MovaiDB
+
+            movaidb = MovaiDB()
+
+        self.movaidb = movaidb
+        # the index is read after being updated, always use the master
+        self.conn = movaidb.db_write
+
+    @staticmethod
+    def flow_key(flow: str) -> str:
+        return f"{PREFIX}Flow/{flow}"
+
+    @staticmethod
+    def node_key(node: str) -> str:
+        return f"{PREFIX}Node/{node}"
+
+    @staticmethod
+    def used_by_key(scope: str, name: str) -> str:
+        return f"{PREFIX}used_by/{scope}/{name}"
+
+    @staticmethod
+    def entries(flow_data: dict) -> Dict[str, str]:
+        """
+        Index entries of a flow, {"NodeInst,<inst>": <node>, "Container,<name>": <subflow>}
+        """
+        entries = {}
+        for name, node_inst in (flow_data.get("NodeInst") or {}).items():
+            if isinstance(node_inst, dict) and node_inst.get("Template"):
+                entries[f"NodeInst,{name}"] = node_inst["Template"]
+        for name, container in (flow_data.get("Container") or {}).items():
+            if isinstance(container, dict) and container.get("ContainerFlow"):
+                entries[f"Container,{name}"] = container["ContainerFlow"]
+        return entries
+
+    @staticmethod
+    def exposed_key(node: str, port: str) -> str:
+        return f"{PREFIX}exposed/{node}/{port}"
+
+    @staticmethod
+    def linked_key(flow: str, node_inst: str, port: str) -> str:
+        return f"{PREFIX}linked/{flow}/{node_inst}/{port}"
+
+    @staticmethod
+    def port_entries(flow_data: dict) -> Dict[str, str]:
+        """
+        Exposed ports and links of a flow,
+        {"ExposedPorts,<node>,<inst>,<exposed port>": <port>, "Links,<id>": <json link>}
+        """
+        entries = {}
+        for node, node_insts in (flow_data.get("ExposedPorts") or {}).items():
+            if not isinstance(node_insts, dict):
+                continue
+            for name, ports in node_insts.items():
+                for port in ports or []:
+                    match = EXPOSED_PORT_REGEX.match(port)
+                    if match:
+                        entries[f"ExposedPorts,{node},{name},{port}"] = match.group(1)
+        for link_id, link in (flow_data.get("Links") or {}).items():
+            if isinstance(link, dict):
+                entries[f"Links,{link_id}"] = json.dumps(link, sort_keys=True, default=str)
+        return entries
+
+    @staticmethod
+    def callback_entries(node_data: dict) -> Dict[str, str]:
+        """Callbacks of the inputs of a node, {"In,<port instance>,<input>": <callback>}"""
+        entries = {}
+        for port_inst, ports in (node_data.get("PortsInst") or {}).items():
+            for name, port_in in ((ports or {}).get("In") or {}).items():
+                if isinstance(port_in, dict) and port_in.get("Callback"):
+                    entries[f"In,{port_inst},{name}"] = port_in["Callback"]
+        return entries
+
+    @classmethod
+    def _members(cls, owner: str, field: str, value: str) -> Set[Tuple[str, str]]:
+        """The (set, member) pairs an entry of a flow or node adds to the index"""
+        kind, name = field.split(",", 1)
+        if kind == "In":
+            return {(cls.used_by_key("Callback", value), f"{owner},{name}")}
+        if kind == "NodeInst":
+            return {(cls.used_by_key("Node", value), f"{owner},{name}")}
+        if kind == "Container":
+            return {(cls.used_by_key("Flow", value), f"{owner},{name}")}
+        if kind == "ExposedPorts":
+            node, exposed = name.split(",", 1)
+            return {(cls.exposed_key(node, value), f"{owner},{exposed}")}
+
+        members = set()
+        link = json.loads(value)
+        for end in ("From", "To"):
+            match = LINK_END_REGEX.match(link.get(end) or "")
+            if match:
+                members.add((cls.linked_key(owner, *match.groups()), name))
+        return members
+
+    def read_flows(self, flow: str = "*", fields: Iterable[str] = USAGE_FIELDS) -> Dict[str, dict]:
+        """Read the node instances and containers of a flow, all the flows with *"""
+        # a get with many attributes makes a single pattern matching none of
+        # them, the keys of the attributes are scanned and read in batches
+        prefixes = tuple(f",{field}:" for field in fields)
+        keys = []
+        for key in self.movaidb.db_read.scan_iter(match=f"Flow:{flow},*", count=1000):
+            key = key.decode("utf-8") if isinstance(key, bytes) else key
+            if key[key.find(",") :].startswith(prefixes):
+                keys.append(key)
+        data = self.movaidb.get_many(keys) if keys else {}
+        return data.get("Flow") or {}
+
+    def read_nodes(self, node: str = "*") -> Dict[str, dict]:
+        """Read the callbacks of the inputs of a node, all the nodes with *"""
+        # callbacks are stored in the keys, no values to read
+        data = self.movaidb.find(
+            {"Node": {node: {"PortsInst": {"*": {"In": {"*": {"Callback": "*"}}}}}}}
+        )
+        return (data or {}).get("Node") or {}
+
+    def _entries(self, flow_data: dict) -> Dict[str, str]:
+        return {**self.entries(flow_data), **self.port_entries(flow_data)}
+
+    def rebuild(self) -> None:
+        """Build the whole index reading all the flows and nodes once"""
+        self.conn.delete(DIRTY_KEY, DIRTY_NODES_KEY)
+        flows = self.read_flows(fields=INDEX_FIELDS)
+        nodes = self.read_nodes()
+
+        stale = list(self.conn.scan_iter(f"{PREFIX}*", count=1000))
+
+        pipe = self.conn.pipeline(transaction=True)
+        if stale:
+            pipe.delete(*stale)
+
+        objects = [
+            *((self.flow_key(flow), flow, self._entries(data)) for flow, data in flows.items()),
+            *(
+                (self.node_key(node), node, self.callback_entries(data))
+                for node, data in nodes.items()
+            ),
+        ]
+        for hash_key, owner, entries in objects:
+            if not entries:
+                continue
+            pipe.hmset(hash_key, entries)
+            for field, value in entries.items():
+                for key, member in self._members(owner, field, value):
+                    pipe.sadd(key, member)
+
+        pipe.set(READY_KEY, 1)
+        pipe.execute()
+
+    def update_flow(self, flow: str) -> None:
+        """Index a flow again"""
+        entries = self._entries(self.read_flows(flow, INDEX_FIELDS).get(flow, {}))
+        self._update(self.flow_key(flow), flow, entries)
+
+    def update_node(self, node: str) -> None:
+        """Index a node again"""
+        self._update(
+            self.node_key(node), node, self.callback_entries(self.read_nodes(node).get(node, {}))
+        )
+
+    def _update(self, hash_key: str, owner: str, entries: Dict[str, str]) -> None:
+        previous = {
+            field.decode("utf-8"): value.decode("utf-8")
+            for field, value in self.conn.hgetall(hash_key).items()
+        }
+
+        pipe = self.conn.pipeline(transaction=True)
+        for field, value in previous.items():
+            if entries.get(field) != value:
+                for key, member in self._members(owner, field, value):
+                    pipe.srem(key, member)
+
+        for field, value in entries.items():
+            if previous.get(field) != value:
+                for key, member in self._members(owner, field, value):
+                    pipe.sadd(key, member)
+
+        pipe.delete(hash_key)
+        if entries:
+            pipe.hmset(hash_key, entries)
+        pipe.execute()
+
+    def refresh(self) -> None:
+        """Bring the index up to date, only the objects written since the last query are read"""
+        if not self.conn.exists(READY_KEY):
+            LOGGER.info("Building the usage index")
+            self.rebuild()
+            return
+
+        # objects are removed from the dirty set before being read, a write
+        # happening meanwhile adds the object back
+        for dirty_key, update in (
+            (DIRTY_KEY, self.update_flow),
+            (DIRTY_NODES_KEY, self.update_node),
+        ):
+            while True:
+                names = self.conn.spop(dirty_key, 100)
+                if not names:
+                    break
+                for name in names:
+                    update(name.decode("utf-8"))
+
+    def used_by(self, scope: str, name: str) -> Dict[str, List[str]]:
+        """
+        Flows using a node template (scope Node) or a flow (scope Flow) directly,
+        {<flow>: [<node instances or containers>]}, or the nodes using a callback
+        (scope Callback), {<node>: ["<port instance>,<input>"]}
+        """
+        output: Dict[str, List[str]] = {}
+        for member in self.conn.smembers(self.used_by_key(scope, name)):
+            flow, instance = member.decode("utf-8").split(",", 1)
+            output.setdefault(flow, []).append(instance)
+
+        return {flow: _sort(output[flow]) for flow in _sort(output)}
+
+    def indirect(self, flows: Iterable[str]) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Flows that use the given flows as subflows, at any depth,
+        {<parent flow>: [(<child flow>, <container>)]}
+        """
+        output: Dict[str, List[Tuple[str, str]]] = {}
+        seen = set()
+        processed = set()
+        queue = list(flows)
+
+        while queue:
+            child = queue.pop(0)
+            if child in processed:
+                continue
+            processed.add(child)
+
+            for parent, containers in self.used_by("Flow", child).items():
+                if parent not in output:
+                    output[parent] = []
+                    queue.append(parent)
+                for container in containers:
+                    if (parent, child, container) not in seen:
+                        seen.add((parent, child, container))
+                        output[parent].append((child, container))
+
+        return output
+
+    def exposed(self, node: str, port: str) -> List[Tuple[str, str, str]]:
+        """
+        Flows exposing a port of a node template, [(<flow>, <node instance>, <exposed port>)],
+        the node template of a container is __<subflow>
+        """
+        members = [
+            tuple(member.decode("utf-8").split(",", 2))
+            for member in self.conn.smembers(self.exposed_key(node, port))
+        ]
+        return sorted(members)
+
+    def links(self, flow: str, node_inst: str, port: str) -> Dict[str, dict]:
+        """Links of a flow from or to a port of a node instance, {<link id>: <link>}"""
+        link_ids = _sort(
+            member.decode("utf-8")
+            for member in self.conn.smembers(self.linked_key(flow, node_inst, port))
+        )
+        if not link_ids:
+            return {}
+
+        values = self.conn.hmget(self.flow_key(flow), [f"Links,{link_id}" for link_id in link_ids])
+        return {
+            link_id: json.loads(value)
+            for link_id, value in zip(link_ids, values)
+            if value is not None
+        }
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from movai_core_shared import Log
 from movai_core_shared.exceptions import DoesNotExist
 from dal.scopes.flow import Flow
@@ -8,6 +10,7 @@ from dal.validation.project_validator import (
     Summary,
     ProjectValidationResult,
 )
+from dal.validation.validation_cache import ValidationCache
 
 LOGGER = Log.get_logger(__name__)
 
@@ -15,29 +18,35 @@ LOGGER = Log.get_logger(__name__)
 class FlowValidator:
     """
     Validates a specific flow within the project.
+
+    With a cache the flow is only checked again when it or any of the
+    objects it depends on changed since its issues were stored.
     """
 
-    def __init__(self, flow_ref: str):
+    def __init__(self, flow_ref: str, cache: Optional[ValidationCache] = None):
         try:
             self.flow = Flow(flow_ref)
         except Exception as e:
             LOGGER.error(f"Error initializing FlowValidator for flow {flow_ref}: {e}")
             raise DoesNotExist(f"Error initializing FlowValidator for flow {flow_ref}: {e}")
 
-        self.project = ProjectValidator()
+        self.project = ProjectValidator(cache=cache)
         self.flow_ref = flow_ref
         self.issues = []
 
-    def validate_flow(self) -> ProjectValidationResult:
+    def validate_flow(self, force: bool = False) -> ProjectValidationResult:
         """
         Validate a specific flow by its reference.
 
+        Args:
+            force: Check the flow even if it has cached issues.
+
         Returns:
             ProjectValidationResult: The result of the flow validation, including issues found.
         """
         try:
             # Validate the specific flow
-            self.issues.extend(self.project.check_flow(self.flow_ref))
+            self.issues.extend(self.project.check_flow_cached(self.flow_ref, force))
 
         except Exception as e:
             LOGGER.error(f"Error validating flow {self.flow_ref}: {e}")
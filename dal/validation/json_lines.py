@@ -0,0 +1,75 @@
+"""
+Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Line numbers of the keys of a document as shown in the IDE.
+
+Documents are shown serialized with json.dumps(indent=4, sort_keys=True),
+the index walks the document once following the same layout and records
+the line of every key path, so locating a key is a dict lookup instead of
+serializing and scanning the document again.
+"""
+from threading import Lock
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from cachetools import LRUCache
+
+LineIndex = Dict[Tuple[str, ...], int]
+
+
+def _walk(value: Any, path: Tuple[str, ...], line: int, index: LineIndex) -> int:
+    """Index the keys of a value starting at a line, returns the last line of the value"""
+    if isinstance(value, dict):
+        items = sorted(value.items())
+    elif isinstance(value, (list, tuple)):
+        items = [(position, item) for position, item in enumerate(value)]
+    else:
+        return line
+
+    if not items:
+        # {} or []
+        return line
+
+    current = line + 1
+    for key, item in items:
+        child = (*path, str(key))
+        if isinstance(value, dict):
+            index.setdefault(child, current)
+        current = _walk(item, child, current, index) + 1
+
+    # closing bracket
+    return current
+
+
+def json_line_index(document: dict) -> LineIndex:
+    """Line, 1-indexed, of every key path of a document serialized with indent=4 and sort_keys"""
+    index: LineIndex = {}
+    _walk(document, (), 1, index)
+    return index
+
+
+class LineIndexCache:
+    """
+    Line indexes of the last documents used. Documents are identified by
+    their id and kept alive by the cache, they must not be changed.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = Lock()
+
+    def get(self, document: dict) -> LineIndex:
+        with self._lock:
+            entry = self._cache.get(id(document))
+        if entry is not None and entry[0] is document:
+            return entry[1]
+
+        index = json_line_index(document)
+        with self._lock:
+            self._cache[id(document)] = (document, index)
+        return index
+
+    def find(self, document: dict, path: Sequence[str]) -> Optional[int]:
+        """Line of a key path of a document, None if the document has no such path"""
+        return self.get(document).get(tuple(path))
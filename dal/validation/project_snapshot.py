@@ -0,0 +1,113 @@
+"""
+Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Read only snapshot of the project documents used by the validation.
+
+All the Flows, Nodes and Configurations of the workspace are read with a
+single bulk read per scope,
+the documents have the same format as the legacy Scope.get_dict(), so the
+line numbers of the issues do not change. The documents are shared by all
+the checks, they must not be changed.
+"""
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from movai_core_shared.logger import Log
+
+from dal.movaidb.db_schema import DBSchema
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+
+LOGGER = Log.get_logger("ProjectSnapshot")
+
+# scopes read by the project validation
+SNAPSHOT_SCOPES = ("Flow", "Node", "Configuration")
+
+
+def _defaults(scope: str) -> dict:
+    """Values of the first level attributes missing in a document, as in Scope.get_dict()"""
+    defaults = {}
+    for key, value in DBSchema()[scope]["$name"].items():
+        if isinstance(value, dict):
+            continue
+        if value == "list":
+            defaults[key] = []
+        elif value == "hash":
+            defaults[key] = {}
+        else:
+            defaults[key] = ""
+    return defaults
+
+
+def _movaidb(movaidb: Optional["MovaiDB"]) -> "MovaiDB":
+    if movaidb is None:
+        # pylint: disable=import-outside-toplevel
+        from dal.movaidb import MovaiDB
+
+        movaidb = MovaiDB()
+    return movaidb
+
+
+def _documents(scope: str, data: dict) -> Dict[str, dict]:
+    defaults = _defaults(scope)
+    return {
+        name: {scope: {name: {**defaults, **content}}}
+        for name, content in ((data or {}).get(scope) or {}).items()
+        if isinstance(content, dict)
+    }
+
+
+def read_document(scope: str, name: str, movaidb: Optional["MovaiDB"] = None) -> Optional[dict]:
+    """Read the document of an object as in Scope.get_dict(), None if it does not exist"""
+    data = _movaidb(movaidb).get({scope: {name: "**"}})
+    return _documents(scope, data).get(name)
+
+
+def read_documents(
+    scope: str, keys: Dict[str, List[str]], movaidb: Optional["MovaiDB"] = None
+) -> Dict[str, dict]:
+    """Documents of the objects of a scope as in Scope.get_dict(), read by their keys in batches"""
+    data = _movaidb(movaidb).get_many([key for object_keys in keys.values() for key in object_keys])
+    return _documents(scope, data)
+
+
+class ProjectSnapshot:
+    """
+    Flows, Nodes and Configurations of the project,
+    {<scope>: {<name>: {<scope>: {<name>: <document>}}}}
+    """
+
+    def __init__(self, documents: Dict[str, Dict[str, dict]]):
+        # scopes fully read, objects missing in them do not exist
+        self.scopes = frozenset(documents)
+        self._documents = MappingProxyType(
+            {scope: MappingProxyType(objects) for scope, objects in documents.items()}
+        )
+
+    @classmethod
+    def load(cls, movaidb: Optional["MovaiDB"] = None) -> "ProjectSnapshot":
+        """Read all the documents of the snapshot scopes, one read per scope"""
+        movaidb = _movaidb(movaidb)
+
+        documents = {}
+        for scope in SNAPSHOT_SCOPES:
+            try:
+                documents[scope] = _documents(scope, movaidb.get({scope: {"*": "**"}}))
+            except Exception as e:  # pylint: disable=broad-except
+                # documents not in the snapshot are read one at a time when used
+                LOGGER.warning(f"Could not read all the {scope} documents: {e}")
+
+        return cls(documents)
+
+    def get(self, scope: str, name: str) -> Optional[dict]:
+        """The document of an object as in Scope.get_dict(), None if not in the snapshot"""
+        return self._documents.get(scope, {}).get(name)
+
+    def read(self, scope: str, name: str, movaidb: Optional["MovaiDB"] = None) -> Optional[dict]:
+        """The document of an object, read from the database if its scope is not in the snapshot"""
+        if scope in self.scopes:
+            return self.get(scope, name)
+        return read_document(scope, name, movaidb)
@@ -4,7 +4,9 @@ Unauthorized copying of this file, via any medium is strictly prohibited
 Proprietary and confidential
 """
 
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from dal.models.scopestree import scopes
 from dal.scopes.package import Package
@@ -19,6 +21,9 @@ from dal.exceptions import (
 )
 from typing import List, Dict, Optional, Set, Tuple
 from pydantic import BaseModel, ConfigDict
+from dal.validation.json_lines import LineIndexCache
+from dal.validation.project_snapshot import ProjectSnapshot, read_document
+from dal.validation.validation_cache import ValidationCache, flow_fingerprint
 from dal.validation.issues import (
     MissingReferencedParameter,
     ProjIssue,
@@ -36,6 +41,12 @@ import re
 
 LOGGER = Log.get_logger("ProjectValidator")
 
+# Number of flows checked at the same time
+VALIDATION_WORKERS = int(os.getenv("MOVAI_VALIDATION_WORKERS", "4"))
+
+# Line of every key of the documents with issues, built once per document
+LINE_INDEXES = LineIndexCache()
+
 # Scopes to validate (same as mobtest METADATA_FOLDERS_NAME)
 VALIDATED_SCOPES = [
     "Annotation",
@@ -140,31 +151,66 @@ class ProjectValidator:
     - No duplicate MOB names across workspace
     - For each Flow, check that all referenced Flows/Nodes exist in the project
     - For each Link, validate instances exist and ports are compatible
+
+    validate() first reads all the Flows and Nodes into a snapshot and then
+    checks the flows concurrently, check_flow() alone reads only what it needs.
+
+    With a cache the issues of a flow are reused while the flow and all the
+    objects it depends on did not change, see dal.validation.validation_cache.
     """
 
-    def __init__(self):
+    def __init__(self, workers: int = VALIDATION_WORKERS, cache: Optional[ValidationCache] = None):
         """
         Initialize the ProjectValidator.
+
+        Args:
+            workers: Number of flows checked at the same time by validate().
+            cache: Where the issues of each flow are kept between runs, none by default.
         """
         self.issues: List[ProjIssue] = []
+        self._workers = max(1, workers)
+        self._cache = cache
         # Cache of all objects by scope: {"Flow": {"name1", "name2"}, "Node": {...}}
+        # built when the first check needs it
         self._objects_by_scope: Dict[str, Set[str]] = {}
         # Cache loaded Flow dictionaries to avoid repeated DAL fetches.
         self._flow_dict_cache: Dict[str, dict] = {}
+        self._snapshot: Optional[ProjectSnapshot] = None
+
+        # Shared by all the flows, so are its port type caches
+        self._link_validator = LinkValidator(objects_by_scope=self._objects_by_scope, logger=LOGGER)
 
-        # Build cache of all objects first
-        self._build_object_cache()
+    def prefetch(self) -> ProjectSnapshot:
+        """Read all the Flows and Nodes at once, the checks then read them from the snapshot."""
+        self._snapshot = ProjectSnapshot.load()
+        self._link_validator = LinkValidator(
+            objects_by_scope=self._objects_by_scope, logger=LOGGER, snapshot=self._snapshot
+        )
+        return self._snapshot
 
     def _get_flow_dict(self, flow_ref: str) -> dict:
         """Get flow dict with in-memory cache."""
+        if self._snapshot is not None:
+            flow_dict = self._snapshot.get("Flow", flow_ref)
+            if flow_dict is not None:
+                return flow_dict
         if flow_ref not in self._flow_dict_cache:
             self._flow_dict_cache[flow_ref] = Flow(flow_ref).get_dict()
         return self._flow_dict_cache[flow_ref]
 
-    def validate(self) -> ProjectValidationResult:
+    def _read(self, scope: str, name: str) -> Optional[dict]:
+        """Read a document from the snapshot, from the database before the prefetch"""
+        if self._snapshot is not None:
+            return self._snapshot.read(scope, name)
+        return read_document(scope, name)
+
+    def validate(self, force: bool = False) -> ProjectValidationResult:
         """
         Validate the project data.
 
+        Args:
+            force: Check all the flows, even the ones with cached issues.
+
         Returns:
             ProjectValidationResult: The result of the project validation, including issues found.
         """
@@ -174,10 +220,18 @@ class ProjectValidator:
         # Run validations
         self._check_duplicates()
 
-        flow_refs = self._objects_by_scope.get("Flow", set())
+        self._ensure_object_cache()
+        self.prefetch()
+        LOGGER.info(f"Project read in {time.perf_counter() - start_time:.2f} seconds")
 
-        for flow_ref in flow_refs:
-            self.issues.extend(self.check_flow(flow_ref))
+        flow_refs = sorted(self._objects_by_scope.get("Flow", set()))
+
+        # map keeps the order of the flows, issues are always in the same order
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            for flow_issues in executor.map(
+                lambda flow_ref: self.check_flow_cached(flow_ref, force), flow_refs
+            ):
+                self.issues.extend(flow_issues)
 
         # Build summary
         error_count = sum(1 for issue in self.issues if issue.severity == Severity.ERROR)
@@ -194,21 +248,40 @@ class ProjectValidator:
                 warning_count=warning_count,
                 scopes_checked=VALIDATED_SCOPES,
             ),
-            issues=[
-                ProjectIssue(
-                    category=issue.category,
-                    iss_type=issue.iss_type,
-                    severity=issue.severity,
-                    msg=issue.msg,
-                    json_path=getattr(issue, "json_path", "N/A"),
-                    document_type=getattr(issue, "document_type", "Unknown"),
-                    document_name=getattr(issue, "document_name", "Unknown"),
-                    line_start=getattr(issue, "line_start", None),
-                )
-                for issue in self.issues
-            ],
+            issues=[self._project_issue(issue) for issue in self.issues],
+        )
+
+    @staticmethod
+    def _project_issue(issue: ProjIssue) -> ProjectIssue:
+        return ProjectIssue(
+            category=issue.category,
+            iss_type=issue.iss_type,
+            severity=issue.severity,
+            msg=issue.msg,
+            json_path=getattr(issue, "json_path", "N/A"),
+            document_type=getattr(issue, "document_type", "Unknown"),
+            document_name=getattr(issue, "document_name", "Unknown"),
+            line_start=getattr(issue, "line_start", None),
+        )
+
+    @staticmethod
+    def _proj_issue(issue: ProjectIssue) -> ProjIssue:
+        return ProjIssue(
+            category=issue.category,
+            iss_type=issue.iss_type,
+            severity=issue.severity,
+            msg=issue.msg,
+            json_path=issue.json_path,
+            line_start=issue.line_start,
+            document_type=issue.document_type,
+            document_name=issue.document_name,
         )
 
+    def _ensure_object_cache(self):
+        """Build the cache of all objects the first time it is needed."""
+        if not self._objects_by_scope:
+            self._build_object_cache()
+
     def _build_object_cache(self):
         """Build a cache of all objects in workspace by scope."""
         for scope_name in VALIDATED_SCOPES:
@@ -447,12 +520,36 @@ class ProjectValidator:
             flow_ref: Reference of the flow to check.
         """
 
+        self._ensure_object_cache()
+
         flow_issues = []
         flow_issues.extend(self._check_nodes_flows_ref_in_flow(flow_ref))
         flow_issues.extend(self._check_flow_parameters(flow_ref))
         flow_issues.extend(self._check_flow_links(flow_ref))
         return flow_issues
 
+    def check_flow_cached(self, flow_ref: str, force: bool = False) -> List[ProjIssue]:
+        """
+        Check a specific flow, the cached issues are returned when neither the
+        flow nor the objects it depends on changed since they were stored.
+
+        Args:
+            flow_ref: Reference of the flow to check.
+            force: Check the flow even if it has cached issues.
+        """
+        if self._cache is None:
+            return self.check_flow(flow_ref)
+
+        fingerprint = flow_fingerprint(flow_ref, self._read)
+        if not force:
+            cached = self._cache.get(flow_ref)
+            if cached is not None and cached[0] == fingerprint:
+                return [self._proj_issue(issue) for issue in cached[1]]
+
+        flow_issues = self.check_flow(flow_ref)
+        self._cache.set(flow_ref, fingerprint, [self._project_issue(i) for i in flow_issues])
+        return flow_issues
+
     def _check_nodes_flows_ref_in_flow(self, flow_ref: str) -> List[ProjIssue]:
         """
         Check that all nodes and flows referenced in a specific flow exist in the project.
@@ -535,9 +632,7 @@ class ProjectValidator:
 
                     # Validate link endpoints
                     flow_issues.extend(
-                        LinkValidator(
-                            objects_by_scope=self._objects_by_scope, logger=LOGGER
-                        ).validate_link(
+                        self._link_validator.validate_link(
                             flow_ref, flow_data, flow_content, link_id, from_path, to_path
                         )
                     )
@@ -554,9 +649,10 @@ class ProjectValidator:
 class LinkValidator:
     """Link validator class."""
 
-    def __init__(self, objects_by_scope: Dict, logger):
+    def __init__(self, objects_by_scope: Dict, logger, snapshot: Optional[ProjectSnapshot] = None):
         self._objects_by_scope = objects_by_scope
         self.logger = logger
+        self._snapshot = snapshot
         # Caches to reduce repeated DAL access during link validation.
         self._flow_content_cache: Dict[str, dict] = {}
         self._node_dict_cache: Dict[str, dict] = {}
@@ -569,8 +665,9 @@ class LinkValidator:
             raise MissingFlowTemplateExc(flow_template)
 
         if flow_template not in self._flow_content_cache:
-            template_flow = Flow(flow_template)
-            template_flow_data = template_flow.get_dict()
+            template_flow_data = self._snapshot and self._snapshot.get("Flow", flow_template)
+            if template_flow_data is None:
+                template_flow_data = Flow(flow_template).get_dict()
             if "Flow" not in template_flow_data or flow_template not in template_flow_data["Flow"]:
                 raise MissingFlowTemplateExc(flow_template)
             self._flow_content_cache[flow_template] = template_flow_data["Flow"][flow_template]
@@ -580,8 +677,10 @@ class LinkValidator:
     def _get_node_dict(self, node_template: str) -> dict:
         """Load a node template dict from DAL once and reuse it."""
         if node_template not in self._node_dict_cache:
-            node = Node(node_template)
-            self._node_dict_cache[node_template] = node.get_dict()
+            node_dict = self._snapshot and self._snapshot.get("Node", node_template)
+            if node_dict is None:
+                node_dict = Node(node_template).get_dict()
+            self._node_dict_cache[node_template] = node_dict
 
         return self._node_dict_cache[node_template]
 
@@ -1022,6 +1121,19 @@ def _find_json_path_line(json_data: dict, path: List[str]) -> Optional[int]:
     Returns:
         Line number (1-indexed) or None if not found
     """
+    try:
+        line = LINE_INDEXES.find(json_data, path)
+        if line is not None:
+            return line
+    except Exception as e:
+        LOGGER.debug(f"Error indexing JSON lines: {e}")
+
+    # paths not in the document, look for the keys in order as before
+    return _scan_json_path_line(json_data, path)
+
+
+def _scan_json_path_line(json_data: dict, path: List[str]) -> Optional[int]:
+    """Find the line number of a JSON path looking for each one of its keys in order."""
     try:
         # Serialize with standard formatting (2-space indent)
         json_str = json.dumps(json_data, indent=4, sort_keys=True)
@@ -6,25 +6,74 @@ Developers:
 - Moawiya Mograbi (moawiya@mov.ai) - 2022
 """
 
+import hashlib
+import pickle
 from pathlib import Path
-from typing import TypedDict
+from threading import Lock
+from typing import Any, Iterator, Optional, TypedDict
+from urllib.parse import urljoin
 
+from cachetools import LRUCache
 from referencing import Registry, Resource
 from jsonschema import Draft202012Validator
 from jsonschema import ValidationError
 
 from dal.classes.filesystem import FileSystem
 
+from .snapshot import SchemaSnapshot
+
+
+# valid documents remembered by each schema
+VALID_DOCUMENTS_CACHE_SIZE = 4096
+
 
 class ValidationResult(TypedDict):
     status: bool
     message: str
 
 
+def content_hash(data: Any) -> Optional[str]:
+    """Hash of the content of a document, None if the document cannot be hashed.
+
+    pickle is used instead of json as it tells lists from tuples and
+    int from str keys, which the schema validation also does.
+
+    """
+    try:
+        content = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return hashlib.sha256(content).hexdigest()
+
+
+def _references(contents: Any, base: str = "") -> Iterator[str]:
+    """URIs of the external schemas referenced by a schema, without fragment."""
+    if isinstance(contents, dict):
+        if isinstance(contents.get("$id"), str):
+            base = urljoin(base, contents["$id"])
+        for key, value in contents.items():
+            if key == "$ref" and isinstance(value, str):
+                uri = urljoin(base, value).split("#")[0]
+                if uri and uri != base:
+                    yield uri
+            else:
+                yield from _references(value, base)
+    elif isinstance(contents, list):
+        for value in contents:
+            yield from _references(value, base)
+
+
 class Schema:
-    def __init__(self, schema_path: Path):
+    def __init__(self, schema_path: Path, snapshot: Optional[SchemaSnapshot] = None):
         self._path: Path = schema_path
 
+        def read_json(path: Path):
+            """Read a schema file, from the snapshot when it has it."""
+            contents = snapshot.get_file(path) if snapshot is not None else None
+            if contents is None:
+                contents = FileSystem.read_json(path)
+            return contents
+
         def retrieve_from_filesystem(uri: str):
             """Retrieve a referenced schema from the filesystem.
 
@@ -36,22 +85,42 @@ class Schema:
                 Resource: A Resource object containing the schema contents.
 
             """
-            path = self._path.parent / uri
-            contents = FileSystem.read_json(path)
-            return Resource.from_contents(contents)
+            return Resource.from_contents(read_json(self._path.parent / uri))
+
+        # the referenced schemas are loaded once into the registry, otherwise
+        # they are retrieved again on every validation
+        contents = read_json(self._path)
+        resources = {}
+        pending = list(_references(contents))
+        while pending:
+            uri = pending.pop()
+            if uri in resources:
+                continue
+            try:
+                resources[uri] = retrieve_from_filesystem(uri)
+            except (OSError, ValueError):
+                # left to fail when validating, as before
+                continue
+            pending.extend(_references(resources[uri].contents))
 
         # registry with the ability to retrieve schemas from the filesystem
-        registry = Registry(retrieve=retrieve_from_filesystem)
+        registry = Registry(retrieve=retrieve_from_filesystem).with_resources(resources.items())
 
         # load main schema into the validator
         self.validator = Draft202012Validator(
-            FileSystem.read_json(self._path),
-            registry=registry,
+            contents,
+            registry=registry.crawl(),
         )
 
+        self._valid: LRUCache = LRUCache(maxsize=VALID_DOCUMENTS_CACHE_SIZE)
+        self._lock = Lock()
+
     def validate(self, data: dict) -> ValidationResult:
         """Validate data against the schema.
 
+        Documents that passed are remembered by a hash of their content
+        and are not validated again.
+
         Args:
             data (dict): The data to be validated.
 
@@ -59,6 +128,12 @@ class Schema:
             ValidationResult: Validation results.
 
         """
+        digest = content_hash(data)
+        if digest is not None:
+            with self._lock:
+                if self._valid.get(digest):
+                    return ValidationResult(status=True, message="")
+
         status = True
         message = ""
         try:
@@ -70,4 +145,8 @@ class Schema:
             status = False
             message = str(e)
 
+        if status and digest is not None:
+            with self._lock:
+                self._valid[digest] = True
+
         return ValidationResult(status=status, message=message)
@@ -0,0 +1,202 @@
+"""Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Compiled snapshot of the schema folders.
+
+Every process that imports dal used to read and parse all the schema files,
+a snapshot keeps the files of a folder in a single json artifact with the
+path, modification time and size of every file. While they match the files
+the snapshot is used as is, otherwise the files are read and their content
+hash is compared with the one of the snapshot, so a stale snapshot is never
+used. The snapshot is plain json, nothing in it is executed when loaded.
+The snapshot is created the first time it is needed, or at build time with:
+
+    python -m dal.validation.snapshot
+
+Files are only parsed when accessed, callers that only touch one scope
+only pay for that scope. The values returned by the mapping are shared,
+use load() to get a copy that can be changed.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from movai_core_shared.logger import Log
+
+from .constants import JSON_SCHEMA_FOLDER_PATH, REDIS_SCHEMA_FOLDER_PATH
+
+LOGGER = Log.get_logger(__name__)
+
+SNAPSHOT_DIR = Path(
+    os.getenv(
+        "MOVAI_SCHEMA_SNAPSHOT_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "movai", "schemas"),
+    )
+)
+
+
+class LazyMapping(Mapping):
+    """Read only mapping whose values are only computed when accessed."""
+
+    def __init__(self, keys: Iterable[str], loader: Callable[[str], Any]):
+        self._keys = list(keys)
+        self._loader = loader
+        self._values: Dict[str, Any] = {}
+        self._lock = Lock()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        if key not in self._keys:
+            raise KeyError(key)
+
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = self._loader(key)
+
+        return self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._keys})"
+
+
+class SchemaSnapshot(LazyMapping):
+    """Parsed json files of a schema folder, keyed by their relative path.
+
+    The snapshot is checked against the path, modification time and size of
+    the json files in the folder, and only on a mismatch against a content
+    hash of the files. If any file changed the snapshot is rebuilt from them.
+
+    """
+
+    _INSTANCES: Dict[Path, "SchemaSnapshot"] = {}
+    _INSTANCES_LOCK = Lock()
+
+    def __init__(self, folder: Path, snapshot_dir: Path = SNAPSHOT_DIR):
+        self._folder = Path(folder)
+        self._snapshot_dir = Path(snapshot_dir)
+        self._entries = self._load()
+        super().__init__(sorted(self._entries), lambda key: json.loads(self._entries[key]))
+
+    @classmethod
+    def of(cls, folder: Path) -> "SchemaSnapshot":
+        """Return the snapshot of a folder, loaded only once per process."""
+        folder = Path(folder)
+        with cls._INSTANCES_LOCK:
+            try:
+                return cls._INSTANCES[folder]
+            except KeyError:
+                snapshot = cls._INSTANCES[folder] = cls(folder)
+                return snapshot
+
+    @classmethod
+    def from_url(cls, url: str) -> "SchemaSnapshot":
+        """Return the snapshot of a folder given as a file:// url."""
+        return cls.of(Path(urlparse(url).path))
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the schema files."""
+        return self._digest
+
+    @property
+    def path(self) -> Path:
+        """Location of the snapshot artifact, one per folder."""
+        folder = hashlib.sha256(str(self._folder.resolve()).encode("utf-8")).hexdigest()
+        return self._snapshot_dir / f"{self._folder.name}-{folder[:16]}.json"
+
+    def _stats(self) -> Dict[str, List[int]]:
+        """Modification time and size of every json file, by relative path."""
+        stats = {}
+        for file in sorted(self._folder.rglob("*.json")):
+            stat = file.stat()
+            stats[file.relative_to(self._folder).as_posix()] = [stat.st_mtime_ns, stat.st_size]
+        return stats
+
+    def _read_files(self, names: Iterable[str]) -> Tuple[str, Dict[str, str]]:
+        """Content hash and text of the files."""
+        digest = hashlib.sha256()
+        files = {}
+        for name in names:
+            content = (self._folder / name).read_bytes()
+            digest.update(name.encode("utf-8"))
+            digest.update(hashlib.sha256(content).digest())
+            files[name] = content.decode("utf-8")
+        return digest.hexdigest(), files
+
+    def _load(self) -> Dict[str, str]:
+        stats = self._stats()
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                snapshot = json.load(fp)
+            if snapshot["stats"] == stats:
+                self._digest = snapshot["digest"]
+                return snapshot["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            snapshot = None
+
+        # no snapshot or the files were touched, compare their contents
+        self._digest, files = self._read_files(stats)
+        if snapshot is not None and snapshot.get("digest") == self._digest:
+            entries = snapshot["entries"]
+        else:
+            entries = files
+            # fail here on an invalid file, not when the file is used
+            for content in entries.values():
+                json.loads(content)
+        self._save(stats, entries)
+        return entries
+
+    def _save(self, stats: Dict[str, List[int]], entries: Dict[str, str]) -> None:
+        try:
+            self._snapshot_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self._snapshot_dir, prefix=".snapshot.", delete=False
+            ) as fp:
+                json.dump({"digest": self._digest, "stats": stats, "entries": entries}, fp)
+            os.replace(fp.name, self.path)
+        except OSError as e:
+            # read only filesystem, we keep working with the parsed files
+            LOGGER.debug(f"Could not store schema snapshot {self.path}: {e}")
+
+    def load(self, name: str) -> Any:
+        """Return a private copy of a file, for callers that change the parsed contents."""
+        return json.loads(self._entries[name])
+
+    def get_file(self, path: Path) -> Optional[Any]:
+        """Return the parsed contents of a file given its path, None if not in the snapshot."""
+        try:
+            return self[Path(path).resolve().relative_to(self._folder.resolve()).as_posix()]
+        except (KeyError, ValueError):
+            return None
+
+
+def build_snapshots() -> None:
+    """Build the snapshots of all the schema folders."""
+    for url in (REDIS_SCHEMA_FOLDER_PATH, JSON_SCHEMA_FOLDER_PATH):
+        snapshot = SchemaSnapshot.from_url(url)
+        print(f"{snapshot.path}: {len(snapshot)} files")
+
+
+if __name__ == "__main__":
+    build_snapshots()
@@ -0,0 +1,206 @@
+"""
+Copyright (C) Mov.ai  - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+
+Cache of the validation results of each flow.
+
+The results of a flow are stored with a fingerprint, a hash of the flow
+and of every Flow, Node, Configuration and var it depends on. Results are
+only reused while the fingerprint is the same, an edit of any of those
+objects makes the flow to be checked again.
+"""
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from movai_core_shared.logger import Log
+
+if TYPE_CHECKING:
+    from dal.movaidb import MovaiDB
+    from dal.validation.project_validator import ProjectIssue
+
+LOGGER = Log.get_logger("ValidationCache")
+
+# reads a document as Scope.get_dict(), (scope, name) -> dict or None
+Reader = Callable[[str, str], Optional[dict]]
+
+
+def _parameters(content: dict) -> List:
+    return [
+        param.get("Value")
+        for param in (content.get("Parameter") or {}).values()
+        if isinstance(param, dict)
+    ]
+
+
+def flow_dependencies(flow_ref: str, read: Reader) -> Dict[str, object]:
+    """
+    Content of a flow and of all the objects its validation depends on:
+    subflows at any depth, node templates, configurations and vars
+    referenced by the parameters. Objects missing are None.
+    """
+    # pylint: disable=import-outside-toplevel
+    from dal.models.flow import Flow as ModelFlow
+
+    output: Dict[str, object] = {}
+    expressions: List = []
+    queue = [flow_ref]
+
+    while queue:
+        name = queue.pop()
+        if f"Flow/{name}" in output:
+            continue
+
+        document = read("Flow", name)
+        content = document["Flow"][name] if document else None
+        output[f"Flow/{name}"] = content
+        if not content:
+            continue
+
+        expressions.extend(_parameters(content))
+
+        for node_inst in (content.get("NodeInst") or {}).values():
+            expressions.extend(_parameters(node_inst))
+            template = node_inst.get("Template")
+            if template and f"Node/{template}" not in output:
+                node = read("Node", template)
+                output[f"Node/{template}"] = node["Node"][template] if node else None
+                if node:
+                    expressions.extend(_parameters(node["Node"][template]))
+
+        for container in (content.get("Container") or {}).values():
+            expressions.extend(_parameters(container))
+            if container.get("ContainerFlow"):
+                queue.append(container["ContainerFlow"])
+
+    parser = ModelFlow.__PARAM_PARSER__
+    configs, variables = parser.references(value for value in expressions if value is not None)
+    for name in sorted(configs):
+        config = read("Configuration", name)
+        output[f"Configuration/{name}"] = config["Configuration"][name] if config else None
+
+    for reference in sorted(variables):
+        try:
+            output[f"Var/{reference}"] = repr(parser.read_var(reference))
+        except Exception:  # pylint: disable=broad-except
+            output[f"Var/{reference}"] = None
+
+    return output
+
+
+def flow_fingerprint(flow_ref: str, read: Reader) -> str:
+    """Hash of a flow and of all the objects its validation depends on"""
+    content = json.dumps(flow_dependencies(flow_ref, read), sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ValidationCache(ABC):
+    """Validation results of each flow with the fingerprint they were computed for"""
+
+    @abstractmethod
+    def load(self, flow_ref: str) -> Optional[str]:
+        """The raw entry of a flow, None if there is none"""
+
+    @abstractmethod
+    def save(self, flow_ref: str, entry: str) -> None:
+        """Store the raw entry of a flow"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all the entries"""
+
+    def get(self, flow_ref: str) -> Optional[Tuple[str, List["ProjectIssue"]]]:
+        """(fingerprint, issues) of the last validation of a flow, None if not cached"""
+        # pylint: disable=import-outside-toplevel
+        from dal.validation.project_validator import ProjectIssue
+
+        try:
+            entry = self.load(flow_ref)
+            if entry is None:
+                return None
+            data = json.loads(entry)
+            return data["fingerprint"], [ProjectIssue(**issue) for issue in data["issues"]]
+        except Exception as e:  # pylint: disable=broad-except
+            # a broken entry is the same as no entry
+            LOGGER.warning(f"Ignoring the cached validation of flow {flow_ref}: {e}")
+            return None
+
+    def set(self, flow_ref: str, fingerprint: str, issues: List["ProjectIssue"]) -> None:
+        """Store the issues of a flow for a fingerprint"""
+        entry = json.dumps(
+            {
+                "fingerprint": fingerprint,
+                "issues": [issue.model_dump(mode="json") for issue in issues],
+            }
+        )
+        try:
+            self.save(flow_ref, entry)
+        except Exception as e:  # pylint: disable=broad-except
+            LOGGER.warning(f"Could not cache the validation of flow {flow_ref}: {e}")
+
+
+class RedisValidationCache(ValidationCache):
+    """
+    Entries are stored in redis, the keys have no ':' so they
+    are never taken as objects of a scope
+    """
+
+    PREFIX = "_validation_cache/"
+
+    def __init__(self, movaidb: Optional["MovaiDB"] = None):
+        if movaidb is None:
+            # pylint: disable=import-outside-toplevel
+            from dal.movaidb import MovaiDB
+
+            movaidb = MovaiDB()
+        self.conn = movaidb.db_write
+
+    def load(self, flow_ref: str) -> Optional[str]:
+        entry = self.conn.get(f"{self.PREFIX}{flow_ref}")
+        return entry.decode("utf-8") if entry is not None else None
+
+    def save(self, flow_ref: str, entry: str) -> None:
+        self.conn.set(f"{self.PREFIX}{flow_ref}", entry)
+
+    def clear(self) -> None:
+        keys = list(self.conn.scan_iter(f"{self.PREFIX}*", count=1000))
+        if keys:
+            self.conn.delete(*keys)
+
+
+class DiskValidationCache(ValidationCache):
+    """Entries are stored as files of a local folder, one file per flow"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(
+            path
+            or os.getenv(
+                "MOVAI_VALIDATION_CACHE_DIR",
+                os.path.join(os.path.expanduser("~"), ".cache", "movai", "validation"),
+            )
+        )
+
+    def _file(self, flow_ref: str) -> Path:
+        return self.path / f"{quote(flow_ref, safe='')}.json"
+
+    def load(self, flow_ref: str) -> Optional[str]:
+        try:
+            return self._file(flow_ref).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def save(self, flow_ref: str, entry: str) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        # write and rename, a reader never sees half of a file
+        tmp = self._file(flow_ref).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(entry, encoding="utf-8")
+        os.replace(tmp, self._file(flow_ref))
+
+    def clear(self) -> None:
+        for file in self.path.glob("*.json"):
+            file.unlink(missing_ok=True)
@@ -7,19 +7,23 @@ Developers:
 - Moawiya Mograbi (moawiya@mov.ai) - 2022
 """
 
+import hashlib
 import urllib
 from io import StringIO
 from pathlib import Path
 from re import search
-from typing import Dict, Protocol
+from threading import Lock
+from typing import Dict, Mapping, Protocol
 
 from babel.messages.pofile import PoFileError, read_po
+from cachetools import LRUCache
 
 from dal.classes.common.singleton import Singleton
 from dal.exceptions import SchemaTypeNotKnown, SchemaVersionError
 
 from .constants import JSON_SCHEMA_FOLDER_PATH
 from .schema import Schema
+from .snapshot import LazyMapping, SchemaSnapshot
 
 
 class Validator(Protocol):
@@ -39,6 +43,22 @@ class Validator(Protocol):
 
         """
 
+    @staticmethod
+    def validate_many(scope: str, documents: Mapping[str, dict]) -> Dict[str, str]:
+        """Validate many documents of the given scope.
+
+        Args:
+            scope (str): The type of the schema to validate against.
+            documents (Mapping[str, dict]): The data to validate by name.
+
+        Returns:
+            Dict[str, str]: The error of each document that does not conform to the schema.
+
+        Raises:
+            SchemaTypeNotKnown: If the scope is not known to the validator.
+
+        """
+
 
 class JsonValidator(metaclass=Singleton):
     """Validator responsible to load schema json files and validate files according
@@ -49,11 +69,15 @@ class JsonValidator(metaclass=Singleton):
     VERSION = "2.4"
 
     def __init__(self):
-        self.schema_types: Dict[str, Schema] = {}
+        self.schema_types: Mapping[str, Schema] = {}
         self._init_schemas()
 
     def _init_schemas(self):
-        """Initialize schemas objects in the schema folder for all of our configuration files."""
+        """Initialize schemas objects in the schema folder for all of our configuration files.
+
+        The validators are only built the first time a type is validated.
+
+        """
         schema_folder = Path(
             urllib.parse.urlparse(JSON_SCHEMA_FOLDER_PATH).path
         )  # remove 'file://' prefix
@@ -62,11 +86,16 @@ class JsonValidator(metaclass=Singleton):
         if not version_folder.exists():
             raise SchemaVersionError(f"Version folder {version_folder} does not exist")
 
+        snapshot = SchemaSnapshot.of(schema_folder)
+        schema_files = {}
         for schema_json in version_folder.iterdir():
             m = search(r"(\w+)\.schema\.json", schema_json.name)
             if m is not None:
-                schema_type = m.group(1)
-                self.schema_types[schema_type] = Schema(schema_json)
+                schema_files[m.group(1)] = schema_json
+
+        self.schema_types = LazyMapping(
+            schema_files, lambda schema_type: Schema(schema_files[schema_type], snapshot)
+        )
 
     def validate(self, scope: str, data: dict):
         """Validate the content against the schema of the given scope.
@@ -89,9 +118,58 @@ class JsonValidator(metaclass=Singleton):
         if not result["status"]:
             raise ValueError(f"Invalid data for scope {scope}: {result['message']} for data {data}")
 
+    def validate_many(self, scope: str, documents: Mapping[str, dict]) -> Dict[str, str]:
+        """Validate many documents of the given scope.
+
+        Args:
+            scope (str): The type of the schema to validate against.
+            documents (Mapping[str, dict]): The data to validate by name.
+
+        Returns:
+            Dict[str, str]: The error of each document that does not conform to the schema.
+
+        Raises:
+            SchemaTypeNotKnown: If the scope is not known to the validator.
+
+        """
+        errors = {}
+        for name, data in documents.items():
+            try:
+                self.validate(scope, data)
+            except ValueError as e:
+                errors[name] = str(e)
+        return errors
+
 
 class POFileValidator:
-    """Confirm the PO file has a valid format"""
+    """Confirm the PO file has a valid format
+
+    PO files that passed are remembered by a hash of their content
+    and are not parsed again.
+
+    """
+
+    _valid: LRUCache = LRUCache(maxsize=1024)
+    _lock = Lock()
+
+    @classmethod
+    def _validate_po(cls, language: str, po_file_content: str):
+        digest = hashlib.sha256(po_file_content.encode("utf-8")).hexdigest()
+        with cls._lock:
+            if cls._valid.get(digest):
+                return
+
+        try:
+            read_po(StringIO(po_file_content), abort_invalid=True)
+        except PoFileError as e:
+            raise ValueError(f"Invalid PO file format for language {language}: {str(e)}")
+        except Exception as e:
+            raise ValueError(
+                f"An error occurred while validating the PO file for language {language}: {str(e)}"
+            )
+
+        with cls._lock:
+            cls._valid[digest] = True
 
     @staticmethod
     def validate(scope: str, data: dict):
@@ -117,14 +195,7 @@ class POFileValidator:
             po_file_content = value.get("po", "")
             if not po_file_content:
                 raise ValueError(f"PO file for language {language} is empty")
-            try:
-                read_po(StringIO(po_file_content), abort_invalid=True)
-            except PoFileError as e:
-                raise ValueError(f"Invalid PO file format for language {language}: {str(e)}")
-            except Exception as e:
-                raise ValueError(
-                    f"An error occurred while validating the PO file for language {language}: {str(e)}"
-                )
+            POFileValidator._validate_po(language, po_file_content)
 
 
 class TranslationValidator:
@@ -148,3 +219,26 @@ class TranslationValidator:
 
         JsonValidator().validate(scope, data)
         POFileValidator().validate(scope, data)
+
+    @staticmethod
+    def validate_many(scope: str, documents: Mapping[str, dict]) -> Dict[str, str]:
+        """Validate many documents of the given scope.
+
+        Args:
+            scope (str): The type of the schema to validate against.
+            documents (Mapping[str, dict]): The data to validate by name.
+
+        Returns:
+            Dict[str, str]: The error of each document that is not valid.
+
+        Raises:
+            SchemaTypeNotKnown: If the scope is not known to the validator.
+
+        """
+        errors = {}
+        for name, data in documents.items():
+            try:
+                TranslationValidator.validate(scope, data)
+            except ValueError as e:
+                errors[name] = str(e)
+        return errors
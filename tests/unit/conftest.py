@@ -2,8 +2,10 @@ import os
 import pytest
 import sys
 import importlib
+import types
 
 from pathlib import Path
+from unittest import mock
 
 CURR_DIR = Path(os.path.dirname(os.path.realpath(__file__)))
 DATA_FOLDER = CURR_DIR / "data"
@@ -60,6 +62,31 @@ def models_message(global_db):
     return msg
 
 
+@pytest.fixture
+def fake_redis(request):
+    """
+    In memory database for MovaiDB and for the global workspace of the
+    scopes tree, the workspace is created with it and dropped after.
+    Test case classes get it as self.db.
+    """
+    from dal.models.scopestree import scopes
+    from dal.utils.redis_mocks import FakePipeline, FakeRedis
+
+    db = FakeRedis()
+    databases = types.SimpleNamespace(
+        db_global=db, db_slave=db, db_local=db, slave_pubsub=None, local_pubsub=None
+    )
+    # MovaiDB only writes in the pipelines given to it when they are redis pipelines
+    with mock.patch("dal.movaidb.database.Redis", return_value=databases), mock.patch(
+        "dal.movaidb.database.Pipeline", FakePipeline
+    ), mock.patch("dal.plugins.persistence.redis.redis.Redis", db), mock.patch.dict(
+        scopes._children, clear=True
+    ):
+        if request.instance is not None:
+            request.instance.db = db
+        yield db
+
+
 @pytest.fixture(scope="session")
 def metadata_folder():
     return DATA_FOLDER / "valid" / "metadata"
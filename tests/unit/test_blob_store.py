@@ -0,0 +1,65 @@
+import json
+import os
+from unittest import mock
+
+from dal.plugins.persistence.filesystem.blobs import BlobStore, DATA_FILE, MANIFEST_FILE
+from dal.tools.archive_storage import migrate
+
+
+def test_put_deduplicates(tmp_path):
+    store = BlobStore(str(tmp_path))
+
+    first = store.put({"b": 1, "a": [1, 2]})
+    second = store.put({"a": [1, 2], "b": 1})
+
+    assert first == second
+    assert store.get(first) == {"a": [1, 2], "b": 1}
+    assert len(os.listdir(tmp_path / ".blobs" / first[:2])) == 1
+
+
+def test_migrate_version_folder(tmp_path):
+    store = BlobStore(str(tmp_path))
+    folder = tmp_path / "Flow" / "flow1" / "v1-1-uuid"
+    folder.mkdir(parents=True)
+    document = {"schema_version": "1.0", "Flow": {"flow1": {"Label": "flow1", "Links": {}}}}
+    (folder / DATA_FILE).write_text(json.dumps(document))
+
+    assert store.migrate(str(folder))
+    assert not (folder / DATA_FILE).exists()
+
+    manifest = json.loads((folder / MANIFEST_FILE).read_text())
+    assert store.assemble(manifest) == document
+
+    # already migrated
+    assert not store.migrate(str(folder))
+
+
+def test_write_manifest_replaces_file(tmp_path):
+    store = BlobStore(str(tmp_path))
+    folder = tmp_path / "Flow" / "flow1" / "v1-1-uuid"
+    folder.mkdir(parents=True)
+
+    with mock.patch("os.replace", side_effect=os.replace) as replace:
+        manifest = store.write_manifest(str(folder), "1.0", "Flow", "flow1", {"Label": "flow1"})
+
+    assert replace.call_args.args[1] == str(folder / MANIFEST_FILE)
+    # only the manifest is left in the version folder
+    assert os.listdir(folder) == [MANIFEST_FILE]
+    assert json.loads((folder / MANIFEST_FILE).read_text()) == manifest
+
+
+def test_migrate_workspace(tmp_path):
+    folder = tmp_path / "global" / "Flow" / "flow1" / "v1-1-uuid"
+    folder.mkdir(parents=True)
+    document = {"schema_version": "1.0", "Flow": {"flow1": {"Label": "flow1"}}}
+    (folder / DATA_FILE).write_text(json.dumps(document))
+    store = BlobStore(str(tmp_path / "global"))
+
+    # new versions keep the data.json layout until the workspace is migrated
+    assert not store.migrated
+
+    report = migrate(str(tmp_path), "global")
+
+    assert report["migrated"] == 1
+    assert store.migrated
+    assert (folder / MANIFEST_FILE).exists()
@@ -0,0 +1,115 @@
+import unittest
+from types import SimpleNamespace
+
+from dal.helpers.flow.compiled import CompiledFlow, FlowCompiler, materialize
+
+
+class FakeLinks(dict):
+    __DEFAULT_DEPENDENCY__ = 0
+
+
+class FakeFlow:
+    def __init__(self, ref, nodes, links, containers=None):
+        self.ref = ref
+        self.workspace = "global"
+        self.version = "__UNVERSIONED__"
+        self.NodeInst = {name: SimpleNamespace(Template=tpl) for name, tpl in nodes.items()}
+        self.Links = FakeLinks(links)
+        self.Container = {
+            name: SimpleNamespace(ContainerLabel=label, subflow=subflow)
+            for name, (label, subflow) in (containers or {}).items()
+        }
+
+    def serialize(self):
+        return {
+            "NodeInst": {name: node.Template for name, node in self.NodeInst.items()},
+            "Links": dict(self.Links),
+            "Container": {
+                name: [c.ContainerLabel, c.subflow.ref] for name, c in self.Container.items()
+            },
+        }
+
+
+class TestFlowCompiler(unittest.TestCase):
+    def setUp(self):
+        FlowCompiler.clear()
+        self.leaf = FakeFlow(
+            "leaf",
+            {"pub": "Publisher"},
+            {"l1": {"From": "START/START/START", "To": "pub/start/in"}},
+        )
+        self.middle = FakeFlow(
+            "middle",
+            {"sub": "Subscriber"},
+            {"l1": {"From": "sub/out/out", "To": "sub/in/in", "Dependency": 1}},
+            {"c1": ("left", self.leaf), "c2": ("right", self.leaf)},
+        )
+        self.main = FakeFlow("main", {}, {}, {"c1": ("top", self.middle)})
+
+    def test_compile(self):
+        compiled = FlowCompiler(use_redis=False).compile(self.main)
+
+        self.assertEqual(
+            sorted(compiled.nodes),
+            ["top__left__pub", "top__right__pub", "top__sub"],
+        )
+        self.assertEqual(
+            compiled.nodes["top__left__pub"], ["global/Flow/leaf/__UNVERSIONED__", "pub"]
+        )
+        self.assertEqual(compiled.templates["top__sub"], "Subscriber")
+        self.assertEqual(
+            compiled.links["top__left__l1"],
+            {"From": "START/START/START", "To": "top__left__pub/start/in", "Dependency": 0},
+        )
+        self.assertEqual(
+            compiled.links["top__l1"],
+            {"From": "top__sub/out/out", "To": "top__sub/in/in", "Dependency": 1},
+        )
+        self.assertEqual(
+            compiled.containers["top__left"],
+            [
+                "global/Flow/middle/__UNVERSIONED__",
+                "c1",
+                "global/Flow/leaf/__UNVERSIONED__",
+            ],
+        )
+
+    def test_shared_subflow_compiled_once(self):
+        compiler = FlowCompiler(use_redis=False)
+        compiler.compile(self.main)
+        self.assertEqual(compiler.built, 3)
+
+    def test_incremental_rebuild(self):
+        other = FakeFlow("other", {"n": "Node"}, {})
+        main = FakeFlow("main", {}, {}, {"c1": ("top", self.middle), "c2": ("o", other)})
+        first = FlowCompiler(use_redis=False).compile(main)
+
+        # only the changed flow and its parents are built again
+        self.leaf.NodeInst["pub2"] = SimpleNamespace(Template="Publisher")
+        compiler = FlowCompiler(use_redis=False)
+        second = compiler.compile(main)
+
+        self.assertEqual(compiler.built, 3)
+        self.assertNotEqual(first.key, second.key)
+        self.assertIn("top__left__pub2", second.nodes)
+
+    def test_recursion(self):
+        loop = FakeFlow("loop", {}, {})
+        loop.Container["c1"] = SimpleNamespace(ContainerLabel="self", subflow=loop)
+        with self.assertRaises(RecursionError):
+            FlowCompiler(use_redis=False).compile(loop)
+
+    def test_serialization(self):
+        compiled = FlowCompiler(use_redis=False).compile(self.main)
+        self.assertEqual(CompiledFlow.from_json(compiled.to_json()), compiled)
+
+    def test_materialize(self):
+        compiled = FlowCompiler(use_redis=False).compile(self.main)
+        flows = {
+            "global/Flow/leaf/__UNVERSIONED__": self.leaf,
+            "global/Flow/middle/__UNVERSIONED__": self.middle,
+        }
+        nodes, links = materialize(compiled, flows.__getitem__)
+
+        self.assertIs(nodes["top__right__pub"], self.leaf.NodeInst["pub"])
+        self.assertEqual(links, compiled.links)
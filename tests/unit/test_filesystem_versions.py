@@ -0,0 +1,131 @@
+import contextlib
+import json
+import os
+import threading
+from unittest import mock
+
+from dal.plugins.persistence.filesystem.filesystem import FilesystemPlugin
+
+
+def legacy_ref(root, *folders):
+    basepath = root / "global" / "Flow" / "flow1"
+    basepath.mkdir(parents=True)
+    for folder in folders:
+        (basepath / folder).mkdir()
+    return basepath
+
+
+def test_legacy_ref_versions(tmp_path):
+    basepath = legacy_ref(tmp_path, "v1-100-a", "v2-200-b", "v3-300-c")
+    plugin = FilesystemPlugin(workspace="global")
+
+    with mock.patch.object(FilesystemPlugin, "_ROOT_PATH", str(tmp_path)):
+        # a lookup indexes the whole ref and not only the requested tag
+        assert FilesystemPlugin.version_folder(str(basepath), "v2") == str(basepath / "v2-200-b")
+        # as does a new version
+        (basepath / "v4-400-d").mkdir()
+        FilesystemPlugin.update_version_index(str(basepath), {"v4": "v4-400-d"})
+
+        versions = plugin.list_versions(scope="Flow", ref="flow1")
+
+    assert sorted((version["tag"], version["date"]) for version in versions) == [
+        ("v1", "100"),
+        ("v2", "200"),
+        ("v3", "300"),
+        ("v4", "400"),
+    ]
+    assert json.loads((basepath / "versions.json").read_text()) == {
+        "v1": "v1-100-a",
+        "v2": "v2-200-b",
+        "v3": "v3-300-c",
+        "v4": "v4-400-d",
+    }
+
+
+def test_list_versions_builds_index(tmp_path):
+    basepath = legacy_ref(tmp_path, "v1-100-a", "v2-200-b")
+    plugin = FilesystemPlugin(workspace="global")
+
+    with mock.patch.object(FilesystemPlugin, "_ROOT_PATH", str(tmp_path)):
+        assert len(plugin.list_versions(scope="Flow", ref="flow1")) == 2
+        with mock.patch("glob.glob") as listed:
+            assert len(plugin.list_versions(scope="Flow", ref="flow1")) == 2
+        listed.assert_not_called()
+
+    assert sorted(os.listdir(basepath)) == [".index.lock", "v1-100-a", "v2-200-b", "versions.json"]
+
+
+def test_concurrent_updates(tmp_path):
+    basepath = legacy_ref(tmp_path)
+
+    threads = [
+        threading.Thread(
+            target=FilesystemPlugin.update_version_index,
+            args=(str(basepath), {f"v{idx}": f"v{idx}-{idx}-x"}),
+        )
+        for idx in range(20)
+    ]
+    # only the file lock, as for several processes
+    with mock.patch.object(FilesystemPlugin, "_INDEX_LOCK", contextlib.nullcontext()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(json.loads((basepath / "versions.json").read_text())) == 20
+
+
+def write_flow(plugin, tag, *templates):
+    node_inst = {f"inst{idx}": {"Template": template} for idx, template in enumerate(templates)}
+    plugin.write({"Label": "flow1", "NodeInst": node_inst}, scope="Flow", ref="flow1", version=tag)
+
+
+def test_write_updates_referrers(tmp_path):
+    plugin = FilesystemPlugin(workspace="global")
+
+    with mock.patch.object(FilesystemPlugin, "_ROOT_PATH", str(tmp_path)):
+        plugin.write({"Label": "node1"}, scope="Node", ref="node1", version="v1")
+        write_flow(plugin, "v1", "global/Node/node1/v1", "global/Node/node2/v1")
+
+    # node2 is not archived, its referrers are only added by rebuild_indexes
+    assert json.loads(
+        (tmp_path / "global" / "Node" / "node1" / "referenced_by.json").read_text()
+    ) == {"v1": ["global/Flow/flow1/v1"]}
+    assert not (tmp_path / "global" / "Node" / "node2").exists()
+
+
+def test_rewrite_drops_the_reference(tmp_path):
+    plugin = FilesystemPlugin(workspace="global")
+
+    with mock.patch.object(FilesystemPlugin, "_ROOT_PATH", str(tmp_path)):
+        plugin.write({"Label": "node1"}, scope="Node", ref="node1", version="v1")
+        write_flow(plugin, "v1", "global/Node/node1/v1")
+        write_flow(plugin, "v2")
+
+        referrers = plugin.get_referrer_objects(scope="Node", ref="node1", version="v1")
+        # the stored versions are never changed, rebuilding gives the same index
+        plugin.rebuild_indexes()
+        rebuilt = plugin.get_referrer_objects(scope="Node", ref="node1", version="v1")
+
+    assert referrers == rebuilt == {"global/Flow/flow1/v1"}
+
+
+def test_get_referrer_objects(tmp_path):
+    plugin = FilesystemPlugin(workspace="global")
+
+    with mock.patch.object(FilesystemPlugin, "_ROOT_PATH", str(tmp_path)):
+        plugin.write({"Label": "node1"}, scope="Node", ref="node1", version="v1")
+        plugin.write({"Label": "node1"}, scope="Node", ref="node1", version="v2")
+        write_flow(plugin, "v1", "global/Node/node1/v1")
+        write_flow(plugin, "v2", "global/Node/node1/v2")
+
+        assert plugin.get_referrer_objects(scope="Node", ref="node1", version="v2") == {
+            "global/Flow/flow1/v2"
+        }
+        assert (
+            plugin.get_referrer_objects(
+                scope="Node", ref="node1", version="v1", search_filter=["Node"]
+            )
+            == set()
+        )
+        assert plugin.get_referrer_objects(scope="Node", ref="node3", version="v1") == set()
@@ -0,0 +1,165 @@
+import json
+import os
+import pickle
+import unittest
+from unittest.mock import Mock, patch
+
+import pytest
+
+from dal.helpers.flow.launch import LaunchPlan, LaunchPlanCompiler, dependencies_order
+from dal.models.scopestree import scopes
+from dal.utils.redis_mocks import FakeRedis
+
+
+def fake_flow():
+    """A flow with the nodes a, b, c and d, where c starts first"""
+    dependencies = {"a": {"b"}, "b": {"c"}, "c": set(), "d": {"a"}}
+    return Mock(
+        workspace="global",
+        ref="main",
+        version="__UNVERSIONED__",
+        full=Mock(NodeInst=dict.fromkeys(dependencies)),
+        remaps={"/remap": {"From": ["a/p/out"], "To": ["b/p/in"]}},
+        get_node_dependencies=lambda name: list(dependencies[name]),
+        get_node_transitions=lambda name: {"d"} if name == "c" else set(),
+        get_node_plugins=lambda name: {"c"} if name == "b" else set(),
+        get_nodelet_manager=lambda name: "c" if name in ("a", "b") else None,
+        get_start_nodes=lambda: ["c"],
+        resolve_all_params=lambda: {"Flow": {}, "NodeInst": {"a": {"x": [1, 2]}}, "Container": {}},
+    )
+
+
+class TestLaunchPlan(unittest.TestCase):
+    def setUp(self):
+        LaunchPlanCompiler.clear()
+
+    def test_dependencies_order(self):
+        self.assertEqual(
+            dependencies_order({"a": ["b"], "b": ["c"], "c": [], "d": ["a"]}),
+            ["c", "b", "a", "d"],
+        )
+        # cycles do not repeat nodes
+        self.assertEqual(dependencies_order({"a": ["b"], "b": ["a"]}), ["b", "a"])
+
+    def test_build(self):
+        plan = LaunchPlanCompiler(use_redis=False).build(fake_flow(), "key")
+
+        self.assertEqual(plan.flow, "global/Flow/main/__UNVERSIONED__")
+        self.assertEqual(plan.nodes, ["c", "b", "a", "d"])
+        self.assertEqual(plan.dependencies["a"], ["b"])
+        self.assertEqual(plan.transitions, {"a": [], "b": [], "c": ["d"], "d": []})
+        self.assertEqual(plan.plugins, {"b": ["c"]})
+        self.assertEqual(plan.nodelets, {"c": ["a", "b"]})
+        self.assertEqual(plan.start_nodes, ["c"])
+        self.assertEqual(LaunchPlan.loads(plan.dumps()), plan)
+
+    def test_redis(self):
+        db = FakeRedis()
+        compiler = LaunchPlanCompiler(use_redis=True)
+        plan = compiler.build(fake_flow(), "key")
+        with patch.object(LaunchPlanCompiler, "redis", staticmethod(lambda: db)):
+            compiler.store(plan)
+            LaunchPlanCompiler.clear()
+
+            # plain json, loading it runs nothing
+            data = db.get(f"_launch_plan:{plan.flow}")
+            self.assertEqual(json.loads(data)["nodes"], plan.nodes)
+            self.assertEqual(compiler.lookup(plan.flow), plan)
+
+            # entries that are not plans are not used
+            db.set(f"_launch_plan:{plan.flow}", pickle.dumps(plan.dumps()))
+            LaunchPlanCompiler.clear()
+            self.assertIsNone(compiler.lookup(plan.flow))
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestLaunchPlanInvalidation(unittest.TestCase):
+    def setUp(self):
+        LaunchPlanCompiler.clear()
+        self.addCleanup(LaunchPlanCompiler.clear)
+        for patcher in (
+            patch.object(LaunchPlanCompiler, "stamps_connection", lambda: self.db),
+            patch.dict(os.environ, {"LP_HOME": "/home/one"}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.write("Configuration", "lp_conf", {"Label": "lp_conf", "Yaml": "rate: 10\n"})
+        self.write("Node", "LpPub", self.node("$(config lp_conf.rate)"))
+        self.write(
+            "Flow",
+            "lp_main",
+            {
+                "Label": "lp_main",
+                "Parameter": {"home": {"Value": "${LP_HOME}/data"}},
+                "NodeInst": {"pub": {"Template": "LpPub", "NodeLabel": "pub"}},
+                "Links": {"l1": {"From": "start/start/start", "To": "pub/start/in"}},
+            },
+        )
+
+    @staticmethod
+    def node(rate):
+        return {
+            "Label": "LpPub",
+            "Type": "ROS1/Node",
+            "Parameter": {"rate": {"Value": rate}},
+            "PortsInst": {"pub": {"Template": "ROS1/Publisher"}},
+        }
+
+    def write(self, scope, ref, data):
+        scopes(workspace="global").write(
+            {scope: {ref: data}}, scope=scope, ref=ref, version="__UNVERSIONED__"
+        )
+
+    def compile(self, compiler):
+        return compiler.compile(scopes(workspace="global").Flow["lp_main"])
+
+    def test_reused_until_inputs_change(self):
+        compiler = LaunchPlanCompiler(use_redis=False)
+        first = self.compile(compiler)
+        self.assertEqual(compiler.built, 1)
+        self.assertEqual(first.params["NodeInst"]["pub"]["rate"], 10)
+        self.assertEqual(first.params["Flow"]["home"], "/home/one/data")
+        # the ports template is not stored, it has no stamp
+        self.assertEqual(
+            first.inputs,
+            {
+                "Configuration:lp_conf": 1,
+                "Flow:lp_main": 1,
+                "Node:LpPub": 1,
+                "Ports:ROS1/Publisher": None,
+            },
+        )
+        self.assertEqual(first.environment, ["LP_HOME"])
+
+        # the plan is checked with a single read of the stamps
+        self.db.commands.clear()
+        self.assertIs(self.compile(compiler), first)
+        self.assertEqual(compiler.built, 1)
+        self.assertEqual(self.db.commands, [("hmget", ("_generations", list(first.inputs)))])
+
+        # a configuration used by a parameter
+        self.write("Configuration", "lp_conf", {"Label": "lp_conf", "Yaml": "rate: 20\n"})
+        plan = self.compile(compiler)
+        self.assertEqual(compiler.built, 2)
+        self.assertEqual(plan.params["NodeInst"]["pub"]["rate"], 20)
+
+        # a node template
+        self.write("Node", "LpPub", self.node("5"))
+        plan = self.compile(compiler)
+        self.assertEqual(compiler.built, 3)
+        self.assertEqual(plan.params["NodeInst"]["pub"]["rate"], 5)
+        self.assertEqual(
+            plan.inputs, {"Flow:lp_main": 1, "Node:LpPub": 2, "Ports:ROS1/Publisher": None}
+        )
+
+        # an env var used by a parameter
+        with patch.dict(os.environ, {"LP_HOME": "/home/two"}):
+            plan = self.compile(compiler)
+            self.assertEqual(compiler.built, 4)
+            self.assertEqual(plan.params["Flow"]["home"], "/home/two/data")
+
+            # objects the plan does not use
+            self.write("Configuration", "lp_conf", {"Label": "lp_conf", "Yaml": "rate: 30\n"})
+            self.assertIs(self.compile(compiler), plan)
+            self.assertEqual(compiler.built, 4)
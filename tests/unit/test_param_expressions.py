@@ -0,0 +1,269 @@
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from dal.helpers.expressions import Reference, compile_expression, invalidate, literal
+from dal.models.flow import Flow
+from dal.models.scopestree import scopes
+from dal.models.var import Var
+from dal.utils.generations import bump
+from dal.utils.redis_mocks import FakeRedis
+
+ParamParser = Flow.__PARAM_PARSER__
+
+
+class TestExpressions(unittest.TestCase):
+    def test_compile_expression(self):
+        compiled = compile_expression("a $(flow x) b $(config c.d)$(var )")
+
+        self.assertEqual(
+            compiled.parts,
+            (
+                "a ",
+                Reference("$(flow x)", "flow", "x"),
+                " b ",
+                Reference("$(config c.d)", "config", "c.d"),
+                Reference("$(var )", None, None),
+            ),
+        )
+        self.assertEqual(compiled.kinds, {"flow", "config"})
+        self.assertIs(compile_expression("a $(flow x) b $(config c.d)$(var )"), compiled)
+
+    def test_literal(self):
+        self.assertEqual(literal("[1, 2]"), [1, 2])
+        self.assertEqual(literal("not a literal"), "not a literal")
+
+        # cached values are not shared with the callers
+        literal("[1, 2]").append(3)
+        self.assertEqual(literal("[1, 2]"), [1, 2])
+
+
+class TestParamParserMemo(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.values = {"x": "1", "y": "$(flow x)"}
+        self.parser = ParamParser(SimpleNamespace(ref="main"))
+        self.parser.mapping["flow"] = self.eval_flow
+        self.parser.mapping["param"] = self.eval_flow
+        self.instance = SimpleNamespace(name="node")
+
+        # the generation stamps written by other processes
+        self.db = FakeRedis()
+        patcher = mock.patch("dal.helpers.expressions.stamps_connection", lambda: self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def eval_flow(self, name, *_):
+        self.calls.append(name)
+        return self.values[name]
+
+    def parse(self, expression):
+        return self.parser.parse("key", expression, "node", self.instance)
+
+    def test_same_as_substitution(self):
+        self.assertEqual(self.parse("$(flow y)"), 1)
+        self.assertEqual(self.parse("[$(flow x), $(flow y)]"), [1, 1])
+        self.assertEqual(self.parse("plain"), "plain")
+
+    def test_memoized(self):
+        self.parse("$(flow y)")
+        self.parse("$(flow y)")
+        self.assertEqual(self.calls, ["y", "x"])
+
+    def test_invalidate(self):
+        self.assertEqual(self.parse("$(flow x)"), 1)
+        self.values["x"] = "2"
+
+        # a change of other kind of references keeps the value
+        invalidate("config")
+        self.assertEqual(self.parse("$(flow x)"), 1)
+
+        invalidate("flow")
+        self.assertEqual(self.parse("$(flow x)"), 2)
+
+    def test_other_processes(self):
+        with mock.patch("dal.helpers.expressions.STAMPS_INTERVAL", 0):
+            self.assertEqual(self.parse("$(flow x)"), 1)
+            self.assertEqual(self.parse("$(param x)"), 1)
+            self.values["x"] = "2"
+
+            # a change of a scope the references do not read keeps the values
+            bump(self.db, ["Configuration:c1,Yaml:"])
+            self.assertEqual(self.parse("$(flow x)"), 1)
+            self.assertEqual(self.parse("$(param x)"), 1)
+
+            # the parameters of node templates
+            bump(self.db, ["Node:n1,Parameter:x,Value:"])
+            self.assertEqual(self.parse("$(flow x)"), 1)
+            self.assertEqual(self.parse("$(param x)"), 2)
+
+            bump(self.db, ["Flow:main,Parameter:x,Value:"])
+            self.assertEqual(self.parse("$(flow x)"), 2)
+
+        # the stamps are read once per interval
+        self.db.commands.clear()
+        with mock.patch("dal.helpers.expressions.STAMPS_INTERVAL", 3600):
+            self.values["x"] = "3"
+            bump(self.db, ["Flow:main,Parameter:x,Value:"])
+            self.assertEqual(self.parse("$(flow x)"), 2)
+        self.assertNotIn("hmget", [name for name, _ in self.db.commands])
+
+    def test_prefetch_vars(self):
+        reads = []
+
+        def read_var(reference):
+            reads.append(reference)
+            return "5"
+
+        def read_vars(references):
+            references = sorted(references)
+            reads.append(references)
+            return dict.fromkeys(references, "5")
+
+        self.parser.read_var = read_var
+        self.parser.read_vars = read_vars
+        with self.parser.prefetch(["$(var robot.a)", "$(var robot.a) $(var robot.b) $(flow x)"]):
+            # all the vars in one read
+            self.assertEqual(reads, [["robot.a", "robot.b"]])
+            self.assertEqual(self.parser.eval_var("robot.a"), "5")
+            self.assertEqual(reads, [["robot.a", "robot.b"]])
+
+        # outside of the block the vars are read again
+        self.parser.eval_var("robot.a")
+        self.assertEqual(reads, [["robot.a", "robot.b"], "robot.a"])
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestReadVars(unittest.TestCase):
+    def test_one_read_per_database(self):
+        Var("robot").set("a", "1")
+        Var("global").set("b", "[1, 2]")
+        references = ["robot.a", "global.b", "robot.missing"]
+        self.db.commands.clear()
+
+        values = ParamParser.read_vars([*references, "not_a_scope.c"])
+
+        self.assertEqual(values, {"robot.a": "1", "global.b": "[1, 2]", "robot.missing": None})
+        # one read of the local and one of the global database
+        self.assertEqual([name for name, _ in self.db.commands], ["mget", "mget"])
+        self.assertEqual(values, {ref: ParamParser.read_var(ref) for ref in references})
+
+
+class TestResolveAllParams(unittest.TestCase):
+    def setUp(self):
+        self.vars = {"robot.name": "rp_robot"}
+        db = FakeRedis()
+        # the global workspace is created with the fake database, and dropped after
+        for patcher in (
+            mock.patch("dal.plugins.persistence.redis.redis.Redis", db),
+            mock.patch.dict(scopes._children, clear=True),
+            mock.patch.dict(os.environ, {"RP_HOME": "/home/rp"}),
+            mock.patch.object(ParamParser, "read_var", staticmethod(self.vars.get)),
+            mock.patch.object(
+                ParamParser,
+                "read_vars",
+                staticmethod(lambda references: {ref: self.vars.get(ref) for ref in references}),
+            ),
+            mock.patch("dal.helpers.expressions.stamps_connection", lambda: db),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.write("Configuration", "rp_conf", {"Label": "rp_conf", "Yaml": "rate: 10\n"})
+        self.write(
+            "Node",
+            "RpNode",
+            {
+                "Label": "RpNode",
+                "Type": "ROS1/Node",
+                "Parameter": {
+                    "rate": {"Value": "$(config rp_conf.rate)"},
+                    "robot": {"Value": "$(var robot.name)"},
+                    "home": {"Value": "${RP_HOME}/data"},
+                    "speed": {"Value": "$(flow speed)"},
+                    "plain": {"Value": "[1, 2]"},
+                },
+            },
+        )
+        self.write(
+            "Flow",
+            "rp_sub",
+            {
+                "Label": "rp_sub",
+                "Parameter": {"speed": {"Value": "2"}},
+                "NodeInst": {
+                    "n": {
+                        "Template": "RpNode",
+                        "NodeLabel": "n",
+                        "Parameter": {"plain": {"Value": "$(flow speed) $(var robot.name)"}},
+                    }
+                },
+            },
+        )
+        self.write(
+            "Flow",
+            "rp_main",
+            {
+                "Label": "rp_main",
+                "Parameter": {
+                    "speed": {"Value": "5"},
+                    "home": {"Value": "${RP_HOME}/main"},
+                    "rate": {"Value": "$(config rp_conf.rate)"},
+                },
+                "NodeInst": {"a": {"Template": "RpNode", "NodeLabel": "a"}},
+                "Container": {
+                    "sub": {
+                        "ContainerFlow": "rp_sub",
+                        "ContainerLabel": "sub",
+                        "Parameter": {"speed": {"Value": "$(flow speed)"}},
+                    }
+                },
+            },
+        )
+
+    def write(self, scope, ref, data):
+        scopes(workspace="global").write(
+            {scope: {ref: data}}, scope=scope, ref=ref, version="__UNVERSIONED__"
+        )
+
+    def test_same_as_per_node(self):
+        flow = scopes(workspace="global").Flow["rp_main"]
+        params = flow.resolve_all_params()
+
+        # resolved again one node instance and container at a time
+        flow.parser.invalidate()
+        self.assertEqual(
+            params,
+            {
+                "Flow": {key: flow.get_param(key) for key in flow.Parameter.keys()},
+                "NodeInst": {name: flow.get_node_params(name) for name in flow.full.NodeInst},
+                "Container": {
+                    name: flow.get_container(name).get_params(name)
+                    for name in flow.compiled.containers
+                },
+            },
+        )
+
+        self.assertEqual(set(params["NodeInst"]), {"a", "sub__n"})
+        self.assertEqual(
+            params["NodeInst"]["a"],
+            {"rate": 10, "robot": "rp_robot", "home": "/home/rp/data", "speed": 5, "plain": [1, 2]},
+        )
+        self.assertEqual(params["NodeInst"]["sub__n"]["plain"], "5 rp_robot")
+        self.assertEqual(params["Container"], {"sub": {"speed": 5}})
+
+    @mock.patch("dal.helpers.expressions.STAMPS_INTERVAL", 3600)
+    def test_node_write(self):
+        flow = scopes(workspace="global").Flow["rp_main"]
+        node = scopes(workspace="global").Node["RpNode"]
+        node.Parameter["speed"].Value = "$(param plain)"
+        node.write()
+        self.assertEqual(flow.get_node_params("a")["speed"], [1, 2])
+
+        # the same expression, the parameter it references changed
+        node.Parameter["plain"].Value = "[3]"
+        node.write()
+        self.assertEqual(flow.get_node_params("a")["speed"], [3])
@@ -0,0 +1,122 @@
+"""Tests for the templates prefetch of the legacy scopes Flow."""
+
+import json
+import unittest
+from collections import Counter
+from unittest import mock
+
+import pytest
+
+from dal.movaidb import MovaiDB
+from dal.scopes.flow import Flow
+
+
+def ports(template):
+    direction = "Out" if template == "ROS1/Publisher" else "In"
+    return {"Template": template, direction: {direction.lower(): {"Message": "std_msgs/String"}}}
+
+
+OBJECTS = {
+    "Flow": {
+        "main": {
+            "Label": "main",
+            "NodeInst": {
+                "talker": {"Template": "Talker"},
+                "listener": {"Template": "Listener"},
+                "fixed": {
+                    "Template": "Listener",
+                    "Parameter": {"_remappable": {"Value": False}},
+                },
+            },
+            "Container": {"sub": {"ContainerFlow": "inner", "ContainerLabel": "sub"}},
+            "Links": {
+                "l1": {"From": "talker/pub/out", "To": "listener/sub/in"},
+                "l2": {"From": "talker/pub/out", "To": "fixed/sub/in"},
+            },
+        },
+        "inner": {
+            "Label": "inner",
+            "NodeInst": {
+                "echo": {"Template": "Listener"},
+                "source": {"Template": "Talker"},
+            },
+            "Links": {"l3": {"From": "source/pub/out", "To": "echo/sub/in"}},
+        },
+    },
+    "Node": {
+        "Talker": {"Label": "Talker", "PortsInst": {"pub": ports("ROS1/Publisher")}},
+        "Listener": {"Label": "Listener", "PortsInst": {"sub": ports("ROS1/Subscriber")}},
+    },
+    "Ports": {
+        "ROS1/Publisher": {"Label": "Publisher", "Out": {"out": {"Message": "std_msgs/String"}}},
+        "ROS1/Subscriber": {"Label": "Subscriber", "In": {"in": {"Message": "std_msgs/String"}}},
+    },
+}
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestPrefetchTemplates(unittest.TestCase):
+    def setUp(self):
+        movaidb = MovaiDB()
+        for scope, objects in OBJECTS.items():
+            for name, content in objects.items():
+                movaidb.set({scope: {name: json.loads(json.dumps(content))}})
+
+    def calc_remaps(self, prefetch=True):
+        """
+        Remaps of the main flow, the names of the templates read for each
+        scope and the number of requests that read them
+        """
+        read = {"Node": Counter(), "Ports": Counter()}
+        requests = Counter()
+        movaidb_get, movaidb_get_many = MovaiDB.get, MovaiDB.get_many
+
+        def get(movaidb, _input, *args, **kwargs):
+            for scope, counter in read.items():
+                counter.update(_input.get(scope, {}).keys())
+                requests[scope] += scope in _input
+            return movaidb_get(movaidb, _input, *args, **kwargs)
+
+        def get_many(movaidb, keys, *args, **kwargs):
+            for scope, counter in read.items():
+                names = {
+                    key.split(",", 1)[0].split(":", 1)[1] for key in keys if key.startswith(scope)
+                }
+                counter.update(names)
+                requests[scope] += bool(names)
+            return movaidb_get_many(movaidb, keys, *args, **kwargs)
+
+        with mock.patch.object(MovaiDB, "get", autospec=True, side_effect=get), mock.patch.object(
+            MovaiDB, "get_many", autospec=True, side_effect=get_many
+        ), mock.patch("builtins.print"):
+            flow = Flow("main")
+            if prefetch:
+                return flow.calc_remaps(), read, requests
+            with mock.patch.object(Flow, "prefetch_templates"):
+                return flow.calc_remaps(), read, requests
+
+    def test_same_remaps(self):
+        remaps, _, _ = self.calc_remaps()
+        expected, _, _ = self.calc_remaps(prefetch=False)
+
+        self.assertEqual(remaps, expected)
+        # the links of the main flow and of the subflow
+        self.assertEqual(
+            remaps,
+            {
+                "sub": {"From": ["talker/pub/out"], "To": ["listener/sub/in", "fixed/sub/in"]},
+                "sub__echo/sub/in": {"From": ["sub__source/pub/out"], "To": ["sub__echo/sub/in"]},
+            },
+        )
+
+    def test_templates_read_once(self):
+        _, read, requests = self.calc_remaps()
+
+        self.assertEqual(read["Node"], Counter({"Talker": 1, "Listener": 1}))
+        self.assertTrue(all(count == 1 for count in read["Ports"].values()), read["Ports"])
+        # all the node templates in one request
+        self.assertEqual(requests["Node"], 1)
+
+        # without the prefetch each template is a request
+        _, _, requests = self.calc_remaps(prefetch=False)
+        self.assertEqual(requests["Node"], 2)
@@ -0,0 +1,152 @@
+import unittest
+from unittest import mock
+
+from dal.models.scopestree import scopes
+from dal.plugins.persistence.redis.indexes import CHECKPOINT_KEY, IndexRebuilder
+from dal.plugins.persistence.redis.redis import RedisPlugin
+from dal.utils.redis_mocks import FakeRedis
+
+
+class TestIndexRebuilder(unittest.TestCase):
+    def test_group_keys(self):
+        keys = [
+            b"Flow:flow1,Label:",
+            b"Flow:flow1,NodeInst:node1,Template:",
+            b"Flow:flow1,relations:",
+            b"Node:node1,Label:",
+            "Node:node1,_schema_version:",
+        ]
+
+        self.assertEqual(
+            IndexRebuilder.group_keys(keys),
+            {
+                "Flow:flow1": [
+                    "Flow:flow1,Label:",
+                    "Flow:flow1,NodeInst:node1,Template:",
+                    "Flow:flow1,relations:",
+                ],
+                "Node:node1": ["Node:node1,Label:", "Node:node1,_schema_version:"],
+            },
+        )
+
+    def test_group_keys_discards_index_only_objects(self):
+        keys = [
+            b"Node:deleted,referenced_by:",
+            b"Node:deleted,relations:",
+            b"_rebuild_indexes:checkpoint",
+            b"Node:node1,Label:",
+        ]
+
+        self.assertEqual(IndexRebuilder.group_keys(keys), {"Node:node1": ["Node:node1,Label:"]})
+
+
+class TestRebuild(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeRedis()
+        for patcher in (
+            mock.patch("dal.plugins.persistence.redis.redis.Redis", self.db),
+            mock.patch("dal.plugins.persistence.redis.indexes.Redis", self.db),
+            mock.patch.dict(scopes._children, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.plugin = RedisPlugin(workspace="global")
+
+        # the keys of the objects, as they are written without the plugin
+        for flow, nodes in (("f1", ["n1", "n2"]), ("f2", ["n2"])):
+            self.db.set(f"Flow:{flow},Label:", flow)
+            for node in nodes:
+                self.db.set(f"Flow:{flow},NodeInst:{node},Template:{node}", node)
+        for node in ("n1", "n2", "n3"):
+            self.db.set(f"Node:{node},Label:", node)
+        self.db.set("Node:n1,PortsInst:p,In:in,Callback:cb", "cb")
+        # stale index of an object that no longer references n3
+        self.db.sadd("Node:n3,referenced_by:", "global/Flow/f1/__UNVERSIONED__")
+
+        self.expected = {
+            "Flow:f1,relations:": [
+                b"global/Node/n1/__UNVERSIONED__",
+                b"global/Node/n2/__UNVERSIONED__",
+            ],
+            "Flow:f2,relations:": [b"global/Node/n2/__UNVERSIONED__"],
+            "Node:n1,relations:": [b"global/Callback/cb/__UNVERSIONED__"],
+        }
+
+    def relations(self):
+        return {key.decode(): self.db.lrange(key, 0, -1) for key in self.db.keys("*,relations:")}
+
+    def referrers(self, scope, ref):
+        return self.plugin.get_referrer_objects(scope=scope, ref=ref)
+
+    def test_rebuild(self):
+        progress = []
+        rebuilder = IndexRebuilder(
+            self.plugin,
+            batch_size=2,
+            workers=2,
+            progress=lambda done, total: progress.append((done, total)),
+        )
+
+        with mock.patch.object(
+            IndexRebuilder, "process_batch", autospec=True, side_effect=IndexRebuilder.process_batch
+        ) as process_batch, mock.patch.object(
+            self.db, "pipeline", wraps=self.db.pipeline
+        ) as pipeline:
+            self.assertEqual(rebuilder.run(), 5)
+
+        # the keyspace is read once, the objects are processed in batches
+        self.assertEqual(
+            [args for name, args in self.db.commands if name == "scan_iter"][1:], [("*",)]
+        )
+        self.assertEqual(sorted(len(call.args[1]) for call in process_batch.mock_calls), [1, 2, 2])
+        # two pipelines read each batch and a transaction writes its indexes
+        self.assertEqual(
+            sorted(call.kwargs["transaction"] for call in pipeline.mock_calls),
+            [False] * 6 + [True] * 3,
+        )
+        self.assertEqual(progress[0], (0, 5))
+        self.assertEqual(progress[-1], (5, 5))
+
+        self.assertEqual(self.relations(), self.expected)
+        self.assertEqual(
+            self.referrers("Node", "n2"),
+            {"global/Flow/f1/__UNVERSIONED__", "global/Flow/f2/__UNVERSIONED__"},
+        )
+        self.assertEqual(self.referrers("Callback", "cb"), {"global/Node/n1/__UNVERSIONED__"})
+        self.assertEqual(self.referrers("Node", "n3"), set())
+        self.assertEqual(self.db.get("Node:n3,_schema_version:"), b"1.0")
+        self.assertFalse(self.db.exists(CHECKPOINT_KEY))
+
+    def test_resume(self):
+        # f1 and f2 were processed by an interrupted rebuild
+        self.db.set(CHECKPOINT_KEY, "Flow:f2")
+
+        self.assertEqual(IndexRebuilder(self.plugin, batch_size=2).run(), 3)
+
+        self.assertEqual(
+            self.relations(), {"Node:n1,relations:": self.expected["Node:n1,relations:"]}
+        )
+        # the reverse index is only cleaned on a fresh start
+        self.assertEqual(self.referrers("Node", "n3"), {"global/Flow/f1/__UNVERSIONED__"})
+        self.assertFalse(self.db.exists(CHECKPOINT_KEY))
+
+        self.assertEqual(IndexRebuilder(self.plugin, resume=False).run(), 5)
+        self.assertEqual(self.relations(), self.expected)
+
+    def test_checkpoint(self):
+        batches = []
+
+        def process_batch(rebuilder, batch):
+            batches.append(batch[-1][0])
+            if len(batches) == 2:
+                raise RuntimeError("interrupted")
+            return len(batch)
+
+        rebuilder = IndexRebuilder(self.plugin, batch_size=2, workers=1)
+        with mock.patch.object(IndexRebuilder, "process_batch", process_batch):
+            with self.assertRaises(RuntimeError):
+                rebuilder.run()
+
+        # the first batch finished, the second one did not
+        self.assertEqual(batches[:2], ["Flow:f2", "Node:n2"])
+        self.assertEqual(self.db.get(CHECKPOINT_KEY), b"Flow:f2")
@@ -0,0 +1,150 @@
+import unittest
+from unittest import mock
+
+from dal.models.model import Model
+from dal.models.scopestree import scopes
+from dal.plugins.persistence.redis.redis import RedisPlugin
+from dal.utils.redis_mocks import FakeRedis
+
+
+def node(callback):
+    return {
+        "Label": "node",
+        "PortsInst": {"p": {"Template": "ROS1/Subscriber", "In": {"in": {"Callback": callback}}}},
+    }
+
+
+def flow(*templates):
+    return {
+        "Label": "flow",
+        "NodeInst": {
+            f"inst{idx}": {"Template": template} for idx, template in enumerate(templates)
+        },
+    }
+
+
+class TestRelationsIndex(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeRedis()
+        # the global workspace is created with the fake database, and dropped after
+        for patcher in (
+            mock.patch("dal.plugins.persistence.redis.redis.Redis", self.db),
+            mock.patch.dict(scopes._children, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.plugin = RedisPlugin(workspace="global")
+
+    def write(self, scope, ref, data):
+        self.plugin.write({scope: {ref: data}}, scope=scope, ref=ref, schema_version="1.0")
+
+    def referrers(self, scope, ref, **kwargs):
+        return self.plugin.get_referrer_objects(scope=scope, ref=ref, **kwargs)
+
+    def test_add(self):
+        self.write("Node", "RelN1", node("RelCb"))
+        self.write("Flow", "RelF1", flow("RelN1"))
+        self.write("Flow", "RelF2", flow("RelN1"))
+
+        self.assertEqual(
+            self.referrers("Node", "RelN1"),
+            {"global/Flow/RelF1/__UNVERSIONED__", "global/Flow/RelF2/__UNVERSIONED__"},
+        )
+        self.assertEqual(self.referrers("Callback", "RelCb"), {"global/Node/RelN1/__UNVERSIONED__"})
+        self.assertEqual(
+            self.referrers("Callback", "RelCb", depth=1),
+            {
+                "global/Node/RelN1/__UNVERSIONED__",
+                "global/Flow/RelF1/__UNVERSIONED__",
+                "global/Flow/RelF2/__UNVERSIONED__",
+            },
+        )
+        self.assertEqual(
+            self.referrers("Callback", "RelCb", depth=1, search_filter=["Flow"]),
+            {"global/Flow/RelF1/__UNVERSIONED__", "global/Flow/RelF2/__UNVERSIONED__"},
+        )
+        self.assertEqual(self.referrers("Node", "Unknown"), set())
+
+    def test_change(self):
+        self.write("Flow", "RelF3", flow("RelN2", "RelN3"))
+        self.write("Flow", "RelF3", flow("RelN3", "RelN4"))
+
+        self.assertEqual(self.referrers("Node", "RelN2"), set())
+        self.assertEqual(self.referrers("Node", "RelN3"), {"global/Flow/RelF3/__UNVERSIONED__"})
+        self.assertEqual(self.referrers("Node", "RelN4"), {"global/Flow/RelF3/__UNVERSIONED__"})
+        # the relations cache is kept sorted
+        self.assertEqual(
+            self.db.lrange("Flow:RelF3,relations:", 0, -1),
+            [b"global/Node/RelN3/__UNVERSIONED__", b"global/Node/RelN4/__UNVERSIONED__"],
+        )
+        # the relations were written again in the same transaction as the index
+        self.assertEqual(
+            [
+                args
+                for name, args in self.db.commands
+                if name == "delete" and "relations" in args[0]
+            ],
+            [("Flow:RelF3,relations:",)] * 2,
+        )
+
+    def test_delete(self):
+        self.write("Node", "RelN5", node("RelCb2"))
+        self.write("Flow", "RelF4", flow("RelN5"))
+
+        self.plugin.delete(scope="Node", ref="RelN5", schema_version="1.0")
+
+        # the node no longer references the callback
+        self.assertEqual(self.referrers("Callback", "RelCb2"), set())
+        self.assertFalse(self.db.exists("Node:RelN5,relations:"))
+        # the flow still references the deleted node
+        self.assertEqual(self.referrers("Node", "RelN5"), {"global/Flow/RelF4/__UNVERSIONED__"})
+        self.assertEqual(self.plugin.list_versions(scope="Node", ref="RelN5"), [])
+
+        self.plugin.delete_relations(self.db, "Flow", "RelF4")
+        self.assertEqual(self.referrers("Node", "RelN5"), set())
+
+    def test_list_scopes(self):
+        self.write("Node", "RelN9", node("RelCb4"))
+        self.write("Flow", "RelF7", flow("RelN9"))
+        self.plugin.delete(scope="Node", ref="RelN9", schema_version="1.0")
+        # keys with a scope and a name only
+        self.db.set("Short:RelS1", "value")
+
+        refs = {(item["scope"], item["ref"]) for item in self.plugin.list_scopes()}
+
+        # the reverse index alone is not an object
+        self.assertNotIn(("Node", "RelN9"), refs)
+        self.assertIn(("Flow", "RelF7"), refs)
+        self.assertIn(("Short", "RelS1"), refs)
+
+    def test_update_relations(self):
+        referrer = "global/Flow/RelF5/__UNVERSIONED__"
+        self.plugin.update_relations(
+            self.db,
+            "Flow",
+            "RelF5",
+            [],
+            {"global/Node/RelN6/__UNVERSIONED__", "other/Node/RelN7/__UNVERSIONED__"},
+        )
+        self.assertEqual(self.db.smembers("Node:RelN6,referenced_by:"), {referrer.encode()})
+        # targets in other workspaces are not indexed here
+        self.assertFalse(self.db.exists("Node:RelN7,referenced_by:"))
+
+        self.plugin.update_relations(
+            self.db, "Flow", "RelF5", ["global/Node/RelN6/__UNVERSIONED__"], set()
+        )
+        self.assertFalse(self.db.exists("Node:RelN6,referenced_by:", "Flow:RelF5,relations:"))
+
+    def test_model_get_referrers(self):
+        self.write("Node", "RelN8", node("RelCb3"))
+        self.write("Flow", "RelF6", flow("RelN8"))
+
+        model = scopes(workspace="global").Node["RelN8"]
+
+        self.assertEqual(model.get_referrers(), {"global/Flow/RelF6/__UNVERSIONED__"})
+        self.assertEqual(
+            Model.get_referrers_relations(
+                workspace="global", scope="Callback", ref="RelCb3", version="__UNVERSIONED__"
+            ),
+            {"global/Node/RelN8/__UNVERSIONED__"},
+        )
@@ -0,0 +1,217 @@
+import json
+import random
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from movai_core_shared.exceptions import RemapValidationError
+
+from dal.helpers.flow import GFlow
+from dal.helpers.flow.remaps import RemapEngine
+from dal.models.flowlinks import FlowLinks
+from dal.models.scopestree import scopes
+from dal.movaidb import MovaiDB
+from dal.scopes.flow import Flow as LegacyFlow
+from dal.validation.template import Template
+
+
+class FakeLinks:
+    def __init__(self):
+        self.value = {}
+
+    def __getitem__(self, key):
+        return Template.load_dict(
+            FlowLinks._parse_link(self.value[key]), FlowLinks.__LINK_TEMPLATE__
+        )
+
+    def ids(self):
+        return self.value.keys()
+
+    @property
+    def full(self):
+        return self.value
+
+
+class FakeFlow:
+    ref = "fake"
+
+    def __init__(self, nodes: int, non_remappable: set):
+        template = SimpleNamespace(
+            PortsInst={f"p{idx}": SimpleNamespace(Template="ROS1/Publisher") for idx in range(3)}
+        )
+        self.nodes = {
+            f"n{idx}": SimpleNamespace(
+                is_remappable=idx not in non_remappable,
+                is_dummy=False,
+                node_template=template,
+                get_params=lambda idx=idx: {"_namespace": f"/ns_n{idx}"},
+            )
+            for idx in range(nodes)
+        }
+        self.NodeInst = self.nodes
+        self.full = SimpleNamespace(NodeInst=self.nodes)
+        self.Links = FakeLinks()
+
+    def get_node_inst(self, name):
+        return self.nodes[name]
+
+    def get_node_inst_param(self, name, key):
+        return f"/ns_{name}"
+
+
+def full_remaps(flow):
+    try:
+        return GFlow(flow).calc_remaps()
+    except RemapValidationError:
+        return RemapValidationError
+
+
+def engine_remaps(call, *args):
+    try:
+        return call(*args)
+    except RemapValidationError:
+        return RemapValidationError
+
+
+class TestRemapEngine(unittest.TestCase):
+    def run_random(self, seed, non_remappable):
+        rnd = random.Random(seed)
+        flow = FakeFlow(12, non_remappable)
+        for idx in range(10):
+            flow.Links.value[f"l{idx}"] = self.random_link(rnd)
+
+        gflow = GFlow(flow)
+        self.assertEqual(engine_remaps(gflow.engine.remaps), full_remaps(flow))
+
+        for step in range(60):
+            if flow.Links.value and rnd.random() < 0.4:
+                link_id = rnd.choice(list(flow.Links.value))
+                del flow.Links.value[link_id]
+                result = engine_remaps(gflow.delete_link, link_id)
+            else:
+                link_id = f"new{step}"
+                flow.Links.value[link_id] = self.random_link(rnd)
+                result = engine_remaps(gflow.add_link, link_id)
+
+            self.assertEqual(result, full_remaps(flow), f"seed {seed} step {step}")
+
+    @staticmethod
+    def random_link(rnd):
+        source, target = rnd.sample(range(12), 2)
+        return {
+            "From": f"n{source}/p{rnd.randrange(3)}/out",
+            "To": f"n{target}/p{rnd.randrange(3)}/in",
+        }
+
+    def test_same_as_full_recompute(self):
+        for seed in range(5):
+            self.run_random(seed, set())
+
+    def test_same_as_full_recompute_with_forced_remaps(self):
+        for seed in range(5):
+            self.run_random(seed, {3, 7})
+
+    def test_update_node(self):
+        flow = FakeFlow(4, set())
+        flow.Links.value["l1"] = {"From": "n0/p0/out", "To": "n1/p0/in"}
+        flow.Links.value["l2"] = {"From": "n2/p0/out", "To": "n3/p0/in"}
+        gflow = GFlow(flow)
+        gflow.engine
+
+        flow.nodes["n0"].is_remappable = False
+        self.assertEqual(gflow.update_node("n0"), full_remaps(flow))
+        self.assertIn("/ns_n0/p0", gflow.remaps)
+
+    def test_graph_built_once(self):
+        flow = FakeFlow(4, set())
+        flow.Links.value["l1"] = {"From": "n0/p0/out", "To": "n1/p0/in"}
+        gflow = GFlow(flow)
+        gflow.engine
+
+        flow.Links.value["l2"] = {"From": "n2/p0/out", "To": "n3/p0/in"}
+        with mock.patch.object(
+            RemapEngine, "graph", autospec=True, side_effect=RemapEngine.graph
+        ) as graph:
+            self.assertEqual(gflow.add_link("l2"), full_remaps(flow))
+        graph.assert_called_once()
+        # the links are kept in the order of a full recompute
+        self.assertEqual([link_id for _, link_id in gflow.engine._sequence], ["l1", "l2"])
+
+
+def ports(template):
+    direction = "Out" if template == "ROS1/Publisher" else "In"
+    return {"Template": template, direction: {direction.lower(): {"Message": "std_msgs/String"}}}
+
+
+OBJECTS = {
+    "Flow": {
+        "main": {
+            "Label": "main",
+            "NodeInst": {
+                "talker": {"Template": "Talker"},
+                "other": {"Template": "Talker"},
+                "listener": {"Template": "Listener"},
+                "fixed": {
+                    "Template": "Listener",
+                    "Parameter": {"_remappable": {"Value": False}},
+                },
+            },
+            "Container": {"sub": {"ContainerFlow": "inner", "ContainerLabel": "sub"}},
+            "Links": {"l1": {"From": "talker/pub/out", "To": "listener/sub/in"}},
+        },
+        "inner": {
+            "Label": "inner",
+            "NodeInst": {"echo": {"Template": "Listener"}, "source": {"Template": "Talker"}},
+            "Links": {"l2": {"From": "source/pub/out", "To": "echo/sub/in"}},
+        },
+    },
+    "Node": {
+        "Talker": {"Label": "Talker", "PortsInst": {"pub": ports("ROS1/Publisher")}},
+        "Listener": {"Label": "Listener", "PortsInst": {"sub": ports("ROS1/Subscriber")}},
+    },
+    "Ports": {
+        "ROS1/Publisher": {"Label": "Publisher", "Out": {"out": {"Message": "std_msgs/String"}}},
+        "ROS1/Subscriber": {"Label": "Subscriber", "In": {"in": {"Message": "std_msgs/String"}}},
+    },
+}
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestFlowLinks(unittest.TestCase):
+    def setUp(self):
+        movaidb = MovaiDB()
+        for scope, objects in OBJECTS.items():
+            for name, content in objects.items():
+                movaidb.set({scope: {name: json.loads(json.dumps(content))}})
+        self.flow = scopes().Flow["main"]
+
+    def full_remaps(self):
+        # the full flow compiled again
+        self.flow._full = None
+        return GFlow(self.flow).calc_remaps()
+
+    def test_add_and_delete(self):
+        self.flow.remaps
+        with mock.patch.object(RemapEngine, "build") as build:
+            link_id, _ = self.flow.Links.add("other", "pub", "fixed", "sub", "out", "in")
+            added = self.flow.remaps
+            self.assertEqual(added, self.full_remaps())
+            self.assertIn("sub", added)
+
+            self.flow.Links.add("other", "pub", "listener", "sub", "out", "in")
+            self.flow.Links.delete(link_id)
+            self.assertEqual(self.flow.remaps, self.full_remaps())
+        # only the touched ports were solved again
+        build.assert_not_called()
+
+    def test_legacy_new_link(self):
+        new_link = {"new": {"From": "other/pub/out", "To": "fixed/sub/in"}}
+
+        remaps = LegacyFlow("main").calc_remaps(new_link)
+
+        self.assertIn("sub", remaps)
+        self.assertNotIn("new", self.flow.Links.value)
+        self.assertNotIn("sub", self.flow.remaps)
+        self.flow.Links.value.update(new_link)
+        self.assertEqual(remaps, self.full_remaps())
@@ -0,0 +1,179 @@
+import unittest
+from unittest import mock
+
+import pytest
+
+from dal.movaidb import MovaiDB
+from dal.scopes.structures import tracked_write
+from dal.utils.redis_mocks import FakeRedis
+from dal.utils.usage_search.usage_index import (
+    DIRTY_KEY,
+    DIRTY_NODES_KEY,
+    UsageIndex,
+    dirty_flows,
+    mark_dirty,
+)
+
+
+def node_inst(template):
+    return {"Template": template, "NodeLabel": "label"}
+
+
+def container(flow):
+    return {"ContainerFlow": flow, "ContainerLabel": "label"}
+
+
+def link(_from, _to):
+    return {"From": _from, "To": _to}
+
+
+def callbacks(**ports):
+    return {
+        "PortsInst": {
+            port: {"In": {"in": {"Callback": callback}}} for port, callback in ports.items()
+        }
+    }
+
+
+FLOWS = {
+    "leaf": {
+        "NodeInst": {"pub": node_inst("Pub"), "sub": node_inst("Sub")},
+        "ExposedPorts": {"Pub": {"pub": ["out/out"]}},
+        "Links": {"l1": link("pub/out/out", "sub/in/in")},
+    },
+    "middle": {
+        "NodeInst": {"sub": node_inst("Sub")},
+        "Container": {"c1": container("leaf"), "c2": container("leaf")},
+        "Links": {
+            "l2": link("c1__pub/out/out", "sub/in/in"),
+            "l3": link("c2__pub/out/out", "sub/in/in"),
+        },
+    },
+    "main": {"Container": {"top": container("middle")}},
+}
+
+NODES = {"Pub": callbacks(tick="on_tick"), "Sub": callbacks(data="on_data", tick="on_tick")}
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestUsageIndex(unittest.TestCase):
+    def setUp(self):
+        self.movaidb = MovaiDB()
+        for name, flow in FLOWS.items():
+            self.write("Flow", name, flow)
+        for name, node in NODES.items():
+            self.write("Node", name, node)
+
+        # names of the flows and nodes read
+        self.reads = []
+        scan_iter, find = self.db.scan_iter, self.movaidb.find
+
+        def scan_flow(match=None, **kwargs):
+            # Flow:<flow>,*
+            if match and match.startswith("Flow:"):
+                self.reads.append(match[len("Flow:") : -len(",*")])
+            return scan_iter(match=match, **kwargs)
+
+        def find_node(_input):
+            self.reads.append(next(iter(_input["Node"])))
+            return find(_input)
+
+        for patcher in (
+            mock.patch.object(self.db, "scan_iter", side_effect=scan_flow, create=True),
+            mock.patch.object(self.movaidb, "find", side_effect=find_node),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.index = UsageIndex(self.movaidb)
+        self.index.refresh()
+
+    def write(self, scope, name, data):
+        tracked_write(self.movaidb, "unsafe_delete", {scope: {name: "**"}})
+        tracked_write(self.movaidb, "set", {scope: {name: {"Label": name, **data}}})
+
+    def test_dirty_flows(self):
+        keys = [
+            "Flow:main,NodeInst:pub,Template:",
+            b"Flow:other,Container:c1,ContainerFlow:",
+            "Flow:last,Links:",
+            "Flow:main,Label:",
+            "Node:pub,Label:",
+        ]
+        self.assertEqual(dirty_flows(keys), {"main", "other", "last"})
+
+    def test_mark_dirty(self):
+        conn = FakeRedis()
+        mark_dirty(
+            conn,
+            ["Flow:main,Links:", "Node:Sub,PortsInst:data,In:in,Callback:cb", "Node:*,PortsInst:"],
+        )
+        self.assertEqual(conn.smembers(DIRTY_KEY), {b"main"})
+        self.assertEqual(conn.smembers(DIRTY_NODES_KEY), {b"Sub"})
+
+    def test_used_by(self):
+        self.assertEqual(self.index.used_by("Node", "Sub"), {"leaf": ["sub"], "middle": ["sub"]})
+        self.assertEqual(self.index.used_by("Flow", "leaf"), {"middle": ["c1", "c2"]})
+        self.assertEqual(self.index.used_by("Node", "Unused"), {})
+
+    def test_indirect(self):
+        self.assertEqual(
+            self.index.indirect(["leaf"]),
+            {"middle": [("leaf", "c1"), ("leaf", "c2")], "main": [("middle", "top")]},
+        )
+
+    def test_only_dirty_flows_are_read(self):
+        # writes mark the flows dirty
+        self.write("Flow", "main", {**FLOWS["main"], "NodeInst": {"sub": node_inst("Sub")}})
+        tracked_write(self.movaidb, "unsafe_delete", {"Flow": {"middle": "**"}})
+        self.assertEqual(self.db.smembers(DIRTY_KEY), {b"main", b"middle"})
+        self.reads.clear()
+
+        self.index.refresh()
+
+        self.assertEqual(sorted(self.reads), ["main", "middle"])
+        self.assertEqual(self.index.used_by("Node", "Sub"), {"leaf": ["sub"], "main": ["sub"]})
+        self.assertEqual(self.index.used_by("Flow", "leaf"), {})
+        self.assertEqual(self.index.used_by("Flow", "middle"), {"main": ["top"]})
+
+    def test_exposed(self):
+        self.assertEqual(self.index.exposed("Pub", "out"), [("leaf", "pub", "out/out")])
+        self.assertEqual(self.index.exposed("Pub", "in"), [])
+
+    def test_links(self):
+        self.assertEqual(
+            self.index.links("middle", "c1__pub", "out"),
+            {"l2": link("c1__pub/out/out", "sub/in/in")},
+        )
+        self.assertEqual(sorted(self.index.links("middle", "sub", "in")), ["l2", "l3"])
+        self.assertEqual(self.index.links("leaf", "pub", "in"), {})
+
+    def test_ports_of_dirty_flows(self):
+        self.write("Flow", "leaf", {**FLOWS["leaf"], "ExposedPorts": {}})
+        links = {"l3": FLOWS["middle"]["Links"]["l3"]}
+        self.write("Flow", "middle", {**FLOWS["middle"], "Links": links})
+
+        self.index.refresh()
+
+        self.assertEqual(self.index.exposed("Pub", "out"), [])
+        self.assertEqual(list(self.index.links("middle", "sub", "in")), ["l3"])
+        self.assertEqual(self.index.links("middle", "c1__pub", "out"), {})
+
+    def test_callbacks(self):
+        self.assertEqual(
+            self.index.used_by("Callback", "on_tick"), {"Pub": ["tick,in"], "Sub": ["tick,in"]}
+        )
+        self.assertEqual(self.index.used_by("Callback", "on_data"), {"Sub": ["data,in"]})
+
+    def test_callbacks_of_dirty_nodes(self):
+        self.write("Node", "Sub", callbacks(data="on_tick"))
+        self.assertEqual(self.db.smembers(DIRTY_NODES_KEY), {b"Sub"})
+        self.reads.clear()
+
+        self.index.refresh()
+
+        self.assertEqual(self.reads, ["Sub"])
+        self.assertEqual(
+            self.index.used_by("Callback", "on_tick"), {"Pub": ["tick,in"], "Sub": ["data,in"]}
+        )
+        self.assertEqual(self.index.used_by("Callback", "on_data"), {})
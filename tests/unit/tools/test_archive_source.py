@@ -0,0 +1,107 @@
+"""Tests for the archive project source of the backup tool."""
+
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from dal.tools.backup import (
+    ArchiveProjectSource,
+    FilesystemProjectSource,
+    InMemoryProjectSource,
+    open_project_source,
+)
+
+FILES = {
+    "manifest.txt": "Flow:main\n",
+    "metadata/Flow/main.json": '{"Flow": {"main": {}}}',
+    "metadata/Callback/cb.json": '{"Callback": {"cb": {}}}',
+    "metadata/Callback/cb.py": "print('cb')",
+    "metadata/Package/maps/floor/map.pgm": "P5",
+}
+
+
+def write_archive(path, files):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path, "w") as archive:
+            for name, text in files.items():
+                archive.writestr(name, text)
+        return
+
+    with tarfile.open(path, "w:gz" if path.endswith(".gz") else "w") as archive:
+        for name, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class TestArchiveProjectSource(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def archive(self, name, files=FILES, **kwargs):
+        path = os.path.join(self.tmp, name)
+        write_archive(path, files)
+        source = ArchiveProjectSource(path, **kwargs)
+        self.addCleanup(source.close)
+        return source
+
+    def test_read(self):
+        expected = InMemoryProjectSource(
+            {name[len("metadata/") :]: text for name, text in FILES.items() if "/" in name}
+        )
+        for name in ("project.zip", "project.tar", "project.tar.gz"):
+            source = self.archive(name)
+
+            self.assertEqual(source.root, "metadata", name)
+            self.assertEqual(source.list_dir(""), ["Callback", "Flow", "Package"])
+            self.assertEqual(source.list_dir("Callback"), ["cb.json", "cb.py"])
+            self.assertTrue(source.is_dir("Package/maps/floor"))
+            self.assertFalse(source.is_file("Package/maps"))
+            self.assertEqual(source.read_text("Callback/cb.py"), "print('cb')")
+            self.assertEqual(source.read_bytes("Package/maps/floor/map.pgm"), b"P5")
+            self.assertEqual(
+                source.display_path("Flow/main.json"),
+                os.path.join(self.tmp, name, "metadata", "Flow", "main.json"),
+            )
+            self.assertEqual(
+                sorted((root, sorted(files)) for root, _, files in source.walk("")),
+                sorted((root, sorted(files)) for root, _, files in expected.walk("")),
+            )
+            with self.assertRaises(FileNotFoundError):
+                source.read_text("Flow/other.json")
+            with self.assertRaises(FileNotFoundError):
+                source.list_dir("Node")
+
+            # concurrent reads
+            paths = ["Callback/cb.py", "Flow/main.json", "Callback/cb.json"] * 20
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                texts = list(executor.map(source.read_text, paths))
+            self.assertEqual(texts, [expected.read_text(path) for path in paths])
+
+    def test_root(self):
+        # a folder with the scopes
+        files = {f"pkg/{name}": text for name, text in FILES.items()}
+        self.assertEqual(self.archive("wrapped.zip", files).root, "pkg/metadata")
+        self.assertEqual(self.archive("flat.zip", {"Flow/main.json": "{}"}).root, "")
+
+        source = self.archive("explicit.tar", files, root="pkg")
+        self.assertEqual(source.list_dir(""), ["manifest.txt", "metadata"])
+
+    def test_open(self):
+        write_archive(os.path.join(self.tmp, "project.tgz"), FILES)
+        source = open_project_source(os.path.join(self.tmp, "project.tgz"))
+        self.addCleanup(source.close)
+        self.assertIsInstance(source, ArchiveProjectSource)
+        self.assertIsInstance(open_project_source(self.tmp), FilesystemProjectSource)
+
+        with open(os.path.join(self.tmp, "broken.zip"), "w") as file:
+            file.write("not an archive")
+        with self.assertRaises(ValueError):
+            ArchiveProjectSource(os.path.join(self.tmp, "broken.zip"))
@@ -0,0 +1,124 @@
+"""Tests for the batched removal of the backup tool."""
+
+import unittest
+from unittest import mock
+
+import pytest
+
+from dal.tools.backup import RemoveException, Remover
+
+KEYS = [
+    "Flow:main,Label:",
+    "Flow:main,NodeInst:a,Template:",
+    "Flow:other,Label:",
+    "Flow:keep,NodeInst:c,Template:",
+    "Node:N1,Label:",
+    "Node:N1,PortsInst:p,In:in,Callback:",
+    "Callback:cb,Label:",
+    "Callback:cb,Code:",
+    "Callback:shared,Label:",
+    "Node:N2,PortsInst:p,In:in,Callback:",
+    "Callback:cb2,Label:",
+    "Var:global,x:",
+]
+
+DOCUMENTS = {
+    "Flow": {
+        "main": {"NodeInst": {"a": {"Template": "N2"}}},
+        "other": {},
+        "keep": {"NodeInst": {"c": {"Template": "N1"}}},
+    },
+    "Node": {
+        "N1": {"PortsInst": {"p": {"In": {"in": {"Callback": "cb"}}}}},
+        "N2": {"PortsInst": {"p": {"In": {"in": {"Callback": "cb2"}}}}},
+    },
+    "Callback": {"cb": {}, "cb2": {}, "shared": {}},
+}
+
+
+def read_documents(scope, keys, movaidb):
+    return {name: {scope: {name: DOCUMENTS[scope][name]}} for name in keys}
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestBatchRemove(unittest.TestCase):
+    def setUp(self):
+        for key in sorted(KEYS):
+            self.db.set(key, "value")
+        patcher = mock.patch("dal.tools.backup.read_documents", side_effect=read_documents)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def commands(self, name):
+        return [args for command, args in self.db.commands if command == name]
+
+    def keys(self):
+        """Keys of the objects, without the indexes and the stamps"""
+        return {key.decode() for key in self.db.keys() if not key.startswith(b"_")}
+
+    def test_individual(self):
+        remover = Remover(recursive=False, batch_size=2)
+        remover.run({"Flow": ["main"], "Callback": ["cb"]})
+
+        self.assertEqual(len(self.commands("scan_iter")), 1)
+        self.assertEqual(
+            self.commands("unlink"),
+            [
+                ("Flow:main,Label:", "Flow:main,NodeInst:a,Template:"),
+                ("Callback:cb,Code:", "Callback:cb,Label:"),
+            ],
+        )
+        self.assertEqual(
+            [fields for _, *fields in self.commands("hdel")], [["Flow/main"], ["Callback/cb"]]
+        )
+        self.assertTrue(remover.removed("Callback", "cb"))
+        self.assertIn("Flow:other,Label:", self.keys())
+
+    def test_recursive(self):
+        with self.assertRaises(RemoveException):
+            Remover().run({"Flow": ["main"]})
+        self.assertEqual(self.keys(), set(KEYS))
+
+    def test_dependencies(self):
+        # N1 and its callback are used by Flow:keep
+        self.db.set("Flow:main,NodeInst:b,Template:", "value")
+        DOCUMENTS["Flow"]["main"]["NodeInst"]["b"] = {"Template": "N1"}
+        self.addCleanup(DOCUMENTS["Flow"]["main"]["NodeInst"].pop, "b")
+
+        with mock.patch("builtins.print") as printed:
+            Remover(dry=True, dependencies=True).run({"Flow": ["main"]})
+        self.assertEqual(
+            [call.args[0] for call in printed.mock_calls],
+            [
+                "Would remove Flow:main (3 keys)",
+                "Would remove Node:N2 (1 keys), dependency",
+                "Would remove Callback:cb2 (1 keys), dependency",
+                "Would keep Node:N1, used by Flow:keep",
+                "Would keep Callback:cb, used by Node:N1",
+                "3 objects, 5 keys",
+            ],
+        )
+        self.assertEqual(self.commands("unlink"), [])
+
+        Remover(batch_size=100, dependencies=True).run({"Flow": ["main"]})
+        self.assertEqual(
+            self.keys(),
+            set(KEYS)
+            - {
+                "Flow:main,Label:",
+                "Flow:main,NodeInst:a,Template:",
+                "Node:N2,PortsInst:p,In:in,Callback:",
+                "Callback:cb2,Label:",
+            },
+        )
+
+    def test_missing(self):
+        with self.assertRaises(RemoveException) as context:
+            Remover(recursive=False).run({"Flow": ["main", "gone"]})
+        self.assertEqual(str(context.exception), "Item Flow:gone not present in database")
+        # nothing removed
+        self.assertEqual(self.keys(), set(KEYS))
+
+        # all the objects of a scope
+        Remover(recursive=False).run({"Callback": [None]})
+        self.assertFalse(any(key.startswith("Callback:") for key in self.keys()))
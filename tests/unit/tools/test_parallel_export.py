@@ -0,0 +1,250 @@
+"""Tests for the streaming export of the backup tool."""
+
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import pytest
+
+from dal.movaidb import MovaiDB
+from dal.tools.backup import ExportException, Exporter, Factory
+from dal.utils.scope_keys import scope_keys as db_scope_keys
+from dal.validation.project_snapshot import read_documents as db_read_documents
+
+DOCUMENTS = {
+    "Flow": {
+        "main": {
+            "Label": "main",
+            "InstallPath": "/opt/project/Flow/main.json",
+            "NodeInst": {"a": {"Template": "N1"}},
+        },
+    },
+    "Node": {
+        "N1": {
+            "Label": "N1",
+            "Dummy": True,
+            "PortsInst": {"p": {"In": {"in": {"Callback": "cb"}}, "Template": "ROS1/Subscriber"}},
+            "Parameter": {"rate": {"Value": "$(config conf.rate)"}},
+        },
+    },
+    "Callback": {"cb": {"Label": "cb", "Code": "print('cb')"}},
+    "Configuration": {"conf": {"Label": "conf", "Yaml": "rate: 1"}},
+    "Ports": {
+        "pkg/P1": {"Label": "P1", "Data": {}, "InstallPath": "x"},
+        "pkg/P2": {"Label": "P2", "Data": {}},
+    },
+}
+
+FILES = {
+    "Flow/main.json": {"Flow": {"main": {"Label": "main", "NodeInst": {"a": {"Template": "N1"}}}}},
+    "Node/N1.json": {
+        "Node": {
+            "N1": {
+                "Label": "N1",
+                "Launch": False,
+                "Remappable": False,
+                "PortsInst": DOCUMENTS["Node"]["N1"]["PortsInst"],
+                "Parameter": DOCUMENTS["Node"]["N1"]["Parameter"],
+            }
+        }
+    },
+    "Callback/cb.json": {"Callback": {"cb": {"Label": "cb"}}},
+    "Callback/cb.py": "print('cb')",
+    "Configuration/conf.json": {"Configuration": {"conf": {"Label": "conf"}}},
+    "Configuration/conf.yaml": "rate: 1",
+}
+
+
+# written to the database for the export of every scope with a legacy class
+OBJECTS = {
+    "Flow": {
+        "main": {
+            "Label": "main",
+            "InstallPath": "/opt/project/Flow/main.json",
+            "NodeInst": {"a": {"Template": "N1"}, "b": {"Template": "SM"}},
+            "Container": {"sub": {"ContainerFlow": "inner"}},
+        },
+        "inner": {"Label": "inner", "NodeInst": {"c": {"Template": "N1"}}},
+    },
+    "Node": {
+        "N1": DOCUMENTS["Node"]["N1"],
+        "SM": {
+            "Label": "SM",
+            "PortsInst": {
+                "sm": {
+                    "Template": "MovAI/StateMachine",
+                    "In": {"in": {"Callback": "place_holder", "Parameter": {"StateMachine": "sm"}}},
+                }
+            },
+        },
+    },
+    "StateMachine": {"sm": {"Label": "sm", "State": {"s": {"Callback": "state"}}}},
+    "Callback": {"cb": DOCUMENTS["Callback"]["cb"], "state": {"Label": "state", "Code": "pass"}},
+    "Configuration": DOCUMENTS["Configuration"],
+    "Ports": {
+        "pkg/P1": {"Label": "P1", "InstallPath": "x", "Data": {"Package": "msgs"}},
+        "pkg/P2": {"Label": "P2", "InstallPath": "y", "Data": {}},
+    },
+    "Message": {
+        "msgs": {
+            "Label": "msgs",
+            "Msg": {"Pose": {"Source": "float64 x", "Compiled": "pose"}},
+            "Srv": {"Get": {"Source": "---", "Compiled": "get"}},
+        }
+    },
+    "Package": {
+        "files": {"Label": "files", "File": {"a.txt": {"Value": "a"}, "b/c.txt": {"Value": "c"}}}
+    },
+    "Translation": {"tr": {"Label": "tr", "Translations": {"pt": {"po": "msgid x"}}}},
+}
+
+
+def scope_keys(scope, movaidb):
+    return {name: [f"{scope}:{name}"] for name in DOCUMENTS.get(scope, {})}
+
+
+def read_documents(scope, keys, movaidb):
+    return {name: {scope: {name: json.loads(json.dumps(DOCUMENTS[scope][name]))}} for name in keys}
+
+
+class TestParallelExport(unittest.TestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch("dal.tools.backup.MovaiDB"),
+            mock.patch("dal.tools.backup.scope_keys", side_effect=scope_keys),
+            mock.patch("dal.tools.backup.read_documents", side_effect=read_documents),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def assertFiles(self, files):
+        self.assertEqual(set(files), set(FILES))
+        for path, content in FILES.items():
+            if path.endswith(".json"):
+                self.assertEqual(json.loads(files[path]), content, path)
+            else:
+                self.assertEqual(files[path], content, path)
+
+    def test_directory(self):
+        path = os.path.join(self.tmp, "project")
+        Exporter(path, workers=2).run({"Flow": ["main"]})
+
+        files = {}
+        for root, _, names in os.walk(path):
+            for name in names:
+                with open(os.path.join(root, name)) as file:
+                    files[os.path.relpath(os.path.join(root, name), path)] = file.read()
+        self.assertFiles(files)
+
+    def test_archives(self):
+        path = os.path.join(self.tmp, "project.zip")
+        Exporter(path).run({"Flow": ["main"]})
+        with zipfile.ZipFile(path) as archive:
+            self.assertFiles({name: archive.read(name).decode() for name in archive.namelist()})
+
+        path = os.path.join(self.tmp, "project.tar.gz")
+        Exporter(path, workers=1).run({"Flow": ["main"]})
+        with tarfile.open(path) as archive:
+            self.assertFiles(
+                {
+                    member.name: archive.extractfile(member).read().decode()
+                    for member in archive.getmembers()
+                }
+            )
+
+    def test_ports(self):
+        # the ports of a package share a file, merged with the one in the project
+        path = os.path.join(self.tmp, "project")
+        os.makedirs(os.path.join(path, "Ports"))
+        with open(os.path.join(path, "Ports", "pkg.json"), "w") as file:
+            json.dump({"Ports": {"pkg/P0": {"Label": "P0"}}}, file)
+
+        exporter = Exporter(path)
+        # replace without asking
+        exporter._override = 1
+        exporter.run({"Ports": ["pkg/P1", "pkg/P2"]})
+
+        with open(os.path.join(path, "Ports", "pkg.json")) as file:
+            self.assertEqual(
+                json.load(file),
+                {
+                    "Ports": {
+                        "pkg/P0": {"Label": "P0"},
+                        "pkg/P1": {"Label": "P1", "Data": {}},
+                        "pkg/P2": {"Label": "P2", "Data": {}},
+                    }
+                },
+            )
+        self.assertTrue(exporter.exported("Ports", "pkg/P2"))
+
+    def test_missing(self):
+        with self.assertRaises(ExportException) as context:
+            Exporter(os.path.join(self.tmp, "project.zip")).run({"Flow": ["main", "other"]})
+        self.assertEqual(str(context.exception), "Can't find Flow:other")
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestExportEquivalence(unittest.TestCase):
+    """The streaming export writes what the export_<scope> functions write."""
+
+    def setUp(self):
+        movaidb = MovaiDB()
+        for scope, objects in OBJECTS.items():
+            for name, content in objects.items():
+                movaidb.set({scope: {name: json.loads(json.dumps(content))}})
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def export(self, workers):
+        path = os.path.join(self.tmp, str(workers))
+        exporter = Exporter(path, workers=workers)
+        # the legacy export writes the file of a package once for each port
+        exporter._override = 1
+        exporter.run(
+            {
+                "Flow": ["main"],
+                "Ports": ["pkg/P1", "pkg/P2"],
+                "Package": ["files"],
+                "Translation": ["tr"],
+            }
+        )
+
+        files = {}
+        for root, _, names in os.walk(path):
+            for name in names:
+                with open(os.path.join(root, name), "rb") as file:
+                    files[os.path.relpath(os.path.join(root, name), path)] = file.read()
+        return files
+
+    def test_documents(self):
+        for scope, objects in OBJECTS.items():
+            documents = db_read_documents(scope, db_scope_keys(scope))
+            self.assertEqual(set(documents), set(objects), scope)
+            for name in objects:
+                self.assertEqual(
+                    documents[name], Factory.get_class(scope)(name).get_dict(), f"{scope}:{name}"
+                )
+
+    def test_workers(self):
+        legacy = self.export(workers=1)
+        streamed = self.export(workers=2)
+
+        self.assertEqual(sorted(streamed), sorted(legacy))
+        for path, data in legacy.items():
+            self.assertEqual(streamed[path], data, path)
+
+        self.assertIn("Message/msgs/Pose.source", legacy)
+        self.assertEqual(
+            json.loads(legacy["Ports/pkg.json"])["Ports"]["pkg/P2"],
+            {"Label": "P2", "Info": "", "Data": {}},
+        )
@@ -0,0 +1,315 @@
+"""Tests for the parallel import of the backup tool."""
+
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from dal.movaidb import MovaiDB
+from dal.scopes.scope import Scope
+from dal.tools.backup import Backup, ImportException, Importer, InMemoryProjectSource
+from dal.tools.import_hashes import HASHES_KEY
+from dal.utils.generations import object_names
+from dal.utils.redis_mocks import FakePipeline
+
+METADATA = Path(__file__).parents[1] / "data" / "valid" / "metadata"
+
+
+def document(scope, name, content):
+    return json.dumps({scope: {name: {"Label": name, **content}}})
+
+
+FILES = {
+    "Flow/main.json": document(
+        "Flow",
+        "main",
+        {
+            "NodeInst": {"a": {"Template": "N1"}},
+            "Container": {"c": {"ContainerFlow": "sub"}},
+        },
+    ),
+    "Flow/sub.json": document("Flow", "sub", {"NodeInst": {"b": {"Template": "N1"}}}),
+    "Node/N1.json": document(
+        "Node",
+        "N1",
+        {
+            "PortsInst": {"p": {"In": {"in": {"Callback": "cb"}}, "Template": "ROS1/Subscriber"}},
+            "Parameter": {"rate": {"Value": "$(config conf.rate)"}},
+        },
+    ),
+    "Callback/cb.json": document("Callback", "cb", {}),
+    "Callback/cb.py": "print('cb')",
+    "Configuration/conf.json": document("Configuration", "conf", {}),
+    "Configuration/conf.yaml": "rate: 1",
+    "Callback/unused.json": document("Callback", "unused", {}),
+}
+
+
+# dependencies of the scopes not in the fixture project
+DEPENDENCY_FILES = {
+    "StateMachine/sm.json": document(
+        "StateMachine",
+        "sm",
+        {"State": {"a": {"Callback": "cb"}, "b": {"Callback": "place_holder"}}},
+    ),
+    "Callback/cb.json": document("Callback", "cb", {}),
+    "Callback/score.json": document("Callback", "score", {}),
+    "TaskTemplate/tt.json": document(
+        "TaskTemplate",
+        "tt",
+        {
+            "ScoringFunction": "score",
+            "GenericScoringFunction": "place_holder",
+            "TaskFilter": "place_holder",
+            "SharedData": {"sdt": {"Enumerator": "e"}},
+        },
+    ),
+    "SharedDataTemplate/sdt.json": document("SharedDataTemplate", "sdt", {}),
+    "SharedDataEntry/sde.json": document("SharedDataEntry", "sde", {"TemplateID": "sdt"}),
+    "Ports/pkg.json": json.dumps(
+        {"Ports": {"pkg/P1": {"Data": {"Package": "msgs"}}, "pkg/P2": {"Data": {}}}}
+    ),
+    "Message/msgs.json": json.dumps({"Msg": ["Pose"]}),
+    "Message/msgs/Pose.source": "float64 x",
+    "Message/msgs/Pose.compiled": "",
+}
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestParallelImport(unittest.TestCase):
+    def setUp(self):
+        self.package = mock.Mock()
+        self.errors = {}
+        # objects written by each pipeline, existence checks are not writes
+        self.executed = []
+        execute = FakePipeline.execute
+
+        def record(pipe, *args, **kwargs):
+            keys = [args[0] for name, args, _ in pipe.command_stack if name != "exists" and args]
+            objects = [tuple(name.split(":", 1)) for name in sorted(object_names(keys))]
+            if objects:
+                self.executed.append(objects)
+            return execute(pipe, *args, **kwargs)
+
+        for patcher in (
+            mock.patch.object(FakePipeline, "execute", autospec=True, side_effect=record),
+            mock.patch("dal.tools.backup.Package", self.package),
+            mock.patch.object(
+                Scope,
+                "validate_format_many",
+                classmethod(lambda cls, scope, documents: dict(self.errors.get(scope, {}))),
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def importer(self, files=FILES, **kwargs):
+        kwargs.setdefault("workers", 2)
+        kwargs.setdefault("source", InMemoryProjectSource(files))
+        return Importer("project", workspace="test", **kwargs)
+
+    def test_levels(self):
+        importer = self.importer()
+        importer.run({"Flow": ["main"]})
+
+        self.assertEqual(
+            self.executed,
+            [
+                [("Callback", "cb"), ("Configuration", "conf")],
+                [("Node", "N1")],
+                [("Flow", "sub")],
+                [("Flow", "main")],
+            ],
+        )
+        self.assertFalse(importer.imported("Callback", "unused"))
+        self.assertTrue(importer.imported("Flow", "main"))
+
+        tracked = [call.kwargs["new_data"] for call in self.package.update_packagedata.mock_calls]
+        self.assertEqual([data.get("Callback") for data in tracked if "Callback" in data], [["cb"]])
+
+        # the code and yaml are read by the import functions
+        items = self.importer()._plan([("Callback", ["cb"])], mock.Mock(map=map))
+        self.assertEqual(items[("Callback", "cb")].data["Callback"]["cb"]["Code"], "print('cb')")
+
+    def test_individual(self):
+        self.importer(recursive=False).run({"Flow": ["main"]})
+        self.assertEqual(self.executed, [[("Flow", "main")]])
+
+    def test_invalid(self):
+        self.errors = {"Flow": {"sub": "bad sub"}, "Node": {"N1": "bad node"}}
+
+        with self.assertRaises(ImportException) as context:
+            self.importer().run({"Flow": ["main"]})
+        # the first error in import order, nothing written
+        self.assertEqual(str(context.exception), "bad node")
+        self.assertEqual(self.executed, [])
+
+        with mock.patch("builtins.print") as printed:
+            self.importer(force=True).run({"Flow": ["main"]})
+        self.assertEqual(
+            [call.args[0] for call in printed.mock_calls],
+            ["Failed to import Node:N1 - bad node", "Failed to import Flow:sub - bad sub"],
+        )
+        self.assertEqual(
+            self.executed,
+            [[("Callback", "cb"), ("Configuration", "conf")], [("Flow", "main")]],
+        )
+
+    def test_incremental(self):
+        importer = self.importer()
+        importer.run({"Flow": ["main"]})
+        self.assertEqual(importer.summary(), {"new": 5, "changed": 0, "unchanged": 0})
+        self.assertEqual(len(self.db.hgetall(HASHES_KEY)), 5)
+
+        # nothing written again
+        self.executed = []
+        importer = self.importer()
+        importer.run({"Flow": ["main"]})
+        self.assertEqual(self.executed, [])
+        self.assertEqual(importer.summary(), {"new": 0, "changed": 0, "unchanged": 5})
+        self.assertTrue(importer.imported("Flow", "main"))
+        tracked = [call.kwargs["new_data"] for call in self.package.update_packagedata.mock_calls]
+        self.assertIn(["main"], [data.get("Flow") for data in tracked])
+
+        # a changed file and an object removed from the database
+        main = document("Flow", "main", {"Container": {"c": {"ContainerFlow": "sub"}}})
+        files = dict(FILES, **{"Flow/main.json": main})
+        self.db.delete(*self.db.keys("Callback:cb,*"))
+        importer = self.importer(files)
+        importer.run({"Flow": ["main"]})
+        self.assertEqual(self.executed, [[("Callback", "cb")], [("Flow", "main")]])
+        self.assertEqual(importer.summary(), {"new": 0, "changed": 2, "unchanged": 3})
+
+        # everything written again
+        self.executed = []
+        self.importer(files, incremental=False).run({"Flow": ["main"]})
+        self.assertEqual(len(self.executed), 4)
+
+    def test_incremental_individual(self):
+        # one object at a time
+        with mock.patch.object(Scope, "validate_format", classmethod(lambda *args: None)):
+            for state in ("new", "unchanged"):
+                importer = self.importer(workers=1, recursive=False)
+                importer.run({"Callback": ["cb"]})
+                self.assertEqual(importer.summary()[state], 1)
+        self.assertEqual(self.executed, [[("Callback", "cb")]])
+
+    def test_failed_write_keeps_the_object(self):
+        self.importer().run({"Flow": ["main"]})
+        keys = sorted(self.db.keys("Flow:main,*"))
+        set_ = MovaiDB.set
+
+        def set_flows(movaidb, data, *args, **kwargs):
+            if "Flow" in data:
+                raise ValueError("not written")
+            return set_(movaidb, data, *args, **kwargs)
+
+        main = document("Flow", "main", {"NodeInst": {"a": {"Template": "N1"}}})
+        files = dict(FILES, **{"Flow/main.json": main, "Configuration/conf.yaml": "rate: 2"})
+        with mock.patch.object(MovaiDB, "set", autospec=True, side_effect=set_flows), mock.patch(
+            "builtins.print"
+        ) as printed:
+            self.importer(files, force=True, clean_old_data=True).run({"Flow": ["main"]})
+
+        self.assertIn(mock.call("Failed to import 'Flow:main'"), printed.mock_calls)
+        # the old keys of the flow are not deleted, the other objects are written again
+        self.assertEqual(sorted(self.db.keys("Flow:main,*")), keys)
+        self.assertNotIn(b"Flow:main", self.db.hgetall(HASHES_KEY))
+        [yaml_key] = self.db.keys("Configuration:conf,Yaml:*")
+        self.assertIn(b"rate: 2", self.db.get(yaml_key))
+
+    def test_archive(self):
+        # the project is imported straight from the archive
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "project.zip")
+            with zipfile.ZipFile(path, "w") as archive:
+                for name, text in FILES.items():
+                    archive.writestr(f"project/metadata/{name}", text)
+
+            with Importer(path, workspace="test", workers=2) as importer:
+                items = importer._plan([("Callback", ["cb"])], mock.Mock(map=map))
+                importer.run({"Flow": ["main"]})
+            # the archive opened by the importer is closed
+            self.assertIsNone(importer.source._zip.fp)
+
+        # a source given to the importer is left open
+        source = mock.Mock(wraps=InMemoryProjectSource(FILES))
+        with self.importer(source=source):
+            pass
+        source.close.assert_not_called()
+
+        self.assertEqual(len(self.executed), 4)
+        self.assertEqual(
+            items[("Callback", "cb")].data["Callback"]["cb"]["InstallPath"],
+            f"{path}/project/metadata/Callback/cb.json",
+        )
+
+
+class TestDependencies(unittest.TestCase):
+    """The parallel import follows the dependencies the import functions follow."""
+
+    def legacy(self, source, scope, name):
+        importer = Importer("project", source=source, dry=True, workers=1)
+        importer.run({scope: [name]})
+        return {(scope, name) for scope, names in importer._imported.items() for name in names}
+
+    def plan(self, source, scope, name):
+        importer = Importer("project", source=source, dry=True)
+        return set(importer._plan([(scope, [name])], mock.Mock(map=map)))
+
+    def assertSameObjects(self, source, scope, name):
+        # the dry run prints the files read
+        with mock.patch("builtins.print"):
+            objects = self.legacy(source, scope, name)
+            planned = self.plan(source, scope, name)
+        self.assertIn((scope, name), objects)
+        self.assertEqual(planned, objects, f"{scope}:{name}")
+        return objects
+
+    def test_fixture_project(self):
+        checked = {}
+        with Importer(str(METADATA), workspace="test", dry=True) as importer:
+            source = importer.source
+            for scope in Backup.SCOPES:
+                if scope in ("Package", "Ports"):
+                    continue
+                for name, _ in importer.get_files(scope, None):
+                    checked[(scope, name)] = self.assertSameObjects(source, scope, name)
+
+        self.assertEqual(len(checked), 21)
+        self.assertEqual(
+            checked[("Flow", "flow_with_nodes_and_subflow")],
+            {
+                ("Flow", "flow_with_nodes_and_subflow"),
+                ("Flow", "flow_with_duplicated_subflow"),
+                ("Flow", "flow_with_four_nodes"),
+                ("Node", "NodePub1"),
+                ("Node", "NodeSub1"),
+                ("Node", "NodePub2"),
+                ("Node", "NodeSub2"),
+            },
+        )
+
+    def test_scopes(self):
+        source = InMemoryProjectSource(DEPENDENCY_FILES)
+        self.assertEqual(
+            self.assertSameObjects(source, "StateMachine", "sm"),
+            {("StateMachine", "sm"), ("Callback", "cb")},
+        )
+        self.assertEqual(
+            self.assertSameObjects(source, "TaskTemplate", "tt"),
+            {("TaskTemplate", "tt"), ("Callback", "score"), ("SharedDataTemplate", "sdt")},
+        )
+        self.assertEqual(
+            self.assertSameObjects(source, "SharedDataEntry", "sde"),
+            {("SharedDataEntry", "sde"), ("SharedDataTemplate", "sdt")},
+        )
+        self.assertEqual(
+            self.assertSameObjects(source, "Ports", "pkg/P1"),
+            {("Ports", "pkg/P1"), ("Message", "msgs")},
+        )
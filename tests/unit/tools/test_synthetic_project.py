@@ -0,0 +1,82 @@
+"""Tests for the synthetic projects and benchmarks."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from dal.tools.benchmark import run_benchmarks
+from dal.tools.synthetic_project import ProjectSpec, generate_project
+from dal.validation.validator import JsonValidator
+
+
+class TestSyntheticProject(unittest.TestCase):
+    def test_generate(self):
+        spec = ProjectSpec.scaled(3)
+        project = generate_project(spec)
+
+        self.assertEqual(
+            project.count(), {"Flow": 12, "Node": 15, "Callback": 9, "Configuration": 6}
+        )
+        self.assertEqual(generate_project(spec).documents, project.documents)
+        self.assertNotEqual(
+            generate_project(ProjectSpec.scaled(3, seed=1)).documents, project.documents
+        )
+
+        flows = project.documents["Flow"]
+        for name, content in flows.items():
+            for container in content.get("Container", {}).values():
+                self.assertIn(container["ContainerFlow"], flows)
+            for node_inst in content["NodeInst"].values():
+                self.assertIn(node_inst["Template"], project.documents["Node"])
+        self.assertTrue(set(project.top_flows()) < set(flows))
+
+        errors = JsonValidator().validate_many(
+            "flow", {name: {"Flow": {name: content}} for name, content in flows.items()}
+        )
+        self.assertEqual(errors, {})
+
+    def test_write(self):
+        project = generate_project(ProjectSpec())
+
+        with tempfile.TemporaryDirectory() as path:
+            project.write(path)
+
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(path, "Callback"))),
+                sorted(
+                    f"{name}.{extension}"
+                    for name in project.documents["Callback"]
+                    for extension in ("json", "py")
+                ),
+            )
+            name = next(iter(project.documents["Configuration"]))
+            with open(os.path.join(path, "Configuration", f"{name}.json")) as file:
+                self.assertNotIn("Yaml", json.load(file)["Configuration"][name])
+            with open(os.path.join(path, "manifest.txt")) as file:
+                self.assertEqual(len(file.readlines()), sum(project.count().values()))
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_report(self):
+        report = run_benchmarks([1, 2], ["schema_validation"], repeat=2)
+
+        self.assertEqual([scale["scale"] for scale in report["scales"]], [1, 2])
+        result = report["scales"][1]["results"]["schema_validation"]
+        self.assertEqual(len(result["runs"]), 2)
+        self.assertEqual(result["min"], min(result["runs"]))
+        json.dumps(report)
+
+    def test_imports(self):
+        # imported once untimed, then the unchanged imports are timed
+        with mock.patch("dal.tools.benchmark._connect", return_value=mock.Mock()), mock.patch(
+            "dal.tools.backup.Importer"
+        ) as importer:
+            report = run_benchmarks([1], ["import_unchanged"], repeat=2)
+
+        self.assertEqual(len(report["scales"][0]["results"]["import_unchanged"]["runs"]), 2)
+        self.assertEqual(
+            [call.kwargs for call in importer.mock_calls if call[0] == ""],
+            [{"incremental": False}, {}, {}],
+        )
@@ -0,0 +1,80 @@
+"""Tests for the usage matrix of the usage_search module."""
+
+import io
+import json
+import unittest
+from unittest import mock
+
+import pytest
+
+from dal.movaidb import MovaiDB
+from dal.tools.usage_search import Searcher
+
+OBJECTS = {
+    "Flow": {
+        "leaf": {"NodeInst": {"pub": {"Template": "Pub"}}},
+        "middle": {
+            "NodeInst": {"sub": {"Template": "Sub"}},
+            "Container": {
+                "c1": {"ContainerFlow": "leaf", "ContainerLabel": "c1"},
+                "c2": {"ContainerFlow": "leaf", "ContainerLabel": "c2"},
+            },
+        },
+        "main": {"Container": {"top": {"ContainerFlow": "middle", "ContainerLabel": "top"}}},
+    },
+    "Node": {"Pub": {}, "Sub": {}, "Unused": {}},
+}
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestUsageMatrix(unittest.TestCase):
+    def setUp(self):
+        self.movaidb = MovaiDB()
+        for scope, objects in OBJECTS.items():
+            for name, data in objects.items():
+                self.movaidb.set({scope: {name: {"Label": name, **data}}})
+
+    def test_usage_matrix(self):
+        with mock.patch.object(self.movaidb, "get_many", wraps=self.movaidb.get_many) as get_many:
+            results = {
+                (result.scope, result.name): result.usage.model_dump()["flow"]
+                for result in Searcher().usage_matrix(self.movaidb)
+            }
+
+        # all the flows in one read
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(
+            results[("Node", "Pub")],
+            {
+                "leaf": {"direct": [{"node_instance_name": "pub"}], "indirect": []},
+                "middle": {
+                    "direct": [],
+                    "indirect": [
+                        {"flow_template_name": "leaf", "flow_instance_name": "c1"},
+                        {"flow_template_name": "leaf", "flow_instance_name": "c2"},
+                    ],
+                },
+                "main": {
+                    "direct": [],
+                    "indirect": [{"flow_template_name": "middle", "flow_instance_name": "top"}],
+                },
+            },
+        )
+        self.assertEqual(
+            results[("Flow", "middle")],
+            {"main": {"direct": [{"flow_instance_name": "top"}], "indirect": []}},
+        )
+        self.assertEqual(results[("Node", "Unused")], {})
+        self.assertEqual(results[("Flow", "main")], {})
+
+    def test_search_all(self):
+        searcher = Searcher()
+        matrix = list(searcher.usage_matrix(self.movaidb))
+        searcher.usage_matrix = lambda: iter(matrix)
+
+        output = io.StringIO()
+        self.assertEqual(searcher.search_all(output), 0)
+
+        document = json.loads(output.getvalue())
+        self.assertEqual(len(document["usage"]), 6)
+        self.assertEqual(document["unused"], {"Node": ["Unused"], "Flow": ["main"]})
@@ -0,0 +1,65 @@
+"""Tests for the generation stamps of the objects."""
+from dal.movaidb import MovaiDB
+from dal.scopes.flow import Flow
+from dal.utils.generations import bump, object_names, stamps
+from dal.utils.redis_mocks import FakeRedis
+from dal.utils.usage_search.usage_index import DIRTY_KEY
+
+
+def test_object_names():
+    assert object_names(
+        [
+            "Flow:main,NodeInst:a,Template:",
+            b"Flow:main,Label:",
+            "Var:global,ID:x@,Value:",
+            "_usage_index/dirty",
+            "_launch_plan:global/Flow/main/__UNVERSIONED__",
+        ]
+    ) == {"Flow:main", "Var:global"}
+
+
+def test_bump():
+    conn = FakeRedis()
+    with conn.pipeline() as pipe:
+        bump(
+            pipe,
+            ["Flow:main,Label:", "Flow:main,Links:l1,From:", "Node:n1,Label:", "Var:global,ID:x@,"],
+        )
+        pipe.execute()
+    bump(conn, ["Node:n1,Label:"])
+
+    assert stamps(conn, ["Flow:main", "Node:n1", "Node:n2"]) == {
+        "Flow:main": 1,
+        "Node:n1": 2,
+        "Node:n2": None,
+    }
+    # once per scope of each write
+    # only the scopes launch plans are computed from
+    assert stamps(conn, ["Flow", "Node", "Var"]) == {"Flow": 1, "Node": 2, "Var": None}
+    assert stamps(conn, []) == {}
+
+
+def test_scope_writes(fake_redis):
+    flow = {"Label": "main", "NodeInst": {"pub": {"Template": "Pub", "NodeLabel": "pub"}}}
+    MovaiDB().set({"Flow": {"main": flow}})
+    MovaiDB().set({"Var": {"global": {"ID": {"x": {"Value": 1}}}}})
+    # MovaiDB writes are not stamped, the scopes are
+    assert stamps(fake_redis, ["Flow:main"]) == {"Flow:main": None}
+
+    flow = Flow("main")
+    fake_redis.commands.clear()
+    flow.Label = "other"
+    # in the transaction of the write
+    assert [name for name, _ in fake_redis.commands] == ["set", "hincrby", "hincrby"]
+    assert fake_redis.smembers(DIRTY_KEY) == set()
+
+    flow.delete("NodeInst", "pub")
+    assert fake_redis.smembers(DIRTY_KEY) == {b"main"}
+
+    flow.remove()
+    assert stamps(fake_redis, ["Flow:main", "Flow", "Var:global", "Var"]) == {
+        "Flow:main": 3,
+        "Flow": 3,
+        "Var:global": None,
+        "Var": None,
+    }
@@ -0,0 +1,49 @@
+import json
+import unittest
+
+from dal.validation.json_lines import LineIndexCache, json_line_index
+from dal.validation.project_validator import _find_json_path_line, _scan_json_path_line
+
+DOCUMENT = {
+    "Flow": {
+        "main": {
+            "Container": {},
+            "Label": "main",
+            "Layers": [],
+            "Links": {
+                "l1": {"From": "pub/out/out", "To": "sub/in/in"},
+                "l2": {"From": "start/start/start", "To": "pub/run/in"},
+            },
+            "NodeInst": {
+                "pub": {"Parameter": {"rate": {"Value": 10}}, "Template": "Pub"},
+                "sub": {"NodeLayers": [1, {"a": [2]}], "Template": "Sub"},
+            },
+        }
+    }
+}
+
+
+class TestJsonLines(unittest.TestCase):
+    def test_lines_match_json_dumps(self):
+        lines = json.dumps(DOCUMENT, indent=4, sort_keys=True).split("\n")
+        index = json_line_index(DOCUMENT)
+
+        self.assertEqual(len(index), 22)
+        for path, line in index.items():
+            self.assertTrue(lines[line - 1].strip().startswith(f'"{path[-1]}": '), path)
+
+    def test_same_lines_as_scan(self):
+        paths = [
+            ["Flow", "main", "Links", "l2", "To"],
+            ["Flow", "main", "NodeInst", "pub", "Parameter", "rate", "Value"],
+            ["Flow", "main", "NodeInst", "sub", "Template"],
+        ]
+        for path in paths:
+            self.assertEqual(
+                _find_json_path_line(DOCUMENT, path), _scan_json_path_line(DOCUMENT, path)
+            )
+
+    def test_cache(self):
+        cache = LineIndexCache()
+        self.assertIs(cache.get(DOCUMENT), cache.get(DOCUMENT))
+        self.assertIsNone(cache.find(DOCUMENT, ["Flow", "other"]))
@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+
+import pytest
+
+from dal.movaidb import MovaiDB
+from dal.validation.project_snapshot import ProjectSnapshot
+
+
+@pytest.mark.usefixtures("fake_redis")
+class TestProjectSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.movaidb = MovaiDB()
+        self.movaidb.set(
+            {"Flow": {"main": {"Label": "main", "NodeInst": {"pub": {"Template": "Pub"}}}}}
+        )
+        self.movaidb.set({"Node": {"Pub": {"Label": "Pub", "PortsInst": {}}}})
+
+        get = mock.patch.object(self.movaidb, "get", wraps=self.movaidb.get)
+        self.get = get.start()
+        self.addCleanup(get.stop)
+        self.snapshot = ProjectSnapshot.load(self.movaidb)
+
+    def reads(self):
+        return [call.args[0] for call in self.get.call_args_list]
+
+    def test_one_read_per_scope(self):
+        self.assertEqual(
+            self.reads(),
+            [{"Flow": {"*": "**"}}, {"Node": {"*": "**"}}, {"Configuration": {"*": "**"}}],
+        )
+
+    def test_get_dict_format(self):
+        flow = self.snapshot.get("Flow", "main")["Flow"]["main"]
+        self.assertEqual(flow["NodeInst"], {"pub": {"Template": "Pub"}})
+        # missing attributes are filled as in Scope.get_dict()
+        self.assertEqual(flow["Links"], {})
+        self.assertEqual(flow["Description"], "")
+        self.assertEqual(self.snapshot.get("Node", "Pub")["Node"]["Pub"]["Label"], "Pub")
+
+    def test_missing(self):
+        self.assertIsNone(self.snapshot.get("Flow", "other"))
+        self.assertIsNone(self.snapshot.read("Flow", "other", self.movaidb))
+        self.assertIsNone(self.snapshot.get("Callback", "Pub"))
+
+    def test_read_scopes_not_in_snapshot(self):
+        self.movaidb.set({"Callback": {"Pub": {"Label": "Pub"}}})
+        document = self.snapshot.read("Callback", "Pub", self.movaidb)
+        self.assertEqual(document["Callback"]["Pub"]["Label"], "Pub")
+        self.assertEqual(self.reads()[-1], {"Callback": {"Pub": "**"}})
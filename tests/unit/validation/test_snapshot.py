@@ -0,0 +1,108 @@
+"""Tests for the SchemaSnapshot class."""
+import json
+import os
+from unittest import mock
+
+from dal.movaidb.db_schema import DBSchema
+from dal.validation.snapshot import LazyMapping, SchemaSnapshot
+
+
+def write_schemas(folder, schemas):
+    for name, contents in schemas.items():
+        path = folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(contents))
+
+
+class TestSchemaSnapshot:
+    def test_snapshot_is_stored(self, tmp_path):
+        """Test that a second load uses the stored snapshot."""
+        folder = tmp_path / "schemas"
+        write_schemas(folder, {"1.0/Flow.json": {"schema": {"Flow": {}}}})
+
+        snapshot = SchemaSnapshot(folder, tmp_path / "cache")
+        assert snapshot.path.exists()
+        assert snapshot["1.0/Flow.json"] == {"schema": {"Flow": {}}}
+
+        cached = SchemaSnapshot(folder, tmp_path / "cache")
+        assert cached.digest == snapshot.digest
+        assert list(cached) == ["1.0/Flow.json"]
+
+    def test_stale_snapshot_is_rebuilt(self, tmp_path):
+        """Test that a change in the files replaces the snapshot."""
+        folder = tmp_path / "schemas"
+        write_schemas(folder, {"1.0/Flow.json": {"schema": {"Flow": {}}}})
+        old = SchemaSnapshot(folder, tmp_path / "cache")
+
+        write_schemas(folder, {"1.0/Flow.json": {"schema": {"Flow": {"Label": "str"}}}})
+        new = SchemaSnapshot(folder, tmp_path / "cache")
+
+        assert new.digest != old.digest
+        assert new["1.0/Flow.json"] == {"schema": {"Flow": {"Label": "str"}}}
+        # replaced in place
+        assert new.path == old.path
+        assert [path.name for path in (tmp_path / "cache").iterdir()] == [new.path.name]
+        assert json.loads(new.path.read_text())["digest"] == new.digest
+
+    def test_files_only_hashed_when_touched(self, tmp_path):
+        """Test that the files are only read when their time or size changed."""
+        folder = tmp_path / "schemas"
+        write_schemas(folder, {"1.0/Flow.json": {"schema": {}}, "1.0/Node.json": {"schema": {}}})
+        snapshot = SchemaSnapshot(folder, tmp_path / "cache")
+
+        with mock.patch.object(
+            SchemaSnapshot, "_read_files", autospec=True, side_effect=SchemaSnapshot._read_files
+        ) as read_files:
+            assert SchemaSnapshot(folder, tmp_path / "cache").digest == snapshot.digest
+            read_files.assert_not_called()
+
+            # same contents, a new modification time
+            stat = (folder / "1.0/Flow.json").stat()
+            os.utime(folder / "1.0/Flow.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert SchemaSnapshot(folder, tmp_path / "cache").digest == snapshot.digest
+            assert read_files.call_count == 1
+
+            # the new time is in the snapshot
+            assert SchemaSnapshot(folder, tmp_path / "cache").digest == snapshot.digest
+            assert read_files.call_count == 1
+
+    def test_db_schema_url(self, tmp_path):
+        """Test that the database schema is loaded from its url."""
+        folder = tmp_path / "schemas"
+        write_schemas(
+            folder,
+            {"1.0/Flow.json": {"schema": {"Label": "str"}}, "2.0/Flow.json": {"schema": {}}},
+        )
+        snapshot = SchemaSnapshot(folder / "1.0", tmp_path / "cache")
+
+        with mock.patch.dict(SchemaSnapshot._INSTANCES, {folder / "1.0": snapshot}), mock.patch(
+            "dal.movaidb.db_schema.REDIS_SCHEMA_FOLDER_PATH", f"file://{folder}"
+        ), mock.patch.dict(DBSchema.__API__, clear=True):
+            schema = DBSchema()
+            assert schema.url == f"file://{folder}/1.0"
+            assert list(schema.keys()) == ["Flow"]
+            assert schema["Flow"] == {"Label": "str"}
+
+    def test_load_returns_a_copy(self, tmp_path):
+        """Test that load returns an object that can be changed."""
+        folder = tmp_path / "schemas"
+        write_schemas(folder, {"1.0/Flow.json": {"schema": {}}})
+        snapshot = SchemaSnapshot(folder, tmp_path / "cache")
+
+        snapshot.load("1.0/Flow.json")["schema"]["changed"] = True
+        assert snapshot["1.0/Flow.json"] == {"schema": {}}
+
+    def test_lazy_mapping(self):
+        """Test that values are only loaded once and when used."""
+        loaded = []
+
+        def loader(key):
+            loaded.append(key)
+            return key.upper()
+
+        mapping = LazyMapping(["a", "b"], loader)
+        assert "a" in mapping and len(mapping) == 2
+        assert loaded == []
+        assert mapping["a"] == "A" and mapping["a"] == "A"
+        assert loaded == ["a"]
+        assert mapping.get("c") is None
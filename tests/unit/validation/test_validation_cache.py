@@ -0,0 +1,126 @@
+import copy
+import tempfile
+import unittest
+
+from dal.validation.issues import MissingMob, ProjIssue
+from dal.validation.project_validator import ProjectValidator
+from dal.validation.validation_cache import (
+    DiskValidationCache,
+    ValidationCache,
+    flow_fingerprint,
+)
+
+
+DOCUMENTS = {
+    "Flow": {
+        "main": {
+            "NodeInst": {"pub": {"Template": "Pub"}},
+            "Container": {"sub": {"ContainerFlow": "leaf"}},
+        },
+        "leaf": {
+            "NodeInst": {
+                "tick": {
+                    "Template": "Tick",
+                    "Parameter": {"rate": {"Value": "$(config timers.rate)"}},
+                }
+            }
+        },
+        "other": {"NodeInst": {"pub": {"Template": "Pub"}}},
+    },
+    "Node": {"Pub": {"Label": "Pub"}, "Tick": {"Label": "Tick"}},
+    "Configuration": {"timers": {"Yaml": "rate: 1"}},
+}
+
+
+class TestFlowFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.documents = copy.deepcopy(DOCUMENTS)
+
+    def read(self, scope, name):
+        content = self.documents.get(scope, {}).get(name)
+        return {scope: {name: content}} if content is not None else None
+
+    def test_dependencies_change_the_fingerprint(self):
+        before = flow_fingerprint("main", self.read)
+
+        self.documents["Node"]["Tick"]["Label"] = "changed"
+        after_node = flow_fingerprint("main", self.read)
+        self.assertNotEqual(before, after_node)
+
+        self.documents["Configuration"]["timers"]["Yaml"] = "rate: 2"
+        self.assertNotEqual(after_node, flow_fingerprint("main", self.read))
+
+    def test_other_objects_do_not_change_the_fingerprint(self):
+        before = flow_fingerprint("main", self.read)
+        self.documents["Flow"]["other"]["Label"] = "changed"
+        self.documents["Node"]["Unused"] = {"Label": "Unused"}
+        self.assertEqual(before, flow_fingerprint("main", self.read))
+
+    def test_missing_objects(self):
+        del self.documents["Flow"]["leaf"]
+        before = flow_fingerprint("main", self.read)
+        self.documents["Flow"]["leaf"] = {}
+        self.assertNotEqual(before, flow_fingerprint("main", self.read))
+
+
+class TestIncrementalValidation(unittest.TestCase):
+    def setUp(self):
+        self.documents = copy.deepcopy(DOCUMENTS)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskValidationCache(self.tmp.name)
+        self.checked = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def validator(self):
+        validator = ProjectValidator(cache=self.cache)
+        validator._read = lambda scope, name: (
+            {scope: {name: self.documents[scope][name]}}
+            if name in self.documents.get(scope, {})
+            else None
+        )
+
+        def check_flow(flow_ref):
+            self.checked.append(flow_ref)
+            return [
+                MissingMob(
+                    json_path=f"{flow_ref}.json",
+                    msg="missing",
+                    document_type="Flow",
+                    document_name=flow_ref,
+                )
+            ]
+
+        validator.check_flow = check_flow
+        return validator
+
+    def test_only_changed_flows_are_checked(self):
+        first = self.validator().check_flow_cached("main")
+        cached = self.validator().check_flow_cached("main")
+        self.assertEqual(self.checked, ["main"])
+        self.assertEqual(cached[0].msg, first[0].msg)
+        self.assertEqual(cached[0].severity, first[0].severity)
+        # the cached issues are the same type as the checked ones
+        self.assertIsInstance(cached[0], ProjIssue)
+        self.assertEqual(
+            ProjectValidator._project_issue(cached[0]), ProjectValidator._project_issue(first[0])
+        )
+
+        self.documents["Node"]["Tick"]["Label"] = "changed"
+        self.validator().check_flow_cached("main")
+        self.assertEqual(self.checked, ["main", "main"])
+
+    def test_force(self):
+        self.validator().check_flow_cached("main")
+        self.validator().check_flow_cached("main", force=True)
+        self.assertEqual(self.checked, ["main", "main"])
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            ValidationCache()
+
+    def test_clear(self):
+        self.validator().check_flow_cached("main")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("main"))
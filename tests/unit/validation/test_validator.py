@@ -1,6 +1,7 @@
 """Tests for the JsonValidator class."""
 import pytest
 import time
+from unittest import mock
 
 from dal.validation.validator import JsonValidator
 import dal.exceptions
@@ -47,3 +48,24 @@ class TestJsonValidator:
             validator.validate("Translation", valid_data)
         time_per_validation = (time.perf_counter() - start_time) / times
         assert time_per_validation < 0.01, "Validation took too long per call"
+
+    def test_validate_many(self, valid_data, invalid_data):
+        """Test that only the invalid documents are reported."""
+        validator = JsonValidator()
+        errors = validator.validate_many("Translation", {"valid": valid_data, "bad": invalid_data})
+        assert list(errors) == ["bad"]
+        assert "invalid_data" in errors["bad"]
+
+    def test_validate_memoized(self, valid_data, invalid_data):
+        """Test that only the documents that passed are not validated again."""
+        schema = JsonValidator().schema_types["Translation"]
+        data = {**valid_data, "Label": "memoized"}
+
+        with mock.patch.object(schema, "validator", mock.Mock(wraps=schema.validator)) as validator:
+            assert schema.validate(data)["status"]
+            assert schema.validate(dict(data))["status"]
+            assert validator.validate.call_count == 1
+
+            assert not schema.validate(invalid_data)["status"]
+            assert not schema.validate(invalid_data)["status"]
+            assert validator.validate.call_count == 3
@@ -1,6 +1,8 @@
 """Tests for backup tool."""
 import os
 import json
+import shutil
+from contextlib import ExitStack
 from filecmp import cmpfiles
 
 import pytest
@@ -31,13 +33,35 @@ class TestToolsBackup:
     - Invalid data handling
     """
 
-    @staticmethod
-    def get_source(manifest_file, metadata_folder, source_type):
+    @pytest.fixture(autouse=True)
+    def project_sources(self, tmp_path_factory):
+        """Close the sources opened by a test, archives are kept in a pytest folder."""
+        with ExitStack() as stack:
+            self.sources = stack
+            self.archives = tmp_path_factory.mktemp("archives")
+            yield
+
+    def get_source(self, manifest_file, metadata_folder, source_type):
         """Get the appropriate source based on the source_type."""
-        from dal.tools.backup import FilesystemProjectSource, InMemoryProjectSource
+        from dal.tools.backup import (
+            ArchiveProjectSource,
+            FilesystemProjectSource,
+            InMemoryProjectSource,
+        )
 
         if source_type == "FilesystemProjectSource":
             return FilesystemProjectSource(metadata_folder)
+        elif source_type == "ArchiveProjectSource":
+            # the metadata folder is a folder of the zip
+            archive = shutil.make_archive(
+                str(self.archives / metadata_folder.name),
+                "zip",
+                root_dir=metadata_folder.parent,
+                base_dir=metadata_folder.name,
+            )
+            return self.sources.enter_context(
+                ArchiveProjectSource(archive, root=metadata_folder.name)
+            )
         else:
             files = {manifest_file.name: manifest_file.read_bytes()}
 
@@ -56,8 +80,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_manifest(self, global_db, metadata_folder, manifest_file, source_type):
         from dal.tools.backup import Importer, Backup
@@ -116,8 +141,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_export_alert(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -160,8 +186,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_export_callback(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -220,8 +247,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_export_configuration(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -280,8 +308,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_export_flow(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -332,8 +361,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_flow_with_dependencies(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -380,8 +410,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_export_node(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -431,8 +462,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_node_multiple(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -465,8 +497,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_package(
         self, global_db, metadata_folder, metadata2_folder, manifest_file, source_type
@@ -519,8 +552,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_export_translation(
         self, global_db, metadata_folder, manifest_file, tmp_path, source_type
@@ -575,8 +609,9 @@ class TestToolsBackup:
         [
             "FilesystemProjectSource",
             "InMemoryProjectSource",
+            "ArchiveProjectSource",
         ],
-        ids=["FilesystemProjectSource", "InMemoryProjectSource"],
+        ids=["FilesystemProjectSource", "InMemoryProjectSource", "ArchiveProjectSource"],
     )
     def test_import_invalid_data(
         self,